@@ -10,6 +10,7 @@ Typical usage example::
   collectives.create_app().run(debug=True)
 """
 
+import os
 from logging.config import fileConfig
 
 import werkzeug
@@ -19,7 +20,7 @@ from flask_login import LoginManager, current_user
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 
-from collectives import api, forms, models
+from collectives import api, commands, forms, models
 from collectives.models import Configuration, DBAdaptedFlaskConfig
 from collectives.routes import (
     activity_supervison,
@@ -34,7 +35,18 @@ from collectives.routes import (
     root,
     technician,
 )
-from collectives.utils import error, extranet, init, jinja, payline
+from collectives.utils import (
+    admission,
+    cache,
+    error,
+    extranet,
+    image_pool,
+    init,
+    jinja,
+    mail,
+    payline,
+    stats,
+)
 
 csrf = CSRFProtect()
 
@@ -87,14 +99,23 @@ def create_app(config_filename="config.py", extra_config=None):
     profile.images.init_app(app)
     extranet.api.init_app(app)
     payline.api.init_app(app)
+    cache.event_list_cache.init_app(app)
+    models.user_group.user_group_memberships.init_app(app)
+    stats.statistics_cache.init_app(app)
+    mail.mail_queue.init_app(app)
+    mail.mail_spool.init_app(app)
+    admission.admission_queue.init_app(app)
+    image_pool.image_pool.init_app(app)
     csrf.init_app(app)  # CSRF-protect non FLaskWTF views
 
     app.context_processor(jinja.helpers_processor)
 
     _migrate = Migrate(app, models.db)
+    app.cli.add_command(commands.cli)
 
     with app.app_context():
-        init.populate_db(app)
+        if app.config["APP_INIT"] == "startup":
+            init.populate_db(app)
 
         app.config = DBAdaptedFlaskConfig(app.config)
 
@@ -119,8 +140,11 @@ def create_app(config_filename="config.py", extra_config=None):
 
         assets.register("scss_all", scss)
         if not app.config.get("DEBUG", False):
-            # production environment
-            scss.build()
+            # production environment: stylesheets are compiled by
+            # `flask collectives init`, unless they are missing
+            output = os.path.join(assets.directory, scss.output)
+            if app.config["APP_INIT"] == "startup" or not os.path.exists(output):
+                scss.build()
 
         # Register blueprints
         app.register_blueprint(root.blueprint)
@@ -145,6 +169,10 @@ def create_app(config_filename="config.py", extra_config=None):
         forms.configure_forms(app)
         forms.csrf.init_app(app)
 
+        if not init.is_running_migration():
+            mail.mail_spool.start_worker(app)
+            admission.admission_queue.start_worker(app)
+
         return app
 
 
@@ -8,7 +8,7 @@ import json
 
 from flask import abort, request
 from flask_login import current_user
-from sqlalchemy import and_, func
+from sqlalchemy import and_
 from sqlalchemy.orm import Query
 
 from collectives.api.common import blueprint
@@ -33,10 +33,14 @@ class AutocompleteUserSchema(UserIdentitySchema):
 
 
 def _make_autocomplete_query(pattern: str) -> Query:
-    """Builds the autocomplete query for the provided pattern"""
+    """Builds the autocomplete query for the provided pattern.
+
+    Names and license numbers are looked up in the user search index, see
+    :py:meth:`collectives.models.user.search.UserSearchMixin.search_condition`
+    """
 
     query = db.session.query(User)
-    query = query.filter(func.lower(User.full_name()).like(f"%{pattern}%"))
+    query = query.filter(User.search_condition(pattern))
     query = query.order_by(User.is_active.desc(), User.full_name(), User.id)
 
     return query
@@ -12,6 +12,8 @@ Typical usage example:
 from flask import Blueprint, url_for
 from flask_marshmallow import Marshmallow
 
+from collectives.utils.images import derived_image_url
+
 marshmallow = Marshmallow()
 """ Marshmallow object.
 
@@ -33,7 +35,7 @@ def avatar_url(user):
         it returns the default avatar SVG.
     """
     if user.avatar is not None:
-        return url_for("images.crop", filename=user.avatar, width=30, height=30)
+        return derived_image_url(user.avatar, "avatar_small")
     return url_for(
         "static", filename="img/default/users/avatar-0" + str(user.id % 6 + 1) + ".png"
     )
@@ -7,13 +7,14 @@ from marshmallow import fields
 
 from collectives.api.common import blueprint, marshmallow
 from collectives.models import Equipment, EquipmentModel, EquipmentType, db
+from collectives.utils.images import derived_image_url
 from collectives.utils.numbers import format_currency
 
 
 def photo_uri(equipment_type):
-    """Generate an URI for event image using Flask-Images.
+    """Generate an URI for equipment type image, see :py:mod:`collectives.utils.images`.
 
-    Returned images are thumbnail of 200x130 px.
+    Returned images fit in 300x300 px.
 
     :param event: Event which will be used to get the image.
     :type event: :py:class:`collectives.models.event.Event`
@@ -21,9 +22,7 @@ def photo_uri(equipment_type):
     :rtype: string
     """
     if equipment_type.path_img is not None:
-        return url_for(
-            "static", filename="uploads/typeEquipmentImg/" + equipment_type.path_img
-        )
+        return derived_image_url(equipment_type.path_img, "equipment_type")
     return url_for("static", filename="img/icon/ionicon/md-images.svg")
 
 
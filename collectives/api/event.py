@@ -1,13 +1,15 @@
 """API to get the event list in index page."""
 
+import base64
+import binascii
 import json
 import re
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from flask import abort, request, url_for
 from flask_login import current_user
 from marshmallow import fields
-from sqlalchemy import and_, func, or_
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import joinedload, selectinload
 
 from collectives.api.common import blueprint, marshmallow
@@ -26,7 +28,9 @@ from collectives.models import (
     User,
     db,
 )
+from collectives.models.event.model import event_activity_types, event_leaders
 from collectives.utils.access import valid_user
+from collectives.utils.cache import event_list_cache
 from collectives.utils.time import current_time, parse_api_date
 
 
@@ -42,6 +46,10 @@ def filter_hidden_events(query):
      - Users with role for an activity can see 'Activity' events
      - Users with any role can see 'Activity' events without activities
 
+    The rights of the current user are read from its cached
+    :py:meth:`collectives.models.user.User.visibility_profile`, and compiled
+    into flat ``IN`` subqueries on the association tables.
+
     :param query: The original query
     :type query: :py:class:`sqlalchemy.orm.query.Query`
     :return: The filtered query
@@ -52,46 +60,170 @@ def filter_hidden_events(query):
         # Not logged users see no pending/private event
         query = query.filter(Event.status != EventStatus.Pending)
         query = query.filter(Event.visibility != EventVisibility.Activity)
-    elif current_user.is_moderator():
+        return query
+
+    profile = current_user.visibility_profile()
+    if profile.is_moderator:
         # Admin see all pending/private events (no filter)
-        pass
+        return query
+
+    # Regular user can see no Pending
+    status_query_filter = Event.status != EventStatus.Pending
+
+    # If user is a supervisor, it can see Pending events of its activities
+    if profile.supervised_activity_ids:
+        status_query_filter = or_(
+            status_query_filter,
+            _event_has_activity(profile.supervised_activity_ids),
+        )
+
+    # Users can only see Activity events for their activities
+    vis_query_filter = Event.visibility != EventVisibility.Activity
+    if profile.role_activity_ids:
+        vis_query_filter = or_(
+            vis_query_filter, _event_has_activity(profile.role_activity_ids)
+        )
+    # Special case for Activity events without activities: all user with roles can see them
+    if profile.has_any_role:
+        with_activity = select(event_activity_types.c.event_id).where(
+            event_activity_types.c.event_id.is_not(None)
+        )
+        vis_query_filter = or_(vis_query_filter, Event.id.not_in(with_activity))
+
+    # If user can create event, they can see all events they lead
+    query_filter = and_(status_query_filter, vis_query_filter)
+    if profile.can_lead_events:
+        led_events = select(event_leaders.c.event_id).where(
+            event_leaders.c.user_id == current_user.id
+        )
+        query_filter = or_(query_filter, Event.id.in_(led_events))
+
+    # After filter construction, it is applied to the query
+    return query.filter(query_filter)
+
+
+def _event_has_activity(activity_ids):
+    """:return: a filter on events related to any of the activities.
+
+    :param activity_ids: Ids of the activities
+    :type activity_ids: set(int)
+    """
+    events_with_activity = select(event_activity_types.c.event_id).where(
+        event_activity_types.c.activity_id.in_(activity_ids)
+    )
+    return Event.id.in_(events_with_activity)
+
+
+def encode_event_cursor(event):
+    """Build an opaque pagination cursor pointing just after an event.
+
+    The cursor follows the ``(Event.start, Event.id)`` ordering of the event list.
+
+    :param event: Last event of the current page
+    :type event: :py:class:`collectives.models.event.Event`
+    :return: An URL-safe cursor string
+    :rtype: string
+    """
+    payload = json.dumps([event.start.isoformat(), event.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_event_cursor(cursor):
+    """Decode a cursor built by :py:func:`encode_event_cursor`.
+
+    :param string cursor: The opaque cursor string
+    :return: The start and id of the last event of the previous page
+    :rtype: (:py:class:`datetime.datetime`, int)
+    :raises ValueError: If the cursor is malformed
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = base64.urlsafe_b64decode(cursor + padding).decode()
+        start, event_id = json.loads(payload)
+        return datetime.fromisoformat(start), int(event_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as err:
+        raise ValueError(f"Invalid cursor {cursor}") from err
+
+
+def paginate_with_cursor(query, cursor, size):
+    """Fetch a page of events using keyset pagination.
+
+    Contrary to ``query.paginate()``, no ``COUNT(*)`` nor ``OFFSET`` scan is
+    made: the page starts right after the event designated by ``cursor``. The
+    query must be ordered by ``(Event.start, Event.id)``.
+
+    :param query: The filtered and ordered event query
+    :type query: :py:class:`sqlalchemy.orm.query.Query`
+    :param string cursor: Cursor of the previous page, empty for the first page
+    :param int size: Number of events per page
+    :return: The events of the page, and the cursor of the next page (None
+        if this is the last page)
+    :rtype: (list(:py:class:`collectives.models.event.Event`), string)
+    """
+    if cursor:
+        start, event_id = decode_event_cursor(cursor)
+        query = query.filter(
+            or_(Event.start > start, and_(Event.start == start, Event.id > event_id))
+        )
+
+    # Fetch one more item to know whether there is a next page
+    items = query.limit(size + 1).all()
+    if len(items) <= size:
+        return items, None
+    items = items[:size]
+    return items, encode_event_cursor(items[-1])
+
+
+_EVENT_LIST_HEADERS = {
+    "content-type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+}
+""" HTTP headers of the event list responses"""
+
+
+def _event_list_cache_key():
+    """Build the key under which the current event list request is cached.
+
+    The key is made of the normalised pagination and filter arguments, and of
+    the visibility class of the current user: anonymous, moderator, or regular
+    users sharing the same :py:meth:`collectives.models.user.User.visibility_profile`.
+    Since leaders also see the events they lead, their key includes their id.
+
+    :return: The cache key
+    :rtype: string
+    """
+    if not current_user.is_authenticated:
+        visibility = "anonymous"
     else:
-        # Regular user can see no Pending
-        status_query_filter = Event.status != EventStatus.Pending
-
-        # If user is a supervisor, it can see Pending events of its activities
-        if current_user.is_supervisor():
-            # Supervisors can see all sup
-            activities = current_user.get_supervised_activities()
-            activities_ids = [a.id for a in activities]
-            activity_filter = Event.activity_types.any(
-                ActivityType.id.in_(activities_ids)
-            )
-            status_query_filter = or_(status_query_filter, activity_filter)
-
-        # Users can only see Activity events for their activities
-        vis_query_filter = Event.visibility != EventVisibility.Activity
-        activities = current_user.activities_with_role()
-        if activities:
-            activities_ids = [a.id for a in activities]
-            activity_filter = Event.activity_types.any(
-                ActivityType.id.in_(activities_ids)
+        profile = current_user.visibility_profile()
+        if profile.is_moderator:
+            visibility = "moderator"
+        else:
+            visibility = json.dumps(
+                [
+                    sorted(profile.supervised_activity_ids),
+                    sorted(profile.role_activity_ids),
+                    profile.has_any_role,
+                    current_user.id if profile.can_lead_events else None,
+                ]
             )
-            vis_query_filter = or_(vis_query_filter, activity_filter)
-        # Special case for Activity events without activities: all user with roles can see them
-        if current_user.has_any_role():
-            vis_query_filter = or_(vis_query_filter, ~Event.activity_types.any())
-
-        # If user can create event, they can see all events they lead
-        query_filter = and_(status_query_filter, vis_query_filter)
-        if current_user.can_create_events():
-            lead = Event.leaders.any(id=current_user.id)
-            query_filter = or_(query_filter, lead)
 
-        # After filter construction, it is applied to the query
-        query = query.filter(query_filter)
+    filters = []
+    i = 0
+    while f"filters[{i}][field]" in request.args:
+        filters.append(
+            [
+                request.args.get(f"filters[{i}][field]"),
+                request.args.get(f"filters[{i}][type]"),
+                request.args.get(f"filters[{i}][value]"),
+            ]
+        )
+        i += 1
 
-    return query
+    pagination = [
+        request.args.get(name) for name in ("page", "size", "cursor", "count")
+    ]
+    return json.dumps([visibility, pagination, sorted(filters, key=str)])
 
 
 @blueprint.route("/events/")
@@ -101,6 +233,11 @@ def events():
     It can be filtered using tabulator filter and sorter. It is paginated using
     ``page`` and ``size`` GET parameters. Regular users cannot see `Pending` event.
 
+    If a ``cursor`` GET parameter is present (empty for the first page), keyset
+    pagination is used instead: the response contains a ``next_cursor`` to
+    request the following page, and the ``total`` is only computed if the
+    ``count`` GET parameter is set.
+
     :return: A tuple:
 
         - JSON containing information describe in EventSchema
@@ -111,12 +248,19 @@ def events():
     """
     page = int(request.args.get("page", 0))
     size = int(request.args.get("size", 25))
+    cursor = request.args.get("cursor")
+
+    # Read before any query, so that a response built from data older than a
+    # concurrent invalidation is not stored
+    cache_generation = event_list_cache.generation()
+    cache_key = _event_list_cache_key()
+    content = event_list_cache.get(cache_key)
+    if content is not None:
+        return content, 200, _EVENT_LIST_HEADERS
 
     # Initialize query
     query = db.session.query(Event)
-    query = query.options(
-        selectinload(Event.tag_refs), selectinload(Event.registrations)
-    )
+    query = query.options(selectinload(Event.tag_refs))
 
     # Hide very old events to unauthenticated
     if not current_user.is_authenticated:
@@ -151,7 +295,7 @@ def events():
                 func.lower(User.first_name + " " + User.last_name).like(f"%{value}%")
             )
         elif field == "title":
-            query_filter = Event.title.like(f"%{value}%")
+            query_filter = Event.search_condition(value, in_description=False)
         elif field == "start":
             value = parse_api_date(value)
             if value is not None:
@@ -203,20 +347,29 @@ def events():
     query = query.order_by(Event.start)
     query = query.order_by(Event.id)
 
-    paginated_events = query.paginate(page=page, per_page=size, error_out=False)
-    data = EventSchema(many=True).dump(paginated_events.items)
-
-    return (
-        json.dumps(
-            {
-                "data": data,
-                "last_page": paginated_events.pages,
-                "total": paginated_events.total,
-            }
-        ),
-        200,
-        {"content-type": "application/json", "Access-Control-Allow-Origin": "*"},
-    )
+    if cursor is not None:
+        try:
+            items, next_cursor = paginate_with_cursor(query, cursor, size)
+        except ValueError:
+            abort(400)
+        response = {
+            "data": EventSchema(many=True).dump(items),
+            "next_cursor": next_cursor,
+        }
+        if request.args.get("count", type=int):
+            response["total"] = query.order_by(None).count()
+    else:
+        paginated_events = query.paginate(page=page, per_page=size, error_out=False)
+        response = {
+            "data": EventSchema(many=True).dump(paginated_events.items),
+            "last_page": paginated_events.pages,
+            "total": paginated_events.total,
+        }
+
+    content = json.dumps(response)
+    event_list_cache.set(cache_key, content, cache_generation)
+
+    return content, 200, _EVENT_LIST_HEADERS
 
 
 class AutocompleteEventSchema(EventSchema):
@@ -232,46 +385,25 @@ def _normalize_search_term(text: str) -> str:
     """Normalize a search term for punctuation-insensitive matching.
 
     Strips punctuation characters, replacing them with spaces, and collapses
-    repeated whitespace.
-    Accent stripping is left to the database collation (MySQL ``unicode_ci``).
+    repeated whitespace. Only used to check the length of search terms, the
+    search itself folds accents, see
+    :py:meth:`collectives.models.event.search.EventSearchMixin.search_relevance`
     """
     text = re.sub(r"[^\w\s]", " ", text)
     text = re.sub(r"\s+", " ", text)
     return text.strip()
 
 
-# Punctuation replacements applied SQL-side so that queries without
-# punctuation can match titles that contain apostrophes, hyphens, etc.
-# Accent handling is delegated to the DB collation (MySQL unicode_ci).
-_SQL_PUNCTUATION_MAP = [
-    ("'", " "), ("\u2019", " "), ("-", " "),
-    ("/", " "), ("(", " "), (")", " "),
-    (":", " "), (".", " "), (",", " "),
-    ("!", " "), ("?", " "), (";", " "),
-    # Collapse double-spaces left by adjacent punctuation (two passes)
-    ("  ", " "), ("  ", " "),
-]  # fmt: skip
-
-
-def _sql_normalized_title():
-    """Return a SQL expression that strips punctuation from ``Event.title``.
-
-    Chains ``REPLACE()`` calls for each entry in :data:`_SQL_PUNCTUATION_MAP`.
-    """
-    col = Event.title
-    for src, dst in _SQL_PUNCTUATION_MAP:
-        col = func.replace(col, src, dst)
-    return col
-
-
 @blueprint.route("/event/autocomplete/")
 def autocomplete_event():
     """API endpoint for event autocompletion.
 
     At least 2 characters are required to make a name search.
 
-    :param string q: Search string. Either the event id (or ``#id``), or a
-                     substring from the title. Accents and punctuation are ignored.
+    :param string q: Search string. Either the event id (or ``#id``), or words
+                     starting words of the title or description. Accents and
+                     punctuation are ignored. Events matching in their title
+                     come first.
     :param int l: Maximum number of returned items.
     :param list[int] aid: List of activity ids to include. Empty means include
                           events for any activity
@@ -308,44 +440,36 @@ def autocomplete_event():
         excluded_ids = request.args.getlist("eid", type=int)
 
         query = Event.query
+        ranking = []
+
+        # Events with one of the provided activities come first, without
+        # excluding the others, see issue #618
+        if activity_ids:
+            ranking.append(
+                Event.activity_types.any(ActivityType.id.in_(activity_ids)).desc()
+            )
 
         if explicit_id_lookup and event_id is not None:
             # "#N" pattern: look up by id only, no title search
-            search_clause = Event.id == event_id
+            query = query.filter(Event.id == event_id)
         else:
-            # Title search: match the original term against the raw title,
-            # plus the normalized term against a SQL-side normalized title
-            # so that "ecole d aventure" matches "École d'aventure", etc.
-            search_clause = or_(
-                Event.title.ilike(f"%{search_term}%"),
-                _sql_normalized_title().ilike(f"%{normalized}%"),
-            )
+            # Search words in titles and descriptions, most relevant first, so
+            # that "ecole d aventure" matches "École d'aventure", etc.
+            matches = Event.search_relevance(search_term)
+            query = query.outerjoin(matches, matches.c.event_id == Event.id)
+            search_clause = matches.c.event_id.is_not(None)
             if event_id is not None:
                 search_clause = or_(search_clause, Event.id == event_id)
-        query = query.filter(search_clause)
+                ranking.append((Event.id == event_id).desc())
+            query = query.filter(search_clause)
+            ranking.append(func.coalesce(matches.c.relevance, 0).desc())
 
         # Remove excluded ids
         query = query.filter(~Event.id.in_(excluded_ids))
 
-        query_without_activity_filtering = query
-
-        # Restrict to event with one of the provided activities
-        if activity_ids:
-            query = query.filter(
-                Event.activity_types.any(ActivityType.id.in_(activity_ids))
-            )
-
-        query = query.order_by(Event.start.desc())
+        query = query.order_by(*ranking, Event.start.desc())
         found_events = query.limit(limit).all()
 
-        if len(found_events) < limit:
-            # We haven't found enough events, try without activity filtering,
-            # See issue #618
-            query = query_without_activity_filtering
-            query = query.filter(~Event.id.in_([event.id for event in found_events]))
-            query = query.order_by(Event.start.desc())
-            found_events += query.limit(limit - len(found_events)).all()
-
     content = AutocompleteEventSchema().dumps(found_events, many=True)
     return content, 200, {"content-type": "application/json"}
 
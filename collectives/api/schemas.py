@@ -13,6 +13,7 @@ from collectives.models import (
     Role,
     User,
 )
+from collectives.utils.images import derived_image_url
 from collectives.utils.time import format_datetime_range
 from collectives.utils.url import slugify
 
@@ -177,7 +178,7 @@ class EventTagSchema(marshmallow.SQLAlchemyAutoSchema):
 
 
 def photo_uri(event):
-    """Generate an URI for event image using Flask-Images.
+    """Generate an URI for event image, see :py:mod:`collectives.utils.images`.
 
     Returned images are thumbnail of 350x250 px.
 
@@ -187,7 +188,7 @@ def photo_uri(event):
     :rtype: string
     """
     if event.photo is not None:
-        return url_for("images.crop", filename=event.photo, width=350, height=250)
+        return derived_image_url(event.photo, "event_card")
     return url_for("static", filename=f"img/default/events/event{event.id % 8 + 1}.svg")
 
 
@@ -205,7 +206,7 @@ class EventSchema(marshmallow.SQLAlchemyAutoSchema):
 
     :type: :py:class:`marshmallow.fields.Function` """
     occupied_slots = fields.Function(
-        lambda event: len(event.holding_slot_registrations())
+        lambda event: event.num_holding_slot_registrations()
     )
     """ Number of occupied user slots for this event.
 
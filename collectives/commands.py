@@ -0,0 +1,259 @@
+"""Module for the ``flask collectives`` command line tools.
+
+Commands are registered on the application in :py:func:`collectives.create_app`.
+Usage::
+
+    FLASK_APP=collectives:create_app flask collectives --help
+"""
+
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from collectives.models import db
+from collectives.models.event.registration import (
+    SLOT_COUNTERS,
+    inconsistent_slot_counters,
+    refresh_slot_counters,
+)
+from collectives.utils import init
+from collectives.utils.admission import admission_queue
+from collectives.utils.certificate import (
+    CertificateError,
+    volunteer_certificates_zip,
+    volunteers_with_valid_badge,
+)
+from collectives.utils.extranet_resync import resync_users
+from collectives.utils.image_backfill import backfill_derivatives
+from collectives.utils.mail import mail_spool
+from collectives.utils.stats import precompute_statistics, statistics_cache
+
+cli = AppGroup("collectives", help="Outils de maintenance de collectives.")
+""" Group of the ``flask collectives`` commands """
+
+
+@cli.command("init")
+@click.option("--no-assets", is_flag=True, help="Ne compile pas les feuilles de style.")
+def init_command(no_assets: bool):
+    """Populate the database with configuration items, the admin account, activity
+    and event types, and compile stylesheets.
+
+    To be run once per deployment, after ``flask db upgrade``. Running it again
+    only updates what changed.
+
+    :param no_assets: Whether to skip the compilation of stylesheets
+    """
+    # pylint: disable=W0212
+    init.initialize(current_app._get_current_object(), assets=not no_assets)
+    click.echo("Base de données initialisée.")
+
+
+@cli.command("check-slot-counters")
+@click.option(
+    "--repair", is_flag=True, help="Recalcule les compteurs des événements faux."
+)
+def check_slot_counters(repair: bool):
+    """Check that event slot counters match the event registrations.
+
+    Exits with an error status if inconsistent counters are found and not repaired.
+
+    :param repair: Whether to recompute inconsistent counters
+    """
+    rows = inconsistent_slot_counters()
+    num_counters = len(SLOT_COUNTERS)
+    for row in rows:
+        stored = row[1 : 1 + num_counters]
+        actual = row[1 + num_counters :]
+        details = ", ".join(
+            f"{name}={value} (attendu {expected})"
+            for name, value, expected in zip(SLOT_COUNTERS, stored, actual)
+            if value != expected
+        )
+        click.echo(f"Événement {row[0]}: {details}")
+
+    if not rows:
+        click.echo("Tous les compteurs de places sont cohérents.")
+        return
+    if not repair:
+        raise click.ClickException(
+            f"{len(rows)} événement(s) avec des compteurs incohérents."
+        )
+
+    refresh_slot_counters(db.session, [row[0] for row in rows])
+    db.session.commit()
+    click.echo(f"{len(rows)} événement(s) corrigé(s).")
+
+
+@cli.command("precompute-statistics")
+def precompute_statistics_command():
+    """Compute and store statistics of the current and previous FFCAM years."""
+    count = precompute_statistics()
+    click.echo(f"Statistiques calculées pour {count} combinaisons de paramètres.")
+
+
+@cli.command("clear-statistics")
+def clear_statistics_command():
+    """Remove all stored statistics."""
+    statistics_cache.invalidate()
+    click.echo("Statistiques supprimées.")
+
+
+@cli.command("send-mails")
+@click.option(
+    "--until-empty",
+    is_flag=True,
+    help="S'arrête dès qu'aucun mail ne peut être envoyé immédiatement.",
+)
+@click.option("--batch-size", type=int, help="Nombre de mails envoyés par lot.")
+def send_mails(until_empty: bool, batch_size: int | None):
+    """Send the mails stored in the spool, by batches.
+
+    Runs until interrupted, unless ``--until-empty`` is set. Several instances
+    can run at once.
+
+    :param until_empty: Whether to stop once no mail can be sent right now
+    :param batch_size: Maximum number of mails claimed at once
+    """
+    if batch_size:
+        mail_spool.batch_size = batch_size
+    sent = mail_spool.sent
+    # pylint: disable=W0212
+    mail_spool.run(current_app._get_current_object(), until_empty=until_empty)
+    click.echo(f"{mail_spool.sent - sent} mail(s) envoyé(s).")
+
+
+@cli.command("process-admissions")
+@click.option(
+    "--until-empty",
+    is_flag=True,
+    help="S'arrête dès que la file d'inscriptions est vide.",
+)
+def process_admissions(until_empty: bool):
+    """Process the self-registrations queued for events using an admission
+    queue, by batches.
+
+    Runs until interrupted, unless ``--until-empty`` is set.
+
+    :param until_empty: Whether to stop once the queue is empty
+    """
+    admitted, refused = admission_queue.admitted, admission_queue.refused
+    # pylint: disable=W0212
+    admission_queue.run(current_app._get_current_object(), until_empty=until_empty)
+    click.echo(
+        f"{admission_queue.admitted - admitted} inscription(s) acceptée(s), "
+        f"{admission_queue.refused - refused} refusée(s)."
+    )
+
+
+@cli.command("resync-users")
+@click.option(
+    "--older-than",
+    type=float,
+    default=12,
+    show_default=True,
+    help="Ne vérifie que les licences vérifiées il y a plus de ce nombre d'heures.",
+)
+@click.option(
+    "--batch-size", type=int, default=100, show_default=True, help="Taille des lots."
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=4,
+    show_default=True,
+    help="Nombre de requêtes simultanées à l'extranet.",
+)
+@click.option(
+    "--rate",
+    type=float,
+    default=5,
+    show_default=True,
+    help="Nombre maximal de requêtes à l'extranet par seconde, 0 pour illimité.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Interroge l'extranet sans enregistrer les modifications.",
+)
+def resync_users_command(
+    older_than: float, batch_size: int, workers: int, rate: float, dry_run: bool
+):
+    """Check the licenses of all extranet users, and synchronise the users whose
+    license has been renewed.
+
+    An interrupted run can simply be restarted: users checked less than
+    ``--older-than`` hours ago are skipped.
+
+    :param older_than: Minimum age in hours of the last check of the licenses
+    :param batch_size: Number of users loaded and committed at once
+    :param workers: Number of threads calling the extranet
+    :param rate: Maximum number of extranet calls per second
+    :param dry_run: Whether to only count the changes, without saving them
+    """
+    stats = resync_users(
+        # pylint: disable=W0212
+        current_app._get_current_object(),
+        older_than=timedelta(hours=older_than),
+        batch_size=batch_size,
+        workers=workers,
+        rate=rate,
+        dry_run=dry_run,
+    )
+    click.echo(f"{stats}.")
+    if stats.errors:
+        raise click.ClickException(
+            f"Erreur de l'extranet après l'utilisateur #{stats.last_user_id}, "
+            "relancer la commande pour reprendre."
+        )
+
+
+@cli.command("generate-image-derivatives")
+@click.option(
+    "--workers",
+    type=int,
+    default=4,
+    show_default=True,
+    help="Nombre d'images redimensionnées simultanément.",
+)
+def generate_image_derivatives(workers: int):
+    """Generate the missing resized versions of all uploaded images.
+
+    Images uploaded before resized versions were generated at upload time are
+    first renamed after the hash of their content.
+
+    :param workers: Number of threads resizing images
+    """
+    # pylint: disable=W0212
+    stats = backfill_derivatives(current_app._get_current_object(), workers=workers)
+    click.echo(f"{stats}.")
+    if stats.errors:
+        raise click.ClickException(
+            f"{stats.errors} image(s) n'ont pas pu être redimensionnée(s)."
+        )
+
+
+@cli.command("volunteer-certificates")
+@click.argument("output", type=click.File("wb"))
+@click.option(
+    "--workers",
+    type=int,
+    default=4,
+    show_default=True,
+    help="Nombre d'attestations générées simultanément.",
+)
+def volunteer_certificates(output, workers: int):
+    """Write the volunteer certificates of all users with a valid volunteer badge
+    in a ZIP archive.
+
+    :param output: Path of the archive
+    :param workers: Number of certificates drawn at once
+    """
+    try:
+        count, drawn = volunteer_certificates_zip(
+            volunteers_with_valid_badge(), output, workers=workers
+        )
+    except CertificateError as err:
+        raise click.ClickException(str(err)) from err
+    click.echo(f"{count} attestation(s) bénévole, dont {drawn} générée(s).")
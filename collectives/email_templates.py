@@ -1,7 +1,7 @@
 """Templates for mails"""
 
 from datetime import timedelta
-from functools import wraps
+from functools import partial
 from typing import List
 
 from flask import current_app, flash, url_for
@@ -89,6 +89,26 @@ def send_unregister_notification(event: Event, user: User, reason: str):
         current_app.logger.error(f"Mailer error: {err}")
 
 
+# pylint: disable=unused-argument
+@mail.mail_action
+def set_token_email_status(token_uuid: str, status: int, error=None):
+    """Mark and register the sending status of a confirmation token.
+
+    Used as action of confirmation mails, see
+    :py:func:`collectives.utils.mail.mail_action`.
+
+    :param token_uuid: UUID of the token
+    :param status: New status, see
+        :py:class:`collectives.models.auth.TokenEmailStatus`
+    :param error: The error which made the sending fail, if any
+    """
+    token = db.session.get(ConfirmationToken, token_uuid)
+    if token is None:
+        return
+    token.status = TokenEmailStatus(status)
+    db.session.commit()
+
+
 def send_confirmation_email(email, name, token):
     """Send an email to user to confirm his account activation
 
@@ -111,53 +131,21 @@ def send_confirmation_email(email, name, token):
         club_name=Configuration.CLUB_NAME,
     )
 
-    @wraps(token)
-    # pylint: disable=unused-argument
-    def has_failed(ex):
-        """Mark and register this token as failed.
-
-        :param e: current exceptions
-        :type e: :py:class:`Exception`"""
-
-        # we get a token object that is not linked to another db session
-        token_copy = (
-            db.session.query(ConfirmationToken)
-            .filter(ConfirmationToken.uuid == token.uuid)
-            .first()
-        )
-
-        token_copy.status = TokenEmailStatus.Failed
-        db.session.add(token_copy)
-        db.session.commit()
-
-    @wraps(token)
-    def has_succeed():
-        """Mark and register this token as success.
-
-        :param e: current exceptions
-        :type e: :py:class:`Exception`"""
-        # we get a token object that is not linked to another db session
-        token_copy = (
-            db.session.query(ConfirmationToken)
-            .filter(ConfirmationToken.uuid == token.uuid)
-            .first()
-        )
-
-        token_copy.status = TokenEmailStatus.Success
-        db.session.add(token_copy)
-        db.session.commit()
-
     mail.send_mail(
         email=email,
         subject=f"{reason.capitalize()} de compte Collectives",
         message=message,
-        error_action=has_failed,
-        success_action=has_succeed,
+        error_action=partial(
+            set_token_email_status, token.uuid, TokenEmailStatus.Failed.value
+        ),
+        success_action=partial(
+            set_token_email_status, token.uuid, TokenEmailStatus.Success.value
+        ),
     )
 
     # Check if local dev, then token validation link is displayed in flash popup
     if current_app.config["EXTRANET_DISABLE"]:
-        has_succeed()
+        set_token_email_status(token.uuid, TokenEmailStatus.Success.value)
         url = url_for(
             "auth.process_confirmation", token_uuid=token.uuid, _external=True
         )
@@ -30,6 +30,7 @@ from collectives.models import (
     ActivityType,
     Configuration,
     Event,
+    EventPricing,
     EventStatus,
     EventTag,
     EventType,
@@ -159,7 +160,12 @@ class EventForm(ModelForm, FlaskForm):
         """Fields to expose"""
 
         model = Event
-        exclude = ["photo"]
+        exclude = [
+            "photo",
+            "holding_slot_count",
+            "payment_pending_count",
+            "waiting_count",
+        ]
 
     photo_file = FileField(validators=[FileAllowed(photos, "Image only!")])
     remove_photo = BooleanField("Supprimer la photo existante")
@@ -464,15 +470,19 @@ class PaymentItemChoiceForm(FlaskForm):
         if not event.event_type.get_terms_file() or event.is_leader(current_user):
             del self.accept_guide
 
+        pricing = EventPricing(event)
+        cheapest_prices = pricing.cheapest_prices_at_date(
+            [current_user.id], current_time().date()
+        )[current_user.id]
         prices = [
-            item.cheapest_price_for_user_now(current_user)
+            cheapest_prices[item.id]
             for item in event.payment_items
+            if item.id in cheapest_prices
         ]
-        prices = list(filter(None, prices))
 
         self.item_price.choices = []
         for price in prices:
-            intervals = generate_price_intervals(price.item, current_user)
+            intervals = generate_price_intervals(price.item, current_user, pricing)
             self.item_price.choices.append(
                 (price.id, payment_item_choice_text(price, intervals))
             )
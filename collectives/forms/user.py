@@ -76,7 +76,13 @@ class AdminTestUserForm(OrderedModelForm, AvatarForm, OptionalPasswordForm):
 
         model = User
         # Avatar is selected/modified by another field
-        exclude = ["avatar", "license_expiry_date", "last_extranet_sync_time"]
+        exclude = [
+            "avatar",
+            "license_expiry_date",
+            "last_extranet_sync_time",
+            "last_extranet_check_time",
+            "search_text",
+        ]
         unique_validator = UniqueValidator
 
     submit = SubmitField("Enregistrer")
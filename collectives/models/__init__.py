@@ -6,6 +6,7 @@ submodules classes by importing them. It also create the ``db`` object
 """
 
 from collectives.models.activity_type import ActivityKind, ActivityType
+from collectives.models.admission import AdmissionRequest, AdmissionRequestStatus
 from collectives.models.auth import ConfirmationToken, ConfirmationTokenType
 from collectives.models.badge import Badge, BadgeCustomLevel, BadgeIds
 from collectives.models.configuration import (
@@ -30,7 +31,9 @@ from collectives.models.event import (
 )
 from collectives.models.event_tag import EventTag
 from collectives.models.globals import db
+from collectives.models.mail import SpooledMail, SpooledMailStatus
 from collectives.models.payment import (
+    EventPricing,
     ItemPrice,
     Payment,
     PaymentItem,
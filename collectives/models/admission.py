@@ -0,0 +1,134 @@
+"""Module for the admission queue model.
+
+Self-registrations to events using an admission queue are stored as
+:py:class:`AdmissionRequest`, then processed in order by the queue workers, see
+:py:class:`collectives.utils.admission.AdmissionQueue`.
+"""
+
+import enum
+
+from collectives.models.globals import db
+from collectives.utils.time import current_time
+
+
+# pylint: disable=invalid-name
+class AdmissionRequestStatus(enum.IntEnum):
+    """Enum listing the status of an admission request"""
+
+    Queued = 0
+    """Request is waiting to be processed"""
+    Admitted = 1
+    """User has been registered to the event, or to its waiting list"""
+    Refused = 2
+    """User could not be registered, see :py:attr:`AdmissionRequest.message`"""
+
+
+# pylint: enable=invalid-name
+
+
+class AdmissionRequest(db.Model):
+    """Self-registration request waiting in the admission queue of an event.
+
+    There is at most one request per user and event. Processed requests are
+    kept until the user makes a new request, so that they can see its result.
+    A worker claims a request by setting :py:attr:`claim_token`, the claim
+    lasting until :py:attr:`claim_expiry` so that requests claimed by a crashed
+    worker are eventually processed by another one.
+    """
+
+    __tablename__ = "admission_requests"
+    __table_args__ = (db.UniqueConstraint("event_id", "user_id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    """Request unique id, also used to process requests in order.
+
+    :type: int
+    """
+
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
+    """Primary key of the event the user wants to register to
+
+    :type: int
+    """
+
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.id"), nullable=False, index=True
+    )
+    """Primary key of the user wanting to register
+
+    :type: int
+    """
+
+    item_price_id = db.Column(
+        db.Integer, db.ForeignKey("item_prices.id"), nullable=True
+    )
+    """Primary key of the price chosen by the user, for paid events
+
+    :type: int
+    """
+
+    payment_id = db.Column(db.Integer, db.ForeignKey("payments.id"), nullable=True)
+    """Primary key of the payment created when the user was admitted to a paid
+    event
+
+    :type: int
+    """
+
+    status = db.Column(
+        db.Enum(AdmissionRequestStatus),
+        nullable=False,
+        default=AdmissionRequestStatus.Queued,
+        index=True,
+    )
+    """Status of the request
+
+    :type: :py:class:`collectives.models.admission.AdmissionRequestStatus`
+    """
+
+    request_time = db.Column(db.DateTime, nullable=False, default=current_time)
+    """Time at which the request was queued, used as registration time
+
+    :type: :py:class:`datetime.datetime`
+    """
+
+    processed_time = db.Column(db.DateTime, nullable=True)
+    """Time at which the request was processed
+
+    :type: :py:class:`datetime.datetime`
+    """
+
+    message = db.Column(db.Text(), nullable=True)
+    """Message shown to the user once the request is processed
+
+    :type: string
+    """
+
+    claim_token = db.Column(db.String(36), nullable=True, index=True)
+    """Token of the worker which is processing the request
+
+    :type: string
+    """
+
+    claim_expiry = db.Column(db.DateTime, nullable=True)
+    """Time at which the claim of the worker expires
+
+    :type: :py:class:`datetime.datetime`
+    """
+
+    event = db.relationship("Event", lazy="select")
+    """Event the user wants to register to
+
+    :type: :py:class:`collectives.models.event.Event`
+    """
+
+    user = db.relationship("User", lazy="select")
+    """User wanting to register
+
+    :type: :py:class:`collectives.models.user.User`
+    """
+
+    item_price = db.relationship("ItemPrice", lazy="select")
+    """Price chosen by the user, for paid events
+
+    :type: :py:class:`collectives.models.payment.ItemPrice`
+    """
@@ -2,10 +2,15 @@
 
 import enum
 import json
+import time
 from datetime import datetime
 from threading import Lock
+from types import MappingProxyType
+from typing import NamedTuple
 
 from flask import Config, current_app
+from sqlalchemy import event
+from sqlalchemy.orm import load_only, object_session
 from sqlalchemy.sql import func
 
 from collectives.models.globals import db
@@ -67,11 +72,32 @@ class ConfigurationTypeEnum(enum.Enum):
 # pylint: disable=invalid-name
 
 
+class ConfigurationSnapshot(NamedTuple):
+    """Immutable copy of the contents of all configuration items."""
+
+    contents: MappingProxyType
+    """ Content of configuration items, by name """
+    generation: tuple
+    """ Generation of the configuration table when it was loaded, see
+    :py:meth:`Meta.current_generation` """
+    expiry: float
+    """ Time after which the generation must be checked again, see
+    :py:func:`time.monotonic` """
+
+
 class Meta(type):
     """Meta Class of Configuration to build __getattr__. Allow
-    using Configuration.xxxx"""
+    using Configuration.xxxx
+
+    Contents of all configuration items are loaded at once in a
+    :py:class:`ConfigurationSnapshot`, which is read without locking and
+    replaced as a whole. Once it is older than
+    :py:data:`config.CONFIGURATION_CACHE_TIME`, a single query checks whether
+    the configuration table changed before loading it again.
+    """
 
-    _cache = {}
+    _snapshot: ConfigurationSnapshot | None = None
+    _invalidations: int = 0
     _lock: Lock = Lock()
 
     # pylint: disable=no-value-for-parameter
@@ -97,46 +123,95 @@ class Meta(type):
     def get(cls, name):
         """Get content of the named configuration item.
 
-        If it exists in cache, it will check age and returns the
-        cache if it not too old. Else, the function will retrieve
-        it.
-
         :param string name: Name of the configuration item
         :returns: the configuration item content"""
-
-        with cls._lock:
-            cached_entry = cls._cache.get(name)
-
-        if cached_entry:
-            age = (datetime.now() - cached_entry["creation"]).total_seconds()
-            if age < current_app.config["CONFIGURATION_CACHE_TIME"]:
-                return cached_entry["content"]
-
-        item = cls.get_item(name)
-        if item is None:
-            raise AttributeError(f"Configuration variable '{name}' does not exist")
-        return item.content
+        snapshot = cls._snapshot
+        if snapshot is None or snapshot.expiry < time.monotonic():
+            snapshot = cls.refresh()
+        try:
+            return snapshot.contents[name]
+        except KeyError as err:
+            raise AttributeError(
+                f"Configuration variable '{name}' does not exist"
+            ) from err
+
+    def refresh(cls) -> ConfigurationSnapshot:
+        """Check the generation of the configuration table, and load all items
+        if it changed.
+
+        Only one thread refreshes the snapshot at once, other threads keep
+        using the previous snapshot meanwhile.
+
+        :returns: the up to date snapshot"""
+        snapshot = cls._snapshot
+        if snapshot is not None and not cls._lock.acquire(blocking=False):
+            return snapshot
+        if snapshot is None:
+            cls._lock.acquire()
+        try:
+            invalidations = cls._invalidations
+            snapshot = cls._snapshot
+            generation = cls.current_generation()
+            contents = None
+            if snapshot is not None and snapshot.generation == generation:
+                contents = snapshot.contents
+            else:
+                contents = MappingProxyType(
+                    {
+                        item.name: item.content
+                        for item in ConfigurationItem.query.options(
+                            load_only(
+                                ConfigurationItem.name,
+                                ConfigurationItem.json_content,
+                                ConfigurationItem.type,
+                            )
+                        )
+                    }
+                )
+            snapshot = ConfigurationSnapshot(
+                contents=contents,
+                generation=generation,
+                expiry=time.monotonic()
+                + current_app.config["CONFIGURATION_CACHE_TIME"],
+            )
+            # Do not keep a snapshot loaded while items were being modified
+            if invalidations == cls._invalidations:
+                cls._snapshot = snapshot
+            return snapshot
+        finally:
+            cls._lock.release()
+
+    def current_generation(cls) -> tuple:
+        """Get the generation of the configuration table, which changes each
+        time an item is added, deleted or modified.
+
+        :returns: the number of items and the sum of their versions"""
+        return tuple(
+            db.session.execute(
+                db.select(
+                    func.count(ConfigurationItem.id),
+                    func.coalesce(func.sum(ConfigurationItem.version), 0),
+                )
+            ).one()
+        )
 
     def get_item(cls, name):
         """Get the named configuration item.
 
-        It caches its content with a thread safe method.
-
         :param string name: Name of the configuration item
         :returns: the configuration item"""
-        item = ConfigurationItem.query.filter_by(name=name).first()
-        if item is not None:
-            with cls._lock:
-                cls._cache[name] = {"creation": datetime.now(), "content": item.content}
-        return item
+        return ConfigurationItem.query.filter_by(name=name).first()
 
-    def uncache(cls, name):
-        """Remove the configuration item from cache.
+    def uncache(cls, name=None):
+        """Discard the cached configuration, so that it is loaded again on next
+        access.
 
-        :param string name: Name of the configuration item"""
+        Configuration items modified through the ORM are uncached automatically.
 
-        with cls._lock:
-            cls._cache[name] = None
+        :param string name: Name of the modified configuration item, unused
+        """
+        cls._invalidations += 1
+        cls._snapshot = None
 
 
 class Configuration(metaclass=Meta):
@@ -200,6 +275,12 @@ class ConfigurationItem(db.Model):
     type = db.Column(db.Enum(ConfigurationTypeEnum))
     """ Configuration type. See :py:class:`ConfigurationTypeEnum` """
 
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    """ Number of modifications of the item, used to detect configuration
+    changes made by other processes. See :py:meth:`Meta.current_generation`
+
+    :type: int"""
+
     def __init__(self, name):
         """Constructor of Configuration.
 
@@ -224,6 +305,23 @@ class ConfigurationItem(db.Model):
         self.json_content = json.dumps(content, ensure_ascii=False).encode("utf8")
 
 
+@event.listens_for(ConfigurationItem, "before_update")
+def _increment_version(mapper, connection, target):
+    """Increment the version of modified configuration items."""
+    # pylint: disable=unused-argument
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version = ConfigurationItem.version + 1
+
+
+@event.listens_for(ConfigurationItem, "after_insert")
+@event.listens_for(ConfigurationItem, "after_update")
+@event.listens_for(ConfigurationItem, "after_delete")
+def _uncache_configuration(mapper, connection, target):
+    """Discard the cached configuration when an item is modified."""
+    # pylint: disable=unused-argument
+    Configuration.uncache(target.name)
+
+
 class DBAdaptedFlaskConfig(Config):
     """Flask Config class modified to allow Flask to fetch config
     in hot configuration."""
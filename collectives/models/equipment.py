@@ -1,9 +1,8 @@
 """Module for equipment related classes"""
 
 import os
-from genericpath import isfile
 
-from flask_uploads import IMAGES, UploadSet, extension
+from flask_uploads import IMAGES, UploadSet
 
 from collectives.models.globals import db
 from collectives.models.reservation import (
@@ -12,6 +11,7 @@ from collectives.models.reservation import (
     ReservationStatus,
 )
 from collectives.models.utils import ChoiceEnum
+from collectives.utils.images import delete_derivatives, hashed_name, save_derivatives
 
 image_equipment_type = UploadSet("imgtypeequip", IMAGES)
 
@@ -102,28 +102,33 @@ class EquipmentType(db.Model):
         "ReservationLine", back_populates="equipment_type"
     )
 
+    def delete_type_img(self):
+        """Remove and dereference the type image, and its derivatives."""
+        if self.path_img:
+            delete_derivatives(image_equipment_type.name, self.path_img)
+            try:
+                os.remove(image_equipment_type.path(self.path_img))
+            except (OSError, FileNotFoundError):
+                # If the file does not exist, we just ignore the error
+                pass
+            self.path_img = None
+
     def save_type_img(self, file):
         """Save an image as type image.
 
         It will both save the files into the file system and save the path into the database.
-        If file is None, it will do nothing. It will use Flask-Upload to save the image.
+        If file is None, it will do nothing. It will use Flask-Upload to save the image,
+        and generate its resized versions, see :py:mod:`collectives.utils.images`.
 
         :param file: request param to be saved.
         :type file: :py:class:`werkzeug.datastructures.FileStorage`
         """
         if file is not None:
-            path_file = (
-                "collectives/static/uploads/typeEquipmentImg/type-"
-                + str(self.name)
-                + "."
-                + extension(file.filename)
-            )
-            if isfile(path_file):
-                os.remove(path_file)
-            filename = image_equipment_type.save(
-                file, name="type-num" + str(self.id) + "."
-            )
-            self.path_img = filename
+            self.delete_type_img()  # remove existing
+
+            name = hashed_name(f"type-num{self.id}", file.stream)
+            self.path_img = image_equipment_type.save(file, name=name)
+            save_derivatives(image_equipment_type.name, self.path_img)
 
     def nb_models(self):
         """
@@ -7,14 +7,17 @@ from collectives.models.event.misc import EventMiscMixin, photos
 from collectives.models.event.model import EventModelMixin
 from collectives.models.event.payment import EventPaymentMixin
 from collectives.models.event.registration import (
+    ConflictingRegistrationError,
     DuplicateRegistrationError,
     EventRegistrationMixin,
     OverbookedRegistrationError,
+    SelfRegistrationError,
 )
 from collectives.models.event.role import (
     EventRoleMixin,
     event_activities_without_leaders,
 )
+from collectives.models.event.search import EventSearchMixin
 from collectives.models.globals import db
 
 
@@ -26,6 +29,7 @@ class Event(
     EventMiscMixin,
     EventPaymentMixin,
     EventDateMixin,
+    EventSearchMixin,
 ):
     """Class of an event.
 
@@ -1,7 +1,107 @@
 """Module for all Event methods related to date manipulation and check."""
 
-from datetime import timedelta
+from datetime import date, datetime, timedelta
 from math import ceil
+from typing import Iterable, List
+
+from sqlalchemy import and_, delete, event, insert, inspect, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from collectives.models.event.model import event_weeks
+
+WEEKS_EPOCH = date(2000, 1, 3)
+""" Monday of week 0 of :py:data:`collectives.models.event.model.event_weeks` """
+
+
+def week_index(time: date | datetime) -> int:
+    """Number of the week of a given time, as stored in
+    :py:data:`collectives.models.event.model.event_weeks`
+
+    :param time: The time, or its date
+    :return: Number of weeks since :py:data:`WEEKS_EPOCH`
+    """
+    if isinstance(time, datetime):
+        time = time.date()
+    return (time - WEEKS_EPOCH).days // 7
+
+
+def event_week_rows(event_id: int, start: datetime, end: datetime) -> List[dict]:
+    """Rows of :py:data:`collectives.models.event.model.event_weeks` for an event.
+
+    :param event_id: Id of the event
+    :param start: Start of the event
+    :param end: End of the event
+    :return: One row for each week the event spans
+    """
+    first_week = week_index(start)
+    last_week = max(first_week, week_index(end))
+    return [
+        {"week": week, "event_id": event_id}
+        for week in range(first_week, last_week + 1)
+    ]
+
+
+def refresh_event_weeks(connection, events: Iterable):
+    """Rewrite the weeks spanned by some events.
+
+    :param connection: Connection or session used to run the queries
+    :param events: Events whose weeks have changed
+    """
+    events = list(events)
+    connection.execute(
+        delete(event_weeks).where(
+            event_weeks.c.event_id.in_([instance.id for instance in events])
+        )
+    )
+    rows = [
+        row
+        for instance in events
+        for row in event_week_rows(instance.id, instance.start, instance.end)
+    ]
+    if rows:
+        connection.execute(insert(event_weeks), rows)
+
+
+def ffcam_days(start: datetime, end: datetime) -> float:
+    """Estimate a duration for ffcam statistics purposes.
+
+    See :py:meth:`EventDateMixin.duration_in_ffcam_days`
+
+    :param start: start of the period
+    :param end: end of the period
+    :returns: number of "ffcam days" of the period
+    """
+    if start == end:
+        return 1
+    duration = end - start
+
+    if duration > timedelta(hours=4):
+        return ceil(duration / timedelta(days=1))
+
+    if duration > timedelta(hours=2, minutes=30):
+        return 0.5
+
+    return 0.25
+
+
+def _delete_event_weeks(mapper, connection, target):
+    """Delete the weeks spanned by an event before the event itself."""
+    # pylint: disable=unused-argument
+    connection.execute(delete(event_weeks).where(event_weeks.c.event_id == target.id))
+
+
+def _insert_event_weeks(mapper, connection, target):
+    """Store the weeks spanned by a new event."""
+    # pylint: disable=unused-argument
+    refresh_event_weeks(connection, [target])
+
+
+def _update_event_weeks(mapper, connection, target):
+    """Store the weeks spanned by an event whose dates have changed."""
+    # pylint: disable=unused-argument
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ("start", "end")):
+        refresh_event_weeks(connection, [target])
 
 
 class EventDateMixin:
@@ -65,6 +165,23 @@ class EventDateMixin:
         """
         return self.registration_close_time <= self.start
 
+    @classmethod
+    def overlapping(cls, start: datetime, end: datetime) -> ColumnElement:
+        """Condition selecting the events overlapping a timespan.
+
+        Candidate events are first looked up by week in
+        :py:data:`collectives.models.event.model.event_weeks`, so that the
+        number of rows read does not grow with the number of past events.
+
+        :param start: Start of the timespan
+        :param end: End of the timespan, excluded
+        :return: Condition to use in a query on events
+        """
+        weeks = select(event_weeks.c.event_id).where(
+            event_weeks.c.week.between(week_index(start), week_index(end))
+        )
+        return and_(cls.id.in_(weeks), cls.start < end, cls.end > start)
+
     def dates_intersect(self, start, end):
         """Check if a specified timespan and the event timespan intersects
         :return: True if timespans intersects
@@ -89,14 +206,9 @@ class EventDateMixin:
         :param event: the event to get the duration of.
         :returns: number of day of the event
         """
-        if self.start == self.end:
-            return 1
-        duration = self.end - self.start
-
-        if duration > timedelta(hours=4):
-            return ceil(duration / timedelta(days=1))
+        return ffcam_days(self.start, self.end)
 
-        if duration > timedelta(hours=2, minutes=30):
-            return 0.5
 
-        return 0.25
+event.listen(EventDateMixin, "before_delete", _delete_event_weeks, propagate=True)
+event.listen(EventDateMixin, "after_insert", _insert_event_weeks, propagate=True)
+event.listen(EventDateMixin, "after_update", _update_event_weeks, propagate=True)
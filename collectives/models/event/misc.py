@@ -12,6 +12,7 @@ from collectives.models.globals import db
 from collectives.models.question import QuestionAnswer
 from collectives.models.user import User
 from collectives.utils import render_markdown
+from collectives.utils.images import delete_derivatives, hashed_name, save_derivatives
 from collectives.utils.misc import is_valid_image
 
 photos = UploadSet("photos", IMAGES)
@@ -75,8 +76,9 @@ class EventMiscMixin:
         return any(activity in user_activities for activity in self.activity_types)
 
     def delete_photo(self):
-        """Remove and dereference an event photo."""
+        """Remove and dereference an event photo, and its derivatives."""
         if self.photo:
+            delete_derivatives(photos.name, self.photo)
             try:
                 os.remove(photos.path(self.photo))
             except (OSError, FileNotFoundError):
@@ -89,10 +91,12 @@ class EventMiscMixin:
 
         Process a raw form data field to add it to the Event as the event
         photo. If ``file`` is None (ie data is empty, no file was submitted),
-        do nothing.
+        do nothing. Resized versions of the photo are generated right away, see
+        :py:mod:`collectives.utils.images`.
 
         :param file: The direct output of a FileInput
         :type file: :py:class:`werkzeug.datastructures.FileStorage`
+        :raises collectives.utils.misc.ImageTooLargeError: if the image is too large
         """
         if file is not None:
             if not is_valid_image(file.stream):
@@ -100,8 +104,9 @@ class EventMiscMixin:
 
             self.delete_photo()  # remove existing
 
-            filename = photos.save(file, name="event-" + str(self.id) + ".")
-            self.photo = filename
+            name = hashed_name(f"event-{self.id}", file.stream)
+            self.photo = photos.save(file, name=name)
+            save_derivatives(photos.name, self.photo)
         return True
 
     def set_rendered_description(self, description):
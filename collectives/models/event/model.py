@@ -26,12 +26,36 @@ event_activity_types = db.Table(
     db.Column("event_id", db.Integer, db.ForeignKey("events.id"), index=True),
 )
 
+# Semaines couvertes par chaque collective, pour trouver rapidement les collectives
+# qui se chevauchent. Maintenu à chaque flush, voir EventDateMixin.overlapping
+event_weeks = db.Table(
+    "event_weeks",
+    db.Column("week", db.Integer, primary_key=True),
+    db.Column("event_id", db.Integer, db.ForeignKey("events.id"), primary_key=True),
+)
+
+# Mots normalisés du titre et de la description de chaque collective, pour la
+# recherche. Maintenu à chaque flush, voir EventSearchMixin.search_relevance
+event_search_tokens = db.Table(
+    "event_search_tokens",
+    db.Column("token", db.String(30), primary_key=True),
+    db.Column(
+        "event_id",
+        db.Integer,
+        db.ForeignKey("events.id"),
+        primary_key=True,
+        index=True,
+    ),
+    db.Column("weight", db.Integer, nullable=False),
+)
+
 
 class EventModelMixin:
     """Part of Event class with all its attributes and related sqlalchemy wizardies.
 
     Not really meant to be used alone."""
 
+    __table_args__ = (db.Index("ix_events_start_end", "start", "end"),)
     __tablename__ = "events"
 
     """Event unique id.
@@ -63,9 +87,11 @@ class EventModelMixin:
 
     :type: string"""
 
-    start = db.Column(db.DateTime, nullable=False, index=True)
+    start = db.Column(db.DateTime, nullable=False)
     """Start of event.
 
+    Indexed along with :py:attr:`end`.
+
     :type: :py:class:`datetime.datetime`"""
 
     end = db.Column(db.DateTime, nullable=False)
@@ -112,6 +138,18 @@ class EventModelMixin:
 
     :type: bool"""
 
+    uses_admission_queue = db.Column(
+        db.Boolean,
+        nullable=False,
+        default=False,
+    )
+    """Whether self-registrations are queued then processed in order, for
+    events expecting a burst of registrations when they open.
+
+    See :py:class:`collectives.utils.admission.AdmissionQueue`
+
+    :type: bool"""
+
     registration_open_time = db.Column(db.DateTime, nullable=True)
     """Earliest moment an user can self-register to this event.
 
@@ -155,6 +193,30 @@ class EventModelMixin:
 
     :type: bool"""
 
+    holding_slot_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of registrations holding a slot, leaders excluded.
+
+    Maintained on each flush, see
+    :py:func:`collectives.models.event.registration.refresh_slot_counters`
+
+    :type: int"""
+
+    payment_pending_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of registrations waiting for their payment.
+
+    Maintained on each flush, see
+    :py:func:`collectives.models.event.registration.refresh_slot_counters`
+
+    :type: int"""
+
+    waiting_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of registrations in waiting list.
+
+    Maintained on each flush, see
+    :py:func:`collectives.models.event.registration.refresh_slot_counters`
+
+    :type: int"""
+
     # Non DB attributes
     @property
     def activity_type_names(self):
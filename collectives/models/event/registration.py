@@ -2,7 +2,11 @@
 
 from datetime import datetime
 from operator import attrgetter
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Update, event, func, inspect, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
 
 from collectives.models.globals import db
 from collectives.models.registration import (
@@ -10,6 +14,7 @@ from collectives.models.registration import (
     RegistrationLevels,
     RegistrationStatus,
 )
+from collectives.models.user import User, UserType
 
 
 class DuplicateRegistrationError(RuntimeError):
@@ -24,11 +29,136 @@ class OverbookedRegistrationError(RuntimeError):
     pass
 
 
+class SelfRegistrationError(RuntimeError):
+    """Exception raised when a user is not allowed to self-register to an event"""
+
+    pass
+
+
+class ConflictingRegistrationError(SelfRegistrationError):
+    """Exception raised when a user self-registering to an event takes part in
+    another activity at the same time"""
+
+    def __init__(self, conflicts: List[Registration]):
+        """Constructor
+
+        :param conflicts: Registrations of the user to the other activities
+        """
+        super().__init__(
+            "Vous allez participer à une ou des activité(s) à cette date : "
+            + ", ".join(
+                f"{c.event.title} ({c.status.display_name()})" for c in conflicts
+            )
+        )
+        self.conflicts = conflicts
+
+
+SLOT_COUNTERS = {
+    "holding_slot_count": (
+        *RegistrationStatus.valid_status(),
+        RegistrationStatus.PaymentPending,
+    ),
+    "payment_pending_count": (RegistrationStatus.PaymentPending,),
+    "waiting_count": (RegistrationStatus.Waiting,),
+}
+""" Registration statuses counted by each slot counter column of
+:py:class:`collectives.models.event.Event`"""
+
+
+def slot_counter_values(event_id) -> Dict:
+    """Build the queries computing the slot counters of an event from its registrations.
+
+    :param event_id: Column or value of the event id, correlated subqueries are
+        returned when it is a column.
+    :return: A dict of scalar subqueries, indexed by counter column name
+    """
+    return {
+        name: select(func.count(Registration.id))
+        .where(Registration.event_id == event_id)
+        .where(Registration.status.in_(statuses))
+        .scalar_subquery()
+        for name, statuses in SLOT_COUNTERS.items()
+    }
+
+
+def refresh_slot_counters(connection, event_ids: Optional[Iterable[int]] = None):
+    """Recompute the slot counters of some events from their registrations.
+
+    :param connection: Connection or session used to run the update
+    :param event_ids: Ids of the events to refresh. All events if None.
+    """
+    # pylint: disable=import-outside-toplevel
+    from collectives.models.event import Event
+
+    table = Event.__table__
+    query = update(table).values(**slot_counter_values(table.c.id))
+    if event_ids is not None:
+        query = query.where(table.c.id.in_(list(event_ids)))
+    connection.execute(query)
+
+
+def inconsistent_slot_counters() -> List:
+    """Find events whose stored slot counters do not match their registrations.
+
+    :return: Rows with the event id, the stored counters, then the actual counters.
+    """
+    # pylint: disable=import-outside-toplevel
+    from collectives.models.event import Event
+
+    actual = slot_counter_values(Event.id)
+    query = select(
+        Event.id,
+        *(getattr(Event, name) for name in SLOT_COUNTERS),
+        *actual.values(),
+    ).where(or_(*(getattr(Event, name) != value for name, value in actual.items())))
+    return db.session.execute(query.order_by(Event.id)).all()
+
+
+@event.listens_for(Session, "after_flush")
+def _update_slot_counters(session, flush_context):
+    """Refresh the slot counters of events whose registrations have been flushed."""
+    # pylint: disable=unused-argument
+    event_ids = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Registration):
+            event_ids.add(instance.event_id)
+            event_ids.update(inspect(instance).attrs.event_id.history.deleted)
+    event_ids.discard(None)
+    if event_ids:
+        refresh_slot_counters(session.connection(), event_ids)
+        session.info.setdefault("slot_counter_events", set()).update(event_ids)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_slot_counters(session, flush_context):
+    """Expire refreshed slot counters of events loaded in session."""
+    # pylint: disable=unused-argument, import-outside-toplevel
+    from collectives.models.event import Event
+
+    for event_id in session.info.pop("slot_counter_events", ()):
+        instance = session.identity_map.get(identity_key(Event, event_id))
+        if instance is not None:
+            session.expire(instance, list(SLOT_COUNTERS))
+
+
 class EventRegistrationMixin:
     """Part of Event class for registration manipulation and check.
 
     Not meant to be used alone."""
 
+    def _slot_counter(self, name: str) -> Optional[int]:
+        """Returns the stored value of a slot counter, when it can be used.
+
+        Counters are only used when registrations are not loaded: loaded
+        registrations may have been modified since the last flush.
+
+        :param name: Name of the counter column, see :py:data:`SLOT_COUNTERS`
+        :return: The counter value, or None if registrations should be counted
+        """
+        if "registrations" not in inspect(self).unloaded:
+            return None
+        return getattr(self, name)
+
     def has_valid_slots(self) -> bool:
         """Check if this event does not have more online slots than overall
         slots.
@@ -115,19 +245,49 @@ class EventRegistrationMixin:
 
         :return: count of taken slots
         """
-        taken_count = sum(
-            1 for registration in self.registrations if registration.is_holding_slot()
-        )
+        taken_count = self.num_holding_slot_registrations()
         if self.include_leaders_in_counts:
             taken_count += len(self.leaders)
         return taken_count
 
+    def num_holding_slot_registrations(self) -> int:
+        """Return the number of registrations holding a slot, leaders excluded.
+
+        :return: count of holding slot registrations
+        """
+        counter = self._slot_counter("holding_slot_count")
+        if counter is not None:
+            return counter
+        return sum(
+            1 for registration in self.registrations if registration.is_holding_slot()
+        )
+
     def num_pending_registrations(self) -> int:
         """Return the number of pending registrations
         (registrations that are holding a slot but not active yet)
 
+        Registrations awaiting payment are read from their counter; active ones
+        are pending if the license of their user expires before the event ends
+        (see :py:meth:`collectives.models.registration.Registration.is_pending_renewal`),
+        which is counted in SQL.
+
         :return: count of pending slots
         """
+        counter = self._slot_counter("payment_pending_count")
+        if counter is not None:
+            return counter + db.session.scalar(
+                select(func.count(Registration.id))
+                .join(User, Registration.user_id == User.id)
+                .where(
+                    Registration.event_id == self.id,
+                    Registration.status.in_(RegistrationStatus.valid_status()),
+                    User.type.not_in((UserType.Local, UserType.Test)),
+                    or_(
+                        User.license_expiry_date.is_(None),
+                        User.license_expiry_date <= self.end.date(),
+                    ),
+                )
+            )
         return sum(
             1
             for registration in self.registrations
@@ -136,6 +296,9 @@ class EventRegistrationMixin:
 
     def num_waiting_registrations(self) -> int:
         """Return the number of registrations in witing list"""
+        counter = self._slot_counter("waiting_count")
+        if counter is not None:
+            return counter
         return sum(
             1
             for registration in self.registrations
@@ -319,7 +482,7 @@ class EventRegistrationMixin:
             return self.has_free_online_slots()
         if self.has_free_online_slots():
             return False
-        return len(self.waiting_registrations()) < self.num_waiting_list
+        return self.num_waiting_registrations() < self.num_waiting_list
 
     def can_self_unregister(
         self, user: "collectives.models.user.User", time: datetime
@@ -345,11 +508,62 @@ class EventRegistrationMixin:
 
         return self.is_registered_with_status(user, good_statuses)
 
+    def _admission_query(
+        self, registration: Registration, allow_overbooking: bool
+    ) -> Update:
+        """Build the statement admitting a registration to this event.
+
+        The statement updates the slot counters of the event row only if there
+        is still room for the registration. It is the only statement deciding
+        whether the event is full: the database evaluates it on the latest
+        committed counters, and the row stays locked until the end of the
+        transaction, so that concurrent admissions to the same event are
+        serialized.
+
+        :param registration: Registration to admit
+        :param allow_overbooking: If true, do not check the number of slots
+        :return: The update statement, which updates one row if the
+            registration is admitted
+        """
+        # pylint: disable=import-outside-toplevel
+        from collectives.models.event import Event
+
+        table = Event.__table__
+        counters = {
+            name: table.c[name] + 1
+            for name, statuses in SLOT_COUNTERS.items()
+            if registration.status in statuses
+        }
+        if not counters:
+            # Only lock the row
+            counters = {"holding_slot_count": table.c.holding_slot_count}
+
+        conditions = [table.c.id == self.id]
+        if allow_overbooking:
+            pass
+        elif registration.status in SLOT_COUNTERS["holding_slot_count"]:
+            taken = table.c.holding_slot_count
+            if self.include_leaders_in_counts:
+                taken = taken + len(self.leaders)
+            conditions.append(taken < table.c.num_slots)
+            if registration.is_self:
+                conditions.append(taken < table.c.num_online_slots)
+        elif registration.status == RegistrationStatus.Waiting:
+            conditions.append(table.c.waiting_count < table.c.num_waiting_list)
+
+        return update(table).where(*conditions).values(**counters)
+
     def add_registration_check_race_conditions(
         self, registration: Registration, allow_overbooking: bool = False
     ):
         """Add a registration to an event, checking for possible race conditions.
 
+        Admission is decided by a conditional update of the slot counters of the
+        event row, see :py:meth:`_admission_query`, then the existing
+        registrations of the user are read while the row is locked. Both run in
+        a savepoint, which is rolled back if the registration is refused, so that
+        other pending changes of the session are kept.
+
         :raises DuplicateRegistrationError: If another registration exists for the same user
         :raises OverbookedRegistrationError: If the event was already full by the time this
           registration was committed
@@ -357,17 +571,110 @@ class EventRegistrationMixin:
         :param registration: Registration to attempt to add to this event
         :param allow_overbooking: If true, to not check for overbooking race conditions
         """
+        user_id = registration.user_id
+        if user_id is None:
+            user_id = registration.user.id
+
+        with db.session.no_autoflush, db.session.begin_nested():
+            result = db.session.execute(
+                self._admission_query(registration, allow_overbooking)
+            )
+            admitted = result.rowcount == 1
+            duplicate = db.session.scalar(
+                select(Registration.id)
+                .where(Registration.event_id == self.id)
+                .where(Registration.user_id == user_id)
+                .limit(1)
+                .with_for_update()
+            )
+
+            # Raising rolls back the savepoint only
+            if duplicate is not None:
+                raise DuplicateRegistrationError("Vous êtes déjà inscrit(e).")
+            if not admitted:
+                raise OverbookedRegistrationError("L'événement est déjà complet.")
+
         self.registrations.append(registration)
         db.session.commit()
 
-        db.session.expire(self)
-        if registration.is_duplicate():
-            self.registrations.remove(registration)
-            db.session.delete(registration)
-            db.session.commit()
-            raise DuplicateRegistrationError("Vous êtes déjà inscrit(e).")
-        if not allow_overbooking and registration.is_overbooked():
-            self.registrations.remove(registration)
-            db.session.delete(registration)
-            db.session.commit()
-            raise OverbookedRegistrationError("L'événement est déjà complet.")
+    def self_register(
+        self,
+        user: "collectives.models.user.User",
+        time: datetime,
+        item_price: Optional["collectives.models.payment.ItemPrice"] = None,
+        registration_time: Optional[datetime] = None,
+    ) -> Tuple[Registration, Optional["collectives.models.payment.Payment"]]:
+        """Register a user to this event, or to its waiting list, following the
+        rules of :py:meth:`can_self_register`.
+
+        The registration is committed, along with the payment created for paid
+        events.
+
+        :raises SelfRegistrationError: If the user cannot self-register
+        :raises ConflictingRegistrationError: If the user takes part in another
+            activity at the same time
+        :raises DuplicateRegistrationError: See
+            :py:meth:`add_registration_check_race_conditions`
+        :raises OverbookedRegistrationError: See
+            :py:meth:`add_registration_check_race_conditions`
+
+        :param user: User to register
+        :param time: Time at which registration rules are checked
+        :param item_price: Price chosen by the user, required for paid events
+            unless the user is registered to the waiting list
+        :param registration_time: Registration time, defaults to ``time``
+        :return: The new registration, and the payment to complete if any
+        """
+        # pylint: disable=import-outside-toplevel
+        from collectives.models.configuration import Configuration
+        from collectives.models.payment import Payment
+
+        registration = Registration(
+            user_id=user.id,
+            status=RegistrationStatus.Active,
+            level=RegistrationLevels.Normal,
+            is_self=True,
+            registration_time=registration_time or time,
+        )
+
+        # Check if user cannot directly subscribe
+        if not self.can_self_register(user, time):
+            # Check if user cannot subscribe in waiting list either
+            if not self.can_self_register(user, time, True):
+                raise SelfRegistrationError(
+                    "Vous ne pouvez pas vous inscrire vous-même."
+                )
+
+            # User subscribe to waiting_list
+            registration.status = RegistrationStatus.Waiting
+            self.add_registration_check_race_conditions(registration)
+            return registration, None
+
+        if self.event_type.requires_activity:
+            conflicts = user.registrations_during(self.start, self.end, self.id)
+            if len(conflicts) > 0:
+                raise ConflictingRegistrationError(conflicts)
+
+        if not self.requires_payment():
+            # Free event
+            self.add_registration_check_race_conditions(registration)
+            return registration, None
+
+        # Paid event
+        if (
+            item_price is None
+            or item_price.item.event_id != self.id
+            or not item_price.is_available_to_user(user)
+            or not item_price.is_available_at_date(time.date())
+        ):
+            raise SelfRegistrationError("Tarif invalide.")
+
+        registration.status = RegistrationStatus.PaymentPending
+        self.add_registration_check_race_conditions(registration)
+
+        payment = Payment(registration=registration, item_price=item_price)
+        payment.terms_version = Configuration.PAYMENTS_TERMS_FILE
+
+        db.session.add(payment)
+        db.session.commit()
+        return registration, payment
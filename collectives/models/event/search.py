@@ -0,0 +1,191 @@
+"""Module for the search index of event titles and descriptions."""
+
+from typing import Dict, Iterable, List
+
+from sqlalchemy import (
+    case,
+    delete,
+    event,
+    false,
+    func,
+    insert,
+    inspect,
+    literal,
+    select,
+    union_all,
+)
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.selectable import Subquery
+
+from collectives.models.event.model import event_search_tokens
+from collectives.models.utils import prefix_condition
+from collectives.utils.misc import fold_search_text
+
+MAX_TOKEN_LENGTH = 30
+""" Maximum length of indexed words, longer words are truncated """
+
+MAX_SEARCH_WORDS = 8
+""" Maximum number of words of a search, further words are ignored """
+
+TITLE_WEIGHT = 4
+""" Relevance of a word found in the title of an event """
+
+DESCRIPTION_WEIGHT = 1
+""" Relevance of a word only found in the description of an event """
+
+EXACT_MATCH_BONUS = 1
+""" Additional relevance of a searched word matching a whole indexed word """
+
+
+def search_words(text: str) -> List[str]:
+    """Distinct folded words of a text, as stored in
+    :py:data:`collectives.models.event.model.event_search_tokens`
+
+    :param text: Text to split
+    :return: Words in order of first appearance
+    """
+    words = (word[:MAX_TOKEN_LENGTH] for word in fold_search_text(text).split())
+    return list(dict.fromkeys(words))
+
+
+def event_search_rows(event_id: int, title: str, description: str) -> List[dict]:
+    """Rows of :py:data:`collectives.models.event.model.event_search_tokens` for
+    an event.
+
+    :param event_id: Id of the event
+    :param title: Title of the event
+    :param description: Markdown description of the event
+    :return: Rows to insert
+    """
+    weights: Dict[str, int] = {}
+    for word in search_words(description or ""):
+        weights[word] = DESCRIPTION_WEIGHT
+    for word in search_words(title or ""):
+        weights[word] = TITLE_WEIGHT
+    return [
+        {"token": token, "event_id": event_id, "weight": weight}
+        for token, weight in weights.items()
+    ]
+
+
+def refresh_event_search(connection, events: Iterable):
+    """Rewrite the search tokens of some events.
+
+    :param connection: Connection or session used to run the queries
+    :param events: Events whose title or description have changed
+    """
+    events = list(events)
+    connection.execute(
+        delete(event_search_tokens).where(
+            event_search_tokens.c.event_id.in_([instance.id for instance in events])
+        )
+    )
+    rows = [
+        row
+        for instance in events
+        for row in event_search_rows(instance.id, instance.title, instance.description)
+    ]
+    if rows:
+        connection.execute(insert(event_search_tokens), rows)
+
+
+def _delete_event_search(mapper, connection, target):
+    """Delete the search tokens of an event before the event itself."""
+    # pylint: disable=unused-argument
+    connection.execute(
+        delete(event_search_tokens).where(event_search_tokens.c.event_id == target.id)
+    )
+
+
+def _insert_event_search(mapper, connection, target):
+    """Store the search tokens of a new event."""
+    # pylint: disable=unused-argument
+    refresh_event_search(connection, [target])
+
+
+def _update_event_search(mapper, connection, target):
+    """Store the search tokens of an event whose title or description changed."""
+    # pylint: disable=unused-argument
+    state = inspect(target)
+    if any(
+        state.attrs[name].history.has_changes() for name in ("title", "description")
+    ):
+        refresh_event_search(connection, [target])
+
+
+class EventSearchMixin:
+    """Part of Event class for title and description searches.
+
+    Not meant to be used alone."""
+
+    @classmethod
+    def search_relevance(cls, pattern: str, in_description: bool = True) -> Subquery:
+        """Events matching a search, with their relevance.
+
+        Each word of the pattern must start a word of the event title, or of
+        its description if `in_description` is set. Accents, case and
+        punctuation are ignored. The relevance of an event is the sum, over
+        the searched words, of :py:data:`TITLE_WEIGHT` or
+        :py:data:`DESCRIPTION_WEIGHT` depending on where the word was found,
+        plus :py:data:`EXACT_MATCH_BONUS` for whole words.
+
+        Words are looked up in
+        :py:data:`collectives.models.event.model.event_search_tokens`, so that
+        searches do not scan the events table.
+
+        :param pattern: The searched words
+        :param in_description: Whether to search the descriptions as well
+        :return: Subquery with ``event_id`` and ``relevance`` columns, empty if
+            the pattern has no word.
+        """
+        tokens = event_search_tokens.c
+        words = search_words(pattern)[:MAX_SEARCH_WORDS]
+        if not words:
+            return (
+                select(tokens.event_id, literal(0).label("relevance"))
+                .where(false())
+                .subquery()
+            )
+
+        matches = []
+        for index, word in enumerate(words):
+            query = select(
+                tokens.event_id,
+                literal(index).label("word"),
+                func.max(
+                    tokens.weight
+                    + case((tokens.token == word, EXACT_MATCH_BONUS), else_=0)
+                ).label("relevance"),
+            ).where(prefix_condition(tokens.token, word))
+            if not in_description:
+                query = query.where(tokens.weight == TITLE_WEIGHT)
+            matches.append(query.group_by(tokens.event_id))
+
+        matches = union_all(*matches).subquery()
+        return (
+            select(
+                matches.c.event_id,
+                func.sum(matches.c.relevance).label("relevance"),
+            )
+            .group_by(matches.c.event_id)
+            .having(func.count(matches.c.word) == len(words))
+            .subquery()
+        )
+
+    @classmethod
+    def search_condition(
+        cls, pattern: str, in_description: bool = True
+    ) -> ColumnElement:
+        """Condition on events matching a search, see :py:meth:`search_relevance`
+
+        :param pattern: The searched words
+        :param in_description: Whether to search the descriptions as well
+        :return: The SQL condition
+        """
+        relevance = cls.search_relevance(pattern, in_description)
+        return cls.id.in_(select(relevance.c.event_id))
+
+
+event.listen(EventSearchMixin, "before_delete", _delete_event_search, propagate=True)
+event.listen(EventSearchMixin, "after_insert", _insert_event_search, propagate=True)
+event.listen(EventSearchMixin, "after_update", _update_event_search, propagate=True)
@@ -0,0 +1,119 @@
+"""Module for the mail spool model.
+
+Mails are stored in the spool by :py:func:`collectives.utils.mail.send_mail`,
+then sent by the spool workers, see :py:class:`collectives.utils.mail.MailSpool`.
+"""
+
+import enum
+
+from collectives.models.globals import db
+from collectives.utils.time import current_time
+
+
+# pylint: disable=invalid-name
+class SpooledMailStatus(enum.IntEnum):
+    """Enum listing the status of a spooled mail"""
+
+    Pending = 0
+    """Mail is waiting to be sent, or to be sent again after an error"""
+    Failed = 1
+    """Mail could not be sent and has been given up"""
+
+
+# pylint: enable=invalid-name
+
+
+class SpooledMail(db.Model):
+    """Mail waiting in the spool.
+
+    Mails are deleted from the spool once sent. A worker claims a mail by
+    setting :py:attr:`claim_token`, the claim lasting until
+    :py:attr:`claim_expiry` so that mails claimed by a crashed worker are
+    eventually sent by another one.
+    """
+
+    __tablename__ = "mail_spool"
+
+    id = db.Column(db.Integer, primary_key=True)
+    """Mail unique id, also used to send mails in order.
+
+    :type: int
+    """
+
+    subject = db.Column(db.Text(), nullable=False)
+    """Mail subject
+
+    :type: string
+    """
+
+    recipients = db.Column(db.JSON(), nullable=False)
+    """Recipient address, or list of addresses which are set as Bcc.
+
+    :type: string or list(string)
+    """
+
+    message = db.Column(db.Text(), nullable=False)
+    """Mail body
+
+    :type: string
+    """
+
+    success_action = db.Column(db.JSON(), nullable=True)
+    """Action run once the mail is sent, see
+    :py:func:`collectives.utils.mail.mail_action`
+
+    :type: dict
+    """
+
+    error_action = db.Column(db.JSON(), nullable=True)
+    """Action run if the mail is given up, see
+    :py:func:`collectives.utils.mail.mail_action`
+
+    :type: dict
+    """
+
+    status = db.Column(
+        db.Enum(SpooledMailStatus), nullable=False, default=SpooledMailStatus.Pending
+    )
+    """Status of the mail
+
+    :type: :py:class:`collectives.models.mail.SpooledMailStatus`
+    """
+
+    creation_time = db.Column(db.DateTime, nullable=False, default=current_time)
+    """Time at which the mail was put in the spool
+
+    :type: :py:class:`datetime.datetime`
+    """
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    """Number of failed attempts to send the mail
+
+    :type: int
+    """
+
+    next_attempt_time = db.Column(
+        db.DateTime, nullable=False, default=current_time, index=True
+    )
+    """Time before which the mail should not be sent
+
+    :type: :py:class:`datetime.datetime`
+    """
+
+    claim_token = db.Column(db.String(36), nullable=True, index=True)
+    """Token of the worker which is sending the mail
+
+    :type: string
+    """
+
+    claim_expiry = db.Column(db.DateTime, nullable=True)
+    """Time at which the claim of the worker expires
+
+    :type: :py:class:`datetime.datetime`
+    """
+
+    last_error = db.Column(db.Text(), nullable=True)
+    """Error raised by the last attempt to send the mail
+
+    :type: string
+    """
@@ -1,13 +1,16 @@
 """Module defining payment-related models"""
 
-from datetime import timedelta
+from datetime import date, timedelta
 from decimal import Decimal
+from typing import Dict, Iterable, List, Set
 
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import make_transient
 from wtforms.validators import NumberRange
 
 from collectives.models.event import Event
 from collectives.models.globals import db
+from collectives.models.registration import Registration, RegistrationStatus
 from collectives.models.user_group import (
     GroupEventCondition,
     GroupLicenseCondition,
@@ -737,3 +740,133 @@ class Payment(db.Model):
             self.processor_token = ""
             self.raw_metadata = ""
             self.creation_time = current_time()
+
+
+class EventPricing:
+    """Prices of the payment items of an event, resolved for several users at once.
+
+    The items, prices, use counts and user group members are loaded once, instead
+    of once per user and price by :py:meth:`PaymentItem.available_prices_to_user`.
+    Prices are then resolved like
+    :py:meth:`PaymentItem.cheapest_price_for_user_at_date`.
+    """
+
+    def __init__(self, event: Event):
+        """Constructor
+
+        :param event: The event whose prices to resolve
+        """
+        self.event = event
+        self.prices: List[ItemPrice] = [
+            price for item in event.payment_items for price in item.active_prices()
+        ]
+        """ Enabled prices of the event items"""
+
+        self.active_use_counts: Dict[int, int] = self._load_active_use_counts()
+        """ Active use count of each limited price, by price id,
+        see :py:meth:`ItemPrice.active_use_count`"""
+
+        self._members: Dict[int, Set[int]] = {}
+        """ Ids of the users which are members of each price group, by price id"""
+
+        self._loaded_user_ids: Set[int] = set()
+        """ Ids of the users whose memberships have been loaded"""
+
+    def _load_active_use_counts(self) -> Dict[int, int]:
+        """:return: the active use counts of the limited prices, in one query"""
+        price_ids = [price.id for price in self.prices if price.max_uses]
+        if not price_ids:
+            return {}
+        leader_ids = [leader.id for leader in self.event.leaders]
+        query = (
+            select(Payment.item_price_id, func.count(Payment.id))
+            .outerjoin(Registration, Payment.registration_id == Registration.id)
+            .where(
+                Payment.item_price_id.in_(price_ids),
+                Payment.status.in_([PaymentStatus.Approved, PaymentStatus.Initiated]),
+                or_(
+                    Registration.status.in_(
+                        [
+                            *RegistrationStatus.valid_status(),
+                            RegistrationStatus.PaymentPending,
+                        ]
+                    ),
+                    Payment.buyer_id.in_(leader_ids),
+                ),
+            )
+            .group_by(Payment.item_price_id)
+        )
+        counts = dict(db.session.execute(query).all())
+        return {price_id: counts.get(price_id, 0) for price_id in price_ids}
+
+    def load_users(self, user_ids: Iterable[int]):
+        """Loads the user group memberships of several users at once.
+
+        :param user_ids: Ids of the users
+        """
+        user_ids = set(user_ids) - self._loaded_user_ids
+        if not user_ids:
+            return
+        for price in self.prices:
+            if price.user_group is not None:
+                members = price.user_group.contains_many(user_ids, self.event.start)
+                self._members.setdefault(price.id, set()).update(members)
+        self._loaded_user_ids |= user_ids
+
+    def has_available_use(self, price: ItemPrice) -> bool:
+        """:return: whether a price has remaining uses, see
+        :py:meth:`ItemPrice.has_available_use`"""
+        if not price.max_uses:
+            return True
+        return price.max_uses > self.active_use_counts[price.id]
+
+    def available_prices(self, user_id: int) -> List[ItemPrice]:
+        """Returns all prices that are available to a user at any point in time.
+
+        :param user_id: Id of the user
+        :return: List of available prices, of all items of the event
+        """
+        self.load_users([user_id])
+        return [
+            price
+            for price in self.prices
+            if (price.user_group is None or user_id in self._members[price.id])
+            and self.has_available_use(price)
+        ]
+
+    def cheapest_prices_at_date(
+        self, user_ids: Iterable[int], at_date: date
+    ) -> Dict[int, Dict[int, ItemPrice]]:
+        """Returns the cheapest price of each item available to several users at a
+        given date.
+
+        :param user_ids: Ids of the users
+        :param at_date: The considered date
+        :return: For each user id, the cheapest price by item id. Items without
+            available prices are omitted.
+        """
+        user_ids = list(user_ids)
+        self.load_users(user_ids)
+        result = {}
+        for user_id in user_ids:
+            cheapest = {}
+            for price in self.available_prices(user_id):
+                if not price.is_available_at_date(at_date):
+                    continue
+                current = cheapest.get(price.item_id)
+                if current is None or price.amount < current.amount:
+                    cheapest[price.item_id] = price
+            result[user_id] = cheapest
+        return result
+
+    def cheapest_price_for_user_at_date(
+        self, item: PaymentItem, user_id: int, at_date: date
+    ) -> ItemPrice | None:
+        """Returns the cheapest price of an item available to a user at a given date.
+
+        :param item: The payment item
+        :param user_id: Id of the user
+        :param at_date: The considered date
+        :return: The cheapest price, or `None` if no price is available
+        """
+        return self.cheapest_prices_at_date([user_id], at_date)[user_id].get(item.id)
@@ -304,68 +304,6 @@ class Registration(db.Model):
             *self.status.valid_transitions(self.event.requires_payment()),
         ]
 
-    def _index_in_list(self, regs: List["Registration"]) -> int:
-        """Returns the chronlogical place this registration has in a list of registrations.
-        -1 if not present. Starts at 0."""
-        if self not in regs:
-            return -1
-        return sum(1 for r in regs if r.id < self.id)
-
-    def holding_index(self) -> int:
-        """Returns the chronlogical place this registration has in all holding place registrations.
-        -1 if not active. Starts at 0."""
-        return self._index_in_list(
-            [r for r in self.event.registrations if r.is_holding_slot()]
-        )
-
-    def online_index(self) -> int:
-        """Returns the chronological place this registration has in all online and holding slot
-        registrations. -1 if not holding slot and online. Starts at 0."""
-        return self._index_in_list(
-            [r for r in self.event.registrations if r.is_self and r.is_holding_slot()]
-        )
-
-    def waiting_index(self) -> int:
-        """Returns the chronological place this registration has in waiting registrations.
-        -1 if not waiting. Starts at 0."""
-        return self._index_in_list(
-            [
-                r
-                for r in self.event.registrations
-                if r.status == RegistrationStatus.Waiting
-            ]
-        )
-
-    def is_duplicate(self) -> bool:
-        """Check if this registration is the duplicate of another one
-        (an earlier registration exists for the same user)
-        """
-        return any(
-            r.id < self.id
-            for r in self.event.registrations
-            if r.user_id == self.user_id
-        )
-
-    def is_overbooked(self) -> bool:
-        """Check if the registration is overbooking.
-
-        An overbooked registration is:
-
-        - | an online registration with more previous Waiting registration
-          | than online slots
-        - | or an holding place registration with more previous holding place registration
-          | than total slots
-        - | a Waiting registration with more previous Waiting registration
-          | than Waiting slots
-
-        """
-
-        return (
-            self.waiting_index() >= self.event.num_waiting_list
-            or self.holding_index() >= self.event.num_slots
-            or self.online_index() >= self.event.num_online_slots
-        )
-
     def is_in_late_unregistration_period(self, time: Optional[datetime] = None) -> bool:
         """
         :param time: Time for which to make the test, defaults to curren time
@@ -10,7 +10,15 @@ from werkzeug.utils import secure_filename
 
 from collectives.models.globals import db
 from collectives.models.user import User
-from collectives.utils.misc import is_valid_image
+from collectives.utils.images import (
+    DERIVATIVES,
+    delete_derivatives,
+    derived_image_url,
+    has_derivative,
+    hashed_name,
+    save_derivatives,
+)
+from collectives.utils.misc import ImageTooLargeError, is_valid_image
 from collectives.utils.time import current_time
 
 documents = UploadSet("documents", DOCUMENTS + IMAGES + ("gpx",))
@@ -20,10 +28,10 @@ documents = UploadSet("documents", DOCUMENTS + IMAGES + ("gpx",))
 """
 
 
-THUMBNAIL_WIDTH = 640
+THUMBNAIL_WIDTH = DERIVATIVES["document_thumbnail"].width
 """Default width in pixels for image thumbnails """
 
-THUMBNAIL_HEIGHT = 480
+THUMBNAIL_HEIGHT = DERIVATIVES["document_thumbnail"].height
 """Default height in pixels for image thumbnails """
 
 
@@ -145,19 +153,28 @@ class UploadedFile(db.Model):
         :return: True if extension is in flask_uploads.IMAGES
         """
         ext = os.path.splitext(self.name)[1][1:]
-        return ext in IMAGES and is_valid_image(self.full_path())
+        try:
+            return ext in IMAGES and is_valid_image(self.full_path())
+        except ImageTooLargeError:
+            return False
 
     def save_file(self, file):
         """Save from a raw file
 
+        Images are saved under a name containing a hash of their content, and
+        their thumbnail is generated right away, see :py:mod:`collectives.utils.images`.
+
         :param file: The direct output of a FileInput
         :type file: :py:class:`werkzeug.datastructures.FileStorage`
         """
         self.name = file.filename
         name, ext = os.path.splitext(self.name)
-        self.path = documents.save(
-            file, name=f"{self.date.strftime('%y_%m_%d')}_{name}{ext}"
-        )
+        name = f"{self.date.strftime('%y_%m_%d')}_{name}"
+        if ext[1:].lower() in IMAGES:
+            self.path = documents.save(file, name=hashed_name(name, file.stream))
+            save_derivatives(documents.name, self.path)
+        else:
+            self.path = documents.save(file, name=f"{name}{ext}")
         file_stats = os.stat(self.full_path())
         self.size = file_stats.st_size
 
@@ -168,7 +185,9 @@ class UploadedFile(db.Model):
         return documents.path(self.path)
 
     def delete_file(self):
-        """Deletes the on-disk file"""
+        """Deletes the on-disk file, and its derivatives"""
+        if self.path:
+            delete_derivatives(documents.name, self.path)
         try:
             os.remove(self.full_path())
         except (FileNotFoundError, OSError):
@@ -196,6 +215,10 @@ class UploadedFile(db.Model):
         :return: The thumbnail URL or None if not an image
         :rtype: int
         """
+        if (width, height) == (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT) and has_derivative(
+            self.path, "document_thumbnail"
+        ):
+            return derived_image_url(self.path, "document_thumbnail", _external=True)
         return (
             url_for(
                 "images.fit",
@@ -12,6 +12,7 @@ from collectives.models.user.enum import Gender, UserType
 from collectives.models.user.misc import UserMiscMixin, avatars
 from collectives.models.user.model import UserModelMixin
 from collectives.models.user.role import UserRoleMixin
+from collectives.models.user.search import UserSearchMixin
 
 
 class User(
@@ -21,6 +22,7 @@ class User(
     UserRoleMixin,
     UserBadgeMixin,
     UserMiscMixin,
+    UserSearchMixin,
     flask_login.UserMixin,
 ):
     """Class to manage user.
@@ -2,11 +2,12 @@
 
 import datetime
 import os
-from typing import List
+from typing import Dict, Iterable, List
 
 import phonenumbers
 from flask_uploads import IMAGES, UploadSet
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select
+from sqlalchemy.orm import contains_eager
 from werkzeug.datastructures import FileStorage
 
 from collectives.models.configuration import Configuration
@@ -14,6 +15,7 @@ from collectives.models.globals import db
 from collectives.models.registration import Registration, RegistrationStatus
 from collectives.models.reservation import ReservationStatus
 from collectives.models.user.enum import Gender, UserType
+from collectives.utils.images import delete_derivatives, hashed_name, save_derivatives
 from collectives.utils.misc import is_valid_image
 
 # Upload
@@ -29,22 +31,28 @@ class UserMiscMixin:
         """Save an image as user avatar.
 
         It will both save the files into the file system and save the path into the database.
-        If file is None, it will do nothing. It will use Flask-Upload to save the image.
+        If file is None, it will do nothing. It will use Flask-Upload to save the image,
+        and generate its resized versions, see :py:mod:`collectives.utils.images`.
 
         :param file: request param to be saved.
         :return: Whether the operation succeeded
+        :raises collectives.utils.misc.ImageTooLargeError: if the image is too large
         """
         if file is not None:
             if not is_valid_image(file.stream):
                 return False
 
-            filename = avatars.save(file, name="user-" + str(self.id) + ".")
-            self.avatar = filename
+            self.delete_avatar()  # remove existing
+
+            name = hashed_name(f"user-{self.id}", file.stream)
+            self.avatar = avatars.save(file, name=name)
+            save_derivatives(avatars.name, self.avatar)
         return True
 
     def delete_avatar(self):
-        """Remove and dereference an user avatar."""
+        """Remove and dereference an user avatar, and its derivatives."""
         if self.avatar:
+            delete_derivatives(avatars.name, self.avatar)
             try:
                 os.remove(avatars.path(self.avatar))
             except (OSError, FileNotFoundError):
@@ -183,43 +191,80 @@ class UserMiscMixin:
         specified timespan. The check only considers events that require an activity
         (e.g 'Collectives' but not 'Soirées')
 
+        See :py:meth:`registrations_during_by_user` to check several users at once.
+
         :param start: Start of the timespan
         :param end: End of the timespan
         :param excluded_event_id: Event id to exclude (often the event being edited)
+        :param include_waiting: Whether to include registrations in waiting lists
         :rtype: list(Registration)
         """
-        # pylint: disable=(import-outside-toplevel
-        from collectives.models.event import Event, EventStatus
+        registrations = self.registrations_during_by_user(
+            [self.id], start, end, excluded_event_id, include_waiting
+        )
+        return registrations.get(self.id, [])
+
+    @staticmethod
+    def registrations_during_by_user(
+        user_ids: Iterable[int],
+        start: datetime.datetime = None,
+        end: datetime.datetime = None,
+        excluded_event_id: int = None,
+        include_waiting: bool = False,
+    ) -> Dict[int, List[Registration]]:
+        """Returns registrations of several users from confirmed events on a
+        specified timespan, in a single query. The check only considers events
+        that require an activity (e.g 'Collectives' but not 'Soirées')
 
-        query = db.session.query(Registration)
-        query = query.options(selectinload(Registration.event))
+        :param user_ids: Ids of the users to check
+        :param start: Start of the timespan
+        :param end: End of the timespan
+        :param excluded_event_id: Event id to exclude (often the event being edited)
+        :param include_waiting: Whether to include registrations in waiting lists
+        :return: Registrations of each user having some, by user id, ordered by
+            event start
+        """
+        # pylint: disable=(import-outside-toplevel
+        from collectives.models.event import Event, EventStatus, EventType
+
+        user_ids = set(user_ids)
+        if not user_ids:
+            return {}
+
+        query = (
+            select(Registration)
+            .join(Registration.event)
+            .join(Event.event_type)
+            .options(contains_eager(Registration.event))
+            .where(Registration.user_id.in_(user_ids))
+            .where(EventType.requires_activity)
+            .where(Event.status == EventStatus.Confirmed)
+        )
         if end is not None:
             if end == start and end.time() == datetime.time(0):
                 # If both start and end are set to midnight the same day,
                 # this is a full-day event. Extend end time accordingly
                 start = start - datetime.timedelta(seconds=1)
                 end = start + datetime.timedelta(hours=18)
-            query = query.filter(Registration.event.has(Event.start < end))
-        if start is not None:
-            query = query.filter(Registration.event.has(Event.end > start))
-        query = query.filter(Registration.user_id == self.id)
+        if start is not None and end is not None:
+            query = query.where(Event.overlapping(start, end))
+        elif end is not None:
+            query = query.where(Event.start < end)
+        elif start is not None:
+            query = query.where(Event.end > start)
         if excluded_event_id is not None:
-            # pylint: disable=(comparison-with-callable)
-            query = query.filter(Registration.event.has(id != excluded_event_id))
+            query = query.where(Registration.event_id != excluded_event_id)
 
         ignored_status = [RegistrationStatus.Rejected]
         if not include_waiting:
             ignored_status.append(RegistrationStatus.Waiting)
-        query = query.filter(~Registration.status.in_(ignored_status))
-
-        query = query.filter(
-            Registration.event.has(Event.event_type.has(requires_activity=True))
-        )
-        query = query.filter(
-            Registration.event.has(Event.status == EventStatus.Confirmed)
-        )
-        registrations = query.all()
+        query = query.where(~Registration.status.in_(ignored_status))
 
+        registrations = {}
+        for registration in db.session.scalars(
+            query.order_by(Event.start, Registration.id)
+        ):
+            registrations.setdefault(registration.user_id, []).append(registration)
         return registrations
 
     def form_of_address(self):
@@ -14,6 +14,20 @@ from collectives.models.user.enum import Gender, UserType
 from collectives.utils.misc import truncate
 from collectives.utils.time import current_time
 
+# Trigrammes des noms des utilisateurs, pour l'autocomplétion.
+# Maintenu à chaque flush, voir UserSearchMixin.search_condition
+user_search_trigrams = db.Table(
+    "user_search_trigrams",
+    db.Column("trigram", db.String(3), primary_key=True),
+    db.Column(
+        "user_id",
+        db.Integer,
+        db.ForeignKey("users.id"),
+        primary_key=True,
+        index=True,
+    ),
+)
+
 
 class UserModelMixin:
     """Part of User class with all its attributes.
@@ -159,6 +173,22 @@ class UserModelMixin:
 
     :type: :py:class:`datetime.datetime`"""
 
+    search_text = db.Column(db.String(201))
+    """ Names of the user, folded for searches.
+
+    Maintained on each flush, see
+    :py:func:`collectives.models.user.search.user_search_text`
+
+    :type: string"""
+
+    last_extranet_check_time = db.Column(db.DateTime)
+    """ Last time the license of the user has been checked on FFCAM extranet
+    by ``flask collectives resync-users``, or the user synchronised.
+
+    See :py:mod:`collectives.utils.extranet_resync`
+
+    :type: :py:class:`datetime.datetime`"""
+
     gender = db.Column(
         db.Enum(Gender),
         nullable=False,
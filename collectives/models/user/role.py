@@ -1,7 +1,11 @@
 """Module for all User methods related to role manipulation and check."""
 
 import datetime
-from typing import List, Set
+from dataclasses import dataclass
+from typing import FrozenSet, List, Set
+
+from flask import g, has_app_context
+from sqlalchemy import event
 
 from collectives.models.activity_type import ActivityType
 from collectives.models.configuration import Configuration
@@ -9,6 +13,43 @@ from collectives.models.globals import db
 from collectives.models.role import Role, RoleIds
 
 
+@dataclass(frozen=True)
+class EventVisibilityProfile:
+    """Summary of the roles of a user which drive the events they can see.
+
+    See :py:func:`collectives.api.event.filter_hidden_events`"""
+
+    is_moderator: bool
+    """Whether the user can see all events"""
+
+    can_lead_events: bool
+    """Whether the user can see the events they lead"""
+
+    has_any_role: bool
+    """Whether the user can see 'Activity' events without activities"""
+
+    supervised_activity_ids: FrozenSet[int]
+    """Activities for which the user can see 'Pending' events"""
+
+    role_activity_ids: FrozenSet[int]
+    """Activities for which the user can see 'Activity' events"""
+
+
+def uncache_visibility_profiles():
+    """Remove the visibility profiles cached in the current application context."""
+    if has_app_context():
+        g.pop("visibility_profiles", None)
+
+
+@event.listens_for(Role, "after_insert")
+@event.listens_for(Role, "after_update")
+@event.listens_for(Role, "after_delete")
+def _uncache_role_user_profile(mapper, connection, target):
+    """Invalidate the visibility profiles when roles are written."""
+    # pylint: disable=unused-argument
+    uncache_visibility_profiles()
+
+
 class UserRoleMixin:
     """Part of User related to role.
 
@@ -216,8 +257,7 @@ class UserRoleMixin:
         from collectives.models.event import Event, EventType
 
         query = db.session.query(Event)
-        query = query.filter(Event.start < end)
-        query = query.filter(Event.end > start)
+        query = query.filter(Event.overlapping(start, end))
         query = query.filter(Event.leaders.contains(self))
         query = query.filter(Event.id != excluded_event_id)
         # pylint: disable=comparison-with-callable
@@ -267,6 +307,34 @@ class UserRoleMixin:
             role.activity_type for role in self.roles if role.activity_type is not None
         }
 
+    def visibility_profile(self) -> EventVisibilityProfile:
+        """Get the summary of the user roles relevant to event visibility.
+
+        The profile is computed once per request (application context), and
+        again if roles are written meanwhile.
+
+        :return: The visibility profile of the user
+        """
+        profiles = None
+        if has_app_context():
+            profiles = g.setdefault("visibility_profiles", {})
+            if self.id in profiles:
+                return profiles[self.id]
+
+        is_moderator = self.is_moderator()
+        profile = EventVisibilityProfile(
+            is_moderator=is_moderator,
+            can_lead_events=self.can_create_events(),
+            has_any_role=self.has_any_role(),
+            supervised_activity_ids=frozenset(
+                () if is_moderator else (a.id for a in self.get_supervised_activities())
+            ),
+            role_activity_ids=frozenset(a.id for a in self.activities_with_role()),
+        )
+        if profiles is not None:
+            profiles[self.id] = profile
+        return profile
+
     def can_see_leader_profile(self, leader: "User") -> bool:
         """Check if the current user may view a leader's profile.
 
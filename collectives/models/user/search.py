@@ -0,0 +1,152 @@
+"""Module for the search index of users, used by autocompletion."""
+
+from typing import Iterable, List, Set
+
+from sqlalchemy import (
+    and_,
+    delete,
+    distinct,
+    event,
+    false,
+    func,
+    insert,
+    inspect,
+    select,
+)
+from sqlalchemy.sql.elements import ColumnElement
+
+from collectives.models.user.model import user_search_trigrams
+from collectives.models.utils import prefix_condition
+from collectives.utils.misc import fold_search_text
+
+MIN_SEARCH_LENGTH = 2
+""" Minimum length of folded search patterns """
+
+
+def user_search_text(first_name: str, last_name: str) -> str:
+    """Text indexed for a user, see
+    :py:attr:`collectives.models.user.model.UserModelMixin.search_text`
+
+    :param first_name: First name of the user
+    :param last_name: Last name of the user
+    :return: The folded names
+    """
+    return fold_search_text(f"{first_name or ''} {last_name or ''}")
+
+
+def search_trigrams(text: str) -> Set[str]:
+    """Trigrams of an indexed text.
+
+    The text is padded with spaces, so that any two-character substring is the
+    start of one of its trigrams.
+
+    :param text: Folded text
+    :return: Set of trigrams
+    """
+    text = f" {text} "
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def refresh_user_search(connection, users: Iterable):
+    """Rewrite the search trigrams of some users.
+
+    :param connection: Connection or session used to run the queries
+    :param users: Users whose search text has changed
+    """
+    users = list(users)
+    connection.execute(
+        delete(user_search_trigrams).where(
+            user_search_trigrams.c.user_id.in_([user.id for user in users])
+        )
+    )
+    rows = [
+        {"trigram": trigram, "user_id": user.id}
+        for user in users
+        for trigram in search_trigrams(user.search_text)
+    ]
+    if rows:
+        connection.execute(insert(user_search_trigrams), rows)
+
+
+def _set_search_text(mapper, connection, target):
+    """Fold the names of a user before saving it."""
+    # pylint: disable=unused-argument
+    target.search_text = user_search_text(target.first_name, target.last_name)
+
+
+def _delete_user_search(mapper, connection, target):
+    """Delete the search trigrams of a user before the user itself."""
+    # pylint: disable=unused-argument
+    connection.execute(
+        delete(user_search_trigrams).where(user_search_trigrams.c.user_id == target.id)
+    )
+
+
+def _insert_user_search(mapper, connection, target):
+    """Store the search trigrams of a new user."""
+    # pylint: disable=unused-argument
+    refresh_user_search(connection, [target])
+
+
+def _update_user_search(mapper, connection, target):
+    """Store the search trigrams of a user whose names have changed."""
+    # pylint: disable=unused-argument
+    if inspect(target).attrs.search_text.history.has_changes():
+        refresh_user_search(connection, [target])
+
+
+class UserSearchMixin:
+    """Part of User class for name and license searches.
+
+    Not meant to be used alone."""
+
+    @classmethod
+    def search_condition(cls, pattern: str) -> ColumnElement:
+        """Condition on users whose names contain a pattern, or whose license
+        number starts with it.
+
+        Accents, case and punctuation are ignored. Candidate users are looked
+        up in :py:data:`collectives.models.user.model.user_search_trigrams`
+        before checking the whole pattern, so that searches do not scan the
+        users table. Patterns made of digits are searched as the start of
+        license numbers instead, using the index of the license column.
+
+        :param pattern: The searched pattern, at least two characters long once
+            folded.
+        :return: The SQL condition
+        """
+        folded = fold_search_text(pattern)
+        if len(folded) < MIN_SEARCH_LENGTH:
+            return false()
+
+        license_prefix = folded.replace(" ", "")
+        if license_prefix.isdigit():
+            return prefix_condition(cls.license, license_prefix)
+
+        trigrams: List[str] = sorted(
+            {folded[i : i + 3] for i in range(len(folded) - 2)}
+        )
+        if trigrams:
+            candidates = (
+                select(user_search_trigrams.c.user_id)
+                .where(user_search_trigrams.c.trigram.in_(trigrams))
+                .group_by(user_search_trigrams.c.user_id)
+                .having(
+                    func.count(distinct(user_search_trigrams.c.trigram))
+                    == len(trigrams)
+                )
+            )
+        else:
+            # Two characters: they start at least one trigram
+            candidates = select(user_search_trigrams.c.user_id).where(
+                prefix_condition(user_search_trigrams.c.trigram, folded)
+            )
+
+        return and_(cls.id.in_(candidates), cls.search_text.like(f"%{folded}%"))
+
+
+event.listen(UserSearchMixin, "before_insert", _set_search_text, propagate=True)
+event.listen(UserSearchMixin, "before_update", _set_search_text, propagate=True)
+event.listen(UserSearchMixin, "before_delete", _delete_user_search, propagate=True)
+event.listen(UserSearchMixin, "after_insert", _insert_user_search, propagate=True)
+event.listen(UserSearchMixin, "after_update", _update_user_search, propagate=True)
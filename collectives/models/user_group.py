@@ -1,10 +1,13 @@
 """Handle dynamic user groups, for restricting or payment options"""
 
-from datetime import datetime
-from typing import List
+import threading
+import time as clock
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Set, Tuple
 
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import Query
+from flask import Flask
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import Query, Session
 
 from collectives.models.badge import Badge, BadgeIds
 from collectives.models.event import Event
@@ -369,13 +372,38 @@ class UserGroup(db.Model):
         Checks if a given user is a member of the group at a specific time.
         The time is used to check for badge expiry.
 
+        Members of saved groups are cached, see :py:data:`user_group_memberships`.
+
         :return: Whether a given user is a member of the group"""
         if not user.is_active:
             return False
+        members = user_group_memberships.get(self, time)
+        if members is not None:
+            return user.id in members
         return (
             self._build_query(time).filter(User.id == user.id).one_or_none() is not None
         )
 
+    def contains_many(self, user_ids: Iterable[int], time: datetime) -> Set[int]:
+        """Checks which of several users are active members of the group at a
+        specific time.
+
+        :param user_ids: Ids of the users to check
+        :param time: Time used to check for badge expiry
+        :return: Ids of the users among `user_ids` that are active members
+        """
+        user_ids = set(user_ids)
+        members = user_group_memberships.get(self, time)
+        if members is not None:
+            return user_ids & members
+        query = self._build_query(time).filter(User.id.in_(user_ids), User.is_active)
+        return {user_id for (user_id,) in query.with_entities(User.id)}
+
+    def active_member_ids(self, time: datetime) -> Set[int]:
+        """:return: the ids of the active members of the group at a specific time"""
+        query = self._build_query(time).filter(User.is_active)
+        return {user_id for (user_id,) in query.with_entities(User.id)}
+
     def _build_query(self, time) -> Query:
         """:return: the SQLAlchemy query used to check group members"""
         query = User.query
@@ -467,3 +495,137 @@ class UserGroup(db.Model):
             or self.badge_conditions
             or self.license_conditions
         )
+
+
+class UserGroupMembershipCache:
+    """Thread-safe in-process cache of the active members of user groups.
+
+    Badge conditions only depend on the date of the checked time, so that the ids
+    of the members of a group are cached by group and date. Entries are dropped
+    when changes to users, roles, badges, groups or their conditions are
+    committed, and entries of groups with event conditions when registrations or
+    events are committed. As other processes may commit changes too, entries also
+    expire after ``USER_GROUP_CACHE_TIMEOUT`` seconds.
+
+    Requires to be initialized with :py:meth:`init_app` to be used.
+    """
+
+    def __init__(self):
+        """Constructor"""
+        self.timeout = 0
+        self.max_size = 256
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[int, date], Tuple[Set[int], float, bool]] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask):
+        """Reads the cache settings from the app configuration, and empties the
+        cache.
+
+        :param app: The Flask application
+        """
+        self.timeout = app.config["USER_GROUP_CACHE_TIMEOUT"]
+        self.max_size = app.config["USER_GROUP_CACHE_SIZE"]
+        self.clear()
+
+    def get(self, group: UserGroup, time: datetime) -> Set[int] | None:
+        """Returns the ids of the active members of a group, computing them if needed.
+
+        :param group: The user group
+        :param time: Time used to check for badge expiry
+        :return: The member ids, or `None` if the group cannot be cached because it
+            is not saved or has uncommitted changes.
+        """
+        if not self.timeout or group.id is None:
+            return None
+        session = Session.object_session(group)
+        if session is None or _has_membership_changes(session):
+            return None
+
+        key = (group.id, time.date())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > clock.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        members = group.active_member_ids(time)
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries.clear()
+            self._entries[key] = (
+                members,
+                clock.monotonic() + self.timeout,
+                bool(group.event_conditions),
+            )
+        return members
+
+    def clear(self, event_conditions_only: bool = False):
+        """Drops cached entries.
+
+        :param event_conditions_only: Only drop entries of groups with event
+            conditions
+        """
+        with self._lock:
+            if not event_conditions_only:
+                self._entries.clear()
+                return
+            for key in [key for key, entry in self._entries.items() if entry[2]]:
+                del self._entries[key]
+
+
+user_group_memberships = UserGroupMembershipCache()
+""" Cache of the members of user groups, used by :py:meth:`UserGroup.contains` """
+
+_MEMBERSHIP_MODELS = (
+    User,
+    Role,
+    Badge,
+    UserGroup,
+    GroupRoleCondition,
+    GroupBadgeCondition,
+    GroupEventCondition,
+    GroupLicenseCondition,
+)
+""" Models whose changes invalidate all of :py:data:`user_group_memberships`"""
+
+_EVENT_MEMBERSHIP_MODELS = (Event, Registration)
+""" Models whose changes invalidate groups with event conditions"""
+
+
+def _has_membership_changes(session: Session) -> bool:
+    """:return: whether the session has changes which may alter group memberships"""
+    if session.info.get("invalidate_user_groups"):
+        return True
+    return any(
+        isinstance(instance, (_MEMBERSHIP_MODELS, _EVENT_MEMBERSHIP_MODELS))
+        for instance in (*session.new, *session.dirty, *session.deleted)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_membership_changes(session, flush_context):
+    """Remember which cached group memberships must be invalidated on commit."""
+    # pylint: disable=unused-argument
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, _MEMBERSHIP_MODELS):
+            session.info["invalidate_user_groups"] = "all"
+            return
+        if isinstance(instance, _EVENT_MEMBERSHIP_MODELS):
+            session.info.setdefault("invalidate_user_groups", "events")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_memberships(session):
+    """Invalidate cached group memberships once changes are visible to others."""
+    invalidate = session.info.pop("invalidate_user_groups", None)
+    if invalidate:
+        user_group_memberships.clear(event_conditions_only=invalidate == "events")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_membership_changes(session):
+    """Forget pending invalidation of rolled back changes."""
+    session.info.pop("invalidate_user_groups", None)
@@ -2,7 +2,15 @@
 
 import enum
 import json
-from typing import List
+from typing import List, Optional
+
+from sqlalchemy import and_
+from sqlalchemy.sql.elements import ColumnElement
+
+SEARCH_ALPHABET = " 0123456789abcdefghijklmnopqrstuvwxyz"
+""" Characters of folded search texts, in the order of all database collations.
+
+See :py:func:`collectives.utils.misc.fold_search_text`"""
 
 
 class ChoiceEnum(enum.IntEnum):
@@ -66,3 +74,35 @@ class ChoiceEnum(enum.IntEnum):
         :rtype: int
         """
         return 1
+
+
+def _next_prefix(prefix: str) -> Optional[str]:
+    """Smallest folded string greater than all the strings starting with a prefix.
+
+    :param prefix: Folded prefix
+    :return: The upper bound, or `None` if there is none.
+    """
+    prefix = prefix.rstrip(SEARCH_ALPHABET[-1])
+    if not prefix:
+        return None
+    next_char = SEARCH_ALPHABET[SEARCH_ALPHABET.index(prefix[-1]) + 1]
+    return prefix[:-1] + next_char
+
+
+def prefix_condition(column, prefix: str) -> ColumnElement:
+    """Condition on a column of folded texts starting with a prefix.
+
+    Unlike ``LIKE 'prefix%'``, the range of values can use indexes whatever the
+    collation and case sensitivity of the database. Punctuation is not used as
+    upper bound, since collations disagree on its order relative to letters.
+
+    :param column: Column of folded texts
+    :param prefix: Folded prefix, see :py:func:`collectives.utils.misc.fold_search_text`
+    :return: The SQL condition
+    """
+    upper_bound = _next_prefix(prefix)
+    if upper_bound is None:
+        # Prefix made of the last character only, bound by the greatest value
+        greatest = prefix.ljust(column.type.length, SEARCH_ALPHABET[-1])
+        return and_(column >= prefix, column <= greatest)
+    return and_(column >= prefix, column < upper_bound)
@@ -11,7 +11,6 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_file,
     url_for,
 )
 from flask_login import current_user
@@ -167,14 +166,10 @@ def export_role():
     query = query.filter(Role.user.has(User.id))
     query = query.filter(Role.activity_id == activity_type.id)
 
-    roles = query.all()
-    out = export.export_roles(roles)
+    roles = export.iterate_by_batches(query)
 
-    return send_file(
-        out,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        download_name=f"{Configuration.CLUB_NAME} - Export Roles {activity_type.name}.xlsx",
-        as_attachment=True,
+    return export.export_roles(
+        roles, f"{Configuration.CLUB_NAME} - Export Roles {activity_type.name}"
     )
 
 
@@ -12,7 +12,6 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_file,
     url_for,
 )
 from flask_login import current_user
@@ -38,7 +37,7 @@ from collectives.models.auth import ConfirmationToken
 from collectives.models.badge import BadgeIds
 from collectives.utils import badges, export, extranet, time
 from collectives.utils.access import confidentiality_agreement, user_is, valid_user
-from collectives.utils.misc import sanitize_file_name
+from collectives.utils.misc import ImageTooLargeError, sanitize_file_name
 
 blueprint = Blueprint("administration", __name__, url_prefix="/administration")
 """ Administration blueprint
@@ -147,8 +146,11 @@ def manage_user(user_id=None):
     # Save avatar into ight UploadSet
     if form.remove_avatar and form.remove_avatar.data:
         user.delete_avatar()
-    if not user.save_avatar(FormClass().avatar_file.data):
-        flash("L'avatar téléchargé n'est pas dans un format d'image valide")
+    try:
+        if not user.save_avatar(FormClass().avatar_file.data):
+            flash("L'avatar téléchargé n'est pas dans un format d'image valide")
+    except ImageTooLargeError as err:
+        flash(str(err), "error")
 
     db.session.add(user)
     db.session.commit()
@@ -423,18 +425,11 @@ def export_role(raw_filters=""):
             filename += db.session.get(ActivityType, filters["t"]).name
         query_filter = query_filter.filter(Role.activity_id == filters["t"])
 
-    roles = query_filter.all()
-
-    out = export.export_roles(roles)
+    roles = export.iterate_by_batches(query_filter)
 
     club_name = sanitize_file_name(Configuration.CLUB_NAME)
 
-    return send_file(
-        out,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        download_name=f"{club_name} - Export {filename}.xlsx",
-        as_attachment=True,
-    )
+    return export.export_roles(roles, f"{club_name} - Export {filename}")
 
 
 @blueprint.route("/users/export", methods=["POST"])
@@ -442,26 +437,18 @@ def export_search_results():
     """Export users from search results.
 
     Accepts filter parameters in the same format as the /api/users/ endpoint
-    and exports all matching users to Excel.
+    and exports all matching users to Excel, or to CSV if the ``format`` form
+    value is ``csv``.
 
-    :return: The Excel file with the users.
+    :return: The Excel or CSV file with the users.
     """
-    query = User.query
-    query = query.options(joinedload(User.roles), joinedload(User.badges))
-
-    query = apply_user_filters(query, request.form)
+    query = apply_user_filters(User.query, request.form)
 
-    users = query.all()
-    out = export.export_users(users)
+    users = export.iterate_by_batches(query)
 
     club_name = sanitize_file_name(Configuration.CLUB_NAME)
 
-    return send_file(
-        out,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        download_name=f"{club_name} - Export utilisateurs.xlsx",
-        as_attachment=True,
-    )
+    return export.export_users(users, f"{club_name} - Export utilisateurs")
 
 
 @blueprint.route("/token", methods=["GET"])
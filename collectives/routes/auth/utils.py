@@ -1,5 +1,7 @@
 """Auth module for miscaleneous functions and classes."""
 
+from datetime import timedelta
+
 from flask import current_app, url_for
 from flask_login import AnonymousUserMixin
 from flask_wtf.csrf import generate_csrf
@@ -42,6 +44,11 @@ def sync_user(user: User, force: bool):
     Synchronization is done if license has been renewed or if 'force' is True. Test users
     cannot be synchronized.
 
+    Unless 'force' is True, the extranet is not called if the license has been
+    checked recently by :py:func:`collectives.utils.extranet_resync.resync_users`,
+    and the license status may come from the cache of
+    :py:meth:`collectives.utils.extranet.ExtranetApi.check_license`.
+
     :param user: User to synchronize
     :param force: if True, do synchronisation even if licence has been recently renewed.
     """
@@ -49,9 +56,19 @@ def sync_user(user: User, force: bool):
         return
 
     time = current_time()
+    if (
+        not force
+        and user.last_extranet_check_time is not None
+        and time - user.last_extranet_check_time
+        < timedelta(seconds=current_app.config["EXTRANET_CHECK_MAX_AGE"])
+        and user.license_expiry_date > time.date()
+    ):
+        # License has been checked recently by the resynchronisation job
+        return
+
     try:
         # Check whether the license has been renewed
-        license_info = extranet.api.check_license(user.license)
+        license_info = extranet.api.check_license(user.license, use_cache=not force)
         valid = license_info.is_valid_at_time(time)
     except extranet.LicenseBelongsToOtherClubError:
         valid = False
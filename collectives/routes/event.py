@@ -16,7 +16,6 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_file,
     url_for,
 )
 from flask_login import current_user
@@ -37,9 +36,11 @@ from collectives.forms.event import PaymentItemChoiceForm
 from collectives.forms.question import QuestionAnswersForm
 from collectives.models import (
     ActivityType,
+    AdmissionRequestStatus,
     Badge,
     Configuration,
     Event,
+    EventPricing,
     EventStatus,
     EventTag,
     EventType,
@@ -53,6 +54,7 @@ from collectives.models import (
     db,
 )
 from collectives.models.event import (
+    ConflictingRegistrationError,
     DuplicateRegistrationError,
     event_activities_without_leaders,
 )
@@ -62,8 +64,9 @@ from collectives.models.user_group import GroupEventCondition
 from collectives.routes.auth import get_bad_phone_message, login_manager
 from collectives.utils import export
 from collectives.utils.access import confidentiality_agreement, valid_user
+from collectives.utils.admission import admission_queue
 from collectives.utils.crawlers import crawlers_catcher, is_crawler
-from collectives.utils.misc import sanitize_file_name
+from collectives.utils.misc import ImageTooLargeError, sanitize_file_name
 from collectives.utils.time import current_time
 from collectives.utils.url import slugify
 
@@ -331,17 +334,10 @@ def export_list_of_registered_users(event_id):
         flash("Accès restreint, rôle insuffisant.", "error")
         return redirect(url_for("event.index"))
 
-    out = export.export_users_registered(event)
-
     filename = sanitize_file_name(event.title)
     club_name = sanitize_file_name(Configuration.CLUB_NAME)
 
-    return send_file(
-        out,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        download_name=f"{club_name} - Collective {filename}.xlsx",
-        as_attachment=True,
-    )
+    return export.export_users_registered(event, f"{club_name} - Collective {filename}")
 
 
 @blueprint.route("/<int:event_id>/print")
@@ -636,8 +632,11 @@ def manage_event(event_id=None):
     # If no photo is sent, we don't do anything, especially if a photo is
     # already existing
     if form.photo_file.data is not None:
-        if not event.save_photo(form.photo_file.data):
-            flash("La photo téléchargée n'est pas dans un format d'image valide")
+        try:
+            if not event.save_photo(form.photo_file.data):
+                flash("La photo téléchargée n'est pas dans un format d'image valide")
+        except ImageTooLargeError as err:
+            flash(str(err), "error")
 
         db.session.add(event)
         db.session.commit()
@@ -734,20 +733,13 @@ def duplicate(event_id=None):
 def self_register(event_id):
     """Route for a user to subscribe to an event.
 
+    For events using an admission queue, the request is only queued, and the
+    user is redirected to :py:func:`admission_status`.
+
     :param int event_id: Primary key of the event to manage.
     """
     event: Event = Event.query.filter_by(id=event_id).first()
 
-    # Prepare registration
-    now = current_time()
-    registration = Registration(
-        user_id=current_user.id,
-        status=RegistrationStatus.Active,
-        level=RegistrationLevels.Normal,
-        is_self=True,
-        registration_time=now,
-    )
-
     if not current_user.has_valid_phone_number():
         flash(Markup(get_bad_phone_message(current_user)), "error")
         return redirect(url_for("event.view_event", event_id=event_id))
@@ -755,79 +747,79 @@ def self_register(event_id):
         flash(Markup(get_bad_phone_message(current_user, emergency=True)), "error")
         return redirect(url_for("event.view_event", event_id=event_id))
 
-    # Check if user cannot directly subscribe
-    if not event or not event.can_self_register(current_user, now):
-        # Check if user cannot subscribe in waiting list either
-        if not event or not event.can_self_register(current_user, now, True):
-            flash("Vous ne pouvez pas vous inscrire vous-même.", "error")
-            return redirect(url_for("event.view_event", event_id=event_id))
-
-        # User subscribe to waiting_list
-        registration.status = RegistrationStatus.Waiting
-        try:
-            event.add_registration_check_race_conditions(registration)
-        except RuntimeError as err:
-            flash(str(err), "error")
+    if not event:
+        flash("Vous ne pouvez pas vous inscrire vous-même.", "error")
         return redirect(url_for("event.view_event", event_id=event_id))
 
-    if event.event_type.requires_activity:
-        conflicts = current_user.registrations_during(event.start, event.end, event_id)
-        if len(conflicts) > 0:
-            conflict_text = [
-                f" * [{c.event.title} ({c.status.display_name()})]"
-                f"({url_for('event.view_event', event_id=c.event_id)})\n"
-                for c in conflicts
-            ]
-
-            flash(
-                "Vous allez participer une ou des activité(s) à cette date: \n"
-                f" {''.join(conflict_text)}\n  Si vous ne participez pas à cette "
-                "activité, vous pouvez demander à son encadrant de vous inscrire "
-                'en "Refusé".',
-                "error",
-            )
+    item_price = None
+    if event.requires_payment():
+        form = PaymentItemChoiceForm(event)
+        if form.validate_on_submit():
+            item_price = db.session.get(ItemPrice, form.item_price.data)
+        elif event.can_self_register(current_user, current_time()):
+            # Form has not been submitted or terms not accepted, return to event page
             return redirect(url_for("event.view_event", event_id=event_id))
 
-    if not event.requires_payment():
-        # Free event
-        try:
-            event.add_registration_check_race_conditions(registration)
-        except RuntimeError as err:
-            flash(str(err), "error")
+    if event.uses_admission_queue:
+        admission_queue.put(
+            event.id, current_user.id, item_price.id if item_price else None
+        )
+        return redirect(url_for("event.admission_status", event_id=event_id))
+
+    try:
+        _, payment = event.self_register(current_user, current_time(), item_price)
+    except ConflictingRegistrationError as err:
+        conflict_text = [
+            f" * [{c.event.title} ({c.status.display_name()})]"
+            f"({url_for('event.view_event', event_id=c.event_id)})\n"
+            for c in err.conflicts
+        ]
 
+        flash(
+            "Vous allez participer une ou des activité(s) à cette date: \n"
+            f" {''.join(conflict_text)}\n  Si vous ne participez pas à cette "
+            "activité, vous pouvez demander à son encadrant de vous inscrire "
+            'en "Refusé".',
+            "error",
+        )
+        return redirect(url_for("event.view_event", event_id=event_id))
+    except RuntimeError as err:
+        flash(str(err), "error")
         return redirect(url_for("event.view_event", event_id=event_id))
 
-    # Paid event
-    form = PaymentItemChoiceForm(event)
-    if form.validate_on_submit():
-        item_price = db.session.get(ItemPrice, form.item_price.data)
-        if (
-            item_price is None
-            or item_price.item.event_id != event_id
-            or not item_price.is_available_to_user(current_user)
-            or not item_price.is_available_at_date(current_time().date())
-        ):
-            flash("Tarif invalide.", "error")
-            return redirect(url_for("event.view_event", event_id=event_id))
+    if payment is not None:
+        # Goto to online payment page
+        return redirect(url_for("payment.request_payment", payment_id=payment.id))
 
-        registration.status = RegistrationStatus.PaymentPending
+    return redirect(url_for("event.view_event", event_id=event_id))
 
-        try:
-            event.add_registration_check_race_conditions(registration)
-        except RuntimeError as err:
-            flash(str(err), "error")
-            return redirect(url_for("event.view_event", event_id=event_id))
 
-        payment = Payment(registration=registration, item_price=item_price)
-        payment.terms_version = Configuration.PAYMENTS_TERMS_FILE
+@blueprint.route("/<int:event_id>/admission", methods=["GET"])
+@valid_user()
+def admission_status(event_id):
+    """Route for a user to wait for the result of their queued registration.
 
-        db.session.add(payment)
-        db.session.commit()
+    :param int event_id: Primary key of the event.
+    """
+    admission = admission_queue.get(event_id, current_user.id)
+    if admission is None:
+        return redirect(url_for("event.view_event", event_id=event_id))
 
-        # Goto to online payment page
-        return redirect(url_for("payment.request_payment", payment_id=payment.id))
+    if admission.status == AdmissionRequestStatus.Queued:
+        return render_template(
+            "event/admission.html",
+            event=admission.event,
+            position=admission_queue.position(admission),
+        )
 
-    # Form has not been submitted to terms not accepted, return to event page
+    if admission.status == AdmissionRequestStatus.Refused:
+        flash(admission.message, "error")
+    elif admission.payment_id is not None:
+        return redirect(
+            url_for("payment.request_payment", payment_id=admission.payment_id)
+        )
+    else:
+        flash(admission.message, "success")
     return redirect(url_for("event.view_event", event_id=event_id))
 
 
@@ -923,6 +915,19 @@ def register_user(event_id):
         else:
             payment_required = event.requires_payment()
 
+            # Looked up before a new registration is attached to the user
+            if event.event_type.requires_activity:
+                conflicts = user.registrations_during(event.start, event.end, event.id)
+                if conflicts:
+                    flash(
+                        f"{user.full_name()} participe à une ou des activité(s) à cette "
+                        "date : "
+                        + ", ".join(
+                            f"{c.event.title} ({c.status.display_name()})"
+                            for c in conflicts
+                        )
+                    )
+
             # Check for existing user registration and reuse if it exists
             try:
                 registration = next(
@@ -937,9 +942,11 @@ def register_user(event_id):
                     registration.registration_time = current_time()
 
             except StopIteration:
+                # Not attached to the user, which would add it to the session
+                # before it is admitted
                 registration = Registration(
                     level=RegistrationLevels.Normal,
-                    user=user,
+                    user_id=user.id,
                     is_self=False,
                     registration_time=current_time(),
                 )
@@ -1403,39 +1410,49 @@ def update_waiting_list(event: Event) -> List[Registration]:
     if not event.is_registration_open_at_time(current_time()):
         return registrations
 
-    for waiting_registration in event.waiting_registrations():
+    waiting_registrations = event.waiting_registrations()
+
+    # Registrations of waiting users to other activities at the same time,
+    # fetched at once for the whole waiting list
+    other_registrations = {}
+    if waiting_registrations and event.event_type.requires_activity:
+        other_registrations = User.registrations_during_by_user(
+            [r.user_id for r in waiting_registrations],
+            event.start,
+            event.end,
+            event.id,
+            include_waiting=True,
+        )
+
+    # Prices available to the waiting users, resolved at once
+    available_prices = {}
+    if waiting_registrations and event.requires_payment():
+        available_prices = EventPricing(event).cheapest_prices_at_date(
+            [r.user_id for r in waiting_registrations], current_time().date()
+        )
+
+    for waiting_registration in waiting_registrations:
         if not event.has_free_online_slots():
             break
 
-        if (
-            event.event_type.requires_activity
-            and waiting_registration.user.registrations_during(
-                event.start, event.end, event.id
-            )
-        ):
+        user_registrations = other_registrations.get(waiting_registration.user_id, [])
+        removed_waiting_registrations = [
+            reg
+            for reg in user_registrations
+            if reg.status == RegistrationStatus.Waiting
+        ]
+        if len(removed_waiting_registrations) < len(user_registrations):
             # Conflicts, skip registration
             continue
 
         if event.requires_payment():
-            if not event.exist_available_prices_to_user(waiting_registration.user):
+            if not available_prices[waiting_registration.user_id]:
                 # Cannot pay, skip registration
                 continue
             waiting_registration.status = RegistrationStatus.PaymentPending
         else:
             waiting_registration.status = RegistrationStatus.Active
 
-        if event.event_type.requires_activity:
-            other_registrations = waiting_registration.user.registrations_during(
-                event.start, event.end, event.id, include_waiting=True
-            )
-            removed_waiting_registrations = [
-                reg
-                for reg in other_registrations
-                if reg.status == RegistrationStatus.Waiting
-            ]
-        else:
-            removed_waiting_registrations = []
-
         send_update_waiting_list_notification(
             waiting_registration, removed_waiting_registrations
         )
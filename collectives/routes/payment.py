@@ -4,7 +4,6 @@ This modules contains the /payment Blueprint
 """
 
 from decimal import Decimal
-from io import BytesIO
 
 from flask import (
     Blueprint,
@@ -14,11 +13,9 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_file,
     url_for,
 )
 from flask_login import current_user
-from openpyxl import Workbook
 
 from collectives.forms.payment import (
     CopyItemForm,
@@ -39,7 +36,7 @@ from collectives.models import (
     UserGroup,
     db,
 )
-from collectives.utils import payline
+from collectives.utils import export, payline
 from collectives.utils.access import (
     confidentiality_agreement,
     payments_enabled,
@@ -265,7 +262,7 @@ def export_payments(event_id=None):
 
     :param event_id: The primary key of the event we're listing the prices of
     :type event_id: int
-    :return: The Excel file with the payments.
+    :return: The Excel or CSV file with the payments.
     """
 
     # Check that the user is allowed to retrieve the payments
@@ -281,11 +278,8 @@ def export_payments(event_id=None):
 
     # Fetch all associated payments
     filters = {k: v for (k, v) in request.args.items() if k.startswith("filters")}
-    payments = extract_payments(event_id, None, None, filters)
+    payments = extract_payments(event_id, None, None, filters, stream=True)
 
-    # Create the excel document
-    workbook = Workbook()
-    worksheet = workbook.active
     fields = {
         "item.event.event_type.name": "Type d'événement",
         "item.event.activity_type_names": "Activités",
@@ -306,25 +300,16 @@ def export_payments(event_id=None):
         "payment_type_str": "Type",
         "processor_order_ref": "Référence",
     }
-    worksheet.append(list(fields.values()))
 
-    for payment in payments:
-        payment.payment_type_str = payment.payment_type.display_name()
-        payment.payment_status_str = payment.status.display_name()
-        worksheet.append([deepgetattr(payment, field, "-") for field in fields])
+    def rows():
+        for payment in payments:
+            payment.payment_type_str = payment.payment_type.display_name()
+            payment.payment_status_str = payment.status.display_name()
+            yield [deepgetattr(payment, field, "-") for field in fields]
 
     # set column width
-    for column in "CDEFGHJLOR":
-        worksheet.column_dimensions[column].width = 25
-    for column in "ABIKMN":
-        worksheet.column_dimensions[column].width = 16
-
-    # set "Amount paid" column format
-    worksheet.column_dimensions["N"].number_format = "#,##0.00€"
-
-    out = BytesIO()
-    workbook.save(out)
-    out.seek(0)
+    column_widths = dict.fromkeys("CDEFGHJLOR", 25)
+    column_widths.update(dict.fromkeys("ABIKMN", 16))
 
     time_str = current_time().strftime("%d_%m_%Y %H_%M")
 
@@ -332,15 +317,17 @@ def export_payments(event_id=None):
 
     if event_id is not None:
         title = slugify(event.title)
-        filename = f"{club_name} - Export paiements {title} au {time_str}.xlsx"
+        filename = f"{club_name} - Export paiements {title} au {time_str}"
     else:
-        filename = f"{club_name} - Export paiements au {time_str}.xlsx"
-
-    return send_file(
-        out,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        download_name=filename,
-        as_attachment=True,
+        filename = f"{club_name} - Export paiements au {time_str}"
+
+    return export.send_table(
+        list(fields.values()),
+        rows(),
+        filename,
+        column_widths=column_widths,
+        # set "Amount paid" column format
+        number_formats={"N": "#,##0.00€"},
     )
 
 
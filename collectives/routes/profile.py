@@ -4,10 +4,8 @@ This modules contains the /profile Blueprint
 """
 
 import hmac
-import textwrap
 from datetime import date
 from io import BytesIO
-from os.path import exists
 
 from flask import (
     Blueprint,
@@ -22,7 +20,6 @@ from flask import (
 from flask_images import Images
 from flask_login import current_user, logout_user
 from markupsafe import Markup
-from PIL import Image, ImageDraw, ImageFont
 
 from collectives.forms import ExtranetUserForm, LocalUserForm
 from collectives.forms.badge import CompetencyBadgeForm
@@ -33,9 +30,6 @@ from collectives.models import (
     BadgeIds,
     Configuration,
     Event,
-    Gender,
-    Role,
-    RoleIds,
     User,
     UserType,
     db,
@@ -46,9 +40,11 @@ from collectives.routes.auth import (
     get_changed_email_message,
     sync_user,
 )
+from collectives.utils import certificate
 from collectives.utils.access import valid_user
 from collectives.utils.extranet import ExtranetError
-from collectives.utils.misc import sanitize_file_name
+from collectives.utils.image_pool import ImagePoolBusy
+from collectives.utils.misc import ImageTooLargeError
 from collectives.utils.profile_token import profile_token
 from collectives.utils.time import current_time
 
@@ -197,8 +193,11 @@ def update_user():
     # Save avatar into UploadSet
     if form.remove_avatar and form.remove_avatar.data:
         user.delete_avatar()
-    if not user.save_avatar(form.avatar_file.data):
-        flash("L'avatar téléchargé n'est pas dans un format d'image valide")
+    try:
+        if not user.save_avatar(form.avatar_file.data):
+            flash("L'avatar téléchargé n'est pas dans un format d'image valide")
+    except ImageTooLargeError as err:
+        flash(str(err), "error")
 
     db.session.add(user)
     db.session.commit()
@@ -285,9 +284,7 @@ def my_payments():
 @blueprint.route("/user/volunteer/cert")
 def volunteer_certificate():
     """Route to show the volunteer cert of a regular user."""
-    if not Configuration.VOLUNTEER_CERT_IMAGE or not exists(
-        Configuration.VOLUNTEER_CERT_IMAGE
-    ):
+    if not certificate.certificates_enabled():
         # No president signature
         flash(
             "Impossible de générer l'attestation bénévole. "
@@ -302,113 +299,24 @@ def volunteer_certificate():
         flash("Non autorisé", "error")
         return redirect(url_for("event.index"))
 
-    president = User.query.filter(
-        User.roles.any(Role.role_id == RoleIds.President)
-    ).first()
-    if not president:
-        # No president in roles table
+    try:
+        pdf = certificate.volunteer_certificate(current_user)
+    except certificate.CertificateError as err:
+        flash(str(err), "error")
+        return redirect(url_for("profile.show_user", user_id=current_user.id))
+    except (ImagePoolBusy, TimeoutError):
         flash(
-            """Impossible de générer l'attestation bénévole.
-                Le club n'a pas de président, merci de contacter le support.""",
+            "Le serveur est trop occupé pour générer l'attestation bénévole, "
+            "merci de réessayer dans quelques instants.",
             "error",
         )
         return redirect(url_for("profile.show_user", user_id=current_user.id))
 
-    # usefull variables
-    font_file = "collectives/static/fonts/DINWeb.woff"
-    font = ImageFont.truetype(font_file, 50)
-    black = (0, 0, 0)
-
-    # Setup rotated watermark
-    template = Image.open(Configuration.VOLUNTEER_CERT_IMAGE)
-    size = template.size
-    width = template.size[0]
-    image = Image.new("RGBA", (int(size[0] * 1.2), int(size[1] * 1.1)), "#ffffff")
-    watermark_text = f"{current_user.full_name()} - {current_user.license} - " * 6
-    watermark_text = [" " * 20 * (i % 4) + watermark_text + "\n" for i in range(75)]
-    watermark_text = "\n".join(watermark_text)
-    ImageDraw.Draw(image).multiline_text(
-        (-1000, 0),
-        watermark_text,
-        "#00000018",
-        font=font,
-        spacing=-10,
-    )
-    image = image.rotate(10)
-    image = image.crop((size[0] * 0.1, size[1] * 0.05, size[0] * 1.1, size[1] * 1.05))
-    image.paste(template, (0, 0), template)
-
-    # Add Header text
-    ImageDraw.Draw(image).multiline_text(
-        (width / 2, 500),
-        f"Attestation de fonction Bénévole\nau {Configuration.CLUB_NAME}",
-        black,
-        font=ImageFont.truetype(font_file, 100),
-        anchor="ms",
-        align="center",
-    )
-
-    # Add Main text
-    conjugate = "e" if current_user.gender == Gender.Woman else ""
-    club_name = Configuration.CLUB_NAME
-    if current_user.license_expiry_date:
-        expiry = current_user.license_expiry_date.year
-    elif current_user.type == UserType.Test:
-        expiry = 1789  # Default year if user is a test user
-    else:
-        flash("""Erreur de date de license. Contactez le support.""", "error")
-        return redirect(url_for("profile.show_user", user_id=current_user.id))
-
-    text = (
-        f"Je sous-signé, {president.full_name()}, président du {club_name} "
-        "certifie que:\n\n"
-        f"                       {current_user.form_of_address()} "
-        f"{current_user.full_name()}, né{conjugate} le "
-        f"{current_user.date_of_birth.strftime('%d/%m/%Y')}, \n\n"
-        f"est licencié{conjugate} au {club_name} sous le numéro d'adhérent "
-        f"{current_user.license}, est membre de la FFCAM, la Fédération "
-        "Française des Clubs Alpins et de Montagne, est à jour de cotisation "
-        f"pour l'année en cours, du 1er septembre {expiry - 1} au 30 septembre "
-        f"{expiry}, et est Bénévole reconnu{conjugate} au sein de notre "
-        "association.\n\n"
-        f"Nom et adresse de la structure:\n{Configuration.CLUB_IDENTITY}\n"
-        "\n\n"
-        "Pour toute question ou réclamation concernant l'attestation: "
-        f"{Configuration.CONTACT_EMAIL}\n\n"
-        "Ces informations sont certifiées conformes."
-    )
-
-    ImageDraw.Draw(image).multiline_text(
-        (width / 2, 900),
-        "\n".join([textwrap.fill(line, width=80) for line in text.split("\n")]),
-        black,
-        font=font,
-        anchor="ms",
-        spacing=45,
-    )
-
-    ImageDraw.Draw(image).multiline_text(
-        (1580, 2550),
-        f"Fait le {date.today().strftime('%d/%m/%Y')}\n"
-        "Cachet et signature du président",
-        black,
-        font=font,
-        spacing=10,
-    )
-
-    no_alpha = Image.new("RGB", image.size, (255, 255, 255))
-    no_alpha.paste(image, (0, 0), image)
-    out = BytesIO()
-    no_alpha.save(out, "PDF")
-    out.seek(0)
-
-    club_name = sanitize_file_name(Configuration.CLUB_NAME)
-
     # Show file to user
     return send_file(
-        out,
+        BytesIO(pdf),
         mimetype="application/pdf",
-        download_name=f"Attestation Benevole {club_name}.pdf",
+        download_name=certificate.certificate_file_name(),
         as_attachment=True,
     )
 
@@ -3,15 +3,27 @@
 This modules contains the root Blueprint
 """
 
-from flask import Blueprint, redirect, render_template, request, send_file, url_for
+import os
+
+from flask import (
+    Blueprint,
+    current_app,
+    redirect,
+    render_template,
+    request,
+    send_from_directory,
+    url_for,
+)
 from flask_login import current_user, login_required
 
 from collectives.forms import csrf
 from collectives.forms.auth import LegalAcceptation
 from collectives.forms.stats import StatisticsParametersForm
 from collectives.models import Configuration, db
+from collectives.utils import export
 from collectives.utils.access import confidentiality_agreement, user_is, valid_user
-from collectives.utils.stats import StatisticsEngine
+from collectives.utils.images import WEBP_EXTENSION
+from collectives.utils.stats import get_engine_class
 from collectives.utils.time import current_time
 
 blueprint = Blueprint("root", __name__)
@@ -35,6 +47,36 @@ def robots_txt():
     return Configuration.ROBOTS_TXT, 200, {"content-type": "text/plain"}
 
 
+@blueprint.route("/derived/<path:path>")
+def derived_image(path):
+    """Route serving resized uploaded images.
+
+    Derivative names change with the content of their original, see
+    :py:mod:`collectives.utils.images`, so that they can be cached forever. The
+    WebP variant is served to browsers explicitly accepting it.
+
+    :param path: Path of the derivative in its original format, relative to
+        ``UPLOADED_DERIVATIVES_DEST``
+    """
+    directory = current_app.config["UPLOADED_DERIVATIVES_DEST"]
+    max_age = current_app.config["IMAGES_DERIVATIVES_MAX_AGE"]
+
+    # Only explicit, as wildcards are also sent by clients not supporting WebP
+    accepts_webp = any(
+        mimetype == "image/webp" and quality > 0
+        for mimetype, quality in request.accept_mimetypes
+    )
+    webp_path = os.path.splitext(path)[0] + WEBP_EXTENSION
+    if accepts_webp and os.path.isfile(os.path.join(directory, webp_path)):
+        path = webp_path
+
+    response = send_from_directory(directory, path, max_age=max_age)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept")
+    return response
+
+
 @blueprint.route("/legal/accept", methods=["POST"])
 @login_required
 def legal_accept():
@@ -56,6 +98,8 @@ def legal_accept():
 def statistics():
     """Displays site event statistics."""
     form = StatisticsParametersForm(formdata=request.args)
+    engine_class = get_engine_class()
+
     if form.validate():
         kwargs = {
             "year": form.year.data,
@@ -63,16 +107,13 @@ def statistics():
         }
         if form.activity_id.data != form.ALL_ACTIVITIES:
             kwargs["activity_id"] = form.activity_id.data
-        engine = StatisticsEngine(**kwargs)
+        engine = engine_class(**kwargs)
     else:
-        engine = StatisticsEngine(year=StatisticsParametersForm().year.data)
+        engine = engine_class(year=StatisticsParametersForm().year.data)
 
     if "excel" in request.args:
-        return send_file(
-            engine.export_excel(),
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            download_name="Statistiques Collectives.xlsx",
-            as_attachment=True,
+        return export.send_workbook(
+            engine.export_excel(), "Statistiques Collectives.xlsx"
         )
 
     return render_template("stats/stats.html", engine=engine, form=form)
@@ -33,6 +33,10 @@ from collectives.models import (
     db,
 )
 from collectives.utils.access import confidentiality_agreement, user_is, valid_user
+from collectives.utils.cache import event_list_cache
+from collectives.utils.image_pool import image_pool
+from collectives.utils.mail import mail_queue, mail_spool
+from collectives.utils.stats import statistics_cache
 
 blueprint = Blueprint("technician", __name__, url_prefix="/technician")
 """ Technician blueprint
@@ -71,9 +75,22 @@ def maintenance():
     return render_template(
         "technician/maintenance.html",
         title="Maintenance du serveur",
+        caches=[event_list_cache.stats(), statistics_cache.stats()],
+        mail_queue=mail_queue.stats(),
+        mail_spool=mail_spool.stats(),
+        image_pool=image_pool.stats(),
     )
 
 
+@blueprint.route("/maintenance/caches", methods=["POST"])
+def clear_caches():
+    """Route to empty all caches"""
+    event_list_cache.invalidate()
+    statistics_cache.invalidate()
+    flash("Les caches ont été vidés", "success")
+    return redirect(url_for("technician.maintenance"))
+
+
 @blueprint.route("/logs", methods=["GET"])
 def logs():
     """Route to list application log"""
@@ -68,7 +68,7 @@ function createAllPaymentsTable(url)
 function exportAsExcel(e)
 {
     var params = table.modules.ajax.serializeParams({'filters':table.getFilters(true)});
-    var url = e.href + "?" + params;
+    var url = e.href + (e.href.includes("?") ? "&" : "?") + params;
     document.location = url;
     return false;
 }
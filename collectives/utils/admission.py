@@ -0,0 +1,314 @@
+"""Module handling the admission queue of events.
+
+Popular events receive most of their self-registrations right when registration
+opens. For events using an admission queue, see
+:py:attr:`collectives.models.event.Event.uses_admission_queue`, requests only
+store an :py:class:`collectives.models.admission.AdmissionRequest` and return.
+Requests are then processed in order, by batches, by the
+:py:data:`admission_queue` workers, while users poll the result of their
+request.
+"""
+
+import threading
+import uuid
+from datetime import timedelta
+from typing import List, Optional
+
+import click
+from flask import Flask
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from collectives.models import (
+    AdmissionRequest,
+    AdmissionRequestStatus,
+    RegistrationStatus,
+    db,
+)
+from collectives.utils.time import current_time
+
+
+class AdmissionQueue:
+    """Queue of self-registration requests, stored in the database.
+
+    The queue is drained by :py:meth:`run`, either by the ``flask collectives
+    process-admissions`` command, or in a thread of each server process,
+    depending on :py:data:`config.ADMISSION_QUEUE_WORKER`. Requests are only
+    processed in arrival order by a single worker. Workers claim up to
+    ``ADMISSION_QUEUE_BATCH_SIZE`` requests for ``ADMISSION_QUEUE_LEASE``
+    seconds, then register users one after the other with
+    :py:meth:`collectives.models.event.Event.self_register`. A worker whose
+    lease expired does not store the result of the requests it claimed.
+    """
+
+    def __init__(self):
+        """Constructor"""
+        self.batch_size = 50
+        self.poll_interval = 1.0
+        self.lease = 60
+
+        self.admitted = 0
+        self.refused = 0
+        self._wakeup = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    def init_app(self, app: Flask):
+        """Reads the queue settings from the app configuration.
+
+        :param app: The Flask application
+        """
+        self.batch_size = app.config["ADMISSION_QUEUE_BATCH_SIZE"]
+        self.poll_interval = app.config["ADMISSION_QUEUE_POLL_INTERVAL"]
+        self.lease = app.config["ADMISSION_QUEUE_LEASE"]
+
+    def put(
+        self, event_id: int, user_id: int, item_price_id: Optional[int] = None
+    ) -> AdmissionRequest:
+        """Queue a self-registration request, replacing the previous processed
+        request of the user for this event.
+
+        If the user already has a queued request, it is kept as is.
+
+        :param event_id: Primary key of the event
+        :param user_id: Primary key of the user
+        :param item_price_id: Primary key of the price chosen by the user
+        :return: The queued request of the user
+        """
+        db.session.execute(
+            delete(AdmissionRequest).where(
+                AdmissionRequest.event_id == event_id,
+                AdmissionRequest.user_id == user_id,
+                AdmissionRequest.status != AdmissionRequestStatus.Queued,
+            )
+        )
+        request = AdmissionRequest(
+            event_id=event_id,
+            user_id=user_id,
+            item_price_id=item_price_id,
+            status=AdmissionRequestStatus.Queued,
+            request_time=current_time(),
+        )
+        db.session.add(request)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            request = self.get(event_id, user_id)
+
+        self._wakeup.set()
+        return request
+
+    def get(self, event_id: int, user_id: int) -> Optional[AdmissionRequest]:
+        """:return: The request of a user for an event, if any"""
+        return db.session.scalar(
+            select(AdmissionRequest).where(
+                AdmissionRequest.event_id == event_id,
+                AdmissionRequest.user_id == user_id,
+            )
+        )
+
+    def position(self, request: AdmissionRequest) -> int:
+        """:return: The number of requests for the same event which will be
+        processed before the given one"""
+        return db.session.scalar(
+            select(func.count(AdmissionRequest.id)).where(
+                AdmissionRequest.event_id == request.event_id,
+                AdmissionRequest.status == AdmissionRequestStatus.Queued,
+                AdmissionRequest.id < request.id,
+            )
+        )
+
+    def claim(self) -> List[AdmissionRequest]:
+        """Claim the next batch of requests to process.
+
+        :return: Requests that are now claimed by this worker, in order
+        """
+        now = current_time()
+        available = and_(
+            AdmissionRequest.status == AdmissionRequestStatus.Queued,
+            or_(
+                AdmissionRequest.claim_expiry.is_(None),
+                AdmissionRequest.claim_expiry < now,
+            ),
+        )
+        ids = db.session.scalars(
+            select(AdmissionRequest.id)
+            .where(available)
+            .order_by(AdmissionRequest.id)
+            .limit(self.batch_size)
+        ).all()
+        if not ids:
+            return []
+
+        # Requests claimed meanwhile by another worker are not available anymore
+        token = str(uuid.uuid4())
+        db.session.execute(
+            update(AdmissionRequest)
+            .where(AdmissionRequest.id.in_(ids), available)
+            .values(
+                claim_token=token, claim_expiry=now + timedelta(seconds=self.lease)
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        db.session.commit()
+        return db.session.scalars(
+            select(AdmissionRequest)
+            .where(AdmissionRequest.claim_token == token)
+            .order_by(AdmissionRequest.id)
+        ).all()
+
+    def drain(self, app: Flask) -> int:
+        """Process a batch of queued requests. Must be called in an app context.
+
+        :param app: The Flask application
+        :return: The number of claimed requests
+        """
+        requests = self.claim()
+        for request in requests:
+            token = request.claim_token
+            try:
+                self._process(request, token)
+            # pylint: disable=broad-except
+            except Exception:
+                app.logger.exception(f"Unable to process admission {request.id}")
+                db.session.rollback()
+                self._refuse(
+                    request, "Une erreur est survenue, veuillez réessayer.", token
+                )
+            # pylint: enable=broad-except
+        return len(requests)
+
+    def _settle(
+        self,
+        request: AdmissionRequest,
+        token: str,
+        status: AdmissionRequestStatus,
+        **values,
+    ) -> bool:
+        """Store the result of a request, if it is still claimed by this worker.
+
+        A request whose lease expired may have been claimed by another worker,
+        which then settles it instead.
+
+        :param request: The processed request
+        :param token: Token with which the request was claimed
+        :param status: Result of the request
+        :param values: Other columns to update, such as ``processed_time``
+        :return: Whether the request was still claimed by this worker
+        """
+        result = db.session.execute(
+            update(AdmissionRequest)
+            .where(
+                AdmissionRequest.id == request.id,
+                AdmissionRequest.claim_token == token,
+            )
+            .values(
+                status=status,
+                claim_token=None,
+                claim_expiry=None,
+                **values,
+            )
+        )
+        return result.rowcount == 1
+
+    def _process(self, request: AdmissionRequest, token: str):
+        """Register the user of a request, and store the result in the request.
+
+        The request is marked as processed in the transaction adding the
+        registration, so that it is not processed twice.
+
+        :param request: The request to process
+        :param token: Token with which the request was claimed
+        """
+        now = current_time()
+        if not self._settle(
+            request, token, AdmissionRequestStatus.Admitted, processed_time=now
+        ):
+            db.session.rollback()
+            return
+
+        try:
+            registration, payment = request.event.self_register(
+                request.user,
+                now,
+                request.item_price,
+                registration_time=request.request_time,
+            )
+        except RuntimeError as err:
+            db.session.rollback()
+            self._refuse(request, str(err), token)
+            return
+
+        if registration.status == RegistrationStatus.Waiting:
+            request.message = "Vous êtes inscrit(e) en liste d'attente."
+        else:
+            request.message = "Vous êtes inscrit(e) à l'événement."
+        if payment is not None:
+            request.payment_id = payment.id
+        db.session.commit()
+        self.admitted += 1
+
+    def _refuse(self, request: AdmissionRequest, message: str, token: str):
+        """Mark a request as refused, if it is still claimed by this worker.
+
+        :param request: The refused request
+        :param message: Reason shown to the user
+        :param token: Token with which the request was claimed
+        """
+        refused = self._settle(
+            request,
+            token,
+            AdmissionRequestStatus.Refused,
+            processed_time=current_time(),
+            message=message,
+        )
+        db.session.commit()
+        if refused:
+            self.refused += 1
+
+    def run(self, app: Flask, until_empty: bool = False):
+        """Process queued requests by batches, waiting for new requests when the
+        queue is empty.
+
+        :param app: The Flask application
+        :param until_empty: Whether to return once the queue is empty
+        """
+        while True:
+            with app.app_context():
+                try:
+                    count = self.drain(app)
+                # pylint: disable=broad-except
+                except Exception:
+                    app.logger.exception("Unable to process admission requests")
+                    count = 0
+                # pylint: enable=broad-except
+                finally:
+                    db.session.remove()
+            if count < self.batch_size:
+                if until_empty:
+                    return
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def start_worker(self, app: Flask):
+        """Start a thread draining the queue, if
+        :py:data:`config.ADMISSION_QUEUE_WORKER` is ``thread``.
+
+        No thread is started by command line tools other than ``flask run``.
+
+        :param app: The application, used to create contexts in the thread
+        """
+        if app.config["ADMISSION_QUEUE_WORKER"] != "thread":
+            return
+        cli_context = click.get_current_context(silent=True)
+        if cli_context is not None and cli_context.command.name != "run":
+            return
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self.run, args=(app,), name="admission-queue", daemon=True
+            )
+            self._worker.start()
+
+
+admission_queue = AdmissionQueue()
+""" Queue of self-registrations to events using an admission queue """
@@ -5,7 +5,7 @@ import csv
 from datetime import datetime
 from typing import List, Sequence, Union
 
-from flask import flash, render_template, request, send_file
+from flask import flash, render_template, request
 from flask_login import current_user
 from markupsafe import Markup
 
@@ -61,22 +61,17 @@ def export_badge(badge_types: Sequence[BadgeIds] | None = None):
     if badge_types is not None:
         query = query.filter(Badge.badge_id.in_(badge_types))
 
-    badges = query.all()
+    badges = export.iterate_by_batches(query)
 
     if not isinstance(activity_type, list):
         filename = activity_type.name
     else:
         filename = ""
 
-    out = export.export_badges(badges)
-
     club_name = sanitize_file_name(Configuration.CLUB_NAME)
 
-    return send_file(
-        out,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        download_name=f"{club_name} - Export {type_title(badge_types)} {filename}.xlsx",
-        as_attachment=True,
+    return export.export_badges(
+        badges, f"{club_name} - Export {type_title(badge_types)} {filename}"
     )
 
 
@@ -0,0 +1,300 @@
+"""Module to cache rendered API responses.
+
+Cached responses are stored in a pluggable backend: an in-process LRU by
+default, or a shared directory so that several server processes can use (and
+invalidate) the same entries. See :py:data:`config.RESPONSE_CACHE_BACKEND`.
+
+Backends count their invalidations in a generation. A response is only stored
+if the generation did not change while it was built, so that responses built
+from data older than the last invalidation are not served.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from collectives.models import Event, EventTag, Registration
+
+
+class MemoryCacheBackend:
+    """Thread-safe in-process LRU cache backend."""
+
+    name = "memory"
+
+    def __init__(self, max_size: int = 256):
+        """Constructor
+
+        :param max_size: Maximum number of entries kept in cache
+        """
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._generation = 0
+        self._lock = Lock()
+
+    def generation(self) -> int:
+        """:return: the number of times the cache was cleared"""
+        return self._generation
+
+    def get(self, key: str) -> str | None:
+        """:return: the cached value for ``key``, or None if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, timeout: int, generation: int | None = None):
+        """Store a value in cache.
+
+        :param key: Key of the entry
+        :param value: Value to store
+        :param timeout: Number of seconds the value may be used
+        :param generation: If set, the value is only stored if the cache was not
+            cleared since :py:meth:`generation` returned it
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (value, time.time() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def __len__(self) -> int:
+        """:return: the number of entries currently stored"""
+        return len(self._entries)
+
+
+class FileCacheBackend:
+    """Cache backend storing entries as files in a directory shared by workers.
+
+    A generation number, stored in the same directory, is bumped on
+    :py:meth:`clear` so that all workers stop using older entries at once.
+    """
+
+    name = "file"
+
+    def __init__(self, directory: str):
+        """Constructor
+
+        :param directory: Folder where entries are stored. Created if needed.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        """:return: path of the file storing ``key``"""
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def generation(self) -> str:
+        """:return: the current generation of the cache"""
+        try:
+            with open(
+                os.path.join(self.directory, "generation"), "r", encoding="utf-8"
+            ) as file:
+                return file.read()
+        except FileNotFoundError:
+            return ""
+
+    def _write(self, path: str, content: str):
+        """Atomically write ``content`` to ``path``."""
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(temp_path, path)
+
+    def get(self, key: str) -> str | None:
+        """:return: the cached value for ``key``, or None if absent or expired"""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry["expires"] < time.time() or entry["generation"] != self.generation():
+            return None
+        return entry["value"]
+
+    def set(self, key: str, value: str, timeout: int, generation: str | None = None):
+        """Store a value in cache.
+
+        The entry is stamped with ``generation``, so that it is never used if
+        the cache was cleared meanwhile, even by another process.
+
+        :param key: Key of the entry
+        :param value: Value to store
+        :param timeout: Number of seconds the value may be used
+        :param generation: Generation returned by :py:meth:`generation` before
+            the value was built. Defaults to the current generation.
+        """
+        current = self.generation()
+        if generation is None:
+            generation = current
+        elif generation != current:
+            return
+        entry = {
+            "generation": generation,
+            "expires": time.time() + timeout,
+            "value": value,
+        }
+        self._write(self._path(key), json.dumps(entry))
+
+    def clear(self):
+        """Invalidate all entries, then remove their files."""
+        self._write(os.path.join(self.directory, "generation"), str(time.time_ns()))
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(".json"):
+                try:
+                    os.unlink(os.path.join(self.directory, file_name))
+                except FileNotFoundError:
+                    pass
+
+    def __len__(self) -> int:
+        """:return: the number of entries currently stored"""
+        return len([f for f in os.listdir(self.directory) if f.endswith(".json")])
+
+
+class ResponseCache:
+    """A named cache of rendered responses or results, with hit and miss counters.
+
+    Requires to be initialized with :py:meth:`init_app` to be used.
+    """
+
+    def __init__(self, name: str, config_prefix: str = "RESPONSE_CACHE"):
+        """Constructor
+
+        :param name: Name of the cache, used for display and file backend folder
+        :param config_prefix: Prefix of the configuration options of this cache
+        """
+        self.name = name
+        self.config_prefix = config_prefix
+        self.backend = None
+        self.timeout = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    def init_app(self, app: Flask):
+        """Initializes the cache backend from the ``app`` configuration.
+
+        Options are read from ``<prefix>_BACKEND``, ``<prefix>_SIZE`` and
+        ``<prefix>_TIMEOUT``. Files are stored below
+        :py:data:`config.RESPONSE_CACHE_DIR`.
+        """
+        prefix = self.config_prefix
+        backend = app.config.get(f"{prefix}_BACKEND", "memory")
+        self.timeout = app.config.get(f"{prefix}_TIMEOUT", 60)
+        self.hits = 0
+        self.misses = 0
+        if not backend:
+            self.backend = None
+        elif backend == "file":
+            directory = os.path.join(app.config["RESPONSE_CACHE_DIR"], self.name)
+            self.backend = FileCacheBackend(directory)
+        else:
+            self.backend = MemoryCacheBackend(app.config.get(f"{prefix}_SIZE", 256))
+
+    def enabled(self) -> bool:
+        """:return: True if a backend is configured"""
+        return self.backend is not None
+
+    def generation(self):
+        """To be read before building a response, and given to :py:meth:`set`.
+
+        :return: the current generation of the backend, or None if disabled
+        """
+        if self.backend is None:
+            return None
+        return self.backend.generation()
+
+    def get(self, key: str) -> str | None:
+        """:return: the cached response for ``key``, or None"""
+        if self.backend is None:
+            return None
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str, generation=None):
+        """Store a response in cache.
+
+        :param key: Key of the response
+        :param value: The response content
+        :param generation: Value of :py:meth:`generation` before the response
+            was built. If set, the response is not stored if the cache was
+            invalidated since then.
+        """
+        if self.backend is not None:
+            self.backend.set(key, value, self.timeout, generation)
+
+    def invalidate(self):
+        """Remove all cached responses."""
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict:
+        """:return: name, backend, size and counters of the cache"""
+        return {
+            "name": self.name,
+            "backend": self.backend.name if self.backend else "désactivé",
+            "size": len(self.backend) if self.backend else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+event_list_cache = ResponseCache("events")
+""" Cache of the event list API responses.
+
+It is invalidated whenever an event, a registration or an event tag is written.
+"""
+
+_EVENT_LIST_MODELS = (Event, Registration, EventTag)
+""" Models whose changes invalidate :py:data:`event_list_cache`"""
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_event_list_changes(session, flush_context):
+    """Remember that the event list cache must be invalidated on commit."""
+    # pylint: disable=unused-argument
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, _EVENT_LIST_MODELS):
+            session.info["invalidate_event_list"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_event_list(session):
+    """Invalidate the event list cache once changes are visible to others."""
+    if session.info.pop("invalidate_event_list", False):
+        event_list_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_event_list_changes(session):
+    """Forget pending invalidation of rolled back changes."""
+    session.info.pop("invalidate_event_list", None)
@@ -0,0 +1,401 @@
+"""Module to generate volunteer certificates.
+
+:py:func:`render_volunteer_certificate` is a job of
+:py:data:`collectives.utils.image_pool.image_pool`: it only receives the texts to
+draw, and knows nothing of the user or the application. The parts which do not
+depend on the user, such as the background image with its header and fonts, are
+kept by each worker process.
+
+Generated certificates are stored in ``VOLUNTEER_CERT_CACHE_DIR``, under a name
+made of the user id, the end of validity of their volunteer badge and a hash of
+the background image and of the texts, so that a certificate is drawn again as
+soon as anything in it changes. A stored certificate keeps the date on which it
+has been drawn.
+"""
+
+import functools
+import hashlib
+import os
+import tempfile
+import textwrap
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from io import BytesIO
+from typing import IO, Iterable, List, Tuple
+
+from flask import current_app
+from PIL import Image, ImageDraw, ImageFont
+from sqlalchemy import or_
+
+from collectives.models import (
+    Badge,
+    Configuration,
+    Gender,
+    Role,
+    RoleIds,
+    User,
+    UserType,
+)
+from collectives.models.badge import BadgeIds
+from collectives.utils.image_pool import image_pool, open_image
+from collectives.utils.misc import sanitize_file_name
+
+FONT_FILE = "collectives/static/fonts/DINWeb.woff"
+""" Font of volunteer certificates """
+
+WATERMARK_LINES = 75
+""" Number of lines of the watermark """
+
+WATERMARK_COLOR = 0x18
+""" Opacity of the black watermark, from 0 to 255 """
+
+
+class CertificateError(Exception):
+    """Exception raised when a volunteer certificate cannot be generated, with a
+    message for the user."""
+
+
+@functools.lru_cache(maxsize=None)
+def _font(size: int) -> ImageFont.FreeTypeFont:
+    """:return: the font of certificates, at a given size"""
+    return ImageFont.truetype(FONT_FILE, size)
+
+
+@functools.lru_cache(maxsize=4)
+def _template_layer(path: str, mtime: int, header: str) -> Image.Image:
+    """Background image of certificates, with their header.
+
+    :param path: Path of the background image
+    :param mtime: Modification time of the background image, so that the cached
+        layer is dropped when the image is replaced
+    :param header: Title of certificates
+    :return: The RGBA layer to paste over the watermark
+    """
+    with open_image(path) as template:
+        layer = template.convert("RGBA")
+    ImageDraw.Draw(layer).multiline_text(
+        (layer.width / 2, 500),
+        header,
+        (0, 0, 0),
+        font=_font(100),
+        anchor="ms",
+        align="center",
+    )
+    return layer
+
+
+@functools.lru_cache(maxsize=4)
+def _watermark_geometry(
+    size: Tuple[int, int],
+) -> Tuple[Tuple[int, int], Tuple[int, int, int, int], List[Tuple[int, int]]]:
+    """Geometry of the watermark, drawn on a larger canvas then rotated.
+
+    :param size: Size of certificates
+    :return: Size of the canvas, box of the certificate in the rotated canvas, and
+        position of each line of the watermark
+    """
+    font = _font(50)
+    canvas = (int(size[0] * 1.2), int(size[1] * 1.1))
+    box = (
+        int(size[0] * 0.1),
+        int(size[1] * 0.05),
+        int(size[0] * 0.1) + size[0],
+        int(size[1] * 0.05) + size[1],
+    )
+    # Lines are separated by an empty line, and shifted by up to 60 spaces
+    line_height = font.getbbox("A")[3] - 10
+    positions = [
+        (int(-1000 + font.getlength(" " * 20 * (i % 4))), 2 * i * line_height)
+        for i in range(WATERMARK_LINES)
+    ]
+    return canvas, box, positions
+
+
+def _watermark(text: str, size: Tuple[int, int]) -> Image.Image:
+    """Rotated watermark repeating a text.
+
+    The line of text is only drawn once, then copied on each line.
+
+    :param text: Text to repeat
+    :param size: Size of certificates
+    :return: The watermark, as a mask of the size of certificates
+    """
+    canvas_size, box, positions = _watermark_geometry(size)
+    font = _font(50)
+    left, _, right, bottom = font.getbbox(text, anchor="la")
+    line = Image.new("L", (right - left, bottom))
+    ImageDraw.Draw(line).text((-left, 0), text, WATERMARK_COLOR, font=font)
+
+    canvas = Image.new("L", canvas_size)
+    for x, y in positions:
+        canvas.paste(line, (x + left, y))
+    return canvas.rotate(10).crop(box)
+
+
+def render_volunteer_certificate(
+    template_path: str, watermark: str, header: str, text: str, footer: str
+) -> bytes:
+    """Draw a volunteer certificate over its background image.
+
+    :param template_path: Path of the background image, of 2479x3508 pixels
+    :param watermark: Text repeated diagonally over the whole certificate
+    :param header: Title of the certificate
+    :param text: Main text of the certificate, wrapped at 80 characters
+    :param footer: Text next to the signature of the president
+    :return: The certificate as a PDF document
+    """
+    layer = _template_layer(template_path, os.stat(template_path).st_mtime_ns, header)
+    black = (0, 0, 0)
+
+    image = Image.new("RGB", layer.size, (255, 255, 255))
+    image.paste(black, (0, 0), _watermark(watermark * 6, layer.size))
+    image.paste(layer, (0, 0), layer)
+
+    # Add Main text
+    ImageDraw.Draw(image).multiline_text(
+        (layer.width / 2, 900),
+        "\n".join([textwrap.fill(line, width=80) for line in text.split("\n")]),
+        black,
+        font=_font(50),
+        anchor="ms",
+        spacing=45,
+    )
+
+    ImageDraw.Draw(image).multiline_text(
+        (1580, 2550),
+        footer,
+        black,
+        font=_font(50),
+        spacing=10,
+    )
+
+    out = BytesIO()
+    image.save(out, "PDF")
+    return out.getvalue()
+
+
+def certificates_enabled() -> bool:
+    """:return: whether a background image has been configured for certificates"""
+    path = Configuration.VOLUNTEER_CERT_IMAGE
+    return bool(path) and os.path.exists(path)
+
+
+def _president() -> User:
+    """:return: the president of the club, who signs certificates"""
+    president = User.query.filter(
+        User.roles.any(Role.role_id == RoleIds.President)
+    ).first()
+    if not president:
+        # No president in roles table
+        raise CertificateError(
+            """Impossible de générer l'attestation bénévole.
+                Le club n'a pas de président, merci de contacter le support."""
+        )
+    return president
+
+
+def _texts(user: User, president: User) -> Tuple[str, str, str]:
+    """Texts of the certificate of a user, except its date.
+
+    :param user: The volunteer
+    :param president: The president of the club
+    :return: The watermark, header and main text
+    """
+    conjugate = "e" if user.gender == Gender.Woman else ""
+    club_name = Configuration.CLUB_NAME
+    if user.license_expiry_date:
+        expiry = user.license_expiry_date.year
+    elif user.type == UserType.Test:
+        expiry = 1789  # Default year if user is a test user
+    else:
+        raise CertificateError("""Erreur de date de license. Contactez le support.""")
+
+    text = (
+        f"Je sous-signé, {president.full_name()}, président du {club_name} "
+        "certifie que:\n\n"
+        f"                       {user.form_of_address()} "
+        f"{user.full_name()}, né{conjugate} le "
+        f"{user.date_of_birth.strftime('%d/%m/%Y')}, \n\n"
+        f"est licencié{conjugate} au {club_name} sous le numéro d'adhérent "
+        f"{user.license}, est membre de la FFCAM, la Fédération "
+        "Française des Clubs Alpins et de Montagne, est à jour de cotisation "
+        f"pour l'année en cours, du 1er septembre {expiry - 1} au 30 septembre "
+        f"{expiry}, et est Bénévole reconnu{conjugate} au sein de notre "
+        "association.\n\n"
+        f"Nom et adresse de la structure:\n{Configuration.CLUB_IDENTITY}\n"
+        "\n\n"
+        "Pour toute question ou réclamation concernant l'attestation: "
+        f"{Configuration.CONTACT_EMAIL}\n\n"
+        "Ces informations sont certifiées conformes."
+    )
+    return (
+        f"{user.full_name()} - {user.license} - ",
+        f"Attestation de fonction Bénévole\nau {club_name}",
+        text,
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _file_hash(path: str, mtime: int) -> str:
+    """:return: the SHA-256 hash of a file, cached until it is modified"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _validity(user: User) -> str:
+    """:return: the end of validity of the volunteer badges of a user"""
+    badges = user.matching_badges({BadgeIds.Benevole}, valid_only=True)
+    if not badges:
+        # Users with roles may download a certificate without a badge
+        return "roles"
+    if any(badge.expiration_date is None for badge in badges):
+        return "permanent"
+    return max(badge.expiration_date for badge in badges).strftime("%Y%m%d")
+
+
+def _prepare(user: User, president: User) -> Tuple[str, Tuple]:
+    """Path of the stored certificate of a user, and arguments to draw it.
+
+    :param user: The volunteer
+    :param president: The president of the club
+    :return: The path, and the arguments of :py:func:`render_volunteer_certificate`
+    """
+    template_path = Configuration.VOLUNTEER_CERT_IMAGE
+    texts = _texts(user, president)
+
+    digest = hashlib.sha256(
+        _file_hash(template_path, os.stat(template_path).st_mtime_ns).encode()
+    )
+    for text in texts:
+        digest.update(b"\0" + text.encode())
+    path = os.path.join(
+        current_app.config["VOLUNTEER_CERT_CACHE_DIR"],
+        f"{user.id}-{_validity(user)}-{digest.hexdigest()[:16]}.pdf",
+    )
+
+    footer = (
+        f"Fait le {date.today().strftime('%d/%m/%Y')}\nCachet et signature du président"
+    )
+    return path, (template_path, *texts, footer)
+
+
+def _store(path: str, pdf: bytes):
+    """Store a certificate, replacing the former certificates of the same user.
+
+    :param path: Path given by :py:func:`_prepare`
+    :param pdf: The certificate
+    """
+    directory, filename = os.path.split(path)
+    os.makedirs(directory, exist_ok=True)
+    user_prefix = filename.split("-")[0] + "-"
+    for former in os.listdir(directory):
+        if former.startswith(user_prefix) and former != filename:
+            try:
+                os.remove(os.path.join(directory, former))
+            except FileNotFoundError:
+                pass
+
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(handle, "wb") as file:
+        file.write(pdf)
+    os.replace(tmp_path, path)
+
+
+def _certificate(path: str, args: Tuple) -> Tuple[bytes, bool]:
+    """Load a stored certificate, or draw and store it.
+
+    Does not need an application context.
+
+    :param path: Path given by :py:func:`_prepare`
+    :param args: Arguments of :py:func:`render_volunteer_certificate`
+    :return: The certificate, and whether it has been drawn
+    """
+    try:
+        with open(path, "rb") as file:
+            return file.read(), False
+    except FileNotFoundError:
+        pass
+    pdf = image_pool.run("certificate", render_volunteer_certificate, *args)
+    _store(path, pdf)
+    return pdf, True
+
+
+def volunteer_certificate(user: User) -> bytes:
+    """Volunteer certificate of a user, drawn if it has not been stored yet.
+
+    :param user: The volunteer
+    :raises CertificateError: if the certificate cannot be generated
+    :raises collectives.utils.image_pool.ImagePoolBusy: if the server is too busy
+        to draw it
+    :return: The certificate as a PDF document
+    """
+    if not certificates_enabled():
+        raise CertificateError(
+            "Impossible de générer l'attestation bénévole. "
+            "La fonctionnalité est désactivée"
+        )
+    pdf, _ = _certificate(*_prepare(user, _president()))
+    return pdf
+
+
+def certificate_file_name(user: User | None = None) -> str:
+    """:return: name of the certificate file, of a user in an archive"""
+    club_name = sanitize_file_name(Configuration.CLUB_NAME)
+    if user is None:
+        return f"Attestation Benevole {club_name}.pdf"
+    name = sanitize_file_name(user.full_name())
+    return f"Attestation Benevole {club_name} - {name} {user.id}.pdf"
+
+
+def volunteers_with_valid_badge() -> Iterable[User]:
+    """:return: users with a volunteer badge which has not expired"""
+    return User.query.filter(
+        User.badges.any(
+            (Badge.badge_id == BadgeIds.Benevole)
+            & or_(
+                Badge.expiration_date.is_(None),
+                Badge.expiration_date >= date.today(),
+            )
+        )
+    ).order_by(User.id)
+
+
+def volunteer_certificates_zip(
+    users: Iterable[User], stream: IO[bytes], workers: int = 4
+) -> Tuple[int, int]:
+    """Write the volunteer certificates of several users in a ZIP archive.
+
+    Certificates which have not been stored yet are drawn in parallel by
+    :py:data:`collectives.utils.image_pool.image_pool`.
+
+    :param users: The volunteers
+    :param stream: Where to write the archive
+    :param workers: Number of certificates submitted to the image pool at once
+    :raises CertificateError: if certificates cannot be generated
+    :return: Number of certificates in the archive, and number of drawn ones
+    """
+    if not certificates_enabled():
+        raise CertificateError("La fonctionnalité est désactivée")
+    president = _president()
+
+    entries = []
+    for user in users:
+        try:
+            path, args = _prepare(user, president)
+        except CertificateError as err:
+            current_app.logger.warning(f"No certificate for user {user.id}: {err}")
+            continue
+        entries.append((certificate_file_name(user), path, args))
+
+    drawn = 0
+    with zipfile.ZipFile(stream, "w") as archive:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda entry: _certificate(*entry[1:]), entries)
+            for entry, (pdf, new) in zip(entries, results):
+                archive.writestr(entry[0], pdf)
+                drawn += new
+    return len(entries), drawn
@@ -1,23 +1,274 @@
-"""Module to help export informations."""
+"""Module to help export informations.
 
-from io import BytesIO
+Exports are built by :py:func:`send_table` which streams rows to the client,
+either as an Excel document (built with openpyxl write-only mode) or as CSV.
+Rows are produced lazily, typically from :py:func:`iterate_by_batches`, so that
+large exports never hold all database objects in memory at once.
 
-from openpyxl import Workbook
+openpyxl is only imported when an Excel document is built, so that server
+processes which never export do not load it.
+"""
+
+import csv
+import unicodedata
+from io import StringIO
+from tempfile import SpooledTemporaryFile
+from typing import IO, TYPE_CHECKING, Any, Iterable, Iterator, Sequence
+from urllib.parse import quote
+
+from flask import Response, request, send_file, stream_with_context
+from sqlalchemy import inspect
 
-from collectives.models.badge import Badge
 from collectives.utils.misc import deepgetattr
 
+if TYPE_CHECKING:
+    from openpyxl import Workbook
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+""" Mimetype of Excel exports """
+
+CSV_MIMETYPE = "text/csv"
+""" Mimetype of CSV exports """
+
+EXPORT_FORMATS = ("xlsx", "csv")
+""" Supported export formats, the first one being the default """
+
+EXPORT_BATCH_SIZE = 1000
+""" Number of database rows loaded at once when iterating over an export query """
+
+SPOOL_MAX_SIZE = 1 << 20
+""" Size above which Excel documents are spooled to disk rather than memory """
+
+
+def requested_export_format() -> str:
+    """Returns the export format requested with the ``format`` request value.
+
+    :returns: One of :py:data:`EXPORT_FORMATS`, defaults to ``xlsx``
+    """
+    export_format = request.values.get("format", "").lower()
+    if export_format in EXPORT_FORMATS:
+        return export_format
+    return EXPORT_FORMATS[0]
+
+
+def iterate_by_batches(query, batch_size: int | None = None) -> Iterator[Any]:
+    """Iterate over the results of an ORM query, loading them by batches.
+
+    Results are ordered by primary key and fetched with keyset pagination, so
+    that each batch is a short, fully buffered query. Unlike a server-side
+    cursor, this leaves the connection free for lazy loads while rows are
+    being exported. Exported objects are only weakly referenced by the session
+    and are released once processed.
+
+    :param query: The query to iterate on. Its ordering is replaced.
+    :param batch_size: Maximum number of objects loaded at once, defaults to
+        :py:data:`EXPORT_BATCH_SIZE`
+    :returns: An iterator over the query results
+    """
+    if batch_size is None:
+        batch_size = EXPORT_BATCH_SIZE
+    entity = query.column_descriptions[0]["entity"]
+    key = inspect(entity).primary_key[0]
+    query = query.order_by(None).order_by(key)
+
+    last_key = None
+    while True:
+        batch_query = query if last_key is None else query.filter(key > last_key)
+        batch = batch_query.limit(batch_size).all()
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        last_key = getattr(batch[-1], key.key)
+
+
+def field_rows(
+    objects: Iterable[Any], fields: Iterable[str], resolve_method: bool = False
+) -> Iterator[list]:
+    """Generates export rows from attribute paths of objects.
+
+    :param objects: Objects to export, one per row
+    :param fields: Attribute path of each column, see
+        :py:func:`collectives.utils.misc.deepgetattr`
+    :param resolve_method: Whether to call attributes that are methods
+    :returns: An iterator over the rows
+    """
+    fields = list(fields)
+    for obj in objects:
+        yield [
+            deepgetattr(obj, field, "-", resolve_method=resolve_method)
+            for field in fields
+        ]
+
+
+def write_xlsx(
+    headers: Sequence[str],
+    rows: Iterable[Sequence],
+    column_widths: dict[str, float] | float = 25,
+    number_formats: dict[str, str] | None = None,
+) -> IO[bytes]:
+    """Write rows into an Excel document using openpyxl write-only mode.
+
+    Rows are written to disk as they are appended, and the resulting document
+    is spooled to a temporary file.
+
+    :param headers: Title of each column
+    :param rows: Iterable of rows, possibly a generator
+    :param column_widths: Width of all columns, or width by column letter
+    :param number_formats: Excel number format by column letter
+    :returns: The Excel document, positioned at its beginning
+    """
+    # pylint: disable=import-outside-toplevel
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import column_index_from_string, get_column_letter
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+
+    if not isinstance(column_widths, dict):
+        column_widths = {
+            get_column_letter(i + 1): column_widths for i in range(len(headers))
+        }
+    for column, width in column_widths.items():
+        worksheet.column_dimensions[column].width = width
+
+    formats = {
+        column_index_from_string(column) - 1: number_format
+        for column, number_format in (number_formats or {}).items()
+    }
+
+    worksheet.append(list(headers))
+    for values in rows:
+        row = list(values)
+        for index, number_format in formats.items():
+            if index < len(row):
+                cell = WriteOnlyCell(worksheet, value=row[index])
+                cell.number_format = number_format
+                row[index] = cell
+        worksheet.append(row)
+
+    return save_workbook(workbook)
+
+
+def save_workbook(workbook: "Workbook") -> IO[bytes]:
+    """Save a workbook into a spooled temporary file.
+
+    :param workbook: The workbook to save
+    :returns: The document, positioned at its beginning
+    """
+    out = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)  # pylint: disable=consider-using-with
+    workbook.save(out)
+    out.seek(0)
+    return out
+
+
+def generate_csv(headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[str]:
+    """Generates a CSV document line by line.
+
+    The document uses semicolons as separators and starts with a byte order
+    mark, so that spreadsheet software opens it with the right encoding.
+
+    :param headers: Title of each column
+    :param rows: Iterable of rows, possibly a generator
+    :returns: An iterator over the document lines
+    """
+    line = StringIO()
+    writer = csv.writer(line, delimiter=";")
+
+    writer.writerow(headers)
+    yield "\ufeff" + line.getvalue()
+    for row in rows:
+        line.seek(0)
+        line.truncate()
+        writer.writerow(["" if value is None else value for value in row])
+        yield line.getvalue()
 
-def export_roles(roles):
-    """Create an excel with the input role and related user.
 
-    :param roles:
-    :type roles: array of :py:class:`collectives.models.role.Role`
-    :returns: The excel with all info
-    :rtype: :py:class:`io.BytesIO`
+def send_table(
+    headers: Sequence[str],
+    rows: Iterable[Sequence],
+    download_name: str,
+    export_format: str | None = None,
+    column_widths: dict[str, float] | float = 25,
+    number_formats: dict[str, str] | None = None,
+) -> Response:
+    """Build the response sending a table as a downloadable document.
+
+    CSV documents are streamed while rows are being produced; Excel documents
+    are sent once fully written, from a temporary file.
+
+    :param headers: Title of each column
+    :param rows: Iterable of rows, possibly a generator
+    :param download_name: File name, without extension
+    :param export_format: One of :py:data:`EXPORT_FORMATS`. If None, use
+        :py:func:`requested_export_format`
+    :param column_widths: Excel column widths, see :py:func:`write_xlsx`
+    :param number_formats: Excel number formats, see :py:func:`write_xlsx`
+    :returns: The response to return from the view
+    """
+    if export_format is None:
+        export_format = requested_export_format()
+    download_name = f"{download_name}.{export_format}"
+
+    if export_format == "csv":
+        response = Response(
+            stream_with_context(generate_csv(headers, rows)),
+            mimetype=CSV_MIMETYPE,
+        )
+        _set_attachment(response, download_name)
+        return response
+
+    return send_workbook(
+        write_xlsx(headers, rows, column_widths, number_formats), download_name
+    )
+
+
+def send_workbook(document: IO[bytes], download_name: str) -> Response:
+    """Build the response sending an Excel document.
+
+    :param document: The document, as returned by :py:func:`save_workbook`
+    :param download_name: File name, with extension
+    :returns: The response to return from the view
+    """
+    size = document.seek(0, 2)
+    document.seek(0)
+    response = send_file(
+        document,
+        mimetype=XLSX_MIMETYPE,
+        download_name=download_name,
+        as_attachment=True,
+    )
+    response.content_length = size
+    return response
+
+
+def _set_attachment(response: Response, download_name: str):
+    """Set the Content-Disposition header of a response, like
+    :py:func:`flask.send_file` does.
+
+    :param response: The response to modify
+    :param download_name: File name of the attachment
+    """
+    try:
+        download_name.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name)
+        simple = simple.encode("ascii", "ignore").decode("ascii")
+        quoted = quote(download_name, safe="!#$&+-.^_`|~")
+        names = {"filename": simple, "filename*": f"UTF-8''{quoted}"}
+    else:
+        names = {"filename": download_name}
+    response.headers.set("Content-Disposition", "attachment", **names)
+
+
+def export_roles(roles: Iterable, download_name: str) -> Response:
+    """Export the input roles and related user.
+
+    :param roles: Roles to export
+    :type roles: iterable of :py:class:`collectives.models.role.Role`
+    :param download_name: File name, without extension
+    :returns: The response with the export
     """
-    workbook = Workbook()
-    worksheet = workbook.active
     fields = {
         "user.license": "Licence",
         "user.first_name": "Prénom",
@@ -27,30 +278,19 @@ def export_roles(roles):
         "activity_type.name": "Activité",
         "name": "Role",
     }
-    worksheet.append(list(fields.values()))
-
-    for role in roles:
-        worksheet.append([deepgetattr(role, field, "-") for field in fields])
-
-    # set column width
-    for i in range(ord("A"), ord("A") + len(fields)):
-        worksheet.column_dimensions[chr(i)].width = 25
-
-    out = BytesIO()
-    workbook.save(out)
-    out.seek(0)
-
-    return out
+    return send_table(
+        list(fields.values()), field_rows(roles, fields.keys()), download_name
+    )
 
 
-def export_badges(badges: list[Badge]) -> BytesIO:
-    """Create an excel with the input badge and related user.
+def export_badges(badges: Iterable, download_name: str) -> Response:
+    """Export the input badges and related user.
 
-    :param badges: List of badges to export
-    :returns: The excel with all info
+    :param badges: Badges to export
+    :type badges: iterable of :py:class:`collectives.models.badge.Badge`
+    :param download_name: File name, without extension
+    :returns: The response with the export
     """
-    workbook = Workbook()
-    worksheet = workbook.active
     fields = {
         "user.license": "Licence",
         "user.first_name": "Prénom",
@@ -62,34 +302,21 @@ def export_badges(badges: list[Badge]) -> BytesIO:
         "level_name": "Niveau",
         "expiration_date": "Date Expiration",
     }
-    worksheet.append(list(fields.values()))
-
-    for badge in badges:
-        worksheet.append(
-            [deepgetattr(badge, field, "-", resolve_method=True) for field in fields]
-        )
-
-    # set column width
-    for i in range(ord("A"), ord("A") + len(fields)):
-        worksheet.column_dimensions[chr(i)].width = 25
-
-    out = BytesIO()
-    workbook.save(out)
-    out.seek(0)
-
-    return out
+    return send_table(
+        list(fields.values()),
+        field_rows(badges, fields.keys(), resolve_method=True),
+        download_name,
+    )
 
 
-def export_users(users):
-    """Create an excel with the input users.
+def export_users(users: Iterable, download_name: str) -> Response:
+    """Export the input users.
 
-    :param users: List of users to export
-    :type users: list of :py:class:`collectives.models.user.User`
-    :returns: The excel with all info
-    :rtype: :py:class:`io.BytesIO`
+    :param users: Users to export
+    :type users: iterable of :py:class:`collectives.models.user.User`
+    :param download_name: File name, without extension
+    :returns: The response with the export
     """
-    workbook = Workbook()
-    worksheet = workbook.active
     fields = {
         "license": "Licence",
         "first_name": "Prénom",
@@ -97,32 +324,20 @@ def export_users(users):
         "mail": "Email",
         "phone": "Téléphone",
     }
-    worksheet.append(list(fields.values()))
+    return send_table(
+        list(fields.values()), field_rows(users, fields.keys()), download_name
+    )
 
-    for user in users:
-        worksheet.append([deepgetattr(user, field, "-") for field in fields])
 
-    for i in range(ord("A"), ord("A") + len(fields)):
-        worksheet.column_dimensions[chr(i)].width = 25
-
-    out = BytesIO()
-    workbook.save(out)
-    out.seek(0)
-
-    return out
-
-
-def export_users_registered(event):
-    """Create an Excel document with the contact information of registered users at an event.
+def export_users_registered(event, download_name: str) -> Response:
+    """Export the contact information of registered users at an event.
 
     :param event:
     :type event: :py:class:`collectives.models.event.event`
-    :returns: The excel with all info
-    :rtype: :py:class:`io.BytesIO`
+    :param download_name: File name, without extension
+    :returns: The response with the export
     """
-    workbook = Workbook()
-    worksheet = workbook.active
-    fields = [
+    headers = [
         "Licence",
         "Prénom",
         "Nom",
@@ -130,10 +345,8 @@ def export_users_registered(event):
         "Email",
         "En cas d'accident",
     ]
-    worksheet.append(fields)
-
-    for reg in event.active_registrations():
-        temp = [
+    rows = (
+        [
             reg.user.license,
             reg.user.first_name,
             reg.user.last_name.upper(),
@@ -141,14 +354,6 @@ def export_users_registered(event):
             reg.user.mail,
             f"{reg.user.emergency_contact_name} ({reg.user.emergency_contact_phone})",
         ]
-        worksheet.append(temp)
-
-    # set column width
-    for i in range(ord("A"), ord("A") + len(fields)):
-        worksheet.column_dimensions[chr(i)].width = 25
-
-    out = BytesIO()
-    workbook.save(out)
-    out.seek(0)
-
-    return out
+        for reg in event.active_registrations()
+    )
+    return send_table(headers, rows, download_name)
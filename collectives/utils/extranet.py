@@ -1,17 +1,25 @@
-"""Module to handle connexions to FFCAM extranet."""
+"""Module to handle connexions to FFCAM extranet.
 
+zeep is only imported when the extranet is first called, so that server
+processes which never call it do not load it.
+"""
+
+import queue
+import threading
 import traceback
-from datetime import date, datetime
-from typing import Dict
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Tuple
 
 from flask import Flask, current_app
-from zeep import Client
-from zeep.exceptions import Error as ZeepError
-from zeep.proxy import ServiceProxy
 
 from collectives.models import Configuration, Gender, User, UserType
 from collectives.utils.time import current_time
 
+if TYPE_CHECKING:
+    from zeep.proxy import ServiceProxy
+
 _OTHER_CLUB_LICENSE_MESSAGE = "Les donnees demandees ne vous sont pas accessibles"
 """Error message returned by extranet API when querying a
 license number that belongs to another club
@@ -122,6 +130,7 @@ def sync_user(user: User, user_info: UserInfo, license_info: LicenseInfo):
     user.license_expiry_date = license_info.expiry_date()
     user.license_category = user_info.license_category
     user.last_extranet_sync_time = current_time()
+    user.last_extranet_check_time = user.last_extranet_sync_time
     user.gender = Gender.Man if user_info.qualite == "M" else Gender.Woman
     user.type = UserType.Extranet
 
@@ -139,16 +148,41 @@ class LicenseBelongsToOtherClubError(ExtranetError):
 
 
 class ExtranetApi:
-    """SOAP Client to retrieve information from FFCAM servers."""
+    """SOAP Client to retrieve information from FFCAM servers.
+
+    Requests are performed with a pool of SOAP clients, so that concurrent requests
+    from several threads do not share the same client.
+
+    To spare a SOAP round trip at each login, statuses of valid licenses are cached
+    until the license may be renewed, see :py:meth:`check_license`. After a failure
+    of the extranet, requests fail immediately for ``EXTRANET_FAILURE_CACHE_TTL``
+    seconds instead of waiting for the extranet again.
+    """
 
     def __init__(self):
         """Constructor"""
 
-        self._auth_info: Dict = {}
-        """Authorization info stub"""
+        self.pool_size = 4
+        self.pool_timeout = 30.0
+        self.cache_size = 10000
+        self.cache_max_age = timedelta(days=7)
+        self.failure_ttl = timedelta(seconds=60)
 
-        self._soap_client: ServiceProxy = None
-        """Cached soap client for performinfg extranet requests"""
+        self._lock = threading.Lock()
+        """Lock protecting the client pool and the caches"""
+
+        self._idle_clients: queue.LifoQueue = queue.LifoQueue()
+        """SOAP clients which are not performing a request, along with their
+        authorization info"""
+
+        self._client_count: int = 0
+        """Number of SOAP clients created by the pool"""
+
+        self._license_cache: OrderedDict = OrderedDict()
+        """Cached license statuses, by license number, along with their expiry time"""
+
+        self._failure_time: Optional[datetime] = None
+        """Time of the last failure of the extranet, if recent"""
 
     def init_app(self, app: Flask):
         """Initializes the API for the given Flask app"""
@@ -156,29 +190,153 @@ class ExtranetApi:
             app.logger.warning(
                 "Extranet API is disabled, using mock API --- no license checks!"
             )
+        self.pool_size = app.config["EXTRANET_CLIENT_POOL_SIZE"]
+        self.pool_timeout = app.config["EXTRANET_CLIENT_POOL_TIMEOUT"]
+        self.cache_size = app.config["EXTRANET_LICENSE_CACHE_SIZE"]
+        self.cache_max_age = timedelta(
+            seconds=app.config["EXTRANET_LICENSE_CACHE_MAX_AGE"]
+        )
+        self.failure_ttl = timedelta(seconds=app.config["EXTRANET_FAILURE_CACHE_TTL"])
+
+    def reset(self):
+        """Drops all SOAP clients and cached information."""
+        with self._lock:
+            self._idle_clients = queue.LifoQueue()
+            self._client_count = 0
+            self._license_cache.clear()
+            self._failure_time = None
+
+    def _create_client(self) -> Tuple["ServiceProxy", Dict]:
+        """Initializes a new SOAP client.
+
+        :return: The client service, and the authorization info stub
+        """
+        # pylint: disable=import-outside-toplevel
+        from zeep import Client
+        from zeep.exceptions import Error as ZeepError
 
-    @property
-    def soap_client(self) -> ServiceProxy:
-        """Returns the cached SOAP client or initialize a new one"""
-        if self._soap_client is None:
-            try:
-                soap_client = Client(wsdl=current_app.config["EXTRANET_WSDL"])
-                self._auth_info = soap_client.service.auth()
-            except (IOError, ZeepError) as err:
-                current_app.logger.error(f"Error loading extranet WSDL: {err}")
-                current_app.logger.error(traceback.format_stack())
-                raise ExtranetError() from err
-
-            current_app.logger.info("Extranet SOAP client initialized.")
-            self._soap_client = soap_client.service
-        return self._soap_client
-
-    @property
-    def auth_info(self) -> Dict:
-        """Builds authorization info from config"""
-        self._auth_info["utilisateur"] = Configuration.EXTRANET_ACCOUNT_ID
-        self._auth_info["motdepasse"] = Configuration.EXTRANET_ACCOUNT_PWD
-        return self._auth_info
+        try:
+            soap_client = Client(wsdl=current_app.config["EXTRANET_WSDL"])
+            auth_info = soap_client.service.auth()
+        except (IOError, ZeepError) as err:
+            current_app.logger.error(f"Error loading extranet WSDL: {err}")
+            current_app.logger.error(traceback.format_stack())
+            self._record_failure()
+            raise ExtranetError() from err
+
+        current_app.logger.info("Extranet SOAP client initialized.")
+        return soap_client.service, auth_info
+
+    @contextmanager
+    def soap_client(self) -> Iterator[Tuple["ServiceProxy", Dict]]:
+        """Borrows a SOAP client from the pool, creating it if the pool is not full.
+
+        Waits for another thread to release a client if the pool is full.
+
+        :return: The client service, and the authorization info to use with it
+        """
+        try:
+            client = self._idle_clients.get_nowait()
+        except queue.Empty:
+            client = None
+            with self._lock:
+                create = self._client_count < self.pool_size
+                if create:
+                    self._client_count += 1
+            if create:
+                try:
+                    client = self._create_client()
+                except ExtranetError:
+                    with self._lock:
+                        self._client_count -= 1
+                    raise
+            else:
+                try:
+                    client = self._idle_clients.get(timeout=self.pool_timeout)
+                except queue.Empty as err:
+                    current_app.logger.error("No extranet SOAP client available")
+                    raise ExtranetError() from err
+
+        service, auth_info = client
+        auth_info["utilisateur"] = Configuration.EXTRANET_ACCOUNT_ID
+        auth_info["motdepasse"] = Configuration.EXTRANET_ACCOUNT_PWD
+        try:
+            yield service, auth_info
+        finally:
+            self._idle_clients.put(client)
+
+    def _record_failure(self):
+        """Remembers that the extranet has just failed."""
+        with self._lock:
+            self._failure_time = current_time()
+
+    def _check_recent_failure(self):
+        """Fails immediately if the extranet has failed recently.
+
+        :raises ExtranetError: If the extranet failed less than
+            ``EXTRANET_FAILURE_CACHE_TTL`` seconds ago.
+        """
+        with self._lock:
+            failure_time = self._failure_time
+        if failure_time is None:
+            return
+        if current_time() - failure_time < self.failure_ttl:
+            raise ExtranetError("Extranet failed recently")
+        with self._lock:
+            self._failure_time = None
+
+    def _cache_expiry(self, info: LicenseInfo, time: datetime) -> Optional[datetime]:
+        """Computes until when the status of a license can be cached.
+
+        Only valid licenses are cached, until their renewal becomes possible, and
+        for at most ``EXTRANET_LICENSE_CACHE_MAX_AGE`` seconds.
+
+        :param info: The license status returned by the extranet
+        :param time: Time at which the status has been returned
+        :return: Expiry time of the cache entry, or `None` if it should not be cached
+        """
+        if not info.is_valid_at_time(time):
+            return None
+        expiry = info.expiry_date()
+        renewal = min(expiry, date(expiry.year, Configuration.LICENSE_RENEWAL_MONTH, 1))
+        renewal_time = datetime.combine(renewal, datetime.min.time(), time.tzinfo)
+        if renewal_time <= time:
+            return None
+        return min(renewal_time, time + self.cache_max_age)
+
+    def _cached_license(self, license_number: str) -> Optional[LicenseInfo]:
+        """Looks up the cached status of a license.
+
+        :param license_number: License to look up.
+        :return: The cached status, or `None` if unknown or expired.
+        """
+        time = current_time()
+        with self._lock:
+            entry = self._license_cache.get(license_number)
+            if entry is None:
+                return None
+            info, expiry = entry
+            if expiry <= time:
+                del self._license_cache[license_number]
+                return None
+            self._license_cache.move_to_end(license_number)
+            return info
+
+    def _cache_license(self, license_number: str, info: LicenseInfo):
+        """Stores the status of a license returned by the extranet.
+
+        :param license_number: License checked on the extranet.
+        :param info: Status returned by the extranet.
+        """
+        expiry = self._cache_expiry(info, current_time())
+        with self._lock:
+            if expiry is None:
+                self._license_cache.pop(license_number, None)
+                return
+            self._license_cache[license_number] = (info, expiry)
+            self._license_cache.move_to_end(license_number)
+            while len(self._license_cache) > self.cache_size:
+                self._license_cache.popitem(last=False)
 
     def disabled(self) -> bool:
         """Check if soap client has been initialized.
@@ -189,11 +347,13 @@ class ExtranetApi:
         """
         return current_app.config["EXTRANET_DISABLE"]
 
-    def check_license(self, license_number: str) -> LicenseInfo:
+    def check_license(self, license_number: str, use_cache: bool = True) -> LicenseInfo:
         """Get information on a license from FFCAM server.
 
         :param license_number: License to get information about.
         :type license_number: string
+        :param use_cache: If `False`, always query FFCAM server, and refresh the
+            cached status of the license.
         """
 
         info = LicenseInfo()
@@ -204,10 +364,20 @@ class ExtranetApi:
             info.renewal_date = current_time()
             return info
 
+        if use_cache:
+            cached_info = self._cached_license(license_number)
+            if cached_info is not None:
+                return cached_info
+
+        self._check_recent_failure()
+        # pylint: disable=import-outside-toplevel
+        from zeep.exceptions import Error as ZeepError
+
         try:
-            result = self.soap_client.verifierUnAdherent(
-                connect=self.auth_info, id=license_number
-            )
+            with self.soap_client() as (service, auth_info):
+                result = service.verifierUnAdherent(
+                    connect=auth_info, id=license_number
+                )
         except (IOError, AttributeError, ZeepError) as err:
             if (
                 isinstance(err, ZeepError)
@@ -219,6 +389,7 @@ class ExtranetApi:
                 f"Error calling extranet 'verifierUnAdherent' : {err}"
             )
             current_app.logger.error(traceback.format_stack())
+            self._record_failure()
             raise ExtranetError() from err
 
         if result["existe"] == 1:
@@ -233,6 +404,7 @@ class ExtranetApi:
                 # In that case simply return an invalid license
                 info.exists = False
 
+        self._cache_license(license_number, info)
         return info
 
     def fetch_user_info(self, license_number: str) -> UserInfo:
@@ -252,10 +424,15 @@ class ExtranetApi:
             info.date_of_birth = date(1970, 1, 1)
             return info
 
+        self._check_recent_failure()
+        # pylint: disable=import-outside-toplevel
+        from zeep.exceptions import Error as ZeepError
+
         try:
-            result = self.soap_client.extractionAdherent(
-                connect=self.auth_info, id=license_number
-            )
+            with self.soap_client() as (service, auth_info):
+                result = service.extractionAdherent(
+                    connect=auth_info, id=license_number
+                )
         except (IOError, AttributeError, ZeepError) as err:
             if (
                 isinstance(err, ZeepError)
@@ -267,6 +444,7 @@ class ExtranetApi:
                 f"Error calling extranet 'extractionAdherent' : {err}"
             )
             current_app.logger.error(traceback.format_stack())
+            self._record_failure()
             raise ExtranetError() from err
 
         info.first_name = result["prenom"]
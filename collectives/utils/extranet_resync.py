@@ -0,0 +1,209 @@
+"""Module to resynchronise all users with FFCAM extranet in the background.
+
+Without it, users are only synchronised when they log in, see
+:py:func:`collectives.routes.auth.utils.sync_user`, so that most licence
+renewals of September hit the extranet during peak login times.
+
+:py:func:`resync_users` checks the licenses of all extranet users by batches,
+with a few threads calling the extranet at a bounded rate, and synchronises the
+users whose license has been renewed. It is run by ``flask collectives
+resync-users``, typically every night. Logins do not call the extranet for users
+whose license has been checked less than ``EXTRANET_CHECK_MAX_AGE`` seconds ago.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from flask import Flask, current_app
+from sqlalchemy import or_, select
+
+from collectives.models import User, UserType, db
+from collectives.utils import extranet
+from collectives.utils.time import current_time
+
+
+class ResyncStatistics:
+    """Statistics of a run of :py:func:`resync_users`."""
+
+    def __init__(self):
+        """Constructor"""
+
+        self.checked: int = 0
+        """ Number of users whose license has been checked."""
+
+        self.synchronized: int = 0
+        """ Number of users whose renewed license has been synchronised."""
+
+        self.invalid: int = 0
+        """ Number of users whose license is not valid on the extranet."""
+
+        self.email_changed: int = 0
+        """ Number of users not synchronised because their email has changed.
+
+        They will be warned at their next login."""
+
+        self.errors: int = 0
+        """ Number of users whose license could not be checked."""
+
+        self.last_user_id: int = 0
+        """ Id of the last checked user."""
+
+    def __str__(self) -> str:
+        return (
+            f"{self.checked} licence(s) vérifiée(s), "
+            f"{self.synchronized} utilisateur(s) synchronisé(s), "
+            f"{self.invalid} licence(s) invalide(s), "
+            f"{self.email_changed} email(s) modifié(s), "
+            f"{self.errors} erreur(s)"
+        )
+
+
+class _RateLimiter:
+    """Spaces out the calls of several threads."""
+
+    def __init__(self, rate: float):
+        """Constructor
+
+        :param rate: Maximum number of calls per second, or 0 for no limit.
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Waits until the next call is allowed."""
+        with self._lock:
+            now = time.monotonic()
+            call_time = max(now, self._next_time)
+            self._next_time = call_time + self.interval
+        if call_time > now:
+            time.sleep(call_time - now)
+
+
+def _fetch(
+    app: Flask,
+    limiter: _RateLimiter,
+    license_number: str,
+    known_expiry: Optional[date],
+) -> Tuple[extranet.LicenseInfo, Optional[extranet.UserInfo]]:
+    """Checks a license, and fetches the user info if the license has been renewed.
+
+    Runs in the worker threads, hence only deals with plain values.
+
+    :param app: The Flask application
+    :param limiter: Limiter of the rate of extranet calls
+    :param license_number: License to check
+    :param known_expiry: License expiry date currently known by the site
+    :return: License info, and user info if the license has been renewed.
+    """
+    with app.app_context():
+        limiter.wait()
+        try:
+            license_info = extranet.api.check_license(license_number, use_cache=False)
+        except extranet.LicenseBelongsToOtherClubError:
+            return extranet.LicenseInfo(), None
+
+        if not license_info.is_valid_at_time(current_time()):
+            return license_info, None
+        if known_expiry is not None and license_info.expiry_date() <= known_expiry:
+            return license_info, None
+
+        limiter.wait()
+        return license_info, extranet.api.fetch_user_info(license_number)
+
+
+def resync_users(
+    app: Flask,
+    older_than: timedelta,
+    batch_size: int = 100,
+    workers: int = 4,
+    rate: float = 5,
+    dry_run: bool = False,
+) -> ResyncStatistics:
+    """Checks the licenses of extranet users, and synchronises the renewed ones.
+
+    Users whose license has been checked less than `older_than` ago are skipped, so
+    that an interrupted run resumes where it stopped. Changes are committed after
+    each batch. The run stops after the first batch with an extranet error.
+
+    :param app: The Flask application
+    :param older_than: Minimum age of the last check of the licenses to check
+    :param batch_size: Number of users loaded and committed at once
+    :param workers: Number of threads calling the extranet
+    :param rate: Maximum number of extranet calls per second, 0 for no limit
+    :param dry_run: If `True`, only count the changes, without saving them
+    :return: Statistics of the run
+    """
+    stats = ResyncStatistics()
+    limiter = _RateLimiter(rate)
+    start_time = current_time()
+    cutoff = start_time - older_than
+
+    query = (
+        select(User)
+        .where(
+            User.type == UserType.Extranet,
+            User.enabled,
+            or_(
+                User.last_extranet_check_time.is_(None),
+                User.last_extranet_check_time < cutoff,
+            ),
+        )
+        .order_by(User.id)
+        .limit(batch_size)
+    )
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            users = (
+                db.session.scalars(query.where(User.id > stats.last_user_id))
+                .unique()
+                .all()
+            )
+            if not users:
+                break
+
+            futures = [
+                executor.submit(
+                    _fetch, app, limiter, user.license, user.license_expiry_date
+                )
+                for user in users
+            ]
+            failed = False
+            for user, future in zip(users, futures):
+                stats.last_user_id = user.id
+                try:
+                    license_info, user_info = future.result()
+                except extranet.ExtranetError:
+                    stats.errors += 1
+                    failed = True
+                    continue
+
+                stats.checked += 1
+                if not license_info.is_valid_at_time(start_time):
+                    stats.invalid += 1
+                elif user_info is not None:
+                    if user.mail != user_info.email:
+                        # Let the user be warned at next login
+                        stats.email_changed += 1
+                        continue
+                    stats.synchronized += 1
+                    if not dry_run:
+                        extranet.sync_user(user, user_info, license_info)
+                if not dry_run:
+                    user.last_extranet_check_time = start_time
+
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+            current_app.logger.info(
+                f"Extranet resynchronisation, up to user #{stats.last_user_id}: {stats}"
+            )
+            if failed:
+                break
+
+    return stats
@@ -0,0 +1,156 @@
+"""Module to generate the derivatives of images uploaded before they existed.
+
+See :py:mod:`collectives.utils.images`. :py:func:`backfill_derivatives` renames
+the images whose name does not contain a hash of their content, then generates
+their missing derivatives with a pool of threads. It is run by ``flask
+collectives generate-image-derivatives``, and can be run again at any time, for
+instance after the derivatives folder has been lost.
+"""
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from flask import Flask, current_app
+from flask_uploads import IMAGES
+from PIL import Image
+from sqlalchemy import select
+
+from collectives.models import EquipmentType, Event, UploadedFile, User, db
+from collectives.utils.images import (
+    generate_derivatives,
+    hashed_name,
+    is_hashed_name,
+    upload_set_path,
+)
+
+SOURCES = [
+    (Event.photo, "photos"),
+    (User.avatar, "avatars"),
+    (EquipmentType.path_img, "imgtypeequip"),
+    (UploadedFile.path, "documents"),
+]
+""" Columns referencing uploaded images, with the name of their upload set """
+
+
+class BackfillStatistics:
+    """Statistics of a run of :py:func:`backfill_derivatives`."""
+
+    def __init__(self):
+        """Constructor"""
+
+        self.images: int = 0
+        """ Number of checked images."""
+
+        self.renamed: int = 0
+        """ Number of images renamed after the hash of their content."""
+
+        self.generated: int = 0
+        """ Number of generated derivative files."""
+
+        self.missing: int = 0
+        """ Number of referenced images not found on disk."""
+
+        self.errors: int = 0
+        """ Number of images whose derivatives could not be generated."""
+
+    def __str__(self) -> str:
+        return (
+            f"{self.images} image(s) vérifiée(s), "
+            f"{self.renamed} renommée(s), "
+            f"{self.generated} fichier(s) généré(s), "
+            f"{self.missing} image(s) manquante(s), "
+            f"{self.errors} erreur(s)"
+        )
+
+
+def _rename(column, upload_set: str, filename: str) -> str:
+    """Copy an image under a name from :py:func:`hashed_name`, and reference it.
+
+    The former file is only removed once the new name is committed.
+
+    :param column: Column referencing the image
+    :param upload_set: Name of the upload set of the image
+    :param filename: Current name of the image
+    :return: The new name of the image
+    """
+    stem, extension = os.path.splitext(filename)
+    with open(upload_set_path(upload_set, filename), "rb") as stream:
+        new_filename = hashed_name(stem, stream) + extension[1:]
+    shutil.copy2(
+        upload_set_path(upload_set, filename),
+        upload_set_path(upload_set, new_filename),
+    )
+
+    db.session.execute(
+        column.table.update()
+        .where(column == filename)
+        .values({column.key: new_filename})
+    )
+    db.session.commit()
+    os.remove(upload_set_path(upload_set, filename))
+    return new_filename
+
+
+def _generate(app: Flask, upload_set: str, filename: str) -> int:
+    """Generate the derivatives of an image, in a worker thread.
+
+    :param app: The Flask application
+    :param upload_set: Name of the upload set of the image
+    :param filename: Name of the image
+    :return: Number of generated files
+    """
+    with app.app_context():
+        return generate_derivatives(upload_set, filename)
+
+
+def backfill_derivatives(app: Flask, workers: int = 4) -> BackfillStatistics:
+    """Rename all the uploaded images after the hash of their content, and generate
+    their missing derivatives.
+
+    :param app: The Flask application
+    :param workers: Number of threads resizing images
+    :return: Statistics of the run
+    """
+    stats = BackfillStatistics()
+
+    images: List[Tuple[str, str]] = []
+    for column, upload_set in SOURCES:
+        filenames = db.session.scalars(select(column).where(column.is_not(None)))
+        for filename in filenames.unique().all():
+            if os.path.splitext(filename)[1][1:].lower() not in IMAGES:
+                continue
+            stats.images += 1
+            if not os.path.isfile(upload_set_path(upload_set, filename)):
+                stats.missing += 1
+            elif is_hashed_name(filename):
+                images.append((upload_set, filename))
+            else:
+                images.append((upload_set, _rename(column, upload_set, filename)))
+                stats.renamed += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (
+                upload_set,
+                filename,
+                executor.submit(_generate, app, upload_set, filename),
+            )
+            for upload_set, filename in images
+        ]
+        for upload_set, filename, future in futures:
+            try:
+                stats.generated += future.result()
+            except (
+                OSError,
+                ValueError,
+                RuntimeError,
+                Image.DecompressionBombError,
+            ) as err:
+                stats.errors += 1
+                current_app.logger.warning(
+                    f"Cannot generate derivatives of {upload_set}/{filename}: {err}"
+                )
+
+    return stats
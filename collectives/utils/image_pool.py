@@ -0,0 +1,263 @@
+"""Module to run image processing in a bounded pool of worker processes.
+
+Decoding, resizing or composing large images with Pillow keeps a server thread
+busy for up to several seconds, so that a few concurrent uploads could take all
+the threads of the server. Image jobs are instead submitted to
+:py:data:`image_pool`, which runs them in worker processes:
+
+- at most ``IMAGE_POOL_QUEUE_SIZE`` jobs are queued or running at once. Callers
+  wait for room up to ``IMAGE_POOL_TIMEOUT`` seconds, then get
+  :py:class:`ImagePoolBusy`;
+- images larger than ``IMAGE_MAX_PIXELS`` are refused before being decoded, see
+  :py:func:`open_image`, and the memory of each worker process is limited to
+  ``IMAGE_POOL_MEMORY_LIMIT`` megabytes;
+- JPEG images are decoded right away at the reduced size which is needed, using
+  :py:meth:`PIL.Image.Image.draft`.
+
+Jobs are module level functions, so that they can be sent to worker processes,
+which know nothing of the Flask application. If ``IMAGE_POOL_WORKERS`` is 0, jobs
+are run by the calling thread. The pixel limit applies to the server processes
+too.
+"""
+
+import io
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Tuple
+
+from flask import Flask
+from PIL import Image
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_max_pixels: int = 0
+""" Maximum number of pixels of opened images in this process, see :py:func:`open_image` """
+
+
+class ImagePoolBusy(RuntimeError):
+    """Exception raised when too many image jobs are already queued."""
+
+
+def _init_worker(max_pixels: int, memory_limit: int):
+    """Set the limits of the process running image jobs.
+
+    :param max_pixels: Maximum number of pixels of opened images
+    :param memory_limit: Maximum memory of the process, in megabytes. 0 or `None`
+        for no limit.
+    """
+    global _max_pixels  # pylint: disable=global-statement
+    _max_pixels = max_pixels
+    Image.MAX_IMAGE_PIXELS = max_pixels or None
+    if memory_limit and resource is not None:
+        limit = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def open_image(source: str | bytes, size: Tuple[int, int] | None = None) -> Image.Image:
+    """Open an image, refusing it before decoding it if it is too large.
+
+    :param source: Path or content of the image
+    :param size: If set, JPEG images are decoded at the smallest scale which is
+        at least this size
+    :raises PIL.Image.DecompressionBombError: if the image has more pixels than
+        ``IMAGE_MAX_PIXELS``
+    :return: The opened image, to be closed by the caller
+    """
+    image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    if _max_pixels and image.width * image.height > _max_pixels:
+        image.close()
+        raise Image.DecompressionBombError(
+            f"Image of {image.width}x{image.height} pixels exceeds the limit "
+            f"of {_max_pixels} pixels"
+        )
+    if size is not None:
+        image.draft(image.mode, size)
+    return image
+
+
+def verify_image(source: str | bytes) -> bool:
+    """Job checking whether a file is a valid image.
+
+    :param source: Path or content of the file
+    :raises PIL.Image.DecompressionBombError: if the image has more pixels than
+        ``IMAGE_MAX_PIXELS``
+    """
+    try:
+        with open_image(source) as image:
+            image.verify()
+    except Image.DecompressionBombError:
+        raise
+    except Exception:  # pylint: disable=broad-exception-caught
+        return False
+    return True
+
+
+class ImageJobStats:
+    """Counters and durations of the jobs of the same kind."""
+
+    DURATION_WINDOW = 100
+    """ Number of recent jobs on which durations are measured """
+
+    def __init__(self):
+        """Constructor"""
+        self.count = 0
+        self.failed = 0
+        self.rejected = 0
+        self.durations: deque = deque(maxlen=self.DURATION_WINDOW)
+
+
+class ImagePool:
+    """Bounded pool of processes running image jobs.
+
+    Requires to be initialized with :py:meth:`init_app` to be used.
+    """
+
+    def __init__(self):
+        """Constructor"""
+        self.workers = 0
+        self.timeout = 30.0
+        self.pending = 0
+        self.jobs: Dict[str, ImageJobStats] = {}
+
+        self._settings: Tuple | None = None
+        self._slots = threading.Semaphore(1)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+
+    def init_app(self, app: Flask):
+        """Reads the pool settings from the app configuration.
+
+        Worker processes are only restarted if their settings changed.
+
+        :param app: The Flask application
+        """
+        self.timeout = app.config["IMAGE_POOL_TIMEOUT"]
+        settings = (
+            app.config["IMAGE_POOL_WORKERS"],
+            app.config["IMAGE_POOL_QUEUE_SIZE"],
+            app.config["IMAGE_MAX_PIXELS"],
+            app.config["IMAGE_POOL_MEMORY_LIMIT"],
+        )
+        if settings == self._settings:
+            return
+
+        self.shutdown()
+        self._settings = settings
+        self.workers, queue_size, max_pixels, _ = settings
+        self._slots = threading.Semaphore(queue_size)
+        self.pending = 0
+        # Also protects images opened by the server process, such as by Flask-Images
+        _init_worker(max_pixels, None)
+
+    def shutdown(self):
+        """Stop the worker processes, without waiting for running jobs."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def run(self, name: str, job: Callable, *args) -> Any:
+        """Run a job and wait for its result.
+
+        :param name: Kind of job, under which its duration is measured
+        :param job: Module level function to run
+        :param args: Arguments of the job, sent to the worker process
+        :raises ImagePoolBusy: if the pool stays full for ``IMAGE_POOL_TIMEOUT``
+        :raises TimeoutError: if the job is not over after ``IMAGE_POOL_TIMEOUT``
+        :return: The result of the job
+        """
+        stats = self.jobs.setdefault(name, ImageJobStats())
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            stats.rejected += 1
+            raise ImagePoolBusy(f"Too many image jobs queued to run {name}")
+        with self._pending_lock:
+            self.pending += 1
+
+        try:
+            if self.workers:
+                future = self._submit(job, *args)
+                remaining = self.timeout - (time.monotonic() - start)
+                return future.result(timeout=max(remaining, 0))
+            try:
+                return job(*args)
+            finally:
+                self._release()
+        except BrokenProcessPool:
+            # A worker process died, for instance killed for using too much
+            # memory: start new ones for next jobs
+            stats.failed += 1
+            self.shutdown()
+            raise
+        except Exception:
+            stats.failed += 1
+            raise
+        finally:
+            stats.count += 1
+            stats.durations.append(time.monotonic() - start)
+
+    def stats(self) -> Dict:
+        """:return: number of pending jobs, and counters and durations in ms of
+        each kind of job"""
+        jobs = []
+        for name, stats in sorted(self.jobs.items()):
+            durations = list(stats.durations)
+            jobs.append(
+                {
+                    "name": name,
+                    "count": stats.count,
+                    "failed": stats.failed,
+                    "rejected": stats.rejected,
+                    "duration_avg": (
+                        round(1000 * sum(durations) / len(durations))
+                        if durations
+                        else 0
+                    ),
+                    "duration_max": round(1000 * max(durations)) if durations else 0,
+                }
+            )
+        return {"workers": self.workers, "pending": self.pending, "jobs": jobs}
+
+    def _release(self, _future: Future | None = None):
+        """Free the slot of a job which is over."""
+        with self._pending_lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def _submit(self, job: Callable, *args) -> Future:
+        """Submit a job to the worker processes, starting them if needed.
+
+        Worker processes are started on first use, so that they are not created
+        before the server processes are forked. The slot of the job is freed once it is over.
+
+        :param job: Function to run
+        :param args: Arguments of the job
+        """
+        try:
+            with self._lock:
+                if self._executor is None:
+                    _, _, max_pixels, memory_limit = self._settings
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("forkserver"),
+                        initializer=_init_worker,
+                        initargs=(max_pixels, memory_limit),
+                    )
+                future = self._executor.submit(job, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+
+image_pool = ImagePool()
+""" Pool of processes running image jobs of the application """
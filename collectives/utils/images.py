@@ -0,0 +1,319 @@
+"""Module to generate resized versions of uploaded images when they are saved.
+
+Uploaded images used to be resized by Flask-Images on their first request, so
+that the first visitor after an upload, or after its cache has been wiped,
+waited for Pillow to decode and resize them.
+
+Originals are now saved under a name containing a hash of their content, see
+:py:func:`hashed_name`, and all their derivatives listed in :py:data:`DERIVATIVES`
+are generated right away by :py:func:`generate_derivatives`, in their original
+format and in WebP, by :py:data:`collectives.utils.image_pool.image_pool`. Since
+the name of a derivative changes with the content of its original, derivatives
+are served with long-lived cache headers by
+:py:func:`collectives.routes.root.derived_image`.
+
+Images uploaded before, or whose derivatives are missing, are still resized by
+Flask-Images until ``flask collectives generate-image-derivatives`` is run, see
+:py:mod:`collectives.utils.image_backfill`.
+"""
+
+import hashlib
+import os
+import re
+from typing import IO, Dict, List, Optional, Tuple
+
+from flask import current_app, url_for
+from PIL import Image, ImageOps
+
+from collectives.utils.image_pool import image_pool, open_image
+
+WEBP_EXTENSION = ".webp"
+""" Extension of the WebP variant of derivatives """
+
+HASH_LENGTH = 12
+""" Number of hexadecimal characters of content hashes in file names """
+
+HASHED_NAME_PATTERN = re.compile(rf"-[0-9a-f]{{{HASH_LENGTH}}}\.[^.]+$")
+""" Pattern of the end of file names produced by :py:func:`hashed_name` """
+
+
+class ImageDerivative:
+    """Resized version of the images of an upload set."""
+
+    def __init__(
+        self,
+        upload_set: str,
+        width: int,
+        height: Optional[int] = None,
+        crop: bool = False,
+    ):
+        """Constructor
+
+        :param upload_set: Name of the upload set of the original images
+        :param width: Maximum width of the derivative
+        :param height: Maximum height of the derivative, `None` for no limit
+        :param crop: If `True`, the image is cropped to fill exactly
+            `width` x `height`, as ``images.crop`` of Flask-Images. Otherwise it
+            is resized to fit, as ``images.fit``.
+        """
+        self.upload_set = upload_set
+        self.width = width
+        self.height = height
+        self.crop = crop
+
+    def resize(self, image: Image.Image) -> Image.Image:
+        """Resize an image according to this derivative.
+
+        Images are never enlarged.
+
+        :param image: Original image
+        :return: The resized image
+        """
+        if self.crop:
+            return ImageOps.fit(
+                image, (self.width, self.height), Image.Resampling.LANCZOS
+            )
+        image = image.copy()
+        image.thumbnail(
+            (self.width, self.height or image.height), Image.Resampling.LANCZOS
+        )
+        return image
+
+    def fallback_url(self, filename: str, **kwargs) -> str:
+        """URL of the image resized on demand by Flask-Images.
+
+        :param filename: Name of the original image in its upload set
+        :param kwargs: Additional arguments of :py:func:`flask.url_for`
+        :return: The URL
+        """
+        if self.height is not None:
+            kwargs["height"] = self.height
+        endpoint = "images.crop" if self.crop else "images.fit"
+        return url_for(endpoint, filename=filename, width=self.width, **kwargs)
+
+
+DERIVATIVES: Dict[str, ImageDerivative] = {
+    "event_card": ImageDerivative("photos", 350, 250, crop=True),
+    "event_full": ImageDerivative("photos", 1100),
+    "avatar_small": ImageDerivative("avatars", 30, 30, crop=True),
+    "avatar_medium": ImageDerivative("avatars", 80, 80, crop=True),
+    "avatar_large": ImageDerivative("avatars", 200, 200, crop=True),
+    "equipment_type": ImageDerivative("imgtypeequip", 300, 300),
+    "document_thumbnail": ImageDerivative("documents", 640, 480),
+}
+""" Derivatives generated for uploaded images, by name """
+
+
+def derivative_names(upload_set: str) -> List[str]:
+    """Names of the derivatives of an upload set.
+
+    :param upload_set: Name of an upload set
+    :return: Names in :py:data:`DERIVATIVES`
+    """
+    return [
+        name
+        for name, derivative in DERIVATIVES.items()
+        if derivative.upload_set == upload_set
+    ]
+
+
+def hashed_name(prefix: str, stream: IO[bytes]) -> str:
+    """Name under which to save an uploaded image, from the hash of its content.
+
+    :param prefix: Beginning of the name, such as ``event-12``
+    :param stream: Content of the image, read then rewound
+    :return: The name, ending with a dot so that Flask-Uploads adds the extension
+    """
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(1 << 16), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return f"{prefix}-{digest.hexdigest()[:HASH_LENGTH]}."
+
+
+def is_hashed_name(filename: str) -> bool:
+    """Check whether an image has been saved under a name from :py:func:`hashed_name`
+
+    :param filename: Name of the image
+    :return: Whether derivatives of the image can be generated
+    """
+    return HASHED_NAME_PATTERN.search(filename) is not None
+
+
+def upload_set_path(upload_set: str, filename: str) -> str:
+    """Path of an uploaded file.
+
+    :param upload_set: Name of the upload set of the file
+    :param filename: Name of the file in its upload set
+    :return: Absolute path of the file
+    """
+    return os.path.join(current_app.upload_set_config[upload_set].destination, filename)
+
+
+def _output_extension(filename: str) -> str:
+    """Extension of derivatives in the original format, JPEG or PNG.
+
+    :param filename: Name of the original image
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return extension if extension in (".jpg", ".jpeg") else ".png"
+
+
+def derivative_filename(filename: str, name: str, webp: bool = False) -> str:
+    """Name of a derivative, relative to ``UPLOADED_DERIVATIVES_DEST``.
+
+    :param filename: Name of the original image in its upload set
+    :param name: Name of the derivative in :py:data:`DERIVATIVES`
+    :param webp: Whether to get the name of the WebP variant
+    :return: The derivative name, such as ``photos/event-12-0123456789ab-event_card.jpg``
+    """
+    stem = os.path.splitext(filename)[0]
+    extension = WEBP_EXTENSION if webp else _output_extension(filename)
+    return f"{DERIVATIVES[name].upload_set}/{stem}-{name}{extension}"
+
+
+def derivative_path(filename: str, name: str, webp: bool = False) -> str:
+    """Absolute path of a derivative, see :py:func:`derivative_filename`"""
+    return os.path.join(
+        current_app.config["UPLOADED_DERIVATIVES_DEST"],
+        derivative_filename(filename, name, webp),
+    )
+
+
+def _save(image: Image.Image, path: str, quality: int):
+    """Save a derivative atomically, so that it is never served half written.
+
+    :param image: Resized image
+    :param path: Destination path, whose extension gives the format
+    :param quality: Quality of JPEG and WebP files
+    """
+    tmp_path = f"{path}.tmp"
+    if path.endswith(WEBP_EXTENSION):
+        image.save(tmp_path, "WEBP", quality=quality)
+    elif path.endswith(".png"):
+        image.save(tmp_path, "PNG", optimize=True)
+    else:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.save(tmp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def render_derivatives(
+    source: str, outputs: List[Tuple[str, ImageDerivative, int]]
+) -> int:
+    """Job of :py:data:`collectives.utils.image_pool.image_pool` writing
+    derivatives of an image.
+
+    :param source: Path of the original image
+    :param outputs: Path, derivative and quality of each file to write
+    :return: Number of written files
+    """
+    # Large enough for all derivatives, whatever the EXIF orientation
+    size = max(
+        max(derivative.width, derivative.height or 0) for _, derivative, _ in outputs
+    )
+    with open_image(source, (size, size)) as image:
+        original = ImageOps.exif_transpose(image)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA")
+        resized = {}
+        for path, derivative, quality in outputs:
+            if derivative not in resized:
+                resized[derivative] = derivative.resize(original)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _save(resized[derivative], path, quality)
+    return len(outputs)
+
+
+def generate_derivatives(upload_set: str, filename: str) -> int:
+    """Generate the missing derivatives of an uploaded image, in
+    :py:data:`collectives.utils.image_pool.image_pool`.
+
+    :param upload_set: Name of the upload set of the image
+    :param filename: Name of the image in its upload set, as given by
+        :py:func:`hashed_name`
+    :return: Number of generated files
+    """
+    config = current_app.config
+    outputs = [
+        (
+            derivative_path(filename, name, webp),
+            DERIVATIVES[name],
+            config["IMAGES_WEBP_QUALITY" if webp else "IMAGES_JPEG_QUALITY"],
+        )
+        for name in derivative_names(upload_set)
+        for webp in (False, True)
+    ]
+    outputs = [output for output in outputs if not os.path.exists(output[0])]
+    if not outputs:
+        return 0
+    return image_pool.run(
+        "derivatives",
+        render_derivatives,
+        upload_set_path(upload_set, filename),
+        outputs,
+    )
+
+
+def delete_derivatives(upload_set: str, filename: str):
+    """Remove all the derivatives of an uploaded image.
+
+    :param upload_set: Name of the upload set of the image
+    :param filename: Name of the image in its upload set
+    """
+    for name in derivative_names(upload_set):
+        for webp in (False, True):
+            try:
+                os.remove(derivative_path(filename, name, webp))
+            except (OSError, FileNotFoundError):
+                # If the file does not exist, we just ignore the error
+                pass
+
+
+def save_derivatives(upload_set: str, filename: str) -> bool:
+    """Generate the derivatives of a newly uploaded image, logging failures.
+
+    Images whose derivatives cannot be generated are still resized on demand by
+    Flask-Images.
+
+    :param upload_set: Name of the upload set of the image
+    :param filename: Name of the image in its upload set
+    :return: Whether the derivatives have been generated
+    """
+    try:
+        generate_derivatives(upload_set, filename)
+    except (OSError, ValueError, RuntimeError, Image.DecompressionBombError) as err:
+        current_app.logger.warning(
+            f"Cannot generate derivatives of {upload_set}/{filename}: {err}"
+        )
+        return False
+    return True
+
+
+def has_derivative(filename: str, name: str) -> bool:
+    """Check whether a derivative of an uploaded image has been generated.
+
+    :param filename: Name of the original image in its upload set
+    :param name: Name of the derivative in :py:data:`DERIVATIVES`
+    :return: Whether the derivative can be served
+    """
+    return is_hashed_name(filename) and os.path.exists(derivative_path(filename, name))
+
+
+def derived_image_url(filename: str, name: str, **kwargs) -> str:
+    """URL of a derivative of an uploaded image.
+
+    Falls back to an URL of Flask-Images if the derivative has not been
+    generated.
+
+    :param filename: Name of the original image in its upload set
+    :param name: Name of the derivative in :py:data:`DERIVATIVES`
+    :param kwargs: Additional arguments of :py:func:`flask.url_for`
+    :return: The URL
+    """
+    if has_derivative(filename, name):
+        return url_for(
+            "root.derived_image", path=derivative_filename(filename, name), **kwargs
+        )
+    return DERIVATIVES[name].fallback_url(filename, **kwargs)
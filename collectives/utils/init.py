@@ -169,6 +169,9 @@ def init_admin(app):
 def init_config(app, force=False, path="collectives/configuration.yaml", clean=True):
     """Load configuration items at app creation.
 
+    All the items are read with a single query, and only the modified ones are
+    written back.
+
     :param app: Flask app used for configuration
     :param bool force: If true, force content update. Default false
     :param str path: Path to YAML configuration list
@@ -179,45 +182,73 @@ def init_config(app, force=False, path="collectives/configuration.yaml", clean=T
 
     with open(path, "r", encoding="utf-8") as file:
         yaml_content = yaml.safe_load(file.read())
-        for folder, config_item in yaml_content.items():
-            for name, config in config_item.items():
-                item = Configuration.get_item(name)
-
-                if config.get("obsolete", False):
-                    if item is not None:
-                        db.session.delete(item)
-                        app.logger.warning(
-                            f"Obsolete configuration item {item.name}: deleting"
-                        )
-                    continue
-
-                if item is None:
-                    app.logger.info(f"Absent configuration item {name}: creating")
-                    item = ConfigurationItem(name)
-                    item.content = config["content"]
-                elif force or config.get("force", False):
-                    Configuration.uncache(item.name)
-                    item.content = config["content"]
 
-                item.description = config["description"]
-                item.hidden = config.get("hidden", False)
-                item.folder = folder
-                item.type = getattr(ConfigurationTypeEnum, config["type"])
+    items = {item.name: item for item in ConfigurationItem.query.all()}
+    for folder, config_item in yaml_content.items():
+        for name, config in config_item.items():
+            item = items.get(name)
+
+            if config.get("obsolete", False):
+                if item is not None:
+                    db.session.delete(item)
+                    app.logger.warning(
+                        f"Obsolete configuration item {item.name}: deleting"
+                    )
+                continue
+
+            if item is None:
+                app.logger.info(f"Absent configuration item {name}: creating")
+                item = ConfigurationItem(name)
+                item.content = config["content"]
                 db.session.add(item)
+            elif force or config.get("force", False):
+                if item.content != config["content"]:
+                    item.content = config["content"]
 
-        if clean:
-            folders = [list(folder.keys()) for folder in yaml_content.values()]
-            all_keys = functools.reduce(operator.iadd, folders, [])
-            absent_conf = sqlalchemy.not_(ConfigurationItem.name.in_(all_keys))
+            _update(item, "description", config["description"])
+            _update(item, "hidden", config.get("hidden", False))
+            _update(item, "folder", folder)
+            _update(item, "type", getattr(ConfigurationTypeEnum, config["type"]))
 
-            for item in ConfigurationItem.query.filter(absent_conf).all():
-                app.logger.warning(f"Unknown configuration item {item.name}: deleting")
+    if clean:
+        folders = [list(folder.keys()) for folder in yaml_content.values()]
+        all_keys = set(functools.reduce(operator.iadd, folders, []))
 
-            ConfigurationItem.query.filter(absent_conf).delete(
-                synchronize_session=False
-            )
+        for name, item in items.items():
+            if name not in all_keys:
+                app.logger.warning(f"Unknown configuration item {name}: deleting")
+                db.session.delete(item)
 
-        db.session.commit()
+    db.session.commit()
+
+
+def _update(item, attribute, value):
+    """Set an attribute of a configuration item, if its value changed.
+
+    :param item: The configuration item
+    :param str attribute: Name of the attribute
+    :param value: New value of the attribute
+    """
+    if getattr(item, attribute) != value:
+        setattr(item, attribute, value)
+
+
+def initialize(app, assets: bool = True):
+    """Populates the database with initial values and compiles stylesheets.
+
+    Run by ``flask collectives init`` once per deployment, after ``flask db
+    upgrade``. Can be run again at any time. See :py:data:`config.APP_INIT`
+
+    :param app: The Flask application
+    :type app: :py:class:`flask.Application`
+    :param bool assets: Whether to compile stylesheets
+    """
+    init_config(app)
+    init_admin(app)
+    activity_types(app)
+    event_types(app)
+    if assets:
+        app.jinja_env.assets_environment["scss_all"].build()
 
 
 def populate_db(app):
@@ -10,6 +10,7 @@ from collectives import models
 from collectives.routes.auth import get_bad_phone_message
 from collectives.utils import numbers
 from collectives.utils import time as custom_time
+from collectives.utils.images import derived_image_url
 from collectives.utils.misc import is_mobile_user
 from collectives.utils.render_markdown import markdown_to_html
 
@@ -29,6 +30,7 @@ def helpers_processor():
     helper_functions["Configuration"] = models.Configuration
     helper_functions["markdown_to_html"] = markdown_to_html
     helper_functions["map_method"] = map_method
+    helper_functions["derived_image_url"] = derived_image_url
     helper_functions["str"] = str
 
     return helper_functions
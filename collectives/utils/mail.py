@@ -10,35 +10,912 @@ DKIM. Conf are taken from app :py:mod:`config`:
 - :py:data:`config.SMTP_PASSWORD`: Password of SMTP server
 - :py:data:`config.DKIM_SELECTOR`: DKIM selector, usually default
 - :py:data:`config.DKIM_KEY`: DKIM private key as PEM format
+
+Mails are not sent by request handlers: :py:func:`send_mail` stores them in
+the durable :py:data:`mail_spool`, or puts them in the in-memory
+:py:data:`mail_queue`. Both are sent by batches over authenticated connections
+kept in a :py:class:`SMTPConnectionPool`.
+
+dkim is only imported when a message is first signed, so that processes which
+do not send mails do not load it.
 """
 
 import email
+import json
+import queue
 import smtplib
 import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from functools import lru_cache, partial
+from typing import Callable, Dict, Iterator, List, NamedTuple
 
-# pylint: disable=E0001
-import dkim
-
-# pylint: enable=E0001
+import click
 import flask
+from flask import Flask
+from sqlalchemy import and_, event, func, or_, select, update
+from sqlalchemy.orm import Session
 
-from collectives.models import Configuration
+from collectives.models import Configuration, SpooledMail, SpooledMailStatus, db
+from collectives.utils.time import current_time
 
 
-def send_mail(**kwargs):
-    """Wrapper for :py:func:`send_mail_threaded`"""
-    threading.Thread(
-        target=send_mail_threaded,
+class SMTPSettings(NamedTuple):
+    """Parameters of a connection to the SMTP server."""
+
+    host: str
+    port: int
+    login: str
+    password: str
+
+    @classmethod
+    def current(cls) -> "SMTPSettings":
+        """:return: the settings of the current configuration"""
+        return cls(
+            host=Configuration.SMTP_HOST,
+            port=Configuration.SMTP_PORT,
+            login=Configuration.SMTP_LOGIN or Configuration.SMTP_ADDRESS,
+            password=Configuration.SMTP_PASSWORD,
+        )
+
+
+class SMTPConnectionPool:
+    """Thread-safe pool of authenticated SMTP connections.
+
+    Connections are returned to the pool after use, and reused if they have
+    not been idle for more than ``idle_timeout`` seconds and the settings did
+    not change. Connections which raised an error are closed.
+    """
+
+    def __init__(self, max_idle: int = 1, idle_timeout: float = 30):
+        """Constructor
+
+        :param max_idle: Maximum number of idle connections kept open
+        :param idle_timeout: Number of seconds an idle connection can be reused
+        """
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.opened = 0
+        """ Number of connections opened since startup """
+        self._idle: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, settings: SMTPSettings) -> smtplib.SMTP:
+        """Get a connection from the pool, opening a new one if needed.
+
+        :param settings: Settings the connection must use
+        :return: An authenticated connection
+        """
+        with self._lock:
+            while self._idle:
+                idle_settings, smtp, idle_since = self._idle.pop()
+                if (
+                    idle_settings == settings
+                    and time.monotonic() - idle_since < self.idle_timeout
+                ):
+                    return smtp
+                self.discard(smtp)
+
+        smtp = smtplib.SMTP(host=settings.host, port=settings.port)
+        try:
+            smtp.starttls()
+            smtp.login(settings.login, settings.password)
+        except BaseException:
+            self.discard(smtp)
+            raise
+        self.opened += 1
+        return smtp
+
+    def release(self, settings: SMTPSettings, smtp: smtplib.SMTP):
+        """Give a connection back to the pool.
+
+        :param settings: Settings used by the connection
+        :param smtp: The connection
+        """
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((settings, smtp, time.monotonic()))
+                return
+        self.discard(smtp)
+
+    @staticmethod
+    def discard(smtp: smtplib.SMTP):
+        """Close a connection, ignoring errors.
+
+        :param smtp: The connection
+        """
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    @contextmanager
+    def connection(self, settings: SMTPSettings) -> Iterator[smtplib.SMTP]:
+        """Context manager providing a connection from the pool.
+
+        The connection is closed if an exception is raised, released otherwise.
+
+        :param settings: Settings the connection must use
+        """
+        smtp = self.acquire(settings)
+        try:
+            yield smtp
+        except BaseException:
+            self.discard(smtp)
+            raise
+        self.release(settings, smtp)
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, smtp, _ in idle:
+            self.discard(smtp)
+
+    def __len__(self) -> int:
+        """:return: the number of idle connections"""
+        return len(self._idle)
+
+
+class DkimSigner(NamedTuple):
+    """DKIM signature parameters, encoded once for all messages."""
+
+    selector: bytes
+    domain: bytes
+    private_key: bytes
+
+    def sign(self, msg: MIMEMultipart):
+        """Add the DKIM-Signature header to a message.
+
+        :param msg: The message to sign
+        """
+        # pylint: disable=import-outside-toplevel
+        import dkim
+
+        sig = dkim.sign(
+            message=msg.as_bytes(),
+            selector=self.selector,
+            domain=self.domain,
+            privkey=self.private_key,
+            include_headers=["From", "To", "Subject", "Message-ID"],
+        )
+        msg["DKIM-Signature"] = sig.decode("ascii").lstrip("DKIM-Signature: ")
+
+
+@lru_cache(maxsize=4)
+def get_dkim_signer(key: str, selector: str, address: str) -> DkimSigner | None:
+    """Returns the DKIM signer for the given configuration.
+
+    :param key: PEM private key, see :py:data:`config.DKIM_KEY`
+    :param selector: DKIM selector, see :py:data:`config.DKIM_SELECTOR`
+    :param address: Sender address, whose domain is used
+    :return: The signer, or None if DKIM is disabled
+    """
+    if key == "" or selector == "":
+        return None
+    return DkimSigner(
+        selector=selector.encode(),
+        domain=address.rsplit("@", maxsplit=1)[-1].encode(),
+        private_key=key.replace("\r", "").encode(),
+    )
+
+
+def build_message(app: Flask, **kwargs) -> MIMEMultipart | None:
+    """Build and sign a mail. Must be called in an app context.
+
+    :param app: The Flask application
+    :param \\**kwargs: See :py:func:`send_mail_threaded`
+    :return: The message, or None if it has no recipient
+    """
+    dest = kwargs["email"]
+    if not dest:
+        # Attempt to send an email with empty dest would result in an error
+        return None
+
+    msg = MIMEMultipart()
+
+    msg["From"] = Configuration.SMTP_ADDRESS
+    msg["Subject"] = kwargs["subject"]
+    msg["Message-ID"] = email.utils.make_msgid(domain=app.config["SERVER_NAME"])
+    msg["Date"] = email.utils.formatdate()
+
+    if isinstance(dest, list):
+        msg["Bcc"] = ",".join(dest)
+    else:
+        msg["To"] = dest
+
+    msg.attach(MIMEText(kwargs["message"], "plain", "utf-8"))
+
+    # DKIM part
+    signer = get_dkim_signer(
+        Configuration.DKIM_KEY, Configuration.DKIM_SELECTOR, Configuration.SMTP_ADDRESS
+    )
+    if signer is not None:
+        signer.sign(msg)
+
+    return msg
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether sending a mail may succeed if retried after an error.
+
+    :param error: The error raised while sending
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500 or error.smtp_code == -1
+    return isinstance(error, (smtplib.SMTPException, OSError))
+
+
+@dataclass
+class QueuedMail:
+    """A mail waiting in :py:class:`MailQueue`."""
+
+    app: Flask
+    """ Application which sent the mail """
+    kwargs: Dict
+    """ Arguments of :py:func:`send_mail` """
+    enqueue_time: float = field(default_factory=time.monotonic)
+    """ When the mail has been queued, see :py:func:`time.monotonic` """
+    attempts: int = 0
+    """ Number of failed attempts to send the mail """
+
+
+class MailQueue:
+    """Bounded queue of mails, sent by a single worker thread.
+
+    The worker takes up to ``MAIL_BATCH_SIZE`` mails at once and sends them
+    over one pooled connection. Mails failing with a transient error are
+    retried up to ``MAIL_MAX_RETRIES`` times, waiting ``MAIL_RETRY_DELAY``
+    seconds, doubled after each attempt.
+    """
+
+    LATENCY_WINDOW = 100
+    """ Number of recent mails on which the send latency is measured """
+
+    def __init__(self):
+        """Constructor"""
+        self.queue: queue.Queue | None = None
+        self.max_size = 1000
+        self.pool = SMTPConnectionPool()
+        self.batch_size = 20
+        self.max_retries = 3
+        self.retry_delay = 5.0
+        self.enqueue_timeout = 5.0
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._latencies: deque = deque(maxlen=self.LATENCY_WINDOW)
+        self._retries: List[tuple] = []
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask):
+        """Reads the queue settings from the app configuration.
+
+        :param app: The Flask application
+        """
+        self.max_size = app.config["MAIL_QUEUE_SIZE"]
+        self.pool.close()
+        self.pool = SMTPConnectionPool(
+            max_idle=app.config["MAIL_SMTP_POOL_SIZE"],
+            idle_timeout=app.config["MAIL_SMTP_IDLE_TIMEOUT"],
+        )
+        self.batch_size = app.config["MAIL_BATCH_SIZE"]
+        self.max_retries = app.config["MAIL_MAX_RETRIES"]
+        self.retry_delay = app.config["MAIL_RETRY_DELAY"]
+        self.enqueue_timeout = app.config["MAIL_ENQUEUE_TIMEOUT"]
+
+    def put(self, app: Flask, **kwargs):
+        """Queue a mail, waiting for room if the queue is full.
+
+        The worker thread is started on first use, so that it is not created
+        before server processes are forked.
+
+        :param app: The Flask application sending the mail
+        :param \\**kwargs: See :py:func:`send_mail_threaded`
+        :raises queue.Full: if the queue stays full for ``MAIL_ENQUEUE_TIMEOUT``
+        """
+        self._ensure_worker()
+        self.queue.put(QueuedMail(app, kwargs), timeout=self.enqueue_timeout)
+
+    def join(self):
+        """Wait until all queued mails have been processed."""
+        if self.queue is not None:
+            self.queue.join()
+
+    def stats(self) -> Dict:
+        """:return: depth of the queue, counters and send latency in ms"""
+        latencies = list(self._latencies)
+        return {
+            "depth": (self.queue.qsize() if self.queue else 0) + len(self._retries),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "connections": self.pool.opened,
+            "latency_avg": (
+                round(1000 * sum(latencies) / len(latencies)) if latencies else 0
+            ),
+            "latency_max": round(1000 * max(latencies)) if latencies else 0,
+        }
+
+    def _ensure_worker(self):
+        """Create the queue and start the worker thread if it is not running.
+
+        The queue is kept when the worker is restarted, so that mails are not lost.
+        """
+        with self._lock:
+            if self.queue is None:
+                self.queue = queue.Queue(maxsize=self.max_size)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="mail-queue", daemon=True
+                )
+                self._worker.start()
+
+    def _next_batch(self) -> List[QueuedMail]:
+        """Wait for mails to send, then return the batch of mails to send now.
+
+        Mails waiting for a retry are part of the batch once their delay is over.
+        """
+        now = time.monotonic()
+        ready = [mail for retry_time, mail in self._retries if retry_time <= now]
+        self._retries = [entry for entry in self._retries if entry[0] > now]
+
+        timeout = None
+        if ready:
+            timeout = 0
+        elif self._retries:
+            timeout = min(retry_time for retry_time, _ in self._retries) - now
+
+        batch = ready
+        try:
+            if len(batch) < self.batch_size:
+                batch.append(self.queue.get(timeout=timeout))
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        """Worker loop, sending mails by batches."""
+        while True:
+            batch = self._next_batch()
+            # Group mails by application, since the configuration may differ
+            by_app: Dict[Flask, List[QueuedMail]] = {}
+            for mail in batch:
+                by_app.setdefault(mail.app, []).append(mail)
+            for app, mails in by_app.items():
+                with app.app_context():
+                    self._send_batch(app, mails)
+
+    def _send_batch(self, app: Flask, mails: List[QueuedMail]):
+        """Send mails over pooled connections. Must be called in an app context.
+
+        :param app: The Flask application of the mails
+        :param mails: Mails to send
+        """
+        send_by_connection(
+            self.pool,
+            mails,
+            partial(self._send_one, app),
+            partial(self._handle_error, app),
+        )
+
+    def _send_one(self, app: Flask, smtp: smtplib.SMTP, mail: QueuedMail):
+        """Send a mail and run its success action.
+
+        :param app: The Flask application of the mail
+        :param smtp: Connection to use
+        :param mail: The mail to send
+        """
+        msg = build_message(app, **mail.kwargs)
+        if msg is None:
+            self.queue.task_done()
+            return
+
+        smtp.send_message(msg)
+        self.sent += 1
+        self._latencies.append(time.monotonic() - mail.enqueue_time)
+        if "success_action" in mail.kwargs:
+            _run_action(app, mail.kwargs["success_action"])
+        self.queue.task_done()
+
+    def _handle_error(self, app: Flask, mail: QueuedMail, error: Exception):
+        """Schedule a retry of a mail which could not be sent, or give up.
+
+        :param app: The Flask application of the mail
+        :param mail: The mail which could not be sent
+        :param error: The error raised while sending
+        """
+        dest = mail.kwargs["email"]
+        if is_transient_error(error) and mail.attempts < self.max_retries:
+            delay = self.retry_delay * 2**mail.attempts
+            mail.attempts += 1
+            self.retried += 1
+            app.logger.warning(f"Unable to send mail to {dest}, retry in {delay}s")
+            self._retries.append((time.monotonic() + delay, mail))
+            return
+
+        app.logger.error(f"Unable to send mail to {dest}", exc_info=error)
+        self.failed += 1
+        if "error_action" in mail.kwargs:
+            _run_action(app, mail.kwargs["error_action"], error)
+        self.queue.task_done()
+
+
+def send_by_connection(pool: SMTPConnectionPool, mails: List, send, on_error):
+    """Send mails over a single pooled connection.
+
+    If a mail fails, the connection is closed and the next mails are sent
+    over a new one.
+
+    :param pool: Pool providing the connections
+    :param mails: Mails to send
+    :param send: Function sending a mail, called with the connection and the mail
+    :param on_error: Function called with a mail and the error if it failed
+    """
+    pending = deque(mails)
+    while pending:
+        try:
+            settings = SMTPSettings.current()
+            smtp = pool.acquire(settings)
+        # pylint: disable=broad-except
+        except Exception as ex:
+            for mail in pending:
+                on_error(mail, ex)
+            return
+
+        try:
+            while pending:
+                send(smtp, pending[0])
+                pending.popleft()
+        except Exception as ex:
+            pool.discard(smtp)
+            on_error(pending.popleft(), ex)
+        # pylint: enable=broad-except
+        else:
+            pool.release(settings, smtp)
+
+
+def _run_action(app: Flask, action, *args):
+    """Run a success or error action, logging its errors.
+
+    :param app: The Flask application of the mail
+    :param action: The function to call
+    :param args: Arguments of the action
+    """
+    try:
+        action(*args)
+    # pylint: disable=broad-except
+    except Exception:
+        app.logger.exception("Error in mail action")
+    # pylint: enable=broad-except
+
+
+mail_queue = MailQueue()
+""" Queue of mails to be sent by the mail worker """
+
+
+MAIL_ACTIONS: Dict[str, Callable] = {}
+""" Functions which can be used as actions of spooled mails, by name """
+
+
+def mail_action(function: Callable) -> Callable:
+    """Decorator registering a function as a possible action of spooled mails.
+
+    Spooled mails can only store registered functions, or
+    :py:func:`functools.partial` of registered functions with positional
+    arguments that can be serialized to JSON. Error actions receive the error
+    as last argument.
+
+    :param function: The function to register
+    :return: The function, unchanged
+    """
+    MAIL_ACTIONS[_action_name(function)] = function
+    return function
+
+
+def _action_name(function: Callable) -> str:
+    """:return: name under which a function is registered in :py:data:`MAIL_ACTIONS`"""
+    return f"{function.__module__}.{function.__qualname__}"
+
+
+def dump_action(action: Callable | None) -> Dict | None:
+    """Converts a mail action to a JSON-serializable dict.
+
+    :param action: The action, see :py:func:`mail_action`
+    :return: The name and arguments of the action, or None if there is no action
+    :raises TypeError: if the action cannot be stored
+    """
+    if action is None:
+        return None
+    args = ()
+    if isinstance(action, partial):
+        if action.keywords:
+            raise TypeError("Mail actions do not support keyword arguments")
+        action, args = action.func, action.args
+    name = _action_name(action)
+    if MAIL_ACTIONS.get(name) is not action:
+        raise TypeError(f"{name} is not a registered mail action")
+    json.dumps(args)
+    return {"name": name, "args": list(args)}
+
+
+def load_action(data: Dict | None) -> Callable | None:
+    """Converts back an action converted by :py:func:`dump_action`.
+
+    :param data: The stored action
+    :return: The action, or None if there is no action
+    """
+    if data is None:
+        return None
+    return partial(MAIL_ACTIONS[data["name"]], *data["args"])
+
+
+class MailSpool:
+    """Durable spool of mails, stored in the database.
+
+    :py:meth:`put` does not write to the database right away: mails are kept
+    in the SQLAlchemy session and written after it is committed, or at the end
+    of the application context. They are dropped if the session is explicitly
+    rolled back. This way spooling never waits for locks held by the request
+    transaction, and no mail is sent about changes which were cancelled.
+
+    The spool is drained by :py:meth:`run`, either in a thread of each server
+    process, or by the ``flask collectives send-mails`` command, depending on
+    :py:data:`config.MAIL_SPOOL_WORKER`. Workers claim up to
+    ``MAIL_BATCH_SIZE`` mails for ``MAIL_SPOOL_LEASE`` seconds, so that
+    several workers can run at once and mails claimed by a crashed worker are
+    eventually sent by another one. Retries follow the rules of
+    :py:class:`MailQueue`, and sent mails are deleted from the spool.
+    """
+
+    SESSION_KEY = "spooled_mails"
+    """ Key of the mails waiting for a commit in the ``info`` of the session """
+
+    def __init__(self):
+        """Constructor"""
+        self.pool = SMTPConnectionPool()
+        self.batch_size = 20
+        self.max_retries = 3
+        self.retry_delay = 5.0
+        self.poll_interval = 5.0
+        self.lease = 300
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._wakeup = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    def init_app(self, app: Flask):
+        """Reads the spool settings from the app configuration, and writes
+        spooled mails at the end of application contexts.
+
+        :param app: The Flask application
+        """
+        self.pool = mail_queue.pool
+        self.batch_size = app.config["MAIL_BATCH_SIZE"]
+        self.max_retries = app.config["MAIL_MAX_RETRIES"]
+        self.retry_delay = app.config["MAIL_RETRY_DELAY"]
+        self.poll_interval = app.config["MAIL_SPOOL_POLL_INTERVAL"]
+        self.lease = app.config["MAIL_SPOOL_LEASE"]
+
+        app.teardown_appcontext(self._write_remaining)
+        for name, listener in (
+            ("after_commit", self._write_committed),
+            ("after_soft_rollback", self._drop_rolled_back),
+        ):
+            if not event.contains(Session, name, listener):
+                event.listen(Session, name, listener)
+
+    def put(self, **kwargs):
+        """Add a mail to the spool, once the current session is committed.
+
+        :param \\**kwargs: See :py:func:`send_mail_threaded`
+        :raises TypeError: if the actions of the mail cannot be stored, see
+            :py:func:`mail_action`
+        """
+        now = current_time()
+        mail = SpooledMail(
+            subject=kwargs["subject"],
+            recipients=kwargs["email"],
+            message=kwargs["message"],
+            success_action=dump_action(kwargs.get("success_action")),
+            error_action=dump_action(kwargs.get("error_action")),
+            status=SpooledMailStatus.Pending,
+            creation_time=now,
+            next_attempt_time=now,
+            attempts=0,
+        )
+        db.session.info.setdefault(self.SESSION_KEY, []).append(mail)
+
+    def _write_committed(self, session: Session):
+        """Write the mails spooled in a session which has just been committed.
+
+        :param session: The committed session
+        """
+        mails = session.info.pop(self.SESSION_KEY, None)
+        if mails:
+            self._write(mails)
+
+    def _drop_rolled_back(self, session: Session, previous_transaction):
+        """Drop the mails spooled in a transaction which has been rolled back.
+
+        Rolling back a savepoint keeps the mails.
+
+        :param session: The rolled back session
+        :param previous_transaction: The transaction which was rolled back
+        """
+        if previous_transaction.parent is None:
+            session.info.pop(self.SESSION_KEY, None)
+
+    def _write_remaining(self, _exception: BaseException | None = None):
+        """Write the mails spooled in a session which has not been committed.
+
+        Mails are written even if the session has uncommitted changes, as
+        handlers may notify users without committing. The session is rolled back
+        first, as it would be at the end of the application context.
+        """
+        if not db.session.registry.has():
+            return
+        mails = db.session.info.pop(self.SESSION_KEY, None)
+        if mails:
+            db.session.rollback()
+            self._write(mails)
+
+    def _write(self, mails: List[SpooledMail]):
+        """Insert mails in the spool, using a separate session. If the database
+        cannot be written, mails are sent through :py:data:`mail_queue`.
+
+        :param mails: The mails to insert
+        """
         # pylint: disable=W0212
-        args=(flask.current_app._get_current_object(),),
-        kwargs=kwargs,
-    ).start()
+        app = flask.current_app._get_current_object()
+        try:
+            with Session(db.engine) as session:
+                session.add_all(mails)
+                session.commit()
+        # pylint: disable=broad-except
+        except Exception:
+            app.logger.exception("Unable to write mails to the spool")
+            for mail in mails:
+                _queue_mail(
+                    app,
+                    subject=mail.subject,
+                    email=mail.recipients,
+                    message=mail.message,
+                )
+        # pylint: enable=broad-except
+        self._wakeup.set()
+
+    def claim(self) -> List[SpooledMail]:
+        """Claim the next batch of mails to send.
+
+        :return: Mails that are now claimed by this worker
+        """
+        now = current_time()
+        available = and_(
+            SpooledMail.status == SpooledMailStatus.Pending,
+            SpooledMail.next_attempt_time <= now,
+            or_(SpooledMail.claim_expiry.is_(None), SpooledMail.claim_expiry < now),
+        )
+        ids = db.session.scalars(
+            select(SpooledMail.id)
+            .where(available)
+            .order_by(SpooledMail.id)
+            .limit(self.batch_size)
+        ).all()
+        if not ids:
+            return []
+
+        # Mails claimed meanwhile by another worker are not available anymore
+        token = str(uuid.uuid4())
+        db.session.execute(
+            update(SpooledMail)
+            .where(SpooledMail.id.in_(ids), available)
+            .values(
+                claim_token=token, claim_expiry=now + timedelta(seconds=self.lease)
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        db.session.commit()
+        return db.session.scalars(
+            select(SpooledMail)
+            .where(SpooledMail.claim_token == token)
+            .order_by(SpooledMail.id)
+        ).all()
+
+    def drain(self, app: Flask) -> int:
+        """Send a batch of spooled mails. Must be called in an app context.
+
+        :param app: The Flask application
+        :return: The number of claimed mails
+        """
+        mails = self.claim()
+        send_by_connection(
+            self.pool,
+            mails,
+            partial(self._send_one, app),
+            partial(self._handle_error, app),
+        )
+        return len(mails)
+
+    def run(self, app: Flask, until_empty: bool = False):
+        """Send spooled mails by batches, waiting for new mails when no mail
+        can be sent right now.
+
+        :param app: The Flask application
+        :param until_empty: Whether to return once no mail can be sent right now
+        """
+        while True:
+            with app.app_context():
+                try:
+                    count = self.drain(app)
+                # pylint: disable=broad-except
+                except Exception:
+                    app.logger.exception("Unable to send spooled mails")
+                    count = 0
+                # pylint: enable=broad-except
+                finally:
+                    db.session.remove()
+            if count < self.batch_size:
+                if until_empty:
+                    return
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def start_worker(self, app: Flask):
+        """Start a thread draining the spool, if
+        :py:data:`config.MAIL_SPOOL_WORKER` is ``thread``.
+
+        No thread is started by command line tools other than ``flask run``.
+
+        :param app: The application, used to create contexts in the thread
+        """
+        if not app.config["MAIL_SPOOL"] or app.config["MAIL_SPOOL_WORKER"] != "thread":
+            return
+        cli_context = click.get_current_context(silent=True)
+        if cli_context is not None and cli_context.command.name != "run":
+            return
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self.run, args=(app,), name="mail-spool", daemon=True
+            )
+            self._worker.start()
+
+    def stats(self) -> Dict:
+        """:return: number of pending and given up mails, age of the oldest
+        pending mail in seconds, and counters of this process"""
+        counts = dict(
+            db.session.execute(
+                select(SpooledMail.status, func.count(SpooledMail.id)).group_by(
+                    SpooledMail.status
+                )
+            ).all()
+        )
+        oldest = db.session.scalar(
+            select(func.min(SpooledMail.creation_time)).where(
+                SpooledMail.status == SpooledMailStatus.Pending
+            )
+        )
+        return {
+            "pending": counts.get(SpooledMailStatus.Pending, 0),
+            "given_up": counts.get(SpooledMailStatus.Failed, 0),
+            "oldest": (
+                round((current_time() - oldest).total_seconds()) if oldest else 0
+            ),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+    def _send_one(self, app: Flask, smtp: smtplib.SMTP, mail: SpooledMail):
+        """Send a spooled mail, remove it from the spool and run its success
+        action.
+
+        :param app: The Flask application
+        :param smtp: Connection to use
+        :param mail: The mail to send
+        """
+        msg = build_message(
+            app, subject=mail.subject, email=mail.recipients, message=mail.message
+        )
+        if msg is not None:
+            smtp.send_message(msg)
+            self.sent += 1
+
+        action = load_action(mail.success_action)
+        db.session.delete(mail)
+        db.session.commit()
+        if msg is not None and action is not None:
+            _run_action(app, action)
+
+    def _handle_error(self, app: Flask, mail: SpooledMail, error: Exception):
+        """Schedule a retry of a spooled mail which could not be sent, or give up.
+
+        Given up mails are kept in the spool with the ``Failed`` status.
+
+        :param app: The Flask application
+        :param mail: The mail which could not be sent
+        :param error: The error raised while sending
+        """
+        db.session.rollback()
+        mail.last_error = repr(error)
+        mail.claim_token = None
+        mail.claim_expiry = None
+
+        if is_transient_error(error) and mail.attempts < self.max_retries:
+            delay = self.retry_delay * 2**mail.attempts
+            mail.attempts += 1
+            mail.next_attempt_time = current_time() + timedelta(seconds=delay)
+            db.session.commit()
+            self.retried += 1
+            app.logger.warning(
+                f"Unable to send mail to {mail.recipients}, retry in {delay}s"
+            )
+            return
+
+        app.logger.error(f"Unable to send mail to {mail.recipients}", exc_info=error)
+        mail.status = SpooledMailStatus.Failed
+        action = load_action(mail.error_action)
+        db.session.commit()
+        self.failed += 1
+        if action is not None:
+            _run_action(app, action, error)
+
+
+mail_spool = MailSpool()
+""" Durable spool of mails, see :py:data:`config.MAIL_SPOOL` """
+
+
+def send_mail(**kwargs):
+    """Spool a mail, or queue it to be sent by :py:data:`mail_queue`.
+
+    See :py:func:`send_mail_threaded` for arguments. Mails are stored in
+    :py:data:`mail_spool` if :py:data:`config.MAIL_SPOOL` is set and their
+    actions can be stored, see :py:func:`mail_action`. If the queue is full,
+    the mail is dropped and its error action is run.
+    """
+    # pylint: disable=W0212
+    app = flask.current_app._get_current_object()
+    if app.config["MAIL_SPOOL"]:
+        try:
+            mail_spool.put(**kwargs)
+            return
+        except TypeError:
+            app.logger.debug("Mail actions cannot be spooled, using the mail queue")
+    _queue_mail(app, **kwargs)
+
+
+def _queue_mail(app: Flask, **kwargs):
+    """Queue a mail to be sent by :py:data:`mail_queue`.
+
+    :param app: The Flask application sending the mail
+    :param \\**kwargs: See :py:func:`send_mail_threaded`
+    """
+    try:
+        mail_queue.put(app, **kwargs)
+    except queue.Full as ex:
+        app.logger.error(
+            f"Mail queue is full, unable to send mail to {kwargs['email']}"
+        )
+        if "error_action" in kwargs:
+            kwargs["error_action"](ex)
 
 
 def send_mail_threaded(app, **kwargs):
-    """Send a mail.
+    """Send a mail right away, in the calling thread.
 
     Usage example:
 
@@ -63,50 +940,15 @@ def send_mail_threaded(app, **kwargs):
     """
     with app.app_context():
         try:
-            smtp = smtplib.SMTP(
-                host=Configuration.SMTP_HOST, port=Configuration.SMTP_PORT
-            )
-
-            smtp.starttls()
-            smtp.login(
-                Configuration.SMTP_LOGIN or Configuration.SMTP_ADDRESS,
-                Configuration.SMTP_PASSWORD,
-            )
-
-            msg = MIMEMultipart()
-
-            msg["From"] = Configuration.SMTP_ADDRESS
-            msg["Subject"] = kwargs["subject"]
-            msg["Message-ID"] = email.utils.make_msgid(domain=app.config["SERVER_NAME"])
-            msg["Date"] = email.utils.formatdate()
-
-            dest = kwargs["email"]
-            if not dest:
-                # Attempt to send an email with empty dest would result in an error
+            msg = build_message(app, **kwargs)
+            if msg is None:
                 return
 
-            if isinstance(dest, list):
-                msg["Bcc"] = ",".join(dest)
-            else:
-                msg["To"] = dest
-
-            msg.attach(MIMEText(kwargs["message"], "plain", "utf-8"))
-
-            # DKIM part
-            if Configuration.DKIM_KEY != "" and Configuration.DKIM_SELECTOR != "":
-                sig = dkim.sign(
-                    message=msg.as_bytes(),
-                    selector=Configuration.DKIM_SELECTOR.encode(),
-                    domain=Configuration.SMTP_ADDRESS.split("@")[-1].encode(),
-                    privkey=Configuration.DKIM_KEY.replace("\r", "").encode(),
-                    include_headers=["From", "To", "Subject", "Message-ID"],
-                )
-                msg["DKIM-Signature"] = sig.decode("ascii").lstrip("DKIM-Signature: ")
-
-            smtp.send_message(msg)
+            settings = SMTPSettings.current()
+            with mail_queue.pool.connection(settings) as smtp:
+                smtp.send_message(msg)
             if "success_action" in kwargs:
-                with app.app_context():
-                    kwargs["success_action"]()
+                kwargs["success_action"]()
         # pylint: disable=broad-except
         except Exception as ex:
             dest = kwargs["email"]
@@ -7,9 +7,11 @@ import types
 import unicodedata
 from typing import IO, Any, Union
 
-from flask import request
+from flask import current_app, request
 from PIL import Image
 
+from collectives.utils.image_pool import image_pool, verify_image
+
 
 class NoDefault:
     """Dummy Class to know if default has been set in :py:func:`deepgetattr`"""
@@ -75,6 +77,15 @@ def to_ascii(value):
     )
 
 
+def fold_search_text(value: str) -> str:
+    """Normalizes a text for accent, case and punctuation insensitive searches.
+
+    :param value: Input string
+    :return: Lower case ASCII string, with words separated by single spaces
+    """
+    return " ".join(re.split(r"[^a-z0-9]+", to_ascii(value).lower())).strip()
+
+
 def sanitize_file_name(name: str) -> str:
     """Returns  sanitized filename without characters that cannot be in a filename.
 
@@ -83,16 +94,36 @@ def sanitize_file_name(name: str) -> str:
     return re.sub(r"[^A-Za-z0-9_ .,àâäçéèêëîïôöùûüÿÀÂÄÇÉÈÊËÎÏÔÖÙÛÜŸÆŒæœ-]", "_", name)
 
 
+class ImageTooLargeError(ValueError):
+    """Exception raised when an image has more pixels than ``IMAGE_MAX_PIXELS``"""
+
+    def __init__(self, max_pixels: int):
+        """Constructor
+
+        :param max_pixels: The maximum number of pixels
+        """
+        super().__init__(
+            "L'image est trop grande : elle ne doit pas dépasser "
+            f"{max_pixels // 1_000_000} millions de pixels"
+        )
+
+
 def is_valid_image(file: Union[str, IO[bytes]]) -> bool:
     """Uses PIL to check whether a file is a valid image
 
+    The check runs in :py:data:`collectives.utils.image_pool.image_pool`. Images
+    which could not be checked because the pool is too busy are not valid.
+
     :param file: File to verify. Path or binary stream, as accepted by :func:`PIL.Image.open`
+    :raises ImageTooLargeError: if the image is larger than ``IMAGE_MAX_PIXELS``
     """
-    try:
-        with Image.open(file) as im:
-            im.verify()
-    except Exception:
-        return False
+    if isinstance(file, str):
+        source = file
+    else:
+        try:
+            source = file.read()
+        except (AttributeError, OSError):
+            return False
 
     # If passed an IO stream need to seek back to start of file
     # otherwise in some environments saved file will be incomplete
@@ -101,7 +132,13 @@ def is_valid_image(file: Union[str, IO[bytes]]) -> bool:
     except (AttributeError, io.UnsupportedOperation):
         pass
 
-    return True
+    try:
+        return image_pool.run("verify", verify_image, source)
+    except Image.DecompressionBombError as err:
+        raise ImageTooLargeError(current_app.config["IMAGE_MAX_PIXELS"]) from err
+    except (RuntimeError, TimeoutError) as err:
+        current_app.logger.warning(f"Cannot check uploaded image: {err}")
+        return False
 
 
 def truncate(value: str, max_len: int, append_ellipsis: bool = True) -> str:
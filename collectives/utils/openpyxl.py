@@ -1,9 +1,16 @@
-"""Varous helping function for openpyxl"""
+"""Varous helping function for openpyxl
 
-from openpyxl.worksheet.worksheet import Worksheet
+openpyxl is only imported when a document is built.
+"""
 
+from typing import TYPE_CHECKING, Iterable, Sequence
 
-def columns_best_fit(worksheet: Worksheet, row_blacklist: list) -> None:
+if TYPE_CHECKING:
+    from openpyxl import Workbook
+    from openpyxl.worksheet.worksheet import Worksheet
+
+
+def columns_best_fit(worksheet: "Worksheet", row_blacklist: list) -> None:
     """Make all columns best fit regarding their content.
 
     :param worksheet: The worksheet to work on
@@ -15,3 +22,53 @@ def columns_best_fit(worksheet: Worksheet, row_blacklist: list) -> None:
         worksheet.column_dimensions[column[0].column_letter].width = (
             max_length + 2
         ) * 1.2
+
+
+def best_fit_widths(rows: Iterable[Sequence]) -> dict[str, float]:
+    """Compute the width of columns best fitting their content.
+
+    Same as :py:func:`columns_best_fit`, for worksheets that are not yet written.
+
+    :param rows: Rows which should take part into the fit
+    :returns: The width of each column, by column letter
+    """
+    # pylint: disable=import-outside-toplevel
+    from openpyxl.utils import get_column_letter
+
+    lengths = {}
+    for row in rows:
+        for index, value in enumerate(row):
+            lengths[index] = max(lengths.get(index, 0), len(str(value)))
+    return {
+        get_column_letter(index + 1): (length + 2) * 1.2
+        for index, length in lengths.items()
+    }
+
+
+def append_titled_sheet(
+    workbook: "Workbook", name: str, title: str, rows: Sequence[Sequence]
+) -> None:
+    """Append a sheet starting with a large title to a write-only workbook.
+
+    Columns best fit the content of ``rows``, except for the first one which
+    usually holds a description.
+
+    :param workbook: The write-only workbook
+    :param name: Name of the sheet
+    :param title: Text of the first line
+    :param rows: Content of the sheet, after the title
+    """
+    # pylint: disable=import-outside-toplevel
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    worksheet = workbook.create_sheet(name)
+    for column, width in best_fit_widths(rows[1:]).items():
+        worksheet.column_dimensions[column].width = width
+    worksheet.row_dimensions[1].height = 25
+
+    title_cell = WriteOnlyCell(worksheet, value=title)
+    title_cell.font = Font(size=20, bold=True)
+    worksheet.append([title_cell])
+    for row in rows:
+        worksheet.append(row)
@@ -1,20 +1,25 @@
-"""Module to handle connexions to Payline."""
+"""Module to handle connexions to Payline.
+
+pysimplesoap is only imported when Payline is first called, so that server
+processes which never call it do not load it.
+"""
 
 import base64
 import decimal
 import json
 import uuid
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict
 
-import pysimplesoap
 from flask import Flask, current_app, request, url_for
-from pysimplesoap.client import SoapClient
 
 from collectives.models import Configuration, User
 from collectives.models.payment import Payment, PaymentStatus
 from collectives.utils.misc import to_ascii, truncate
 from collectives.utils.time import format_date
 
+if TYPE_CHECKING:
+    from pysimplesoap.client import SoapClient
+
 PAYLINE_VERSION = 26
 """ Version of payline API
 :type: int
@@ -350,9 +355,9 @@ class PaylineApi:
     def __init__(self):
         """Constructor"""
 
-        self._webpayment_client: SoapClient = None
+        self._webpayment_client: "SoapClient" = None
         """ SOAP client object to connect to Payline WebPaymentAPI."""
-        self._directpayment_client: SoapClient = None
+        self._directpayment_client: "SoapClient" = None
         """ SOAP client object to connect to Payline DirectPaymentAPI."""
 
         self.payline_currency: str = ""
@@ -402,11 +407,13 @@ class PaylineApi:
             self.payline_merchant_id.encode() + b":" + self.payline_access_key.encode()
         ).decode("utf-8")
 
-    def _create_client(self, wsdl_path: str) -> SoapClient:
+    def _create_client(self, wsdl_path: str) -> "SoapClient":
         """Creates a SOAP client from a WSDL file
 
         :param wsdl_path: Relative path to the wsdl file
         """
+        # pylint: disable=import-outside-toplevel
+        from pysimplesoap.client import SoapClient
 
         return SoapClient(
             wsdl=wsdl_path,
@@ -418,7 +425,7 @@ class PaylineApi:
         )
 
     @property
-    def webpayment_client(self) -> SoapClient:
+    def webpayment_client(self) -> "SoapClient":
         """Cached SOAP client object to connect to Payline WebPaymentAPI."""
         if self._webpayment_client is None:
             self._webpayment_client = self._create_client(
@@ -428,7 +435,7 @@ class PaylineApi:
         return self._webpayment_client
 
     @property
-    def directpayment_client(self) -> SoapClient:
+    def directpayment_client(self) -> "SoapClient":
         """Cached SOAP client object to connect to Payline DirectPaymentAPI."""
         if self._directpayment_client is None:
             self._directpayment_client = self._create_client(
@@ -462,6 +469,9 @@ class PaylineApi:
 
             return payment_response
 
+        # pylint: disable=import-outside-toplevel
+        from pysimplesoap.client import SoapFault
+
         try:
             response = self.webpayment_client.doWebPayment(
                 version=PAYLINE_VERSION,
@@ -505,7 +515,7 @@ class PaylineApi:
 
             return payment_response
 
-        except pysimplesoap.client.SoapFault as err:
+        except SoapFault as err:
             current_app.logger.error(f"Payment API error: {err}")
 
         return None
@@ -534,13 +544,16 @@ class PaylineApi:
             }
             return PaymentDetails(response)
 
+        # pylint: disable=import-outside-toplevel
+        from pysimplesoap.client import SoapFault
+
         try:
             response = self.webpayment_client.getWebPaymentDetails(
                 version=PAYLINE_VERSION, token=token
             )
             return PaymentDetails(response)
 
-        except pysimplesoap.client.SoapFault as err:
+        except SoapFault as err:
             current_app.logger.error(f"Payment API error: {err}")
 
         return None
@@ -568,6 +581,9 @@ class PaylineApi:
             }
             return RefundDetails(response)
 
+        # pylint: disable=import-outside-toplevel
+        from pysimplesoap.client import SoapFault
+
         try:
             # First try reset in case payment has not been debited yet
             response = self.directpayment_client.doReset(
@@ -584,7 +600,7 @@ class PaylineApi:
 
             return RefundDetails(response)
 
-        except pysimplesoap.client.SoapFault as err:
+        except SoapFault as err:
             current_app.logger.error(f"Payment API error: {err}")
 
         return None
@@ -11,6 +11,7 @@ from sqlalchemy.sql import func
 from collectives.models import (
     ActivityType,
     Event,
+    EventPricing,
     ItemPrice,
     Payment,
     PaymentItem,
@@ -21,19 +22,22 @@ from collectives.models import (
     User,
     db,
 )
+from collectives.utils.export import iterate_by_batches
 from collectives.utils.numbers import format_currency
 from collectives.utils.time import current_time, format_date, format_date_range
 
 # pylint: disable=no-value-for-parameter
 
 
-def extract_payments(event_id=None, page=None, pagesize=50, filters=None):
+def extract_payments(event_id=None, page=None, pagesize=50, filters=None, stream=False):
     """Return payments related to the search parameters
 
     :param int event_id: Event ID of the payments. None for no event filter
     :param int page: Page of the extraction. None for no pagination
     :param int pagesize: Size of the page in case of pagination
     :param dict filters: Filters as tabulators format.
+    :param bool stream: If True and not paginating, load payments by batches
+        while iterating, see :py:func:`collectives.utils.export.iterate_by_batches`
     :returns: list of payment filtered regarding previous parameters
     """
 
@@ -120,6 +124,13 @@ def extract_payments(event_id=None, page=None, pagesize=50, filters=None):
     query = query.order_by(Payment.id)
     if page is not None:
         return query.paginate(page=page, per_page=pagesize, error_out=False)
+    if stream:
+        query = query.options(
+            selectinload(Payment.item)
+            .selectinload(PaymentItem.event)
+            .selectinload(Event.main_leader)
+        )
+        return iterate_by_batches(query)
     return query.all()
 
 
@@ -161,7 +172,9 @@ class PriceDateInterval:
         return f"à partir du {format_date(self.start)}: {format_currency(self.amount)}"
 
 
-def generate_price_intervals(item: PaymentItem, user: User) -> List[PriceDateInterval]:
+def generate_price_intervals(
+    item: PaymentItem, user: User, pricing: EventPricing | None = None
+) -> List[PriceDateInterval]:
     """Generates a timeline of how the item price will evolve in the future.
 
     That is, generate a list of cheapest prices at all points in the future,
@@ -169,10 +182,13 @@ def generate_price_intervals(item: PaymentItem, user: User) -> List[PriceDateInt
 
     :param item: Payment item to consider
     :param user: User for whom the price should be compute
+    :param pricing: Prices of the item event, loaded if not provided
     :return: The sorted list of date intervals with the corresponding charged amount
     """
 
-    all_prices = item.available_prices_to_user(user)
+    if pricing is None:
+        pricing = EventPricing(item.event)
+    all_prices = [p for p in pricing.available_prices(user.id) if p.item_id == item.id]
 
     # Conservatively generate potential boundaries at each price start/end
     boundaries = set()
@@ -202,7 +218,7 @@ def generate_price_intervals(item: PaymentItem, user: User) -> List[PriceDateInt
     current_end = None
     current_amount = None
     for interval in intervals:
-        price = item.cheapest_price_for_user_at_date(user, interval.start)
+        price = pricing.cheapest_price_for_user_at_date(item, user.id, interval.start)
         amount = price.amount if price else None
         if amount == current_amount:
             # Same price, extend current interval
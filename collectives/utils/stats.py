@@ -1,16 +1,20 @@
 """
 Module to calculate statistics of the event database.
 
+Computed statistics are stored in :py:data:`statistics_cache`, shared by all
+server processes with the default ``file`` backend.
 """
 
-from datetime import datetime, timedelta
-from functools import lru_cache
-from io import BytesIO
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from functools import wraps
 from math import floor
+from typing import IO, Any, Callable, Dict, List, NamedTuple, Set, Tuple
 
-from openpyxl import Workbook
-from openpyxl.styles import Font
-from sqlalchemy import distinct, func
+from flask import current_app
+from sqlalchemy import distinct, func, select
 
 from collectives.models import (
     ActivityType,
@@ -18,29 +22,121 @@ from collectives.models import (
     EventStatus,
     EventTag,
     EventType,
+    Gender,
     Registration,
     RegistrationStatus,
     User,
     db,
 )
-from collectives.utils.openpyxl import columns_best_fit
-from collectives.utils.time import current_time
+from collectives.models.event.date import ffcam_days
+from collectives.models.event.model import event_activity_types, event_leaders
+from collectives.utils.cache import ResponseCache
+from collectives.utils.export import save_workbook
+from collectives.utils.openpyxl import append_titled_sheet
+from collectives.utils.time import current_time, get_ffcam_year
 
 # Pylint does not understand that func.count IS callable.
 # See https://github.com/pylint-dev/pylint/issues/1682
 # pylint: disable=not-callable
 
+statistics_cache = ResponseCache("statistics", "STATISTICS_CACHE")
+""" Store of computed statistics, indexed by engine parameters and statistic name.
+
+See :py:data:`config.STATISTICS_CACHE_BACKEND`
+"""
+
+
+def encode_statistic(value: Any) -> str:
+    """Serialize a statistic result to be stored in :py:data:`statistics_cache`.
+
+    Dictionnaries are stored as lists of items since their keys may be tuples or
+    integers.
+
+    :param value: The statistic result
+    :returns: The JSON representation of the result
+    """
+    if isinstance(value, dict):
+        items = [
+            [list(key) if isinstance(key, tuple) else key, item]
+            for key, item in value.items()
+        ]
+        return json.dumps({"items": items})
+    return json.dumps({"value": value})
+
+
+def decode_statistic(content: str) -> Any:
+    """Deserialize a statistic result stored by :py:func:`encode_statistic`.
+
+    :param content: The JSON representation of the result
+    :returns: The statistic result
+    """
+    data = json.loads(content)
+    if "items" in data:
+        return {
+            tuple(key) if isinstance(key, list) else key: item
+            for key, item in data["items"]
+        }
+    return data["value"]
+
+
+def memoize(method: Callable) -> Callable:
+    """Decorator keeping the result of an engine method for the engine lifetime."""
+
+    @wraps(method)
+    def wrapper(self):
+        name = method.__name__
+        if name not in self.results:
+            self.results[name] = method(self)
+        return self.results[name]
+
+    return wrapper
+
+
+def statistic(method: Callable) -> Callable:
+    """Decorator for engine statistics.
+
+    Results are kept for the engine lifetime, and in :py:data:`statistics_cache`
+    so that engines with the same parameters do not compute them again. Engines
+    whose :py:attr:`StatisticsEngine.refresh` is set compute them anyway, and
+    overwrite the stored results.
+    """
+
+    @wraps(method)
+    def wrapper(self):
+        name = method.__name__
+        if name not in self.results:
+            key = f"{self.cache_key()}/{name}"
+            generation = statistics_cache.generation()
+            content = None if self.refresh else statistics_cache.get(key)
+            if content is None:
+                self.results[name] = method(self)
+                statistics_cache.set(
+                    key, encode_statistic(self.results[name]), generation
+                )
+            else:
+                self.results[name] = decode_statistic(content)
+        return self.results[name]
+
+    return wrapper
+
 
 class StatisticsEngine:
     """Configurable class which will output statistics"""
 
-    CACHE_TTL = 600
-    """ Number of second to cache the answers """
+    results = None
+    """ Statistics computed by this engine, indexed by name.
+
+    :type: dict
+    """
 
     creation_time = None
-    """ Time when the engine is created.
-    
-    It is used to compare StatisticsEngine object and limit cache time"""
+    """ Time when the engine is created."""
+
+    refresh = False
+    """ Whether statistics are computed even if they are in :py:data:`statistics_cache`
+
+    :type: bool
+    """
 
     activity_id = None
     """ All statistics of the engine will be limited to the activity with this id
@@ -250,6 +346,7 @@ class StatisticsEngine:
         Eg: StatisticsEngine(activity_id = 1)
 
         :param kwargs: see :py:class:`StatisticsEngine` attributes"""
+        self.results = {}
         for attr in dir(self):
             if "__" in attr:
                 continue
@@ -273,7 +370,7 @@ class StatisticsEngine:
             return None
         return floor((self.end - self.start).total_seconds() / 3600 / 24)
 
-    @lru_cache()
+    @memoize
     def valid_activity_events(self):
         """Returns valid relevent events from cache or process it.
 
@@ -282,7 +379,7 @@ class StatisticsEngine:
         query = self.global_filters(Event.query, requires_activity=True)
         return query.all()
 
-    @lru_cache()
+    @memoize
     def events(self):
         """Returns relevent events from cache or process it."""
         return self.global_filters(Event.query).all()
@@ -319,12 +416,12 @@ class StatisticsEngine:
 
         return query
 
-    @lru_cache()
+    @statistic
     def nb_registrations(self) -> int:
         """Returns the total number of registration."""
         return self.global_filters(Registration.query).count()
 
-    @lru_cache()
+    @statistic
     def nb_active_registrations(self) -> int:
         """Returns the total number of active registration.
         Cf :py:meth:`collectives.models.registration.RegistrationStatus.is_valid()`
@@ -343,12 +440,12 @@ class StatisticsEngine:
                 query = query.filter(condition)
         return query.count()
 
-    @lru_cache()
+    @statistic
     def nb_events(self) -> int:
         """Returns the total number of events."""
         return self.count_events()
 
-    @lru_cache()
+    @statistic
     def nb_collectives(self) -> int:
         """Returns the number of events of type "Collectives" """
         condition = Event.event_type.has(EventType.name == "Collective")
@@ -362,18 +459,18 @@ class StatisticsEngine:
             return None
         return self.count_events(filters) / self.nb_days()
 
-    @lru_cache()
+    @statistic
     def mean_events_per_day(self) -> float:
         """Returns the mean number of event per day."""
         return self.count_mean_events_per_day()
 
-    @lru_cache()
+    @statistic
     def mean_collectives_per_day(self) -> float:
         """Returns the mean number of event of type "Collectives" per day."""
         condition = Event.event_type.has(EventType.name == "Collective")
         return self.count_mean_events_per_day([condition])
 
-    @lru_cache()
+    @statistic
     def nb_events_by_event_type(self) -> dict:
         """Returns the total number of events of each event type."""
         query = db.session.query(Event, func.count(Event.event_type_id))
@@ -395,18 +492,18 @@ class StatisticsEngine:
         counts = {c[0].name: c[1] for c in counts}
         return counts
 
-    @lru_cache()
+    @statistic
     def nb_events_by_activity_type(self) -> dict:
         """Returns the total number of events of each activity type."""
         return self.count_events_by_activity_type()
 
-    @lru_cache()
+    @statistic
     def nb_collectives_by_activity_type(self) -> dict:
         """Returns the total number of events of type "Collectives" of each activity type."""
         condition = Event.event_type.has(EventType.name == "Collective")
         return self.count_events_by_activity_type([condition])
 
-    @lru_cache()
+    @statistic
     def nb_events_by_event_tag(self) -> dict:
         """Returns the total number of events of each activity type."""
         query = db.session.query(EventTag, func.count(Event.id)).join(
@@ -415,7 +512,7 @@ class StatisticsEngine:
         counts = self.global_filters(query).group_by(EventTag.type).all()
         return {c[0].name: c[1] for c in counts}
 
-    @lru_cache()
+    @statistic
     def nb_events_by_leaders(self) -> dict:
         """Returns the total number of events of each leader."""
         query = db.session.query(User, func.count(Event.id)).join(
@@ -425,7 +522,7 @@ class StatisticsEngine:
         counts = {c[0].full_name(): c[1] for c in counts}
         return counts
 
-    @lru_cache()
+    @statistic
     def nb_registrations_by_gender(self) -> dict:
         """Returns the total number of registration per gender."""
         query = db.session.query(Registration, func.count(Registration.id)).join(User)
@@ -434,7 +531,7 @@ class StatisticsEngine:
         counts = {c[0].user.gender.display_name(): c[1] for c in counts}
         return counts
 
-    @lru_cache()
+    @statistic
     def attendee_time_by_gender_and_license_type(self) -> dict:
         """Returns the total number of attendee days per gender and license type."""
         query = (
@@ -460,7 +557,7 @@ class StatisticsEngine:
 
         return durations
 
-    @lru_cache()
+    @statistic
     def volunteer_time(self) -> float:
         """Returns the total number of volunteer hours."""
         events = self.valid_activity_events()
@@ -468,7 +565,7 @@ class StatisticsEngine:
             event.duration_in_ffcam_days() * len(event.leaders) for event in events
         )
 
-    @lru_cache()
+    @statistic
     def volunteer_time_by_activity_type(self) -> dict:
         """Returns the total number of volunteer hours of each activity type."""
         durations = {}
@@ -479,21 +576,21 @@ class StatisticsEngine:
                 durations[activity_name] = durations.get(activity_name, 0) + duration
         return durations
 
-    @lru_cache()
+    @statistic
     def mean_registrations_per_event(self) -> float:
         """Returns the mean number of registration per events."""
         if self.nb_events() == 0:
             return 0
         return self.nb_active_registrations() / self.nb_events()
 
-    @lru_cache()
+    @statistic
     def mean_registrations_per_day(self) -> float:
         """Returns the mean number of registration per day."""
         if self.nb_days() is None or self.nb_days() == 0:
             return None
         return self.nb_active_registrations() / self.nb_days()
 
-    @lru_cache()
+    @statistic
     def population_registration_number(self) -> dict:
         """Returns the number of user for each user registration quantity.
 
@@ -512,7 +609,7 @@ class StatisticsEngine:
         counts = {c[0]: c[1] for c in counts}
         return counts
 
-    @lru_cache()
+    @statistic
     def nb_user_per_activity_type(self) -> dict:
         """Returns number of individuals users for each activity."""
         counting = func.count(distinct(User.id + "-" + ActivityType.id))
@@ -525,7 +622,7 @@ class StatisticsEngine:
         counts = query.group_by(ActivityType.id).all()
         return {c[3].name: c[4] for c in counts}
 
-    @lru_cache()
+    @statistic
     def nb_active_registrations_per_activity_type(self) -> dict:
         """Returns the number of active registrations per activity.
         Cf :py:meth:`collectives.models.registration.RegistrationStatus.is_valid()`
@@ -540,7 +637,7 @@ class StatisticsEngine:
         counts = query.group_by(ActivityType.id).all()
         return {c[2].name: c[3] for c in counts}
 
-    @lru_cache()
+    @statistic
     def nb_unregistrations_inc_late_and_unjustified_absentees_per_week(self) -> dict:
         """
         Returns the number of unregistrations and unjustifited absentees per week,
@@ -584,22 +681,20 @@ class StatisticsEngine:
 
         return unregistrations_by_week_and_status
 
-    def export_excel(self) -> BytesIO:
+    def export_excel(self) -> IO[bytes]:
         """Generate an Excel with all statistics inside.
 
         Name and description are defined in
         :py:attr:`collectives.utils.stats.StatisticsEngine.__index__`
 
         :returns: An excel file"""
-        workbook = Workbook()
-        main_ws = workbook.active
-        main_ws.title = "Général"
-        main_ws.append(["Statistique du site des collectives"])
-        main_ws["A1"].font = Font(size=20, bold=True)
-        main_ws.row_dimensions[1].height = 25
-        main_ws.append([""])
-        main_ws.append([f"Du {self.start} au {self.end}"])
-        main_ws.append([""])
+        # pylint: disable=import-outside-toplevel
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        # The general sheet comes first, but is only known once all are computed
+        main_rows = [[""], [f"Du {self.start} au {self.end}"], [""]]
+        sheets = []
 
         # Filter all attribute of the current engine to keep only statisctics functions
         functions = list(self.INDEX.keys())
@@ -607,43 +702,46 @@ class StatisticsEngine:
 
         for fnc in functions:
             if issubclass(fnc.__annotations__["return"], dict):
-                worksheet = workbook.create_sheet()
-                worksheet.title = self.INDEX[fnc.__name__]["name"]
-                worksheet.append([worksheet.title])
-                worksheet["A1"].font = Font(size=20, bold=True)
-                worksheet.row_dimensions[1].height = 25
-                worksheet.append([self.INDEX[fnc.__name__]["description"]])
-                worksheet.append([""])
-                data = fnc()
-                for key, value in data.items():
+                name = self.INDEX[fnc.__name__]["name"]
+                rows = [[self.INDEX[fnc.__name__]["description"]], [""]]
+                for key, value in fnc().items():
                     if isinstance(key, tuple):
                         keys = (str(k) for k in key)
                     else:
                         keys = (str(key),)
-                    worksheet.append([*keys, str(value)])
-                columns_best_fit(worksheet, [1, 2])
+                    rows.append([*keys, str(value)])
+                sheets.append((name, rows))
             if fnc.__annotations__["return"] in [int, float]:
-                main_ws.append([self.INDEX[fnc.__name__]["name"], fnc()])
+                main_rows.append([self.INDEX[fnc.__name__]["name"], fnc()])
+
+        append_titled_sheet(
+            workbook, "Général", "Statistique du site des collectives", main_rows
+        )
+        for name, rows in sheets:
+            append_titled_sheet(workbook, name, name, rows)
 
-        columns_best_fit(main_ws, [1, 2])
+        return save_workbook(workbook)
 
-        out = BytesIO()
-        workbook.save(out)
-        out.seek(0)
+    def cache_key(self) -> str:
+        """Returns the key of engine parameters in :py:data:`statistics_cache`.
 
-        return out
+        Statistics of engines with the same key are identical."""
+        event_types = ",".join(str(i) for i in sorted(self.event_type_ids or []))
+        return f"{self.activity_id}/{event_types}/{self.start}->{self.end}"
+
+    def compute_all(self, refresh: bool = False):
+        """Compute all statistics of :py:attr:`INDEX`, or load them from store.
 
-    def time_segment(self) -> int:
-        """Returns an id of the creation time regarding ttl."""
-        return floor(self.creation_time.timestamp() / self.CACHE_TTL)
+        :param refresh: If True, statistics are computed and stored again even if
+            they are in store, see :py:attr:`refresh`
+        """
+        self.refresh = refresh
+        for name in self.INDEX:
+            getattr(self, name)()
 
     def __str__(self) -> str:
         """Returns string representation of Engine"""
-        event_types = ",".join(str(i) for i in sorted(self.event_type_ids or []))
-        return (
-            f"{self.activity_id}/{event_types}/"
-            f"{self.start}->{self.end}/{self.time_segment()}"
-        )
+        return self.cache_key()
 
     def __hash__(self) -> int:
         """Return unique hash based on StatisticsEngine parameters"""
@@ -656,5 +754,303 @@ class StatisticsEngine:
             and sorted(self.event_type_ids or []) == sorted(other.event_type_ids or [])
             and self.start == other.start
             and self.end == other.end
-            and self.time_segment() == other.time_segment()
         )
+
+
+@dataclass
+class EventFacts:
+    """Compact description of an event, as used by :py:class:`SinglePassStatisticsEngine`"""
+
+    event_type_id: int
+    """Id of the event type"""
+
+    duration: float
+    """Duration of the event in FFCAM days,
+    see :py:func:`collectives.models.event.date.ffcam_days`"""
+
+    activity_ids: List[int] = field(default_factory=list)
+    """Ids of the activity types of the event, ordered"""
+
+    leader_ids: List[int] = field(default_factory=list)
+    """Ids of the leaders of the event, one per leader row"""
+
+    tag_types: List[int] = field(default_factory=list)
+    """Types of the tags of the event"""
+
+
+class RegistrationFacts(NamedTuple):
+    """Compact description of a registration, as used by
+    :py:class:`SinglePassStatisticsEngine`"""
+
+    id: int
+    event_id: int
+    user_id: int
+    status: RegistrationStatus
+    gender: Gender
+    license_category: str
+
+
+class SinglePassStatisticsEngine(StatisticsEngine):
+    """Statistics engine loading all relevant facts at once.
+
+    Instead of one query per statistic, a small number of column-only queries load
+    a fact table of the relevant events and registrations, from which statistics
+    are derived in memory. Results are the same as :py:class:`StatisticsEngine`.
+
+    :py:meth:`nb_unregistrations_inc_late_and_unjustified_absentees_per_week` is
+    not derived from the facts and stays a separate query: it covers the last 52
+    weeks of all events, regardless of the engine filters.
+    """
+
+    @memoize
+    def facts(self) -> Tuple[Dict[int, EventFacts], List[RegistrationFacts]]:
+        """Loads the facts of relevant events and their registrations.
+
+        :returns: events facts indexed by event id, ordered by id, and the list of
+                  registration facts
+        """
+        event_ids = self.global_filters(db.session.query(Event.id)).subquery()
+        event_ids = select(event_ids.c.id)
+
+        events = {}
+        query = db.session.query(Event.id, Event.event_type_id, Event.start, Event.end)
+        for row in self.global_filters(query).order_by(Event.id):
+            events[row.id] = EventFacts(
+                row.event_type_id, ffcam_days(row.start, row.end)
+            )
+
+        query = select(event_activity_types).where(
+            event_activity_types.c.event_id.in_(event_ids)
+        )
+        for row in db.session.execute(
+            query.order_by(event_activity_types.c.activity_id)
+        ):
+            events[row.event_id].activity_ids.append(row.activity_id)
+
+        query = select(event_leaders).where(event_leaders.c.event_id.in_(event_ids))
+        for row in db.session.execute(query):
+            events[row.event_id].leader_ids.append(row.user_id)
+
+        query = db.session.query(EventTag.event_id, EventTag.type)
+        for row in query.filter(EventTag.event_id.in_(event_ids)):
+            events[row.event_id].tag_types.append(row.type)
+
+        query = (
+            db.session.query(
+                Registration.id,
+                Registration.event_id,
+                Registration.user_id,
+                Registration.status,
+                User.gender,
+                User.license_category,
+            )
+            .join(User, Registration.user_id == User.id)
+            .filter(Registration.event_id.in_(event_ids))
+        )
+        registrations = [RegistrationFacts(*row) for row in query]
+
+        return events, registrations
+
+    def valid_registrations(self) -> List[RegistrationFacts]:
+        """Returns the facts of valid registrations of relevent events."""
+        valid_statuses = RegistrationStatus.valid_status()
+        return [r for r in self.facts()[1] if r.status in valid_statuses]
+
+    def collective_type_ids(self) -> Set[int]:
+        """Returns the ids of event types named "Collective"."""
+        query = db.session.query(EventType.id).filter(EventType.name == "Collective")
+        return {row.id for row in query}
+
+    @statistic
+    def nb_registrations(self) -> int:
+        """Returns the total number of registration."""
+        return len(self.facts()[1])
+
+    @statistic
+    def nb_active_registrations(self) -> int:
+        """Returns the total number of active registration.
+        Cf :py:meth:`collectives.models.registration.RegistrationStatus.is_valid()`
+        """
+        return len(self.valid_registrations())
+
+    @statistic
+    def nb_events(self) -> int:
+        """Returns the total number of events."""
+        return len(self.facts()[0])
+
+    @statistic
+    def nb_collectives(self) -> int:
+        """Returns the number of events of type "Collectives" """
+        type_ids = self.collective_type_ids()
+        return sum(1 for e in self.facts()[0].values() if e.event_type_id in type_ids)
+
+    @statistic
+    def mean_events_per_day(self) -> float:
+        """Returns the mean number of event per day."""
+        if self.nb_days() is None:
+            return None
+        return self.nb_events() / self.nb_days()
+
+    @statistic
+    def mean_collectives_per_day(self) -> float:
+        """Returns the mean number of event of type "Collectives" per day."""
+        if self.nb_days() is None:
+            return None
+        return self.nb_collectives() / self.nb_days()
+
+    @statistic
+    def nb_events_by_event_type(self) -> dict:
+        """Returns the total number of events of each event type."""
+        counts = Counter(e.event_type_id for e in self.facts()[0].values())
+        names = dict(db.session.query(EventType.id, EventType.name))
+        return {names[type_id]: counts[type_id] for type_id in sorted(counts)}
+
+    def count_events_by_activity_type(self, only_collectives=False) -> dict:
+        """Returns  number of events of each activity type.
+
+        :param bool only_collectives: Whether to count only events of type "Collective"
+        """
+        type_ids = self.collective_type_ids()
+        counts = Counter(
+            activity_id
+            for event in self.facts()[0].values()
+            if not only_collectives or event.event_type_id in type_ids
+            for activity_id in event.activity_ids
+        )
+        return self.by_activity_name(counts)
+
+    def by_activity_name(self, values: dict) -> dict:
+        """Index values by activity name instead of activity id, ordered by name.
+
+        :param values: Values indexed by activity id
+        """
+        names = dict(db.session.query(ActivityType.id, ActivityType.name))
+        return dict(sorted((names[id], value) for id, value in values.items()))
+
+    @statistic
+    def nb_events_by_activity_type(self) -> dict:
+        """Returns the total number of events of each activity type."""
+        return self.count_events_by_activity_type()
+
+    @statistic
+    def nb_collectives_by_activity_type(self) -> dict:
+        """Returns the total number of events of type "Collectives" of each activity type."""
+        return self.count_events_by_activity_type(only_collectives=True)
+
+    @statistic
+    def nb_events_by_event_tag(self) -> dict:
+        """Returns the total number of events of each activity type."""
+        counts = Counter(t for e in self.facts()[0].values() for t in e.tag_types)
+        tags = EventTag.all(include_deprecated=True)
+        return {tags[t]["name"]: counts[t] for t in sorted(counts)}
+
+    @statistic
+    def nb_events_by_leaders(self) -> dict:
+        """Returns the total number of events of each leader."""
+        counts = Counter(u for e in self.facts()[0].values() for u in e.leader_ids)
+        leaders = User.query.filter(User.id.in_(counts.keys())).order_by(User.id)
+        return {leader.full_name(): counts[leader.id] for leader in leaders}
+
+    @statistic
+    def nb_registrations_by_gender(self) -> dict:
+        """Returns the total number of registration per gender."""
+        counts = Counter(r.gender for r in self.valid_registrations())
+        return {gender.display_name(): count for gender, count in counts.items()}
+
+    @statistic
+    def attendee_time_by_gender_and_license_type(self) -> dict:
+        """Returns the total number of attendee days per gender and license type."""
+        events = self.facts()[0]
+        durations = {}
+        for registration in self.valid_registrations():
+            key = (registration.license_category, registration.gender.display_name())
+            durations[key] = (
+                durations.get(key, 0) + events[registration.event_id].duration
+            )
+        return durations
+
+    @statistic
+    def volunteer_time(self) -> float:
+        """Returns the total number of volunteer hours."""
+        return sum(
+            e.duration * len(set(e.leader_ids)) for e in self.facts()[0].values()
+        )
+
+    @statistic
+    def volunteer_time_by_activity_type(self) -> dict:
+        """Returns the total number of volunteer hours of each activity type."""
+        durations = Counter()
+        for event in self.facts()[0].values():
+            for activity_id in event.activity_ids:
+                durations[activity_id] += event.duration * len(set(event.leader_ids))
+        return self.by_activity_name(durations)
+
+    @statistic
+    def population_registration_number(self) -> dict:
+        """Returns the number of user for each user registration quantity.
+
+        :returns: index are number are registration, value is number of user with that
+                    many registrations
+        """
+        per_user = Counter(r.user_id for r in self.facts()[1])
+        counts = Counter(per_user.values())
+        return {count: counts[count] for count in sorted(counts)}
+
+    @statistic
+    def nb_user_per_activity_type(self) -> dict:
+        """Returns number of individuals users for each activity."""
+        events = self.facts()[0]
+        users = {}
+        for registration in self.valid_registrations():
+            for activity_id in events[registration.event_id].activity_ids:
+                users.setdefault(activity_id, set()).add(registration.user_id)
+        return self.by_activity_name({id: len(u) for id, u in users.items()})
+
+    @statistic
+    def nb_active_registrations_per_activity_type(self) -> dict:
+        """Returns the number of active registrations per activity.
+        Cf :py:meth:`collectives.models.registration.RegistrationStatus.is_valid()`
+        """
+        events = self.facts()[0]
+        counts = Counter(
+            activity_id
+            for registration in self.valid_registrations()
+            for activity_id in set(events[registration.event_id].activity_ids)
+        )
+        return self.by_activity_name(counts)
+
+
+def get_engine_class() -> type:
+    """Returns the statistics engine class to use.
+
+    See :py:data:`config.STATISTICS_SINGLE_PASS`
+    """
+    if current_app.config.get("STATISTICS_SINGLE_PASS"):
+        return SinglePassStatisticsEngine
+    return StatisticsEngine
+
+
+def precompute_statistics() -> int:
+    """Computes and stores the statistics of the current and previous FFCAM years,
+    for all activities and for each activity.
+
+    Statistics are computed again and overwrite those in :py:data:`statistics_cache`,
+    so that they do not expire if this is run more often than
+    :py:data:`config.STATISTICS_CACHE_TIMEOUT`.
+
+    :returns: Number of computed engines
+    """
+    engine_class = get_engine_class()
+    current_year = get_ffcam_year(date.today())
+    activity_ids = [None] + [
+        activity.id
+        for activity in ActivityType.get_all_types()
+        if not activity.deprecated
+    ]
+
+    count = 0
+    for year in (current_year, current_year - 1):
+        for activity_id in activity_ids:
+            engine_class(year=year, activity_id=activity_id).compute_all(refresh=True)
+            count += 1
+    return count
@@ -61,8 +61,19 @@ File syntax is described here:
 ADMINPWD = environ.get("ADMINPWD") or "foobar2"
 """Password for admin account
 
-Will be set or reset at every application. Makes sure this is a secure password
-in production.
+Will be set or reset by ``flask collectives init``. Makes sure this is a secure
+password in production.
+
+Can be set using environment variable.
+
+:type: string
+"""
+
+APP_INIT = environ.get("APP_INIT", "command")
+"""When the database is populated with configuration items, the admin account,
+activity and event types, and stylesheets are compiled. ``startup``: when each
+server process starts. ``command``: only by ``flask collectives init``, which is
+run once per deployment, for instance by ``deployment/docker/entrypoint.sh``.
 
 Can be set using environment variable.
 
@@ -70,8 +81,8 @@ Can be set using environment variable.
 """
 
 CONFIGURATION_CACHE_TIME = 60
-""" Number of second a configuration item can be cached before requiring
-an update from DB.
+""" Number of second the configuration can be cached before checking whether
+it changed in DB.
 
 :type: int"""
 
@@ -93,6 +104,49 @@ Can be set using environment variable.
 :type: string
 """
 
+EXTRANET_CLIENT_POOL_SIZE = 4
+"""Maximum number of SOAP clients connected to FFCAM server by each server process.
+
+See :py:class:`collectives.utils.extranet.ExtranetApi`
+
+:type: int
+"""
+
+EXTRANET_CLIENT_POOL_TIMEOUT = 30
+"""Number of seconds to wait for a SOAP client when all of them are busy.
+
+:type: int
+"""
+
+EXTRANET_LICENSE_CACHE_MAX_AGE = 7 * 24 * 3600
+"""Maximum number of seconds during which the status of a valid license is
+cached, if the license cannot be renewed before.
+
+:type: int
+"""
+
+EXTRANET_LICENSE_CACHE_SIZE = 10000
+"""Maximum number of license statuses cached by each server process.
+
+:type: int
+"""
+
+EXTRANET_FAILURE_CACHE_TTL = 60
+"""Number of seconds after a failure of FFCAM server during which requests to it
+fail without being sent.
+
+:type: int
+"""
+
+EXTRANET_CHECK_MAX_AGE = 2 * 24 * 3600
+"""Number of seconds after a check of a license by ``flask collectives
+resync-users`` during which the license is not checked again at login.
+
+See :py:mod:`collectives.utils.extranet_resync`
+
+:type: int
+"""
+
 PAYMENTS_MAX_PRICE = 10000
 """Maximum price in euros for a payment item
 
@@ -397,6 +451,281 @@ IMAGES_PATH = [
     "static/uploads/documents",
 ]
 
+UPLOADED_DERIVATIVES_DEST = os.path.join(basedir, "collectives/static/uploads/derived")
+"""Folder path for resized versions of uploaded images.
+
+See :py:mod:`collectives.utils.images`
+
+:type: string
+"""
+IMAGES_DERIVATIVES_MAX_AGE = 365 * 24 * 3600
+"""Time in seconds during which browsers may cache resized uploaded images.
+
+Their name changes with their content, so that they never need revalidation.
+
+:type: int
+"""
+IMAGES_JPEG_QUALITY = 85
+"""Quality of the resized uploaded images saved as JPEG, from 1 to 95.
+
+:type: int
+"""
+IMAGES_WEBP_QUALITY = 80
+"""Quality of the WebP variants of resized uploaded images, from 1 to 100.
+
+:type: int
+"""
+
+IMAGE_POOL_WORKERS = int(environ.get("IMAGE_POOL_WORKERS", 2))
+"""Number of processes checking, resizing and drawing images, for each server
+process. 0 to process images in the server threads.
+
+See :py:data:`collectives.utils.image_pool.image_pool`
+
+Can be set using environment variable.
+
+:type: int
+"""
+
+IMAGE_POOL_QUEUE_SIZE = 8
+"""Maximum number of image jobs waiting or running at once. Beyond that, requests
+processing images wait for ``IMAGE_POOL_TIMEOUT`` then fail.
+
+:type: int
+"""
+
+IMAGE_POOL_TIMEOUT = 30
+"""Number of seconds a request waits for an image job to be queued, then to be
+over.
+
+:type: int
+"""
+
+IMAGE_POOL_MEMORY_LIMIT = 1024
+"""Maximum memory of each image processing process, in megabytes. 0 for no limit.
+
+:type: int
+"""
+
+IMAGE_MAX_PIXELS = 100_000_000
+"""Maximum number of pixels of processed images. Larger images are refused before
+being decoded, to protect the server from decompression bombs. The default
+accepts photos of current phones and cameras, which can exceed 50 millions of
+pixels.
+
+:type: int
+"""
+
+RESPONSE_CACHE_BACKEND = environ.get("RESPONSE_CACHE_BACKEND", "memory")
+"""Backend used to cache API responses, such as the event list.
+
+Can be ``memory`` (in-process LRU), ``file`` (shared by all server processes,
+see :py:data:`RESPONSE_CACHE_DIR`) or empty to disable caching.
+
+Can be set using environment variable.
+
+:type: string
+"""
+
+RESPONSE_CACHE_DIR = environ.get("RESPONSE_CACHE_DIR") or os.path.join(
+    basedir, "instance/cache"
+)
+"""Folder path for the ``file`` response cache backend.
+
+Can be set using environment variable.
+
+:type: string
+"""
+
+VOLUNTEER_CERT_CACHE_DIR = environ.get("VOLUNTEER_CERT_CACHE_DIR") or os.path.join(
+    basedir, "instance/cache/certificates"
+)
+"""Folder path where generated volunteer certificates are kept, see
+:py:mod:`collectives.utils.certificate`.
+
+Can be set using environment variable.
+
+:type: string
+"""
+
+RESPONSE_CACHE_SIZE = 256
+"""Maximum number of responses kept by the ``memory`` cache backend.
+
+:type: int
+"""
+
+RESPONSE_CACHE_TIMEOUT = 60
+"""Number of seconds a cached API response can be served.
+
+:type: int
+"""
+
+USER_GROUP_CACHE_TIMEOUT = 60
+"""Number of seconds the members of a user group can be cached by a server process.
+Set to 0 to disable caching.
+
+See :py:data:`collectives.models.user_group.user_group_memberships`
+
+:type: int
+"""
+
+USER_GROUP_CACHE_SIZE = 256
+"""Maximum number of user groups and dates whose members are cached.
+
+:type: int
+"""
+
+STATISTICS_CACHE_BACKEND = environ.get("STATISTICS_CACHE_BACKEND", "file")
+"""Backend used to store computed statistics.
+
+Same values as :py:data:`RESPONSE_CACHE_BACKEND`. The default ``file`` backend
+shares results between all server processes and keeps them across restarts.
+
+Can be set using environment variable.
+
+:type: string
+"""
+
+STATISTICS_CACHE_SIZE = 4096
+"""Maximum number of statistics kept by the ``memory`` backend.
+
+One statistic is stored per engine parameters and statistic name.
+
+:type: int
+"""
+
+STATISTICS_CACHE_TIMEOUT = 3600
+"""Number of seconds computed statistics can be displayed.
+
+Running ``flask collectives precompute-statistics`` more often than this, for
+instance from a timer or a cron job, computes again the statistics of the current
+and previous FFCAM years, so that the statistics page does not have to. The
+command must use the same store as the server, e.g. the ``file`` backend.
+
+:type: int
+"""
+
+STATISTICS_SINGLE_PASS = True
+"""Whether the statistics page loads all event facts at once and computes
+statistics in memory, instead of running one query per statistic.
+
+See :py:class:`collectives.utils.stats.SinglePassStatisticsEngine`
+
+:type: bool
+"""
+
+MAIL_QUEUE_SIZE = 1000
+"""Maximum number of mails waiting to be sent by the mail worker.
+
+See :py:data:`collectives.utils.mail.mail_queue`
+
+:type: int
+"""
+
+MAIL_ENQUEUE_TIMEOUT = 5
+"""Number of seconds to wait for room in a full mail queue before dropping a mail.
+
+:type: int
+"""
+
+MAIL_BATCH_SIZE = 20
+"""Maximum number of mails sent over the same SMTP connection in a row.
+
+:type: int
+"""
+
+MAIL_SMTP_POOL_SIZE = 1
+"""Maximum number of idle authenticated SMTP connections kept open.
+
+:type: int
+"""
+
+MAIL_SMTP_IDLE_TIMEOUT = 30
+"""Number of seconds an idle SMTP connection can be reused. It should be lower
+than the inactivity timeout of the SMTP server.
+
+:type: int
+"""
+
+MAIL_MAX_RETRIES = 3
+"""Number of times a mail is sent again after a temporary SMTP error.
+
+:type: int
+"""
+
+MAIL_RETRY_DELAY = 5
+"""Number of seconds before the first retry of a mail, doubled for each retry.
+
+:type: int
+"""
+
+MAIL_SPOOL = True
+"""Whether mails are stored in the database before being sent, so that they are
+not lost if the server restarts.
+
+See :py:data:`collectives.utils.mail.mail_spool`
+
+:type: bool
+"""
+
+MAIL_SPOOL_WORKER = environ.get("MAIL_SPOOL_WORKER", "thread")
+"""How the mail spool is drained. ``thread``: by a thread of each server process.
+``command``: only by ``flask collectives send-mails``, which can run in
+separate processes or containers.
+
+Can be set using environment variable.
+
+:type: string
+"""
+
+MAIL_SPOOL_POLL_INTERVAL = 5
+"""Number of seconds between two checks of the mail spool by an idle worker.
+
+:type: int
+"""
+
+MAIL_SPOOL_LEASE = 300
+"""Number of seconds after which mails claimed by a worker which did not send
+them can be claimed by another worker.
+
+:type: int
+"""
+
+ADMISSION_QUEUE_WORKER = environ.get("ADMISSION_QUEUE_WORKER", "command")
+"""How the admission queue of events is drained. ``command``: only by ``flask
+collectives process-admissions``, which can run in a separate process or
+container. ``thread``: by a thread of each server process.
+
+Requests are only processed in arrival order by a single worker: run a single
+``process-admissions`` command, or use ``thread`` with a single server process.
+
+See :py:data:`collectives.utils.admission.admission_queue`
+
+Can be set using environment variable.
+
+:type: string
+"""
+
+ADMISSION_QUEUE_BATCH_SIZE = 50
+"""Maximum number of admission requests claimed at once by a worker.
+
+:type: int
+"""
+
+ADMISSION_QUEUE_POLL_INTERVAL = 1
+"""Number of seconds between two checks of the admission queue by an idle
+worker.
+
+:type: int
+"""
+
+ADMISSION_QUEUE_LEASE = 60
+"""Number of seconds after which admission requests claimed by a worker which
+did not process them can be claimed by another worker.
+
+:type: int
+"""
+
 
 DEFAULT_ONLINE_SLOTS = environ.get("DEFAULT_ONLINE_SLOTS") or 0
 """ Default number of slots for online subscription to an event
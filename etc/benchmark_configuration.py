@@ -0,0 +1,106 @@
+"""Benchmark of the cost of reading ``Configuration`` items.
+
+Simulates requests reading a number of configuration items, and measures:
+
+- ``warm``: the time per item access while the cache is valid;
+- ``expired``: the time and number of SQL queries of the first request after
+  the cache expired (:py:data:`config.CONFIGURATION_CACHE_TIME`).
+
+Usage::
+
+    uv run etc/benchmark_configuration.py --items 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from collectives import create_app
+from collectives.models import Configuration, ConfigurationItem, db
+from collectives.utils import init
+
+EXPIRED_REQUESTS = 5
+
+
+def simulate_request(names: list[str]) -> None:
+    """Read the given configuration items, as a request would."""
+    for name in names:
+        Configuration.get(name)
+
+
+def main() -> None:
+    """Point d'entrée du script."""
+    parser = argparse.ArgumentParser(description="Benchmark configuration reads.")
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    db_path = tempfile.mkstemp(suffix="benchmark.db")[1]
+    try:
+        app = create_app(
+            extra_config={
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+                "SERVER_NAME": "localhost",
+            }
+        )
+        with app.app_context():
+            db.create_all()
+            init.populate_db(app)
+            names = [item.name for item in ConfigurationItem.query.all()]
+            names = (names * (1 + args.items // len(names)))[: args.items]
+
+            statements = []
+            event.listen(
+                db.engine,
+                "before_cursor_execute",
+                lambda *_: statements.append(None),
+            )
+
+            app.config["CONFIGURATION_CACHE_TIME"] = 3600
+            simulate_request(names)
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                simulate_request(names)
+            elapsed = time.perf_counter() - start
+            accesses = args.requests * len(names)
+            print(
+                f"warm: {1e9 * elapsed / accesses:.0f} ns per access, "
+                f"{1e6 * elapsed / args.requests:.1f} µs per request"
+            )
+
+            app.config["CONFIGURATION_CACHE_TIME"] = 1
+            for name in set(names):
+                Configuration.uncache(name)
+            simulate_request(names)
+            total_time = 0.0
+            total_queries = 0
+            for _ in range(EXPIRED_REQUESTS):
+                time.sleep(1.1)
+                del statements[:]
+                start = time.perf_counter()
+                simulate_request(names)
+                total_time += time.perf_counter() - start
+                total_queries += len(statements)
+                db.session.rollback()
+            print(
+                f"expired: {1e3 * total_time / EXPIRED_REQUESTS:.2f} ms and "
+                f"{total_queries / EXPIRED_REQUESTS:.0f} queries per request "
+                f"reading {len(names)} items ({len(set(names))} distinct)"
+            )
+    finally:
+        os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
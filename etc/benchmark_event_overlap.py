@@ -0,0 +1,123 @@
+"""Benchmark of the queries looking for events overlapping a timespan.
+
+Generates a multi-year dataset with ``etc/test_set.py`` in a temporary SQLite
+database, then compares, for random timespans:
+
+- ``range``: the plain ``Event.start < end AND Event.end > start`` condition;
+- ``weeks``: :py:meth:`collectives.models.event.Event.overlapping`, which
+  looks up candidate events in the ``event_weeks`` table first;
+- ``conflicts``: :py:meth:`collectives.models.user.User.registrations_during_by_user`
+  for all the users of the dataset.
+
+Usage::
+
+    uv run etc/benchmark_event_overlap.py --years 10 --queries 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from sqlalchemy import func, select
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from collectives import create_app
+from collectives.models import Event, User, db
+from collectives.utils import init
+from etc import test_set
+
+
+def measure(name: str, windows: list, run) -> None:
+    """Run a query for each timespan and print the mean time per query."""
+    start = time.perf_counter()
+    found = 0
+    for window in windows:
+        found += run(*window)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>9}: {1e3 * elapsed / len(windows):.3f} ms per query, "
+        f"{found / len(windows):.1f} results per query"
+    )
+
+
+def main() -> None:
+    """Point d'entrée du script."""
+    parser = argparse.ArgumentParser(description="Benchmark overlap queries.")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    db_path = tempfile.mkstemp(suffix="benchmark.db")[1]
+    try:
+        app = create_app(
+            extra_config={
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+                "SERVER_NAME": "localhost",
+            }
+        )
+        with app.app_context():
+            db.create_all()
+            init.populate_db(app)
+
+            rng = random.Random(test_set.RANDOM_SEED)
+            test_set.NUM_DAYS = 365 * args.years
+            users = test_set.create_users(rng)
+            leaders = test_set.assign_activity_roles(rng, users)
+            start = time.perf_counter()
+            test_set.create_events(rng, users, leaders)
+            print(
+                f"{Event.query.count()} events generated over {args.years} years "
+                f"in {time.perf_counter() - start:.0f}s"
+            )
+
+            first, last = db.session.execute(
+                select(func.min(Event.start), func.max(Event.end))
+            ).one()
+            windows = []
+            for _ in range(args.queries):
+                window_start = first + timedelta(
+                    hours=rng.randrange(int((last - first).total_seconds() // 3600))
+                )
+                windows.append((window_start, window_start + timedelta(hours=9)))
+            user_ids = [user.id for user in users]
+
+            def range_query(window_start, window_end):
+                query = select(Event.id).where(
+                    Event.start < window_end, Event.end > window_start
+                )
+                return len(db.session.execute(query).all())
+
+            def weeks_query(window_start, window_end):
+                query = select(Event.id).where(
+                    Event.overlapping(window_start, window_end)
+                )
+                return len(db.session.execute(query).all())
+
+            def conflicts_query(window_start, window_end):
+                registrations = User.registrations_during_by_user(
+                    user_ids, window_start, window_end
+                )
+                return sum(len(regs) for regs in registrations.values())
+
+            for run in range(2):
+                if run:
+                    print("(second run, warm cache)")
+                measure("range", windows, range_query)
+                measure("weeks", windows, weeks_query)
+                measure("conflicts", windows, conflicts_query)
+    finally:
+        os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark of the ``/api/events/`` pagination modes.
+
+Seeds a temporary SQLite database with a large number of events, then
+compares the latency of fetching page N with the offset mode (``page``) and
+with the keyset mode (``cursor``).
+
+Usage::
+
+    uv run etc/benchmark_event_pagination.py --events 100000 --pages 1 100 1000 4000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from collectives import create_app
+from collectives.api.event import encode_event_cursor
+from collectives.models import (
+    ActivityType,
+    Event,
+    EventStatus,
+    EventType,
+    EventVisibility,
+    User,
+    db,
+)
+from collectives.models.event.model import event_activity_types, event_leaders
+from collectives.utils import init
+
+PAGE_SIZE = 25
+BATCH_SIZE = 5000
+
+
+def seed_events(num_events: int) -> None:
+    """Insert ``num_events`` events starting from tomorrow, several per day."""
+    leader = User.query.first()
+    activity = ActivityType.query.first()
+    event_type = EventType.query.first()
+    first_day = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+    first_day += timedelta(days=1)
+
+    for batch_start in range(0, num_events, BATCH_SIZE):
+        rows = []
+        for index in range(batch_start, min(batch_start + BATCH_SIZE, num_events)):
+            start = first_day + timedelta(days=index // 20, minutes=15 * (index % 4))
+            rows.append(
+                {
+                    "title": f"Benchmark event {index}",
+                    "description": "",
+                    "rendered_description": "",
+                    "start": start,
+                    "end": start + timedelta(hours=8),
+                    "num_slots": 10,
+                    "num_online_slots": 5,
+                    "num_waiting_list": 0,
+                    "include_leaders_in_counts": False,
+                    "status": EventStatus.Confirmed,
+                    "visibility": EventVisibility.Licensed,
+                    "show_all_badges": True,
+                    "main_leader_id": leader.id,
+                    "event_type_id": event_type.id,
+                }
+            )
+        db.session.execute(insert(Event), rows)
+        db.session.commit()
+
+    event_ids = [row[0] for row in db.session.query(Event.id).all()]
+    for batch_start in range(0, len(event_ids), BATCH_SIZE):
+        batch = event_ids[batch_start : batch_start + BATCH_SIZE]
+        db.session.execute(
+            insert(event_activity_types),
+            [{"event_id": i, "activity_id": activity.id} for i in batch],
+        )
+        db.session.execute(
+            insert(event_leaders),
+            [{"event_id": i, "user_id": leader.id} for i in batch],
+        )
+    db.session.commit()
+
+
+def measure(client, url: str, repeat: int) -> float:
+    """Return the median latency in milliseconds of a GET request."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+    return statistics.median(timings)
+
+
+def cursor_for_page(page: int) -> str:
+    """Return the cursor pointing at the beginning of ``page`` (1-based)."""
+    if page <= 1:
+        return ""
+    previous = (
+        Event.query.order_by(Event.start, Event.id)
+        .offset((page - 1) * PAGE_SIZE - 1)
+        .first()
+    )
+    return encode_event_cursor(previous)
+
+
+def main() -> None:
+    """Point d'entrée du script."""
+    parser = argparse.ArgumentParser(description="Benchmark event list pagination.")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000, 4000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = tempfile.mkstemp(suffix="benchmark.db")[1]
+    try:
+        app = create_app(
+            extra_config={
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+                "SERVER_NAME": "localhost",
+                "RESPONSE_CACHE_BACKEND": "",
+            }
+        )
+        with app.app_context():
+            db.create_all()
+            init.populate_db(app)
+            seed_start = time.perf_counter()
+            seed_events(args.events)
+            print(
+                f"Seeded {args.events} events in {time.perf_counter() - seed_start:.1f}s"
+            )
+
+            client = app.test_client()
+            print(f"{'page':>8} {'offset (ms)':>12} {'cursor (ms)':>12}")
+            for page in args.pages:
+                offset_ms = measure(
+                    client, f"/api/events/?page={page}&size={PAGE_SIZE}", args.repeat
+                )
+                cursor = cursor_for_page(page)
+                cursor_ms = measure(
+                    client,
+                    f"/api/events/?cursor={cursor}&size={PAGE_SIZE}",
+                    args.repeat,
+                )
+                print(f"{page:>8} {offset_ms:>12.1f} {cursor_ms:>12.1f}")
+    finally:
+        os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Benchmark of the event search queries.
+
+Generates a multi-year dataset with ``etc/test_set.py`` in a temporary SQLite
+database, then compares, for random prefixes of outing names:
+
+- ``like``: the former autocomplete, matching ``ILIKE '%term%'`` on the title
+  and on the title stripped of punctuation by chained ``REPLACE()`` calls, first
+  restricted to an activity then without it;
+- ``index``: :py:meth:`collectives.models.event.Event.search_relevance`, which
+  looks up words in the ``event_search_tokens`` table, in a single query
+  ranked by activity, relevance and date.
+
+Usage::
+
+    uv run etc/benchmark_event_search.py --years 10 --queries 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import func, or_, select
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from collectives import create_app
+from collectives.models import ActivityType, Event, db
+from collectives.utils import init
+from etc import test_set
+
+LIMIT = 12
+
+PUNCTUATION = ["'", "’", "-", "/", "(", ")", ":", ".", ",", "!", "?", ";"]
+
+
+def measure(name: str, queries: list, run) -> None:
+    """Run a search for each query and print the mean time per query."""
+    start = time.perf_counter()
+    found = 0
+    for query in queries:
+        found += run(*query)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>6}: {1e3 * elapsed / len(queries):.3f} ms per query, "
+        f"{found / len(queries):.1f} results per query"
+    )
+
+
+def like_search(term: str, activity_id: int) -> int:
+    """Former autocomplete queries."""
+    normalized = re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", term)).strip()
+    title = Event.title
+    for char in PUNCTUATION:
+        title = func.replace(title, char, " ")
+    title = func.replace(func.replace(title, "  ", " "), "  ", " ")
+    query = select(Event.id).where(
+        or_(Event.title.ilike(f"%{term}%"), title.ilike(f"%{normalized}%"))
+    )
+    found = db.session.scalars(
+        query.where(Event.activity_types.any(ActivityType.id == activity_id))
+        .order_by(Event.start.desc())
+        .limit(LIMIT)
+    ).all()
+    if len(found) < LIMIT:
+        found += db.session.scalars(
+            query.where(Event.id.not_in(found))
+            .order_by(Event.start.desc())
+            .limit(LIMIT - len(found))
+        ).all()
+    return len(found)
+
+
+def index_search(term: str, activity_id: int) -> int:
+    """Autocomplete query through the search index."""
+    matches = Event.search_relevance(term)
+    query = (
+        select(Event.id)
+        .join(matches, matches.c.event_id == Event.id)
+        .order_by(
+            Event.activity_types.any(ActivityType.id == activity_id).desc(),
+            matches.c.relevance.desc(),
+            Event.start.desc(),
+        )
+        .limit(LIMIT)
+    )
+    return len(db.session.scalars(query).all())
+
+
+def main() -> None:
+    """Point d'entrée du script."""
+    parser = argparse.ArgumentParser(description="Benchmark event searches.")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    db_path = tempfile.mkstemp(suffix="benchmark.db")[1]
+    try:
+        app = create_app(
+            extra_config={
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+                "SERVER_NAME": "localhost",
+                "ADMISSION_QUEUE_WORKER": "command",
+                "MAIL_SPOOL_WORKER": "command",
+            }
+        )
+        with app.app_context():
+            db.create_all()
+            init.populate_db(app)
+
+            rng = random.Random(test_set.RANDOM_SEED)
+            test_set.NUM_DAYS = 365 * args.years
+            users = test_set.create_users(rng)
+            leaders = test_set.assign_activity_roles(rng, users)
+            start = time.perf_counter()
+            test_set.create_events(rng, users, leaders)
+            print(
+                f"{Event.query.count()} events generated over {args.years} years "
+                f"in {time.perf_counter() - start:.0f}s"
+            )
+
+            # Keystrokes of users typing an outing name
+            outings = sorted(
+                {
+                    outing
+                    for outings in test_set.REAL_OUTINGS_BY_ACTIVITY.values()
+                    for outing in outings
+                }
+            )
+            activity_ids = [activity.id for activity in ActivityType.query]
+            queries = []
+            for _ in range(args.queries):
+                outing = rng.choice(outings)
+                queries.append(
+                    (outing[: rng.randint(2, len(outing))], rng.choice(activity_ids))
+                )
+
+            for run in range(2):
+                if run:
+                    print("(second run, warm cache)")
+                measure("like", queries, like_search)
+                measure("index", queries, index_search)
+    finally:
+        os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
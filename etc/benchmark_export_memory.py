@@ -0,0 +1,275 @@
+"""Benchmark of the peak memory used by the payment export.
+
+Seeds a temporary SQLite database with a large number of approved payments,
+then measures in a fresh process the peak resident set size (RSS) of:
+
+- ``workbook``: loading all payments then building a regular openpyxl
+  workbook in memory, as the export used to do;
+- ``xlsx``: the streaming Excel export of ``/payment/export``;
+- ``csv``: the streaming CSV export of ``/payment/export?format=csv``.
+
+Peak RSS is measured from the start of the export (Linux only, elsewhere it
+includes application startup), heap is the peak of Python allocations.
+
+Usage::
+
+    uv run etc/benchmark_export_memory.py --payments 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import BytesIO
+from pathlib import Path
+
+from sqlalchemy import insert
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from collectives import create_app
+from collectives.models import (
+    ActivityType,
+    Event,
+    EventType,
+    ItemPrice,
+    Payment,
+    PaymentItem,
+    PaymentStatus,
+    PaymentType,
+    User,
+    db,
+)
+from collectives.utils import init
+
+MODES = ("workbook", "xlsx", "csv")
+NUM_EVENTS = 20
+BATCH_SIZE = 5000
+
+
+def make_app(db_path: str):
+    """Create the application on the benchmark database."""
+    return create_app(
+        extra_config={
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+            "SERVER_NAME": "localhost",
+            "WTF_CSRF_ENABLED": False,
+        }
+    )
+
+
+def seed_payments(num_payments: int) -> None:
+    """Insert ``num_payments`` approved payments spread over a few events."""
+    admin = User.query.filter_by(mail="admin").first()
+    activity = ActivityType.query.first()
+    event_type = EventType.query.first()
+    start = datetime.now() - timedelta(days=30)
+
+    prices = []
+    for index in range(NUM_EVENTS):
+        event = Event(
+            title=f"Benchmark event {index}",
+            start=start,
+            end=start + timedelta(hours=8),
+            main_leader=admin,
+            event_type=event_type,
+        )
+        event.leaders.append(admin)
+        event.activity_types.append(activity)
+        item = PaymentItem(title="Participation", event=event)
+        price = ItemPrice(title="Tarif normal", amount=Decimal("25.50"), item=item)
+        price.update_time = start
+        db.session.add(event)
+        prices.append(price)
+    db.session.commit()
+
+    for batch_start in range(0, num_payments, BATCH_SIZE):
+        rows = []
+        for index in range(batch_start, min(batch_start + BATCH_SIZE, num_payments)):
+            price = prices[index % NUM_EVENTS]
+            rows.append(
+                {
+                    "item_price_id": price.id,
+                    "payment_item_id": price.item_id,
+                    "buyer_id": admin.id,
+                    "reporter_id": admin.id,
+                    "payment_type": PaymentType.Online,
+                    "status": PaymentStatus.Approved,
+                    "creation_time": start,
+                    "finalization_time": start,
+                    "processor_token": f"token{index}",
+                    "processor_order_ref": f"ref{index}",
+                    "raw_metadata": "",
+                    "amount_charged": price.amount,
+                    "amount_paid": price.amount,
+                }
+            )
+        db.session.execute(insert(Payment), rows)
+        db.session.commit()
+
+
+def export_full_workbook(app) -> int:
+    """Export payments the way it was done before streaming.
+
+    :returns: The size of the document in bytes
+    """
+    # pylint: disable=import-outside-toplevel
+    from openpyxl import Workbook
+
+    from collectives.utils.misc import deepgetattr
+    from collectives.utils.payment import extract_payments
+
+    with app.test_request_context():
+        payments = extract_payments()
+        workbook = Workbook()
+        worksheet = workbook.active
+        fields = [
+            "item.event.event_type.name",
+            "item.event.activity_type_names",
+            "item.event.main_leader.first_name",
+            "item.event.main_leader.last_name",
+            "item.event.title",
+            "item.event.start",
+            "buyer.license",
+            "buyer.first_name",
+            "buyer.last_name",
+            "buyer.mail",
+            "buyer.phone",
+            "item.title",
+            "price.title",
+            "amount_paid",
+            "finalization_time",
+            "processor_order_ref",
+        ]
+        worksheet.append(fields)
+        for payment in payments:
+            worksheet.append([deepgetattr(payment, field, "-") for field in fields])
+        out = BytesIO()
+        workbook.save(out)
+        return out.getbuffer().nbytes
+
+
+def export_route(app, export_format: str) -> int:
+    """Download the export through the payment route.
+
+    :returns: The size of the document in bytes
+    """
+    client = app.test_client()
+    response = client.post(
+        "/auth/login", data={"login": "admin", "password": app.config["ADMINPWD"]}
+    )
+    if response.status_code != 302:
+        raise RuntimeError("Unable to log in as admin")
+
+    response = client.get(f"/payment/export?format={export_format}", buffered=False)
+    if response.status_code != 200:
+        raise RuntimeError(f"Export returned {response.status_code}")
+    size = sum(len(chunk) for chunk in response.iter_encoded())
+    response.close()
+    return size
+
+
+def read_rss() -> tuple[float, float]:
+    """Return the current and peak RSS of the process, in MB.
+
+    On Linux, the peak is reset by :py:func:`reset_peak_rss`; elsewhere it is
+    the peak since the process started.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            values = dict(line.split(":", 1) for line in status)
+        return (
+            int(values["VmRSS"].split()[0]) / 1024,
+            int(values["VmHWM"].split()[0]) / 1024,
+        )
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return peak, peak
+
+
+def reset_peak_rss() -> None:
+    """Reset the peak RSS of the process so that application startup is not
+    accounted for, when supported by the system."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def measure(db_path: str, mode: str) -> None:
+    """Run one export mode and print its timings and peak memory."""
+    app = make_app(db_path)
+    with app.app_context():
+        gc.collect()
+        reset_peak_rss()
+        baseline, _ = read_rss()
+        tracemalloc.start()
+        start = time.perf_counter()
+        if mode == "workbook":
+            size = export_full_workbook(app)
+        else:
+            size = export_route(app, mode)
+        elapsed = time.perf_counter() - start
+        heap_peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        _, peak = read_rss()
+    print(
+        f"{mode:>10} {elapsed:>9.1f} {size / 1e6:>10.1f} "
+        f"{peak:>10.1f} {peak - baseline:>10.1f} {heap_peak:>10.1f}"
+    )
+
+
+def main() -> None:
+    """Point d'entrée du script."""
+    parser = argparse.ArgumentParser(description="Benchmark payment export memory.")
+    parser.add_argument("--payments", type=int, default=50_000)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--measure", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.db, args.measure)
+        return
+
+    db_path = tempfile.mkstemp(suffix="benchmark.db")[1]
+    try:
+        app = make_app(db_path)
+        with app.app_context():
+            db.create_all()
+            init.populate_db(app)
+            seed_start = time.perf_counter()
+            seed_payments(args.payments)
+            print(
+                f"Seeded {args.payments} payments "
+                f"in {time.perf_counter() - seed_start:.1f}s"
+            )
+
+        # Each mode runs in its own process so that peaks do not add up
+        print(
+            f"{'mode':>10} {'time (s)':>9} {'size (MB)':>10} "
+            f"{'peak (MB)':>10} {'delta (MB)':>10} {'heap (MB)':>10}"
+        )
+        for mode in args.modes:
+            subprocess.run(
+                [sys.executable, __file__, "--measure", mode, "--db", db_path],
+                check=True,
+            )
+    finally:
+        os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
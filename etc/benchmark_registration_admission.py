@@ -0,0 +1,214 @@
+"""Concurrency benchmark of event self-registration.
+
+Creates an event with a few online slots, logs in many users, then fires all
+their ``self_register`` requests at once from parallel threads. Checks that the
+event is not overbooked and that no user is registered twice, and reports the
+time and number of SQL statements spent.
+
+With ``--queue``, the event uses an admission queue: the time reported for the
+requests is the time to queue them, then the queue is drained by a single
+worker.
+
+By default a temporary SQLite database is used. A MySQL/MariaDB database can be
+used instead with ``--database-uri``; it must be empty, it is filled by the
+benchmark.
+
+Usage::
+
+    uv run etc/benchmark_registration_admission.py --users 50 --slots 10 [--queue]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import event as sa_event
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from collectives import create_app
+from collectives.models import (
+    ActivityType,
+    Event,
+    EventStatus,
+    EventType,
+    Gender,
+    Registration,
+    RegistrationStatus,
+    User,
+    UserType,
+    db,
+)
+from collectives.utils import init
+from collectives.utils.admission import admission_queue
+
+PASSWORD = "fooBar2+!"
+
+
+def seed(num_users: int, num_slots: int, queue: bool) -> int:
+    """Create the event and the users.
+
+    :returns: The id of the event
+    """
+    admin = User.query.filter_by(mail="admin").first()
+    now = date.today()
+    event = Event(
+        title="Benchmark collective",
+        start=now + timedelta(days=10),
+        end=now + timedelta(days=10),
+        registration_open_time=now - timedelta(days=1),
+        registration_close_time=now + timedelta(days=5),
+        num_slots=num_slots,
+        num_online_slots=num_slots,
+        num_waiting_list=0,
+        uses_admission_queue=queue,
+        status=EventStatus.Confirmed,
+        main_leader=admin,
+        event_type=EventType.query.filter_by(name="Collective").first(),
+    )
+    db.session.add(event)
+    event.leaders.append(admin)
+    event.activity_types.append(ActivityType.query.first())
+
+    for index in range(num_users):
+        user = User(
+            first_name="Benchmark",
+            last_name=f"User {index}",
+            gender=Gender.Other,
+            mail=f"user{index}@example.org",
+            type=UserType.Test,
+            license=str(990000000000 + index),
+            license_category="XX",
+            date_of_birth=date(2000, 1, 1),
+            phone=f"0601{index:06d}",
+            emergency_contact_name="Emergency",
+            emergency_contact_phone=f"0699{index:06d}",
+            legal_text_signature_date=datetime.now(),
+            legal_text_signed_version=1,
+        )
+        user.password = PASSWORD
+        db.session.add(user)
+    db.session.commit()
+    return event.id
+
+
+def main() -> None:
+    """Point d'entrée du script."""
+    parser = argparse.ArgumentParser(description="Benchmark self registrations.")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--slots", type=int, default=10)
+    parser.add_argument("--database-uri", help="Database to use instead of SQLite")
+    parser.add_argument("--queue", action="store_true", help="Use admission queue")
+    args = parser.parse_args()
+
+    db_path = None
+    database_uri = args.database_uri
+    if database_uri is None:
+        db_path = tempfile.mkstemp(suffix="benchmark.db")[1]
+        database_uri = f"sqlite:///{db_path}"
+
+    try:
+        app = create_app(
+            extra_config={
+                "SQLALCHEMY_DATABASE_URI": database_uri,
+                "SERVER_NAME": "localhost",
+                "WTF_CSRF_ENABLED": False,
+                "ADMISSION_QUEUE_WORKER": "command",
+            }
+        )
+        with app.app_context():
+            db.create_all()
+            init.populate_db(app)
+            event_id = seed(args.users, args.slots, args.queue)
+
+            clients = []
+            for index in range(args.users):
+                client = app.test_client()
+                response = client.post(
+                    "/auth/login",
+                    data={"login": f"user{index}@example.org", "password": PASSWORD},
+                )
+                if response.status_code != 302:
+                    raise RuntimeError(f"Unable to log in user {index}")
+                clients.append(client)
+
+            statements = []
+            sa_event.listen(
+                db.engine,
+                "before_cursor_execute",
+                lambda *_: statements.append(None),
+            )
+
+        barrier = threading.Barrier(args.users)
+        errors = []
+
+        def register(client):
+            """Send the self-registration request of a user"""
+            barrier.wait()
+            try:
+                response = client.post(f"/collectives/{event_id}/self_register")
+                if response.status_code != 302:
+                    errors.append(response.status_code)
+            # pylint: disable=broad-except
+            except Exception as err:
+                errors.append(err)
+
+        threads = [
+            threading.Thread(target=register, args=(client,)) for client in clients
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{args.users} requests in {elapsed:.2f}s, "
+            f"{len(statements) / args.users:.1f} SQL statements per request, "
+            f"{len(errors)} errors"
+        )
+
+        if args.queue:
+            del statements[:]
+            start = time.perf_counter()
+            admission_queue.run(app, until_empty=True)
+            print(
+                f"queue drained in {time.perf_counter() - start:.2f}s, "
+                f"{len(statements) / args.users:.1f} SQL statements per request, "
+                f"{admission_queue.admitted} admitted, "
+                f"{admission_queue.refused} refused"
+            )
+
+        with app.app_context():
+            registrations = Registration.query.filter_by(event_id=event_id).all()
+            holding = [r for r in registrations if r.is_holding_slot()]
+            user_ids = [r.user_id for r in registrations]
+            event = db.session.get(Event, event_id)
+
+            print(
+                f"{len(holding)} registrations for {args.slots} slots, "
+                f"counter {event.holding_slot_count}, "
+                f"{sum(r.status == RegistrationStatus.Waiting for r in registrations)}"
+                " waiting"
+            )
+            assert not errors, errors
+            assert len(holding) <= args.slots, "Event is overbooked"
+            assert len(set(user_ids)) == len(user_ids), "Duplicate registrations"
+            assert event.holding_slot_count == len(holding)
+            print("OK: no overbooking, no duplicate")
+    finally:
+        if db_path is not None:
+            os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
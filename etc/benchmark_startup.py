@@ -0,0 +1,147 @@
+"""Benchmark of the start of a server process.
+
+Starts fresh Python processes on a populated temporary SQLite database, and
+measures for each of them:
+
+- ``import``: the time to import the ``collectives`` package;
+- ``create_app``: the time and number of SQL queries of
+  :py:func:`collectives.create_app`;
+- ``first request``: the time to serve a first request;
+- ``total``: the time from the start of the process to the end of the first
+  request, as seen by the parent process.
+
+Processes are started with ``APP_INIT=startup``, where each of them populates
+the database and compiles stylesheets, then with ``APP_INIT=command``, where
+this is done once by ``flask collectives init``. See :py:data:`config.APP_INIT`
+
+Usage::
+
+    uv run etc/benchmark_startup.py --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+MODES = ("startup", "command")
+
+
+def child() -> None:
+    """Start the application and serve a first request, then print timings."""
+    start = time.perf_counter()
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    import collectives
+
+    imported = time.perf_counter()
+
+    statements = []
+    event.listen(Engine, "before_cursor_execute", lambda *_: statements.append(None))
+    app = collectives.create_app()
+    created = time.perf_counter()
+    queries = len(statements)
+
+    with app.test_client() as client:
+        client.get("/")
+    served = time.perf_counter()
+
+    print(
+        json.dumps(
+            {
+                "import": imported - start,
+                "create_app": created - imported,
+                "queries": queries,
+                "first request": served - created,
+            }
+        )
+    )
+
+
+def run_child(env: dict) -> dict:
+    """Run :py:func:`child` in a new Python process.
+
+    :param env: Environment variables of the process
+    :return: Timings of the process, with its total duration
+    """
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, __file__, "--child"],
+        env=env,
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    total = time.perf_counter() - start
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["total"] = total
+    return timings
+
+
+def main() -> None:
+    """Point d'entrée du script."""
+    parser = argparse.ArgumentParser(description="Benchmark server startup.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    db_path = tempfile.mkstemp(suffix="benchmark.db")[1]
+    env = dict(
+        os.environ,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}",
+        MAIL_SPOOL_WORKER="command",
+        ADMISSION_QUEUE_WORKER="command",
+    )
+    try:
+        subprocess.run(
+            [sys.executable, "-m", "flask", "db", "upgrade"],
+            env=dict(env, FLASK_APP="collectives:create_app"),
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            check=True,
+        )
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "flask", "collectives", "init"],
+            env=dict(env, FLASK_APP="collectives:create_app"),
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            check=True,
+        )
+        print(f"flask collectives init: {time.perf_counter() - start:.2f} s")
+
+        for mode in MODES:
+            runs = [run_child(dict(env, APP_INIT=mode)) for _ in range(args.runs)]
+            print(
+                f"{mode}: "
+                + ", ".join(
+                    f"{key} {1e3 * statistics.median(run[key] for run in runs):.0f} ms"
+                    for key in ("import", "create_app", "first request", "total")
+                )
+                + f", {statistics.median(run['queries'] for run in runs):.0f} "
+                "queries in create_app"
+            )
+    finally:
+        os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Benchmark of the user autocomplete queries.
+
+Generates users with random names in a temporary SQLite database, then
+compares, for random name and license parts:
+
+- ``like``: the former ``LOWER(first_name || ' ' || last_name) LIKE`` condition,
+  which scans the whole users table;
+- ``index``: :py:meth:`collectives.models.user.User.search_condition`, which
+  looks up candidate users in the ``user_search_trigrams`` table first, or
+  searches license numbers by prefix.
+
+Both queries are ordered and limited as in ``/api/users/autocomplete/``.
+
+Usage::
+
+    uv run etc/benchmark_user_autocomplete.py --users 50000 --queries 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import func, insert, select
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from collectives import create_app
+from collectives.models import User, db
+from collectives.models.user.search import refresh_user_search, user_search_text
+from collectives.utils import init
+from etc import test_set
+
+BATCH_SIZE = 5000
+
+
+def create_users(rng: random.Random, count: int) -> None:
+    """Insert users in bulk, without the ORM events maintaining the index."""
+    for first in range(0, count, BATCH_SIZE):
+        rows = []
+        for index in range(first, min(first + BATCH_SIZE, count)):
+            first_name, last_name = test_set.random_name(rng)
+            license_number = f"7400{index:08d}"
+            rows.append(
+                {
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "mail": f"user.{index}{test_set.TEST_MAIL_SUFFIX}",
+                    "license": license_number,
+                    "date_of_birth": date(1980, 1, 1),
+                    "enabled": rng.random() < 0.8,
+                    "search_text": user_search_text(first_name, last_name),
+                }
+            )
+        db.session.execute(insert(User), rows)
+    refresh_user_search(
+        db.session, db.session.execute(select(User.id, User.search_text)).all()
+    )
+    db.session.commit()
+
+
+def measure(name: str, patterns: list, run) -> None:
+    """Run a query for each pattern and print the mean time per query."""
+    start = time.perf_counter()
+    found = 0
+    for pattern in patterns:
+        found += run(pattern)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>6}: {1e3 * elapsed / len(patterns):.3f} ms per query, "
+        f"{found / len(patterns):.1f} results per query"
+    )
+
+
+def main() -> None:
+    """Point d'entrée du script."""
+    parser = argparse.ArgumentParser(description="Benchmark user autocomplete.")
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=8)
+    args = parser.parse_args()
+
+    db_path = tempfile.mkstemp(suffix="benchmark.db")[1]
+    try:
+        app = create_app(
+            extra_config={
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+                "SERVER_NAME": "localhost",
+                "ADMISSION_QUEUE_WORKER": "command",
+                "MAIL_SPOOL_WORKER": "command",
+            }
+        )
+        with app.app_context():
+            db.create_all()
+            init.populate_db(app)
+
+            rng = random.Random(test_set.RANDOM_SEED)
+            start = time.perf_counter()
+            create_users(rng, args.users)
+            print(
+                f"{User.query.count()} users indexed "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+
+            # Keystrokes of leaders typing a name or a license number
+            patterns = []
+            for _ in range(args.queries):
+                first_name, last_name = test_set.random_name(rng)
+                text = rng.choice(
+                    [
+                        last_name,
+                        f"{first_name} {last_name}",
+                        f"7400{rng.randrange(10**8):08d}",
+                    ]
+                )
+                patterns.append(text[: rng.randint(2, len(text))])
+
+            def run_query(condition):
+                query = (
+                    select(User.id)
+                    .where(condition)
+                    .order_by(User.is_active.desc(), User.full_name(), User.id)
+                    .limit(args.limit)
+                )
+                return len(db.session.execute(query).all())
+
+            def like_query(pattern):
+                pattern = pattern.lower()
+                return run_query(func.lower(User.full_name()).like(f"%{pattern}%"))
+
+            def index_query(pattern):
+                return run_query(User.search_condition(pattern))
+
+            for run in range(2):
+                if run:
+                    print("(second run, warm cache)")
+                measure("like", patterns, like_query)
+                measure("index", patterns, index_query)
+    finally:
+        os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Add mail spool
+
+Revision ID: 3c8e5a1d9b27
+Revises: 7d3e1f9a2c41
+Create Date: 2026-10-17 15:02:11.482907
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3c8e5a1d9b27"
+down_revision = "7d3e1f9a2c41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "mail_spool",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("subject", sa.Text(), nullable=False),
+        sa.Column("recipients", sa.JSON(), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("success_action", sa.JSON(), nullable=True),
+        sa.Column("error_action", sa.JSON(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum("Pending", "Failed", name="spooledmailstatus"),
+            nullable=False,
+        ),
+        sa.Column("creation_time", sa.DateTime(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_time", sa.DateTime(), nullable=False),
+        sa.Column("claim_token", sa.String(length=36), nullable=True),
+        sa.Column("claim_expiry", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_mail_spool_claim_token"), "mail_spool", ["claim_token"], unique=False
+    )
+    op.create_index(
+        op.f("ix_mail_spool_next_attempt_time"),
+        "mail_spool",
+        ["next_attempt_time"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_mail_spool_next_attempt_time"), table_name="mail_spool")
+    op.drop_index(op.f("ix_mail_spool_claim_token"), table_name="mail_spool")
+    op.drop_table("mail_spool")
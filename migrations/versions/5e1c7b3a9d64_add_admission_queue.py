@@ -0,0 +1,86 @@
+"""Add admission queue of events
+
+Revision ID: 5e1c7b3a9d64
+Revises: 9b4f2e7c1a53
+Create Date: 2026-10-17 18:21:37.104582
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5e1c7b3a9d64"
+down_revision = "9b4f2e7c1a53"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("events", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "uses_admission_queue",
+                sa.Boolean(),
+                nullable=False,
+                server_default="0",
+            )
+        )
+
+    op.create_table(
+        "admission_requests",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("item_price_id", sa.Integer(), nullable=True),
+        sa.Column("payment_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum("Queued", "Admitted", "Refused", name="admissionrequeststatus"),
+            nullable=False,
+        ),
+        sa.Column("request_time", sa.DateTime(), nullable=False),
+        sa.Column("processed_time", sa.DateTime(), nullable=True),
+        sa.Column("message", sa.Text(), nullable=True),
+        sa.Column("claim_token", sa.String(length=36), nullable=True),
+        sa.Column("claim_expiry", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["event_id"], ["events.id"]),
+        sa.ForeignKeyConstraint(["item_price_id"], ["item_prices.id"]),
+        sa.ForeignKeyConstraint(["payment_id"], ["payments.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("event_id", "user_id"),
+    )
+    op.create_index(
+        op.f("ix_admission_requests_claim_token"),
+        "admission_requests",
+        ["claim_token"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_admission_requests_status"),
+        "admission_requests",
+        ["status"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_admission_requests_user_id"),
+        "admission_requests",
+        ["user_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_admission_requests_user_id"), table_name="admission_requests"
+    )
+    op.drop_index(op.f("ix_admission_requests_status"), table_name="admission_requests")
+    op.drop_index(
+        op.f("ix_admission_requests_claim_token"), table_name="admission_requests"
+    )
+    op.drop_table("admission_requests")
+
+    with op.batch_alter_table("events", schema=None) as batch_op:
+        batch_op.drop_column("uses_admission_queue")
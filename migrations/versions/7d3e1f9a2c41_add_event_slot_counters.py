@@ -0,0 +1,47 @@
+"""add slot counters to events table
+
+Revision ID: 7d3e1f9a2c41
+Revises: 50b732cde535
+Create Date: 2026-10-17 10:12:43.218904
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7d3e1f9a2c41"
+down_revision = "50b732cde535"
+branch_labels = None
+depends_on = None
+
+counters = {
+    "holding_slot_count": ("Active", "Present", "PaymentPending"),
+    "payment_pending_count": ("PaymentPending",),
+    "waiting_count": ("Waiting",),
+}
+
+
+def upgrade():
+    with op.batch_alter_table("events", schema=None) as batch_op:
+        for name in counters:
+            batch_op.add_column(
+                sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+            )
+
+    # Backfill counters from existing registrations
+    for name, statuses in counters.items():
+        status_list = ", ".join(f"'{status}'" for status in statuses)
+        op.execute(
+            f"UPDATE events SET {name} = ("
+            "SELECT COUNT(registrations.id) FROM registrations "
+            "WHERE registrations.event_id = events.id "
+            f"AND registrations.status IN ({status_list}))"
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("events", schema=None) as batch_op:
+        for name in counters:
+            batch_op.drop_column(name)
@@ -0,0 +1,29 @@
+"""Add version to configuration items
+
+Revision ID: 9b4f2e7c1a53
+Revises: 3c8e5a1d9b27
+Create Date: 2026-10-17 16:21:37.903114
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9b4f2e7c1a53"
+down_revision = "3c8e5a1d9b27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("config", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("version", sa.Integer(), nullable=False, server_default="1")
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("config", schema=None) as batch_op:
+        batch_op.drop_column("version")
@@ -0,0 +1,66 @@
+"""Add index of the weeks spanned by events
+
+Revision ID: b7d2e4f19c35
+Revises: 5e1c7b3a9d64
+Create Date: 2026-10-17 20:07:52.318420
+
+"""
+
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b7d2e4f19c35"
+down_revision = "5e1c7b3a9d64"
+branch_labels = None
+depends_on = None
+
+
+WEEKS_EPOCH = date(2000, 1, 3)
+
+
+def week_index(time):
+    """Same as collectives.models.event.date.week_index"""
+    if isinstance(time, str):
+        time = datetime.fromisoformat(time)
+    if isinstance(time, datetime):
+        time = time.date()
+    return (time - WEEKS_EPOCH).days // 7
+
+
+def upgrade():
+    with op.batch_alter_table("events", schema=None) as batch_op:
+        batch_op.drop_index("ix_events_start")
+        batch_op.create_index("ix_events_start_end", ["start", "end"], unique=False)
+
+    event_weeks = op.create_table(
+        "event_weeks",
+        sa.Column("week", sa.Integer(), nullable=False),
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["event_id"], ["events.id"]),
+        sa.PrimaryKeyConstraint("week", "event_id"),
+    )
+
+    events = sa.table("events", sa.column("id"), sa.column("start"), sa.column("end"))
+    events = op.get_bind().execute(sa.select(events.c.id, events.c.start, events.c.end))
+    rows = []
+    for event_id, start, end in events:
+        first_week = week_index(start)
+        last_week = max(first_week, week_index(end))
+        rows.extend(
+            {"week": week, "event_id": event_id}
+            for week in range(first_week, last_week + 1)
+        )
+    if rows:
+        op.bulk_insert(event_weeks, rows)
+
+
+def downgrade():
+    op.drop_table("event_weeks")
+
+    with op.batch_alter_table("events", schema=None) as batch_op:
+        batch_op.drop_index("ix_events_start_end")
+        batch_op.create_index("ix_events_start", ["start"], unique=False)
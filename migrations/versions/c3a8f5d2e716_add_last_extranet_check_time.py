@@ -0,0 +1,29 @@
+"""Add time of the last license check of users
+
+Revision ID: c3a8f5d2e716
+Revises: b7d2e4f19c35
+Create Date: 2026-10-17 21:42:10.583214
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c3a8f5d2e716"
+down_revision = "b7d2e4f19c35"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("last_extranet_check_time", sa.DateTime(), nullable=True)
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.drop_column("last_extranet_check_time")
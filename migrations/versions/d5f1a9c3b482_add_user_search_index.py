@@ -0,0 +1,82 @@
+"""Add search index of user names
+
+Revision ID: d5f1a9c3b482
+Revises: c3a8f5d2e716
+Create Date: 2026-10-17 23:12:37.904615
+
+"""
+
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d5f1a9c3b482"
+down_revision = "c3a8f5d2e716"
+branch_labels = None
+depends_on = None
+
+
+def fold_search_text(value):
+    """Same as collectives.utils.misc.fold_search_text"""
+    value = (
+        unicodedata.normalize("NFKD", str(value))
+        .encode("ascii", "ignore")
+        .decode("ascii")
+    )
+    return " ".join(re.split(r"[^a-z0-9]+", value.lower())).strip()
+
+
+def upgrade():
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("search_text", sa.String(length=201)))
+
+    user_search_trigrams = op.create_table(
+        "user_search_trigrams",
+        sa.Column("trigram", sa.String(length=3), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("trigram", "user_id"),
+    )
+    with op.batch_alter_table("user_search_trigrams", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_user_search_trigrams_user_id"), ["user_id"], unique=False
+        )
+
+    users = sa.table(
+        "users",
+        sa.column("id"),
+        sa.column("first_name"),
+        sa.column("last_name"),
+        sa.column("search_text"),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(users.c.id, users.c.first_name, users.c.last_name)
+    ).all()
+    trigrams = []
+    for user_id, first_name, last_name in rows:
+        text = fold_search_text(f"{first_name or ''} {last_name or ''}")
+        connection.execute(
+            users.update().where(users.c.id == user_id).values(search_text=text)
+        )
+        padded = f" {text} "
+        trigrams.extend(
+            {"trigram": trigram, "user_id": user_id}
+            for trigram in {padded[i : i + 3] for i in range(len(padded) - 2)}
+        )
+    if trigrams:
+        op.bulk_insert(user_search_trigrams, trigrams)
+
+
+def downgrade():
+    with op.batch_alter_table("user_search_trigrams", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_user_search_trigrams_user_id"))
+
+    op.drop_table("user_search_trigrams")
+
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.drop_column("search_text")
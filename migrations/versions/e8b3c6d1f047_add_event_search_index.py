@@ -0,0 +1,78 @@
+"""Add search index of event titles and descriptions
+
+Revision ID: e8b3c6d1f047
+Revises: d5f1a9c3b482
+Create Date: 2026-10-18 08:41:19.627305
+
+"""
+
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e8b3c6d1f047"
+down_revision = "d5f1a9c3b482"
+branch_labels = None
+depends_on = None
+
+
+MAX_TOKEN_LENGTH = 30
+TITLE_WEIGHT = 4
+DESCRIPTION_WEIGHT = 1
+
+
+def search_words(text):
+    """Same as collectives.models.event.search.search_words"""
+    text = (
+        unicodedata.normalize("NFKD", str(text))
+        .encode("ascii", "ignore")
+        .decode("ascii")
+    )
+    return [word[:MAX_TOKEN_LENGTH] for word in re.split(r"[^a-z0-9]+", text.lower())]
+
+
+def upgrade():
+    event_search_tokens = op.create_table(
+        "event_search_tokens",
+        sa.Column("token", sa.String(length=30), nullable=False),
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("weight", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["event_id"], ["events.id"]),
+        sa.PrimaryKeyConstraint("token", "event_id"),
+    )
+    with op.batch_alter_table("event_search_tokens", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_event_search_tokens_event_id"), ["event_id"], unique=False
+        )
+
+    events = sa.table(
+        "events", sa.column("id"), sa.column("title"), sa.column("description")
+    )
+    events = op.get_bind().execute(
+        sa.select(events.c.id, events.c.title, events.c.description)
+    )
+    rows = []
+    for event_id, title, description in events:
+        weights = {}
+        for word in search_words(description or ""):
+            weights[word] = DESCRIPTION_WEIGHT
+        for word in search_words(title or ""):
+            weights[word] = TITLE_WEIGHT
+        weights.pop("", None)
+        rows.extend(
+            {"token": token, "event_id": event_id, "weight": weight}
+            for token, weight in weights.items()
+        )
+    if rows:
+        op.bulk_insert(event_search_tokens, rows)
+
+
+def downgrade():
+    with op.batch_alter_table("event_search_tokens", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_event_search_tokens_event_id"))
+
+    op.drop_table("event_search_tokens")
@@ -6,5 +6,7 @@ import collectives
 if __name__ == "__main__":
     # Systematic upgrade of the db
     os.environ["FLASK_APP"] = "collectives:create_app"
+    os.environ.setdefault("ADMISSION_QUEUE_WORKER", "thread")
     subprocess.run(["flask db upgrade"], shell=True, check=True)
+    subprocess.run(["flask collectives init --no-assets"], shell=True, check=True)
     collectives.create_app().run(debug=True)
@@ -1,10 +1,15 @@
 """Test technician functions"""
 
+from collectives.models import db
+from collectives.utils.cache import event_list_cache
+
 
 def test_index(admin_client):
     """Test access to technician index"""
     response = admin_client.get("/technician/maintenance")
     assert response.status_code == 200
+    assert 'id="mail_queue_stats"' in response.text
+    assert 'id="mail_spool_stats"' in response.text
 
 
 def test_logs(admin_client):
@@ -23,3 +28,31 @@ def test_cover(admin_client):
     """Test access to cover management page"""
     response = admin_client.get("/technician/cover")
     assert response.status_code == 200
+
+
+def test_event_list_cache(admin_client, event1):
+    """Test that event list responses are cached and invalidated on writes"""
+    url = "/api/events/?page=1&size=25"
+    response = admin_client.get(url)
+    assert response.status_code == 200
+    assert response.json["total"] == 1
+
+    stats = event_list_cache.stats()
+    response = admin_client.get(url)
+    assert response.json["total"] == 1
+    assert event_list_cache.stats()["hits"] == stats["hits"] + 1
+
+    event1.title = "Updated title"
+    db.session.commit()
+
+    response = admin_client.get(url)
+    assert response.json["data"][0]["title"] == "Updated title"
+
+    response = admin_client.get("/technician/maintenance")
+    assert response.status_code == 200
+    assert "cache_stats" in response.text
+    assert "image_pool_stats" in response.text
+
+    response = admin_client.post("/technician/maintenance/caches")
+    assert response.status_code == 302
+    assert len(event_list_cache.backend) == 0
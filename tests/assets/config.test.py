@@ -3,3 +3,7 @@
 TESTING = True
 WTF_CSRF_ENABLED = False
 BCRYPT_LOG_ROUNDS = 4
+STATISTICS_CACHE_BACKEND = "memory"
+MAIL_MAX_RETRIES = 0
+MAIL_SPOOL_WORKER = "command"
+ADMISSION_QUEUE_WORKER = "command"
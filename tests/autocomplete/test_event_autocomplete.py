@@ -219,3 +219,25 @@ def test_search_result_limit(user1_client, app, leader_user):
     response = user1_client.get(get_url("Limitée", max_returns=5))
     assert response.status_code == 200
     assert len(response.json) <= 5
+
+
+# ---------------------------------------------------------------------------
+# Relevance
+# ---------------------------------------------------------------------------
+
+
+def test_search_results_sorted_by_relevance(user1_client, three_events_different_dates):
+    """Events matching in their title come before events matching in their
+    description, then by descending start date."""
+    first, second, third = three_events_different_dates
+    first.title = "Cascade de glace"
+    second.description = "Approche par la cascade"
+    third.title = "Glaciers et cascades"
+    db.session.commit()
+
+    response = user1_client.get(get_url("Cascade"))
+    assert response.status_code == 200
+    assert [e["id"] for e in response.json] == [first.id, third.id, second.id]
+
+    response = user1_client.get(get_url("glac cascad"))
+    assert [e["id"] for e in response.json] == [third.id, first.id]
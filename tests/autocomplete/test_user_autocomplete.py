@@ -58,3 +58,22 @@ def test_search_returns_valid_profile_token(leader_client, user1, user2):
     assert result["token"] == profile_token(leader_client.user.id, user1.id)
     # A different viewer would get a different token
     assert result["token"] != profile_token(user2.id, user1.id)
+
+
+def test_search_users_folded(leader_client, user1, user2, user3, user4):
+    """Test that searches ignore accents and punctuation, and match licenses"""
+    user4.first_name = "Jérôme"
+    user4.last_name = "D'Aôst-Vallée"
+    response = leader_client.get(get_url("aost vall"))
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json] == [user4.id]
+
+    response = leader_client.get(get_url("JEROME"))
+    assert [r["id"] for r in response.json] == [user4.id]
+
+    response = leader_client.get(get_url(user2.license))
+    assert [r["id"] for r in response.json] == [user2.id]
+
+    user4.last_name = "Martin"
+    response = leader_client.get(get_url("vallee"))
+    assert len(response.json) == 0
@@ -235,3 +235,52 @@ def test_event_title_search(user1_client, event1, event2):
     data = response.json["data"]
     assert len(data) == 1
     assert data[0]["title"] == event2.title
+
+
+def test_event_title_search_folded(user1_client, event1, event2):
+    """Test that title search ignores accents and punctuation, not descriptions"""
+
+    event1.title = "Traversée de l'Étale"
+    event2.description = "Retour par l'Étale"
+    db.session.commit()
+
+    response = user1_client.get(
+        "/api/events/?page=1&size=25&filters[0][field]=title"
+        "&filters[0][type]=like&filters[0][value]=etal trav"
+    )
+    assert response.status_code == 200
+    data = response.json["data"]
+    assert [event["id"] for event in data] == [event1.id]
+
+
+def test_event_cursor_pagination(user1_client, event1, event2, event3, past_event):
+    """Test keyset pagination of the event list"""
+
+    response = user1_client.get("/api/events/?page=1&size=25")
+    assert response.status_code == 200
+    expected_ids = [event["id"] for event in response.json["data"]]
+    assert len(expected_ids) == 4
+
+    ids = []
+    cursor = ""
+    for _ in range(3):
+        response = user1_client.get(f"/api/events/?size=3&cursor={cursor}")
+        assert response.status_code == 200
+        assert "total" not in response.json
+        ids += [event["id"] for event in response.json["data"]]
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == expected_ids
+
+    response = user1_client.get("/api/events/?size=3&cursor=&count=1")
+    assert response.status_code == 200
+    assert response.json["total"] == 4
+    assert len(response.json["data"]) == 3
+
+
+def test_event_cursor_pagination_invalid(user1_client, event1):
+    """Test that a malformed cursor is rejected"""
+
+    response = user1_client.get("/api/events/?size=3&cursor=not-a-cursor")
+    assert response.status_code == 400
@@ -2,7 +2,14 @@
 
 from datetime import date, timedelta
 
-from collectives.models import BadgeIds, RegistrationStatus, db
+from collectives.models import (
+    AdmissionRequest,
+    AdmissionRequestStatus,
+    BadgeIds,
+    RegistrationStatus,
+    db,
+)
+from collectives.utils.admission import admission_queue
 from collectives.utils.time import current_time
 
 # pylint: disable=unused-argument
@@ -607,3 +614,78 @@ def test_register_for_expired_suspended_user(
     assert event.is_registered(user)
     assert len(event.registrations) == 1
     assert not user.has_a_valid_suspended_badge()
+
+
+def test_admission_queue(app, user1, user1_client, user2, event):
+    """Test self registration through the admission queue of an event"""
+    event.uses_admission_queue = True
+    db.session.commit()
+
+    # user2 is first in line for the only online slot
+    admission_queue.put(event.id, user2.id)
+    response = user1_client.post(f"/collectives/{event.id}/self_register")
+    assert response.status_code == 302
+    assert response.location.endswith(f"/collectives/{event.id}/admission")
+    assert len(event.registrations) == 0
+
+    response = user1_client.get(f"/collectives/{event.id}/admission")
+    assert response.status_code == 200
+    assert "1 demande(s)" in response.text
+
+    # Requests are processed in order
+    assert admission_queue.drain(app) == 2
+    assert admission_queue.drain(app) == 0
+    db.session.refresh(event)
+    assert [r.user for r in event.registrations] == [user2]
+    assert event.holding_slot_count == 1
+
+    response = user1_client.get(
+        f"/collectives/{event.id}/admission", follow_redirects=True
+    )
+    assert response.status_code == 200
+    assert "Vous ne pouvez pas vous inscrire vous-même." in response.text
+    assert (
+        admission_queue.get(event.id, user1.id).status == AdmissionRequestStatus.Refused
+    )
+
+    # A new request replaces the refused one
+    event.num_online_slots = 2
+    db.session.commit()
+    user1_client.post(f"/collectives/{event.id}/self_register")
+    assert AdmissionRequest.query.filter_by(event_id=event.id).count() == 2
+    assert admission_queue.drain(app) == 1
+
+    response = user1_client.get(
+        f"/collectives/{event.id}/admission", follow_redirects=True
+    )
+    assert "Vous êtes inscrit(e)" in response.text
+    db.session.refresh(event)
+    assert event.is_registered(user1)
+    assert event.holding_slot_count == 2
+
+
+def test_admission_lease_expired(app, user1, event):
+    """Test that a worker whose lease expired does not overwrite the result
+    stored by the worker which claimed the request again"""
+    event.uses_admission_queue = True
+    db.session.commit()
+    admission_queue.put(event.id, user1.id)
+
+    (request,) = admission_queue.claim()
+    former_token = request.claim_token
+    request.claim_expiry = current_time() - timedelta(seconds=1)
+    db.session.commit()
+
+    # Another worker claims the request again, and admits the user
+    assert admission_queue.drain(app) == 1
+    db.session.refresh(request)
+    assert request.status == AdmissionRequestStatus.Admitted
+
+    # pylint: disable=protected-access
+    admission_queue._refuse(request, "Trop tard", former_token)
+    admission_queue._process(request, former_token)
+    db.session.refresh(request)
+    assert request.status == AdmissionRequestStatus.Admitted
+    assert request.message != "Trop tard"
+    db.session.refresh(event)
+    assert len(event.registrations) == 1
@@ -27,11 +27,12 @@ def db_file():
 
 
 @pytest.fixture
-def app(db_file):
+def app(db_file, tmp_path):
     """Session-wide test `Flask` application."""
     extra_config = {
         "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_file}",
         "SERVER_NAME": "localhost",
+        "VOLUNTEER_CERT_CACHE_DIR": str(tmp_path / "certificates"),
     }
     fixture_app = collectives.create_app(
         "../tests/assets/config.test.py", extra_config=extra_config
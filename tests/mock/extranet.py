@@ -7,7 +7,7 @@ from zeep.exceptions import Error as ZeepError
 
 from collectives.email_templates import send_confirmation_email
 from collectives.models import Configuration
-from collectives.utils.extranet import _OTHER_CLUB_LICENSE_MESSAGE
+from collectives.utils.extranet import _OTHER_CLUB_LICENSE_MESSAGE, api
 
 # pylint: disable=unused-argument,redefined-builtin
 
@@ -188,7 +188,12 @@ def extranet_monkeypatch(monkeypatch):
     Configuration.EXTRANET_ACCOUNT_ID = "XXX"
     Configuration.CLUB_PREFIX = "7400"
 
-    monkeypatch.setattr("collectives.utils.extranet.api._soap_client", FakeSoapClient())
+    api.reset()
+    monkeypatch.setattr(api, "_create_client", lambda: (FakeSoapClient(), {}))
     monkeypatch.setattr(
         "collectives.email_templates.send_confirmation_email", _send_confirmation_email
     )
+
+    yield
+
+    api.reset()
@@ -56,6 +56,47 @@ class FakeSMTP:
     def send_message(self, *args) -> None:
         """Fake method that does not do anything"""
 
+    def quit(self) -> None:
+        """Fake method that does not do anything"""
+
+    def close(self) -> None:
+        """Fake method that does not do anything"""
+
+
+class StubSMTP(FakeSMTP):
+    """Local SMTP stub recording connections and sent messages.
+
+    Errors to raise on the next calls of :py:meth:`send_message` can be queued in
+    :py:attr:`errors`.
+    """
+
+    connections: List["StubSMTP"] = []
+    """ Connections opened since the stub was installed """
+    errors: List[Exception] = []
+    """ Errors to raise on next sends """
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Record the new connection"""
+        super().__init__(*args, **kwargs)
+        self.messages = []
+        self.closed = False
+        StubSMTP.connections.append(self)
+
+    def send_message(self, *args) -> None:
+        """Record the message, or raise the next queued error"""
+        if StubSMTP.errors:
+            raise StubSMTP.errors.pop(0)
+        self.messages.append(args[0])
+
+    def quit(self) -> None:
+        """Mark the connection as closed"""
+        self.closed = True
+
+    @classmethod
+    def sent_messages(cls) -> List:
+        """Returns messages sent over all connections"""
+        return [msg for smtp in cls.connections for msg in smtp.messages]
+
 
 @pytest.fixture
 def mail_success_monkeypatch(monkeypatch):
@@ -70,3 +111,12 @@ def mail_success_monkeypatch(monkeypatch):
     monkeypatch.setattr("smtplib.SMTP", FakeSMTP)
     monkeypatch.setattr("collectives.utils.mail.send_mail", send_mail)
     return mailer_log
+
+
+@pytest.fixture
+def smtp_stub(monkeypatch):
+    """Replace SMTP connections by :py:class:`StubSMTP`"""
+    monkeypatch.setattr(StubSMTP, "connections", [])
+    monkeypatch.setattr(StubSMTP, "errors", [])
+    monkeypatch.setattr("smtplib.SMTP", StubSMTP)
+    return StubSMTP
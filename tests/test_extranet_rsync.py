@@ -2,13 +2,21 @@
 
 # pylint: disable=unused-argument
 
-from collectives.models import User, db
+from datetime import date, timedelta
+
+import pytest
+
+from collectives.models import User, UserType, db
+from collectives.routes.auth.utils import sync_user
+from collectives.utils import extranet
 from tests import fixtures, mock
 from tests.mock.extranet import (
     EXPIRED_LICENSE,
+    VALID_LICENSE,
     VALID_LICENSE_WITH_NO_EMAIL,
     VALID_USER_EMAIL,
     VALID_USER_EMERGENCY,
+    FakeSoapClient,
 )
 
 
@@ -131,3 +139,96 @@ def test_user_resync_account(user1_client, user2, extranet_monkeypatch):
     )
     assert response.status_code == 200
     assert "error message" in response.text
+
+
+def test_license_status_cache(app, extranet_monkeypatch, monkeypatch):
+    """Test the caching of license statuses and of extranet failures"""
+
+    calls = []
+    check_license = FakeSoapClient.verifierUnAdherent
+
+    def counting_check_license(self, **kwargs):
+        calls.append(kwargs["id"])
+        result = check_license(self, **kwargs)
+        if result["existe"]:
+            # Licenses renewed today cannot be renewed again before next season
+            result["inscription"] = date.today().isoformat()
+        return result
+
+    monkeypatch.setattr(FakeSoapClient, "verifierUnAdherent", counting_check_license)
+
+    # Valid licenses are cached
+    assert extranet.api.check_license(VALID_LICENSE).exists
+    assert extranet.api.check_license(VALID_LICENSE).exists
+    assert calls == [VALID_LICENSE]
+    assert extranet.api.check_license(VALID_LICENSE, use_cache=False).exists
+    assert calls == [VALID_LICENSE] * 2
+
+    # Invalid ones are not
+    assert not extranet.api.check_license(EXPIRED_LICENSE).exists
+    assert not extranet.api.check_license(EXPIRED_LICENSE).exists
+    assert calls == [VALID_LICENSE] * 2 + [EXPIRED_LICENSE] * 2
+
+    # Failures are remembered
+    def failing_check_license(self, **kwargs):
+        calls.append(kwargs["id"])
+        raise IOError("Extranet is down")
+
+    monkeypatch.setattr(FakeSoapClient, "verifierUnAdherent", failing_check_license)
+    calls.clear()
+    for _ in range(2):
+        with pytest.raises(extranet.ExtranetError):
+            extranet.api.check_license(EXPIRED_LICENSE)
+    assert calls == [EXPIRED_LICENSE]
+
+    # Cached licenses remain available
+    assert extranet.api.check_license(VALID_LICENSE).exists
+    assert calls == [EXPIRED_LICENSE]
+
+
+def test_resync_users_command(
+    app, extranet_user, user1, extranet_monkeypatch, monkeypatch
+):
+    """Test the bulk resynchronisation of extranet users"""
+
+    extranet_user.license_expiry_date = date.today() - timedelta(days=1)
+    extranet_user.emergency_contact_name = ""
+    user1.type = UserType.Extranet
+    user1.license = EXPIRED_LICENSE
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    summary = (
+        "2 licence(s) vérifiée(s), 1 utilisateur(s) synchronisé(s), "
+        "1 licence(s) invalide(s)"
+    )
+
+    result = runner.invoke(args=["collectives", "resync-users", "--dry-run"])
+    assert result.exit_code == 0
+    assert summary in result.output
+    db.session.refresh(extranet_user)
+    assert extranet_user.emergency_contact_name == ""
+    assert extranet_user.last_extranet_check_time is None
+
+    result = runner.invoke(args=["collectives", "resync-users", "--rate", "0"])
+    assert result.exit_code == 0
+    assert summary in result.output
+    db.session.refresh(extranet_user)
+    db.session.refresh(user1)
+    assert extranet_user.emergency_contact_name == VALID_USER_EMERGENCY
+    assert extranet_user.license_expiry_date > date.today()
+    assert extranet_user.last_extranet_check_time is not None
+    assert user1.last_extranet_check_time is not None
+
+    # Users checked recently are skipped, by next runs and at login
+    result = runner.invoke(args=["collectives", "resync-users"])
+    assert result.exit_code == 0
+    assert "0 licence(s) vérifiée(s)" in result.output
+
+    def failing_check_license(self, **kwargs):
+        raise IOError("Extranet is down")
+
+    monkeypatch.setattr(FakeSoapClient, "verifierUnAdherent", failing_check_license)
+    sync_user(extranet_user, force=False)
+    with pytest.raises(extranet.ExtranetError):
+        sync_user(extranet_user, force=True)
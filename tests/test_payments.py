@@ -1,9 +1,24 @@
 """Module to test payment module."""
 
 # pylint: disable=unused-argument
-from flask import url_for
+import csv
+from io import BytesIO, StringIO
 
-from collectives.models import RegistrationStatus, db
+from flask import url_for
+from openpyxl import load_workbook
+
+from collectives.models import (
+    EventPricing,
+    Payment,
+    PaymentStatus,
+    Registration,
+    RegistrationLevels,
+    RegistrationStatus,
+    db,
+)
+from collectives.utils import export
+from collectives.utils.payment import generate_price_intervals
+from collectives.utils.time import current_time
 from tests import utils
 
 
@@ -147,6 +162,27 @@ def test_payline_registration(user1_client, paying_event, payline_monkeypatch):
     assert api_data[0]["item"]["event"]["title"] == paying_event.title
 
 
+def test_registration_terms_not_accepted(user1_client, paying_event):
+    """Test that a paid registration without accepted terms goes back to the
+    event page without error"""
+    response = user1_client.get(f"/collectives/{paying_event.id}")
+    data = utils.load_data_from_form(response.text, "select_payment_item")
+    item = paying_event.payment_items[0]
+    data["item_price"] = item.cheapest_price_for_user_now(user1_client.user).id
+    data.pop("accept_payment_terms", None)
+
+    response = user1_client.post(
+        f"/collectives/{paying_event.id}/self_register", data=data
+    )
+    assert response.status_code == 302
+    assert response.location == url_for(
+        "event.view_event", event_id=paying_event.id, _external=False
+    )
+    with user1_client.session_transaction() as session:
+        assert not session.get("_flashes")
+    assert len(paying_event.registrations) == 0
+
+
 def test_payline_registration_unfinalized(
     user1_client, paying_event, payline_monkeypatch
 ):
@@ -209,3 +245,86 @@ def test_payline_registration_unfinalized(
     api_data = response.json
     assert len(api_data) == 1
     assert api_data[0]["item"]["event"]["title"] == paying_event.title
+
+
+def test_export_payments(admin_client, paying_event, user1, user2, monkeypatch):
+    """Test Excel and CSV exports of payments, loaded by several batches"""
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+
+    item_price = paying_event.payment_items[0].prices[0]
+    for user in (user1, user2, user1):
+        payment = Payment(item_price=item_price, buyer=user)
+        payment.amount_paid = item_price.amount
+        payment.status = PaymentStatus.Approved
+        db.session.add(payment)
+    db.session.commit()
+
+    response = admin_client.get(
+        url_for("payment.export_payments", event_id=paying_event.id)
+    )
+    assert response.status_code == 200
+    assert response.content_type == export.XLSX_MIMETYPE
+    worksheet = load_workbook(filename=BytesIO(response.data)).active
+    assert worksheet.max_row == 4
+    assert worksheet.max_column == 18
+    assert worksheet["E2"].value == paying_event.title
+    assert worksheet["H3"].value == user2.first_name
+    assert worksheet["N2"].number_format == "#,##0.00€"
+
+    response = admin_client.get(
+        url_for("payment.export_payments", event_id=paying_event.id, format="csv")
+    )
+    assert response.status_code == 200
+    assert response.mimetype == export.CSV_MIMETYPE
+    assert ".csv" in response.headers["Content-Disposition"]
+    lines = list(csv.reader(StringIO(response.text.lstrip("\ufeff")), delimiter=";"))
+    assert len(lines) == 4
+    assert lines[0][0] == "Type d'événement"
+    assert lines[2][7] == user2.first_name
+
+
+def test_event_pricing(paying_event, user1, user2):
+    """Test resolving prices of several users at once"""
+    item = paying_event.payment_items[0]
+    regular_price = item.prices[0]
+    leader = paying_event.leaders[0]
+    users = [user1, user2, leader]
+    today = current_time().date()
+
+    def check_pricing():
+        pricing = EventPricing(paying_event)
+        cheapest = pricing.cheapest_prices_at_date([u.id for u in users], today)
+        for user in users:
+            assert cheapest[user.id].get(item.id) == (
+                item.cheapest_price_for_user_at_date(user, today)
+            )
+            assert pricing.available_prices(user.id) == item.available_prices_to_user(
+                user
+            )
+        return cheapest
+
+    cheapest = check_pricing()
+    assert cheapest[user1.id][item.id] == regular_price
+    assert cheapest[leader.id][item.id] != regular_price
+
+    # Use up the regular price
+    regular_price.max_uses = 1
+    registration = Registration(
+        user=user1,
+        event=paying_event,
+        status=RegistrationStatus.Active,
+        level=RegistrationLevels.Normal,
+        is_self=True,
+    )
+    db.session.add(registration)
+    db.session.commit()
+    payment = Payment(registration=registration, item_price=regular_price)
+    payment.status = PaymentStatus.Approved
+    db.session.add(payment)
+    db.session.commit()
+
+    cheapest = check_pricing()
+    assert item.id not in cheapest[user2.id]
+
+    intervals = generate_price_intervals(item, leader, EventPricing(paying_event))
+    assert [(i.start, i.end, i.amount) for i in intervals] == [(today, None, 0)]
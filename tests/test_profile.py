@@ -1,10 +1,12 @@
 """Module to test user profile pages."""
 
+import zipfile
 from datetime import date, timedelta
 
 from flask import url_for
 
 from collectives.models import BadgeCustomLevel, BadgeIds, Event, User, db
+from collectives.utils.image_pool import image_pool
 from collectives.utils.profile_token import profile_token
 from tests import utils
 from tests.fixtures import client
@@ -82,6 +84,58 @@ def test_generate_valid_benevole_cert(client_with_valid_benevole_badge, presiden
     assert response.content_type == "application/pdf"
 
 
+def test_volunteer_cert_cache(
+    app,
+    client_with_valid_benevole_badge,
+    user_with_expired_benevole_badge,
+    president_user,
+    tmp_path,
+    monkeypatch,
+):
+    """Test that volunteer certs are only drawn once, and their bulk generation."""
+
+    monkeypatch.setitem(app.config, "VOLUNTEER_CERT_CACHE_DIR", str(tmp_path))
+    user = client_with_valid_benevole_badge.user
+
+    response = client_with_valid_benevole_badge.get("/profile/user/volunteer/cert")
+    assert response.content_type == "application/pdf"
+    stored = list(tmp_path.iterdir())
+    assert len(stored) == 1
+    assert stored[0].name.startswith(f"{user.id}-")
+    assert stored[0].read_bytes() == response.data
+
+    count = certificate_jobs()
+    response = client_with_valid_benevole_badge.get("/profile/user/volunteer/cert")
+    assert response.data == stored[0].read_bytes()
+    assert certificate_jobs() == count
+
+    # A change of name replaces the stored cert
+    user.first_name = "Renamed"
+    db.session.commit()
+    response = client_with_valid_benevole_badge.get("/profile/user/volunteer/cert")
+    assert certificate_jobs() == count + 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # Bulk generation only includes users with a valid badge
+    archive_path = tmp_path.parent / "certificates.zip"
+    runner = app.test_cli_runner()
+    result = runner.invoke(
+        args=["collectives", "volunteer-certificates", str(archive_path)]
+    )
+    assert result.exit_code == 0
+    assert "1 attestation(s) bénévole, dont 0 générée(s)" in result.output
+    with zipfile.ZipFile(archive_path) as archive:
+        (name,) = archive.namelist()
+        assert "Renamed" in name and name.endswith(f" {user.id}.pdf")
+        assert archive.read(name) == response.data
+
+
+def certificate_jobs() -> int:
+    """:return: the number of volunteer certs drawn by the image pool"""
+    stats = image_pool.jobs.get("certificate")
+    return stats.count if stats else 0
+
+
 def test_generate_expired_benevole_cert(
     client_with_expired_benevole_badge, president_user
 ):
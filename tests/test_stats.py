@@ -2,12 +2,20 @@
 
 # pylint: disable=unused-argument
 
+import time
 from datetime import timedelta
+from io import BytesIO
 
 import openpyxl
 
 from collectives.models import ActivityType, EventType
-from collectives.utils.stats import StatisticsEngine
+from collectives.utils.stats import (
+    SinglePassStatisticsEngine,
+    StatisticsEngine,
+    encode_statistic,
+    precompute_statistics,
+    statistics_cache,
+)
 from collectives.utils.time import current_time
 
 
@@ -140,3 +148,79 @@ def test_statistics_engine_only_party(stats_env):
     # Empty selection means no restriction on event type.
     engine = StatisticsEngine(event_type_ids=[])
     assert engine.nb_events() == 6
+
+
+def test_single_pass_engine(stats_env, monkeypatch):
+    """Tests that the single pass engine gives the same results as the default one."""
+    monkeypatch.setattr(statistics_cache, "backend", None)
+    alpinisme = ActivityType.query.filter_by(name="Alpinisme").first()
+    party = EventType.query.filter_by(name="Soirée").first()
+
+    parameters = [
+        {},
+        {"start": current_time(), "end": current_time() + timedelta(days=365)},
+        {"activity_id": alpinisme.id},
+        {"event_type_ids": [party.id]},
+        {"year": current_time().year},
+    ]
+    for kwargs in parameters:
+        engine = StatisticsEngine(**kwargs)
+        single_pass_engine = SinglePassStatisticsEngine(**kwargs)
+        for name in StatisticsEngine.INDEX:
+            expected = getattr(engine, name)()
+            assert getattr(single_pass_engine, name)() == expected, (name, kwargs)
+
+    assert openpyxl.load_workbook(filename=single_pass_engine.export_excel())
+
+
+def test_statistics_page(stats_env, supervisor_client):
+    """Tests the statistics page with the single pass engine."""
+    response = supervisor_client.get("/stats")
+    assert response.status_code == 200
+    response = supervisor_client.get("/stats?excel")
+    assert response.status_code == 200
+    workbook = openpyxl.load_workbook(filename=BytesIO(response.data))
+    assert workbook.sheetnames[0] == "Général"
+    assert workbook["Général"]["A3"].value.startswith("Du ")
+    assert workbook["Général"]["A1"].font.bold
+
+
+def test_statistics_store(stats_env):
+    """Tests that statistics are shared between engines with the same parameters."""
+    statistics_cache.invalidate()
+    engine = StatisticsEngine()
+    expected = engine.attendee_time_by_gender_and_license_type()
+    assert statistics_cache.misses == 1
+
+    other_engine = SinglePassStatisticsEngine()
+    assert other_engine.attendee_time_by_gender_and_license_type() == expected
+    assert statistics_cache.hits == 1
+    assert StatisticsEngine(activity_id=1).nb_events() is not None
+    assert statistics_cache.misses == 2
+
+    statistics_cache.invalidate()
+    assert StatisticsEngine().nb_events() == 6
+    assert statistics_cache.misses == 3
+
+    assert precompute_statistics() > 0
+    hits = statistics_cache.hits
+    year = current_time().year if current_time().month >= 9 else current_time().year - 1
+    StatisticsEngine(year=year).compute_all()
+    assert statistics_cache.hits == hits + len(StatisticsEngine.INDEX)
+
+
+def test_statistics_precomputation(stats_env):
+    """Tests that precomputation overwrites statistics which are about to expire."""
+    statistics_cache.invalidate()
+    year = current_time().year if current_time().month >= 9 else current_time().year - 1
+    engine = StatisticsEngine(year=year)
+    key = f"{engine.cache_key()}/nb_events"
+    statistics_cache.backend.set(key, encode_statistic(-1), 1)
+
+    precompute_statistics()
+    time.sleep(1.1)
+
+    misses = statistics_cache.misses
+    assert StatisticsEngine(year=year).nb_events() == engine.nb_events()
+    assert engine.nb_events() != -1
+    assert statistics_cache.misses == misses
@@ -0,0 +1,99 @@
+"""Unit tests for the Configuration cache"""
+
+import pytest
+import sqlalchemy as sa
+
+from collectives.models import Configuration, ConfigurationItem, db
+from collectives.utils import init
+
+
+@pytest.fixture
+def statements(app):
+    """A list which receives the SQL statements run on the app database"""
+    logged = []
+
+    def log_statement(conn, cursor, statement, *args):
+        # pylint: disable=unused-argument
+        logged.append(statement)
+
+    engine = db.engine
+    sa.event.listen(engine, "before_cursor_execute", log_statement)
+    yield logged
+    sa.event.remove(engine, "before_cursor_execute", log_statement)
+
+
+def test_configuration_snapshot(app, statements):
+    """Test that configuration items are loaded at once and revalidated"""
+    Configuration.uncache()
+    del statements[:]
+
+    assert Configuration.CLUB_NAME == Configuration["CLUB_NAME"]
+    assert Configuration.TOKEN_DURATION > 0
+    assert len(statements) == 2
+
+    with pytest.raises(AttributeError):
+        _ = Configuration.NOT_A_CONFIGURATION_ITEM
+    assert len(statements) == 2
+
+    # Items modified through the ORM are reloaded right away
+    item = Configuration.get_item("CLUB_NAME")
+    version = item.version
+    item.content = "Club de test"
+    db.session.commit()
+    assert item.version == version + 1
+    assert Configuration.CLUB_NAME == "Club de test"
+
+    # Items modified elsewhere are reloaded once the snapshot expired
+    db.session.execute(
+        sa.update(ConfigurationItem)
+        .where(ConfigurationItem.name == "CLUB_NAME")
+        .values(json_content='"Autre club"', version=ConfigurationItem.version + 1)
+    )
+    db.session.commit()
+    assert Configuration.CLUB_NAME == "Club de test"
+
+    # pylint: disable=protected-access
+    Configuration._snapshot = Configuration._snapshot._replace(expiry=0)
+    del statements[:]
+    assert Configuration.CLUB_NAME == "Autre club"
+    assert len(statements) == 2
+
+    # Only the generation is checked when the table did not change
+    Configuration._snapshot = Configuration._snapshot._replace(expiry=0)
+    del statements[:]
+    assert Configuration.CLUB_NAME == "Autre club"
+    assert len(statements) == 1
+
+
+def test_init_config(app, statements):
+    """Test that configuration items are loaded from YAML with a single query"""
+    path = "tests/assets/configuration.test.yaml"
+    item = Configuration.get_item("test_string")
+    version = item.version
+    item.description = "Ancienne description"
+    db.session.delete(Configuration.get_item("test_int"))
+    db.session.commit()
+
+    del statements[:]
+    init.init_config(app, path=path, clean=False)
+    assert len([s for s in statements if s.startswith("SELECT")]) == 1
+    assert Configuration.get_item("test_string").description != "Ancienne description"
+    assert Configuration.get_item("test_string").version == version + 2
+    assert Configuration.get_item("test_int") is not None
+
+    # Running it again writes nothing
+    del statements[:]
+    init.init_config(app, path=path, clean=False)
+    assert len(statements) == 1
+
+
+def test_init_command(app):
+    """Test that ``flask collectives init`` can be run several times"""
+    runner = app.test_cli_runner()
+    for _ in range(2):
+        result = runner.invoke(args=["collectives", "init", "--no-assets"])
+        assert result.exit_code == 0, result.output
+        assert "Base de données initialisée." in result.output
+
+    assert Configuration.get_item("CLUB_NAME") is not None
+    assert Configuration.get_item("test_string") is None
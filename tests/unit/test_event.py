@@ -2,6 +2,8 @@
 
 import datetime
 
+import sqlalchemy as sa
+
 # pylint: disable=C0301
 from collectives.models import (
     ActivityType,
@@ -14,6 +16,7 @@ from collectives.models import (
     User,
     db,
 )
+from collectives.models.event.model import event_weeks
 from collectives.models.user_group import GroupRoleCondition, UserGroup
 from collectives.routes.event import update_waiting_list
 from collectives.utils.time import current_time
@@ -242,6 +245,103 @@ def test_waiting_list_update(event1: Event, event2: Event, user1: User, user2: U
     assert reg_u2_e2.status == RegistrationStatus.Active
 
 
+def test_registrations_during_by_user(
+    event1: Event, event2: Event, event3: Event, user1: User, user2: User, user3: User
+):
+    """Test fetching the registrations of several users during an event at once"""
+    event3.start = event1.start + datetime.timedelta(days=30)
+    event3.end = event1.end + datetime.timedelta(days=30)
+
+    for event, user, status in (
+        (event1, user1, RegistrationStatus.Active),
+        (event2, user1, RegistrationStatus.Waiting),
+        (event2, user2, RegistrationStatus.Active),
+        (event3, user3, RegistrationStatus.Active),
+    ):
+        db.session.add(
+            Registration(
+                event=event, user=user, status=status, level=RegistrationLevels.Normal
+            )
+        )
+    db.session.commit()
+
+    user_ids = [user1.id, user2.id, user3.id]
+    start, end = event1.start, event1.end
+    statements = []
+
+    @sa.event.listens_for(db.engine, "before_cursor_execute")
+    def log_statement(conn, cursor, statement, *args):
+        # pylint: disable=unused-argument
+        statements.append(statement)
+
+    conflicts = User.registrations_during_by_user(user_ids, start, end)
+    # Only eager loaded event relationships are queried separately
+    assert sum("FROM registrations" in statement for statement in statements) == 1
+    assert {
+        user_id: [r.event for r in regs] for user_id, regs in conflicts.items()
+    } == {
+        user1.id: [event1],
+        user2.id: [event2],
+    }
+
+    conflicts = User.registrations_during_by_user(
+        user_ids, event2.start, event2.end, event2.id, include_waiting=True
+    )
+    assert list(conflicts) == [user1.id]
+    assert conflicts[user1.id][0].event == event1
+    assert (
+        user1.registrations_during(event2.start, event2.end, event2.id)
+        == (conflicts[user1.id])
+    )
+    assert not User.registrations_during_by_user([])
+
+
+def test_overlapping_events(event1: Event, event2: Event, event3: Event):
+    """Test the lookup of events overlapping a timespan"""
+    start = datetime.datetime(2031, 3, 3, 8)
+    event1.start, event1.end = start, start + datetime.timedelta(hours=8)
+    event2.start, event2.end = start, start + datetime.timedelta(days=20)
+    event3.start = start - datetime.timedelta(days=400)
+    event3.end = event3.start + datetime.timedelta(hours=8)
+    db.session.commit()
+
+    weeks = db.session.execute(
+        sa.select(event_weeks.c.event_id, sa.func.count()).group_by(
+            event_weeks.c.event_id
+        )
+    ).all()
+    assert dict(weeks) == {event1.id: 1, event2.id: 3, event3.id: 1}
+
+    def overlapping(begin, end):
+        query = sa.select(Event.id).where(Event.overlapping(begin, end))
+        return set(db.session.scalars(query))
+
+    assert overlapping(start, start + datetime.timedelta(hours=1)) == {
+        event1.id,
+        event2.id,
+    }
+    later = start + datetime.timedelta(days=15)
+    assert overlapping(later, later + datetime.timedelta(hours=1)) == {event2.id}
+    assert overlapping(event1.end, later) == {event2.id}
+    assert overlapping(event3.start, event3.end) == {event3.id}
+
+    # Weeks follow date changes and deletions
+    event3.start = event3.start + datetime.timedelta(days=400)
+    event3.end = event3.end + datetime.timedelta(days=400)
+    db.session.commit()
+    assert overlapping(start, start + datetime.timedelta(hours=1)) == {
+        event1.id,
+        event2.id,
+        event3.id,
+    }
+    db.session.delete(event2)
+    db.session.commit()
+    assert overlapping(later, later + datetime.timedelta(hours=1)) == set()
+    assert not db.session.scalars(
+        sa.select(event_weeks.c.week).where(event_weeks.c.event_id == event2.id)
+    ).all()
+
+
 def test_paying_event_waiting_list_update(
     paying_event: Event, user1: User, president_user: User
 ):
@@ -1,13 +1,22 @@
 """Unit tests for registrations"""
 
 import pytest
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
 
-from collectives.models import Registration, RegistrationLevels, RegistrationStatus, db
+from collectives.models import (
+    Registration,
+    RegistrationLevels,
+    RegistrationStatus,
+    UserType,
+    db,
+)
 from collectives.models.event import (
     DuplicateRegistrationError,
     Event,
     OverbookedRegistrationError,
 )
+from collectives.models.event.registration import inconsistent_slot_counters
 
 
 def test_overflow(user1, user2, user3, user4, event: Event):
@@ -44,8 +53,13 @@ def test_overflow(user1, user2, user3, user4, event: Event):
     )
 
     event.add_registration_check_race_conditions(reg1)
+    # Pending changes of the session are kept when a registration is refused
+    user2.first_name = "Refusé"
     with pytest.raises(OverbookedRegistrationError):
         event.add_registration_check_race_conditions(reg2)
+    db.session.commit()
+    db.session.refresh(user2)
+    assert user2.first_name == "Refusé"
     event.add_registration_check_race_conditions(reg3)
     with pytest.raises(OverbookedRegistrationError):
         event.add_registration_check_race_conditions(reg4)
@@ -86,7 +100,119 @@ def test_duplicate(user1, user2, event: Event):
     event.add_registration_check_race_conditions(reg2)
     with pytest.raises(DuplicateRegistrationError):
         event.add_registration_check_race_conditions(reg3)
+    db.session.commit()
+    assert not inconsistent_slot_counters()
 
     assert len(event.registrations) == 2
     assert (event.registrations[0]) == reg1
     assert (event.registrations[1]) == reg2
+
+
+def test_slot_counters(app, event1_with_reg_waiting_list: Event):
+    """Test that slot counters follow registration changes"""
+
+    event = event1_with_reg_waiting_list
+    db.session.add(event)
+    db.session.commit()
+
+    # Registrations are not loaded anymore, counters are used
+    assert event.holding_slot_count == 2
+    assert event.waiting_count == 2
+    assert event.num_taken_slots() == 2
+    assert event.num_waiting_registrations() == 2
+    assert "registrations" in sa.inspect(event).unloaded
+
+    event.registrations[0].status = RegistrationStatus.PaymentPending
+    event.registrations[2].status = RegistrationStatus.Active
+    db.session.delete(event.registrations[3])
+    db.session.commit()
+
+    assert event.holding_slot_count == 3
+    assert event.payment_pending_count == 1
+    assert event.waiting_count == 0
+    assert inconsistent_slot_counters() == []
+    assert event.num_pending_registrations() == 1
+
+    # Active registrations of users whose license expires are pending too
+    user = event.registrations[1].user
+    user.type = UserType.Extranet
+    user.license_expiry_date = None
+    db.session.commit()
+    assert event.num_pending_registrations() == 2
+    assert "registrations" in sa.inspect(event).unloaded
+    assert len([r for r in event.registrations if r.is_holding_slot()]) == 3
+    assert event.num_pending_registrations() == 2
+
+    db.session.execute(
+        sa.update(Event).where(Event.id == event.id).values(holding_slot_count=10)
+    )
+    db.session.commit()
+    assert [row[0] for row in inconsistent_slot_counters()] == [event.id]
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["collectives", "check-slot-counters"])
+    assert result.exit_code != 0
+    result = runner.invoke(args=["collectives", "check-slot-counters", "--repair"])
+    assert result.exit_code == 0
+    assert inconsistent_slot_counters() == []
+    assert event.num_taken_slots() == 3
+
+
+def test_concurrent_admission(user1, user2, user3, event: Event):
+    """Test that admission uses the committed state of the event, not the
+    registrations loaded in session"""
+
+    event.num_online_slots = 2
+    event.num_slots = 2
+    db.session.add(event)
+    db.session.commit()
+
+    reg1 = Registration(
+        user_id=user1.id,
+        status=RegistrationStatus.Active,
+        level=RegistrationLevels.Normal,
+        is_self=True,
+    )
+    event.add_registration_check_race_conditions(reg1)
+    assert event.can_self_register(user2, event.registration_open_time)
+
+    # Another server process registers user3 meanwhile
+    with Session(db.engine) as other_session:
+        other_session.add(
+            Registration(
+                event_id=event.id,
+                user_id=user3.id,
+                status=RegistrationStatus.Active,
+                level=RegistrationLevels.Normal,
+                is_self=True,
+            )
+        )
+        other_session.commit()
+
+    reg2 = Registration(
+        user_id=user2.id,
+        status=RegistrationStatus.Active,
+        level=RegistrationLevels.Normal,
+        is_self=True,
+    )
+    with pytest.raises(OverbookedRegistrationError):
+        event.add_registration_check_race_conditions(reg2)
+
+    # Only the savepoint was rolled back: the session still holds former values
+    db.session.refresh(event)
+    assert [r.user_id for r in event.registrations] == [user1.id, user3.id]
+    assert event.holding_slot_count == 2
+    assert inconsistent_slot_counters() == []
+
+    # Leaders can still overbook the event, but not register a user twice
+    reg2.status = RegistrationStatus.Active
+    event.add_registration_check_race_conditions(reg2, allow_overbooking=True)
+    assert event.holding_slot_count == 3
+    reg4 = Registration(
+        user_id=user2.id,
+        status=RegistrationStatus.Active,
+        level=RegistrationLevels.Normal,
+        is_self=False,
+    )
+    with pytest.raises(DuplicateRegistrationError):
+        event.add_registration_check_race_conditions(reg4, allow_overbooking=True)
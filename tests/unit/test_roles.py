@@ -60,3 +60,41 @@ def test_add_activity_role(user2: User, user3: User):
     assert not user3.is_leader()
     assert user3.can_create_events()
     assert activity2 in user3.get_organizable_activities()
+
+
+def test_visibility_profile(app, user2: User):
+    """Test that the visibility profile follows role changes"""
+
+    activity1 = db.session.get(ActivityType, 1)
+    activity2 = db.session.get(ActivityType, 2)
+
+    profile = user2.visibility_profile()
+    assert not profile.is_moderator
+    assert not profile.can_lead_events
+    assert not profile.has_any_role
+    assert not profile.role_activity_ids
+    assert user2.visibility_profile() is profile
+    # Profiles are only kept for the current request
+    with app.app_context():
+        assert user2.visibility_profile() is not profile
+        assert user2.visibility_profile() == profile
+
+    promote_to_leader(user2, activity=activity1.name)
+    db.session.commit()
+    profile = user2.visibility_profile()
+    assert profile.can_lead_events
+    assert profile.has_any_role
+    assert profile.role_activity_ids == {activity1.id}
+    assert not profile.supervised_activity_ids
+
+    promote_user(
+        user2, activity_name=activity2.name, role_id=RoleIds.ActivitySupervisor
+    )
+    db.session.commit()
+    profile = user2.visibility_profile()
+    assert profile.role_activity_ids == {activity1.id, activity2.id}
+    assert profile.supervised_activity_ids == {activity2.id}
+
+    user2.roles.clear()
+    db.session.commit()
+    assert not user2.visibility_profile().has_any_role
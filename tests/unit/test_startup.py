@@ -0,0 +1,73 @@
+"""Regression tests on the import cost and memory of a server process"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+LAZY_MODULES = ("openpyxl", "zeep", "pysimplesoap", "dkim", "requests")
+""" Heavy modules which should only be imported when they are used """
+
+MAX_STARTUP_TIME = 15
+""" Maximum time to import the application and create it, in seconds """
+
+MAX_STARTUP_RSS = 130
+""" Maximum peak resident memory of a process which created the application, in
+MB """
+
+STARTUP_CODE = """
+import json, pathlib, re, sys, time
+start = time.perf_counter()
+import collectives
+collectives.create_app(
+    "../tests/assets/config.test.py",
+    extra_config={"SQLALCHEMY_DATABASE_URI": "sqlite:///%s"},
+)
+elapsed = time.perf_counter() - start
+status = pathlib.Path("/proc/self/status").read_text()
+print(json.dumps({
+    "time": elapsed,
+    "rss": int(re.search(r"VmHWM:\\s+(\\d+)", status)[1]) / 1024,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def import_time_report(stderr: str, count: int = 15) -> str:
+    """Summarize the output of ``python -X importtime``.
+
+    :param stderr: Output of the process
+    :param count: Number of modules to list
+    :return: The modules which took the longest to import, with their
+        cumulative import time
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules.append((int(cumulative), name.strip()))
+    modules.sort(reverse=True)
+    return "\n".join(f"{time / 1000:8.1f} ms {name}" for time, name in modules[:count])
+
+
+def test_startup_cost(tmp_path):
+    """Test that creating the application does not load heavy modules, and stays
+    within time and memory limits"""
+    if not sys.platform.startswith("linux"):
+        pytest.skip("Memory is read from /proc")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE % (tmp_path / "db")],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    report = import_time_report(process.stderr)
+    print(report)
+
+    imported = [name for name in LAZY_MODULES if name in result["modules"]]
+    assert not imported, f"{imported} imported at startup\n{report}"
+    assert result["time"] < MAX_STARTUP_TIME, f"{result['time']:.1f} s\n{report}"
+    assert result["rss"] < MAX_STARTUP_RSS, f"{result['rss']:.0f} MB\n{report}"
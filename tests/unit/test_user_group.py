@@ -1,6 +1,6 @@
 """Unit tests for UserGroup class"""
 
-from collectives.models import BadgeIds, RegistrationStatus, RoleIds, User, db
+from collectives.models import BadgeIds, RegistrationStatus, Role, RoleIds, User, db
 from collectives.models.badge import Badge
 from collectives.models.user_group import (
     GroupBadgeCondition,
@@ -8,6 +8,7 @@ from collectives.models.user_group import (
     GroupLicenseCondition,
     GroupRoleCondition,
     UserGroup,
+    user_group_memberships,
 )
 from collectives.utils.time import current_time
 
@@ -253,6 +254,39 @@ def test_any_role_condition(user1, president_user, leader_user):
     assert leader_user in group0_members
 
 
+def test_user_group_membership_cache(user1, user2, president_user):
+    """Test caching of user group members"""
+
+    group0 = UserGroup()
+    group0.role_conditions.append(GroupRoleCondition(role_id=RoleIds.President))
+    db.session.add(group0)
+    db.session.commit()
+
+    time = current_time()
+    hits, misses = user_group_memberships.hits, user_group_memberships.misses
+    assert group0.contains(president_user, time)
+    assert not group0.contains(user1, time)
+    assert group0.contains_many([user1.id, user2.id, president_user.id], time) == {
+        president_user.id
+    }
+    assert user_group_memberships.misses == misses + 1
+    assert user_group_memberships.hits == hits + 2
+
+    # Uncommitted changes are taken into account, then invalidate the cache
+    user1.roles.append(Role(role_id=RoleIds.President))
+    assert group0.contains(user1, time)
+    db.session.commit()
+    assert group0.contains_many([user1.id, user2.id], time) == {user1.id}
+    assert user_group_memberships.misses == misses + 2
+
+    # Inactive users are not members
+    user2.roles.append(Role(role_id=RoleIds.President))
+    user2.enabled = False
+    db.session.commit()
+    assert not group0.contains(user2, time)
+    assert group0.contains_many([user2.id], time) == set()
+
+
 def test_badge_condition_with_null_and_non_null_expiration(
     user_with_valid_benevole_badge,
     user_with_expired_benevole_badge,
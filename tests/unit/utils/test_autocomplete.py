@@ -65,7 +65,7 @@ def test_normalize_search_term(raw, expected):
 
 
 # ---------------------------------------------------------------------------
-# Python ↔ SQL punctuation normalisation consistency
+# Event search index
 # ---------------------------------------------------------------------------
 
 
@@ -78,16 +78,15 @@ def test_normalize_search_term(raw, expected):
         "Réunion!",
     ],
 )
-def test_python_and_sql_normalize_match(app, title):
-    """The SQL-side punctuation normalisation must match the Python side.
-
-    This catches any punctuation character that _normalize_search_term handles
-    but _SQL_PUNCTUATION_MAP does not (or vice-versa).
+def test_event_search_tokens_match_query_words(app, title):
+    """The words indexed for an event title must be those of the normalised
+    search term, so that searching the title finds the event.
     """
     from datetime import date, timedelta
 
-    from collectives.api.event import _sql_normalized_title
     from collectives.models import ActivityType, Event, EventType, db
+    from collectives.models.event.model import event_search_tokens
+    from collectives.models.event.search import TITLE_WEIGHT, search_words
 
     alpinisme = ActivityType.query.filter_by(name="Alpinisme").first()
     event_type = EventType.query.filter_by(name="Collective").first()
@@ -106,14 +105,17 @@ def test_python_and_sql_normalize_match(app, title):
     db.session.add(event)
     db.session.flush()
 
-    # Query the SQL-side normalised value
-    sql_result = (
-        db.session.query(_sql_normalized_title()).filter(Event.id == event.id).scalar()
-    )
-
-    python_result = _normalize_search_term(title)
-
-    # ilike is case-insensitive, so compare lowercased
-    assert sql_result.lower().strip() == python_result.lower()
+    tokens = db.session.execute(
+        db.select(event_search_tokens.c.token).where(
+            event_search_tokens.c.event_id == event.id,
+            event_search_tokens.c.weight == TITLE_WEIGHT,
+        )
+    ).scalars()
+    assert set(tokens) == set(search_words(_normalize_search_term(title)))
+
+    found = db.session.scalars(
+        db.select(Event.id).where(Event.search_condition(title, in_description=False))
+    ).all()
+    assert found == [event.id]
 
     db.session.rollback()
@@ -0,0 +1,55 @@
+"""Unit test on :py:mod:`collectives.utils.cache` backends."""
+
+from collectives.utils.cache import FileCacheBackend, MemoryCacheBackend
+
+
+def test_memory_backend():
+    """Test LRU eviction and expiry of the in-process backend"""
+
+    backend = MemoryCacheBackend(max_size=2)
+    backend.set("a", "1", 60)
+    backend.set("b", "2", 60)
+    assert backend.get("a") == "1"
+
+    # "b" is the least recently used entry
+    backend.set("c", "3", 60)
+    assert backend.get("b") is None
+    assert backend.get("a") == "1"
+    assert len(backend) == 2
+
+    backend.set("d", "4", -1)
+    assert backend.get("d") is None
+
+    backend.clear()
+    assert backend.get("a") is None
+
+
+def test_file_backend(tmp_path):
+    """Test that file backend entries are shared and invalidated"""
+
+    backend = FileCacheBackend(str(tmp_path))
+    other_worker = FileCacheBackend(str(tmp_path))
+
+    backend.set("key", "value", 60)
+    assert other_worker.get("key") == "value"
+    assert len(backend) == 1
+
+    other_worker.clear()
+    assert backend.get("key") is None
+    assert len(backend) == 0
+
+    backend.set("expired", "value", -1)
+    assert other_worker.get("expired") is None
+
+
+def test_stale_set_after_clear(tmp_path):
+    """Test that a value built before an invalidation is not stored after it"""
+
+    for backend in (MemoryCacheBackend(), FileCacheBackend(str(tmp_path))):
+        generation = backend.generation()
+        backend.clear()
+        backend.set("stale", "value", 60, generation)
+        assert backend.get("stale") is None
+
+        backend.set("fresh", "value", 60, backend.generation())
+        assert backend.get("fresh") == "value"
@@ -0,0 +1,65 @@
+"""Unit test on :py:mod:`collectives.utils.image_pool`."""
+
+import io
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from collectives.utils.image_pool import ImagePoolBusy, image_pool
+from collectives.utils.misc import ImageTooLargeError, is_valid_image
+
+
+@pytest.fixture
+def inline_pool(app, monkeypatch):
+    """Run image jobs in the calling thread, with a single slot"""
+    monkeypatch.setitem(app.config, "IMAGE_POOL_WORKERS", 0)
+    monkeypatch.setitem(app.config, "IMAGE_POOL_QUEUE_SIZE", 1)
+    monkeypatch.setitem(app.config, "IMAGE_POOL_TIMEOUT", 0.2)
+    monkeypatch.setitem(app.config, "IMAGE_MAX_PIXELS", 1000 * 1000)
+    image_pool.init_app(app)
+    yield image_pool
+    monkeypatch.undo()
+    image_pool.init_app(app)
+
+
+def _png(width: int, height: int) -> io.BytesIO:
+    """Content of a PNG image"""
+    stream = io.BytesIO()
+    Image.new("RGB", (width, height)).save(stream, "PNG")
+    stream.seek(0)
+    return stream
+
+
+def test_image_validation(app):
+    """Test that images are checked by worker processes"""
+
+    assert is_valid_image(_png(200, 100))
+    assert not is_valid_image(io.BytesIO(b"not an image"))
+
+    jobs = {job["name"]: job for job in image_pool.stats()["jobs"]}
+    assert jobs["verify"]["count"] >= 2
+    assert image_pool.stats()["pending"] == 0
+
+
+def test_image_pool_limits(inline_pool):
+    """Test the pixel limit and the bounded queue"""
+
+    assert is_valid_image(_png(1000, 1000))
+    with pytest.raises(ImageTooLargeError, match="1 millions de pixels"):
+        is_valid_image(_png(1001, 1000))
+
+    # The only slot is taken by a slow job
+    slow_job = threading.Thread(target=inline_pool.run, args=("slow", time.sleep, 0.5))
+    slow_job.start()
+    time.sleep(0.05)
+    with pytest.raises(ImagePoolBusy):
+        inline_pool.run("fast", time.sleep, 0)
+    assert not is_valid_image(_png(10, 10))
+    slow_job.join()
+
+    jobs = {job["name"]: job for job in inline_pool.stats()["jobs"]}
+    assert jobs["fast"]["rejected"] == 1
+    assert jobs["slow"]["duration_avg"] >= 500
+    assert inline_pool.run("fast", time.sleep, 0) is None
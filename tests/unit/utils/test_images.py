@@ -0,0 +1,96 @@
+"""Unit test on :py:mod:`collectives.utils.images`."""
+
+import io
+import os
+
+import pytest
+from flask_uploads import UploadConfiguration
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from collectives.api.schemas import photo_uri
+from collectives.models import db
+from collectives.utils.images import derivative_path, is_hashed_name
+
+
+@pytest.fixture
+def upload_dirs(app, tmp_path, monkeypatch):
+    """Redirect uploaded photos and their derivatives to a temporary folder"""
+    photos_dir = tmp_path / "photos"
+    photos_dir.mkdir()
+    monkeypatch.setitem(
+        app.upload_set_config, "photos", UploadConfiguration(str(photos_dir))
+    )
+    monkeypatch.setitem(
+        app.config, "UPLOADED_DERIVATIVES_DEST", str(tmp_path / "derived")
+    )
+    return photos_dir
+
+
+def _jpeg(color: str) -> bytes:
+    """Content of a JPEG image"""
+    stream = io.BytesIO()
+    Image.new("RGB", (1600, 1200), color).save(stream, "JPEG")
+    return stream.getvalue()
+
+
+def test_derivatives_generated_on_upload(app, client, event, upload_dirs):
+    """Test that derivatives are generated when an event photo is saved"""
+
+    file = FileStorage(io.BytesIO(_jpeg("red")), filename="photo.jpg")
+    assert event.save_photo(file)
+    db.session.commit()
+
+    assert is_hashed_name(event.photo)
+    for webp in (False, True):
+        with Image.open(derivative_path(event.photo, "event_card", webp)) as image:
+            assert image.size == (350, 250)
+        with Image.open(derivative_path(event.photo, "event_full", webp)) as image:
+            assert image.size == (1100, 825)
+
+    url = photo_uri(event)
+    assert "/derived/photos/" in url
+
+    response = client.get(url, headers={"Accept": "image/webp,image/*"})
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "Accept" in response.headers["Vary"]
+
+    for accept in ("image/jpeg", "*/*", "image/*", "image/webp;q=0,*/*"):
+        response = client.get(url, headers={"Accept": accept})
+        assert response.mimetype == "image/jpeg"
+
+    # A new photo gets a new name, and derivatives of the former one are removed
+    former_path = derivative_path(event.photo, "event_card")
+    file = FileStorage(io.BytesIO(_jpeg("blue")), filename="photo.jpg")
+    assert event.save_photo(file)
+    assert not os.path.exists(former_path)
+    assert os.path.exists(derivative_path(event.photo, "event_card"))
+
+
+def test_generate_image_derivatives_command(app, event, upload_dirs):
+    """Test the backfill of derivatives of images uploaded before they existed"""
+
+    (upload_dirs / "event-1.jpg").write_bytes(_jpeg("green"))
+    event.photo = "event-1.jpg"
+    db.session.commit()
+    with app.test_request_context():
+        assert "imgsizer/" in photo_uri(event)
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["collectives", "generate-image-derivatives"])
+    assert result.exit_code == 0
+    assert "1 image(s) vérifiée(s), 1 renommée(s), 4 fichier(s) généré(s)" in (
+        result.output
+    )
+
+    db.session.refresh(event)
+    assert is_hashed_name(event.photo)
+    assert not (upload_dirs / "event-1.jpg").exists()
+    with app.test_request_context():
+        assert "/derived/photos/" in photo_uri(event)
+
+    # Derivatives are only generated once
+    result = runner.invoke(args=["collectives", "generate-image-derivatives"])
+    assert "0 renommée(s), 0 fichier(s) généré(s)" in result.output
@@ -0,0 +1,205 @@
+"""Unit test on :py:mod:`collectives.utils.mail` queues and connection pool."""
+
+# pylint: disable=unused-argument,redefined-outer-name
+
+import smtplib
+
+import pytest
+
+from collectives.email_templates import send_confirmation_email
+from collectives.models import ConfirmationToken, SpooledMail, SpooledMailStatus, db
+from collectives.models.auth import TokenEmailStatus
+from collectives.utils import mail
+from collectives.utils.mail import MailQueue, get_dkim_signer, send_mail
+from collectives.utils.time import current_time
+from tests.mock.mail import smtp_stub
+
+
+@pytest.fixture
+def mail_queue(app):
+    """A mail queue with short retry delays"""
+    queue = MailQueue()
+    queue.init_app(app)
+    queue.max_retries = 2
+    queue.retry_delay = 0.01
+    yield queue
+    queue.pool.close()
+
+
+def test_mail_queue_reuses_connection(app, smtp_stub, mail_queue):
+    """Test that queued mails are sent over a single pooled connection"""
+    for i in range(30):
+        mail_queue.put(app, subject="Test", email=f"user{i}@example.org", message="M")
+    mail_queue.join()
+
+    assert len(smtp_stub.connections) == 1
+    assert len(smtp_stub.connections[0].messages) == 30
+    assert not smtp_stub.connections[0].closed
+
+    stats = mail_queue.stats()
+    assert stats["depth"] == 0
+    assert stats["sent"] == 30
+    assert stats["connections"] == 1
+
+    # Empty recipients are ignored
+    mail_queue.put(app, subject="Test", email=[], message="M")
+    mail_queue.join()
+    assert mail_queue.stats()["sent"] == 30
+
+
+def test_mail_queue_retry(app, smtp_stub, mail_queue):
+    """Test that transient errors are retried over a new connection"""
+    smtp_stub.errors.append(smtplib.SMTPServerDisconnected("Connection lost"))
+    succeeded = []
+
+    mail_queue.put(
+        app,
+        subject="Test",
+        email="user@example.org",
+        message="M",
+        success_action=lambda: succeeded.append(True),
+    )
+    mail_queue.join()
+
+    assert succeeded == [True]
+    assert len(smtp_stub.connections) == 2
+    assert smtp_stub.connections[0].closed
+    stats = mail_queue.stats()
+    assert stats["sent"] == 1
+    assert stats["retried"] == 1
+    assert stats["failed"] == 0
+
+
+def test_mail_queue_permanent_error(app, smtp_stub, mail_queue):
+    """Test that permanent errors run the error action without retrying"""
+    refused = smtplib.SMTPRecipientsRefused({"user@example.org": (550, b"Unknown")})
+    smtp_stub.errors.append(refused)
+    errors = []
+
+    mail_queue.put(
+        app,
+        subject="Test",
+        email="user@example.org",
+        message="M",
+        error_action=errors.append,
+    )
+    mail_queue.put(app, subject="Test", email="other@example.org", message="M")
+    mail_queue.join()
+
+    assert errors == [refused]
+    assert [msg["To"] for msg in smtp_stub.sent_messages()] == ["other@example.org"]
+    stats = mail_queue.stats()
+    assert stats["sent"] == 1
+    assert stats["retried"] == 0
+    assert stats["failed"] == 1
+
+
+def test_dkim_signer_cache():
+    """Test that DKIM parameters are prepared once per configuration"""
+    assert get_dkim_signer("", "default", "noreply@example.org") is None
+
+    signer = get_dkim_signer("KEY\r\n", "default", "noreply@example.org")
+    assert signer.domain == b"example.org"
+    assert signer.private_key == b"KEY\n"
+    assert get_dkim_signer("KEY\r\n", "default", "noreply@example.org") is signer
+
+
+def test_mail_spool(app, smtp_stub):
+    """Test that spooled mails are written on commit and sent by the command"""
+    token = ConfirmationToken("740012345678", None)
+    db.session.add(token)
+    db.session.commit()
+
+    send_confirmation_email("user@example.org", "User", token)
+    assert SpooledMail.query.count() == 0
+    db.session.commit()
+
+    spooled = SpooledMail.query.one()
+    assert spooled.recipients == "user@example.org"
+    assert spooled.success_action["args"] == [token.uuid, TokenEmailStatus.Success]
+
+    # Mails spooled without commit are written at the end of the app context
+    with app.app_context():
+        send_mail(subject="Test", email=["a@example.org", "b@example.org"], message="M")
+    assert SpooledMail.query.count() == 2
+    assert not smtp_stub.connections
+
+    # Mails are dropped on rollback
+    send_mail(subject="Rolled back", email="c@example.org", message="M")
+    db.session.rollback()
+    db.session.commit()
+    assert SpooledMail.query.count() == 2
+
+    # but not at the end of an app context with uncommitted changes
+    with app.app_context():
+        db.session.add(ConfirmationToken("740012345679", None))
+        db.session.flush()
+        send_mail(subject="Not committed", email="d@example.org", message="M")
+    assert SpooledMail.query.count() == 3
+    assert ConfirmationToken.query.count() == 1
+
+    result = app.test_cli_runner().invoke(
+        args=["collectives", "send-mails", "--until-empty"]
+    )
+    assert result.exit_code == 0
+    assert "3 mail(s)" in result.output
+
+    assert len(smtp_stub.connections) == 1
+    assert [msg["To"] for msg in smtp_stub.sent_messages()] == [
+        "user@example.org",
+        None,
+        "d@example.org",
+    ]
+    assert SpooledMail.query.count() == 0
+    db.session.refresh(token)
+    assert token.status == TokenEmailStatus.Success
+
+
+def test_mail_spool_errors(app, smtp_stub):
+    """Test retries and failures of spooled mails"""
+    token = ConfirmationToken("740012345678", None)
+    db.session.add(token)
+    db.session.commit()
+    mail.mail_spool.max_retries = 1
+
+    smtp_stub.errors.append(smtplib.SMTPServerDisconnected("Connection lost"))
+    send_confirmation_email("user@example.org", "User", token)
+    db.session.commit()
+
+    assert mail.mail_spool.drain(app) == 1
+    spooled = SpooledMail.query.one()
+    assert spooled.status == SpooledMailStatus.Pending
+    assert spooled.attempts == 1
+    assert spooled.claim_token is None
+    assert "Connection lost" in spooled.last_error
+
+    # The mail is not sent again before its retry delay
+    assert mail.mail_spool.drain(app) == 0
+    spooled.next_attempt_time = current_time()
+    db.session.commit()
+
+    smtp_stub.errors.append(smtplib.SMTPServerDisconnected("Connection lost"))
+    assert mail.mail_spool.drain(app) == 1
+    db.session.refresh(spooled)
+    assert spooled.status == SpooledMailStatus.Failed
+    assert mail.mail_spool.drain(app) == 0
+
+    db.session.refresh(token)
+    assert token.status == TokenEmailStatus.Failed
+    assert not smtp_stub.sent_messages()
+
+
+def test_mail_spool_unserializable_action(app, smtp_stub):
+    """Test that mails whose actions cannot be stored are queued in memory"""
+    succeeded = []
+    send_mail(
+        subject="Test",
+        email="user@example.org",
+        message="M",
+        success_action=lambda: succeeded.append(True),
+    )
+    db.session.commit()
+    mail.mail_queue.join()
+
+    assert SpooledMail.query.count() == 0
+    assert succeeded == [True]